@@ -84,60 +84,139 @@ class ErrorStatistics:
 
 
 class TimeSeriesData:
-    """时间序列数据"""
+    """时间序列数据
     
-    def __init__(self, max_points: int = 1440):  # 默认保存24小时的分钟级数据
+    固定长度的环形缓冲；同一时间桶内的点原地更新而不是追加。
+    按点维护前缀和（Σy、Σy²、Σi·y，i 为点的绝对序号），
+    趋势与均值/方差计算均为 O(1)。
+    """
+    
+    def __init__(self, max_points: int = 1440, bucket_seconds: int = 60):  # 默认保存24小时的分钟级数据
         self.max_points = max_points
-        self.timestamps: deque = deque(maxlen=max_points)
-        self.values: deque = deque(maxlen=max_points)
+        self.bucket = timedelta(seconds=bucket_seconds)
+        self.timestamps: deque = deque()
+        self.values: deque = deque()
+        self._prefix: deque = deque()  # 截至每个点（含）的前缀和
+        self._base: Tuple[float, float, float] = (0, 0, 0)  # 已淘汰点的前缀和
+        self._next_index = 0
         self._lock = threading.Lock()
     
     def add_point(self, timestamp: datetime, value: float):
-        """添加数据点"""
+        """添加数据点；与最新点时间戳相同则覆盖其值"""
+        with self._lock:
+            if self.timestamps and timestamp == self.timestamps[-1]:
+                self._set_last(value)
+            else:
+                self._append(timestamp, value)
+    
+    def increment(self, bucket_start: datetime, delta: float = 1):
+        """累加到时间桶；跨桶时缺失的桶补 0，保证序列按桶连续"""
         with self._lock:
-            self.timestamps.append(timestamp)
-            self.values.append(value)
+            if self.timestamps:
+                last = self.timestamps[-1]
+                if bucket_start <= last:
+                    # 同一桶（或时钟回拨）计入最新桶
+                    self._set_last(self.values[-1] + delta)
+                    return
+                missing = int((bucket_start - last) / self.bucket) - 1
+                for i in range(max(0, missing - self.max_points), missing):
+                    self._append(last + self.bucket * (i + 1), 0)
+            self._append(bucket_start, delta)
+    
+    def _append(self, timestamp: datetime, value: float):
+        prev = self._prefix[-1] if self._prefix else self._base
+        i = self._next_index
+        self.timestamps.append(timestamp)
+        self.values.append(value)
+        self._prefix.append((prev[0] + value, prev[1] + value * value, prev[2] + i * value))
+        self._next_index = i + 1
+        if len(self.values) > self.max_points:
+            self.timestamps.popleft()
+            self.values.popleft()
+            self._base = self._prefix.popleft()
+    
+    def _set_last(self, value: float):
+        prev = self._prefix[-2] if len(self._prefix) > 1 else self._base
+        i = self._next_index - 1
+        self.values[-1] = value
+        self._prefix[-1] = (prev[0] + value, prev[1] + value * value, prev[2] + i * value)
+    
+    def _window_sums(self, points: int) -> Tuple[int, float, float, float]:
+        """最近 points 个点的 (n, Σy, Σy², Σx·y)，x 从 0 开始"""
+        n = min(points, len(self.values))
+        if n == 0:
+            return 0, 0, 0, 0
+        last = self._prefix[-1]
+        before = self._prefix[-n - 1] if n < len(self._prefix) else self._base
+        sum_y = last[0] - before[0]
+        sum_y2 = last[1] - before[1]
+        first_index = self._next_index - n
+        sum_xy = (last[2] - before[2]) - first_index * sum_y
+        return n, sum_y, sum_y2, sum_xy
     
     def get_data(self, since: Optional[datetime] = None) -> List[Tuple[datetime, float]]:
         """获取数据"""
         with self._lock:
-            data = list(zip(self.timestamps, self.values))
-            
-            if since:
-                data = [(ts, val) for ts, val in data if ts >= since]
+            if since is None:
+                return list(zip(self.timestamps, self.values))
             
+            # 时间戳有序，从尾部向前收集
+            data = []
+            for ts, val in zip(reversed(self.timestamps), reversed(self.values)):
+                if ts < since:
+                    break
+                data.append((ts, val))
+            data.reverse()
             return data
     
+    def count_since(self, since: datetime) -> int:
+        """since 之后的点数"""
+        with self._lock:
+            count = 0
+            for ts in reversed(self.timestamps):
+                if ts < since:
+                    break
+                count += 1
+            return count
+    
     def get_latest_value(self) -> Optional[float]:
         """获取最新值"""
         with self._lock:
             return self.values[-1] if self.values else None
     
     def calculate_trend(self, points: int = 10) -> float:
-        """计算趋势（斜率）"""
+        """计算趋势（最近 points 个点的线性回归斜率）"""
         with self._lock:
-            if len(self.values) < 2:
+            n, sum_y, _, sum_xy = self._window_sums(points)
+            if n < 2:
                 return 0.0
             
-            recent_values = list(self.values)[-points:]
-            if len(recent_values) < 2:
+            sum_x = n * (n - 1) / 2
+            sum_x2 = (n - 1) * n * (2 * n - 1) / 6
+            denominator = n * sum_x2 - sum_x ** 2
+            if denominator == 0:
                 return 0.0
             
-            # 简单线性回归计算斜率
-            n = len(recent_values)
-            x = list(range(n))
-            y = recent_values
-            
-            sum_x = sum(x)
-            sum_y = sum(y)
-            sum_xy = sum(x[i] * y[i] for i in range(n))
-            sum_x2 = sum(x[i] ** 2 for i in range(n))
-            
-            if n * sum_x2 - sum_x ** 2 == 0:
-                return 0.0
-            
-            slope = (n * sum_xy - sum_x * sum_y) / (n * sum_x2 - sum_x ** 2)
-            return slope
+            return (n * sum_xy - sum_x * sum_y) / denominator
+    
+    def calculate_stats(self, points: int) -> Tuple[float, float]:
+        """最近 points 个点的 (均值, 标准差)"""
+        with self._lock:
+            n, sum_y, sum_y2, _ = self._window_sums(points)
+            if n == 0:
+                return 0.0, 0.0
+            mean = sum_y / n
+            variance = max(sum_y2 / n - mean * mean, 0.0)
+            return mean, variance ** 0.5
+
+
+# 各统计窗口的长度；窗口起点见 ErrorAggregator._window_start
+_WINDOW_SPANS = {
+    TimeWindow.MINUTE: timedelta(minutes=1),
+    TimeWindow.HOUR: timedelta(hours=1),
+    TimeWindow.DAY: timedelta(days=1),
+    TimeWindow.WEEK: timedelta(weeks=1),
+}
 
 
 class ErrorAggregator:
@@ -148,8 +227,10 @@ class ErrorAggregator:
     
     def __init__(self, max_history: int = 10000):
         self.max_history = max_history
-        self.error_history: List[MarketPrismError] = []
+        self.error_history: deque = deque(maxlen=max_history)
         self.error_patterns: Dict[str, ErrorPattern] = {}
+        # 模式签名 (错误类型, 分类) -> 模式，免去每次拼接字符串键
+        self._pattern_index: Dict[Tuple[ErrorType, ErrorCategory], ErrorPattern] = {}
         
         # 时间序列数据
         self.error_rate_series = TimeSeriesData()
@@ -158,6 +239,7 @@ class ErrorAggregator:
         
         # 统计数据
         self.current_statistics: Dict[TimeWindow, ErrorStatistics] = {}
+        self._window_ends: Dict[TimeWindow, datetime] = {}
         
         # 线程安全
         self._lock = threading.Lock()
@@ -170,76 +252,67 @@ class ErrorAggregator:
         now = datetime.now(timezone.utc)
         
         for window in TimeWindow:
-            if window == TimeWindow.MINUTE:
-                start_time = now.replace(second=0, microsecond=0)
-            elif window == TimeWindow.HOUR:
-                start_time = now.replace(minute=0, second=0, microsecond=0)
-            elif window == TimeWindow.DAY:
-                start_time = now.replace(hour=0, minute=0, second=0, microsecond=0)
-            else:  # WEEK
-                days_since_monday = now.weekday()
-                start_time = (now - timedelta(days=days_since_monday)).replace(
-                    hour=0, minute=0, second=0, microsecond=0
-                )
-            
-            self.current_statistics[window] = ErrorStatistics(
-                time_window=window,
-                start_time=start_time,
-                end_time=now,
-                total_errors=0
+            self._reset_statistics_window(window, now)
+    
+    @staticmethod
+    def _window_start(window: TimeWindow, now: datetime) -> datetime:
+        """时间窗口的起点"""
+        if window == TimeWindow.MINUTE:
+            return now.replace(second=0, microsecond=0)
+        elif window == TimeWindow.HOUR:
+            return now.replace(minute=0, second=0, microsecond=0)
+        elif window == TimeWindow.DAY:
+            return now.replace(hour=0, minute=0, second=0, microsecond=0)
+        else:  # WEEK
+            days_since_monday = now.weekday()
+            return (now - timedelta(days=days_since_monday)).replace(
+                hour=0, minute=0, second=0, microsecond=0
             )
     
     def add_error(self, error: MarketPrismError):
         """添加错误到聚合器"""
         with self._lock:
-            # 添加到历史记录
+            # 添加到历史记录（deque 自动限制大小）
             self.error_history.append(error)
             
-            # 限制历史记录大小
-            if len(self.error_history) > self.max_history:
-                self.error_history = self.error_history[-self.max_history:]
+            now = datetime.now(timezone.utc)
             
             # 更新统计
-            self._update_statistics(error)
+            self._update_statistics(error, now)
             
             # 更新时间序列
-            self._update_time_series(error)
+            self._update_time_series(error, now)
             
             # 更新错误模式
             self._update_patterns(error)
     
-    def _update_statistics(self, error: MarketPrismError):
+    def _update_statistics(self, error: MarketPrismError, now: Optional[datetime] = None):
         """更新统计信息"""
-        now = datetime.now(timezone.utc)
+        now = now or datetime.now(timezone.utc)
+        
+        # 各窗口共用的统计键只计算一次
+        category = error.category.value
+        severity = error.severity.value
+        error_type = error.error_type.name
+        component = error.get_context_value('component', 'unknown')
         
-        for window, stats in self.current_statistics.items():
-            # 检查是否需要重置统计窗口
-            if self._should_reset_window(stats, now):
+        for window in TimeWindow:
+            # 越过窗口边界时重置
+            if now >= self._window_ends[window]:
                 self._reset_statistics_window(window, now)
-                stats = self.current_statistics[window]
+            stats = self.current_statistics[window]
             
             # 更新统计数据
             stats.total_errors += 1
             stats.end_time = now
             
-            # 按分类统计
-            category = error.category.value
             stats.by_category[category] = stats.by_category.get(category, 0) + 1
-            
-            # 按严重程度统计
-            severity = error.severity.value
             stats.by_severity[severity] = stats.by_severity.get(severity, 0) + 1
-            
-            # 按错误类型统计
-            error_type = error.error_type.name
             stats.by_type[error_type] = stats.by_type.get(error_type, 0) + 1
-            
-            # 按组件统计（从上下文获取）
-            component = error.get_context_value('component', 'unknown')
             stats.by_component[component] = stats.by_component.get(component, 0) + 1
             
             # 计算错误率
-            duration = (stats.end_time - stats.start_time).total_seconds()
+            duration = (now - stats.start_time).total_seconds()
             if duration > 0:
                 stats.error_rate = stats.total_errors / duration * 60  # 每分钟错误数
                 critical_errors = stats.by_severity.get('critical', 0)
@@ -247,28 +320,12 @@ class ErrorAggregator:
     
     def _should_reset_window(self, stats: ErrorStatistics, now: datetime) -> bool:
         """判断是否应该重置统计窗口"""
-        if stats.time_window == TimeWindow.MINUTE:
-            return now.minute != stats.start_time.minute
-        elif stats.time_window == TimeWindow.HOUR:
-            return now.hour != stats.start_time.hour
-        elif stats.time_window == TimeWindow.DAY:
-            return now.date() != stats.start_time.date()
-        else:  # WEEK
-            return now.isocalendar()[1] != stats.start_time.isocalendar()[1]
+        return now >= stats.start_time + _WINDOW_SPANS[stats.time_window]
     
     def _reset_statistics_window(self, window: TimeWindow, now: datetime):
         """重置统计窗口"""
-        if window == TimeWindow.MINUTE:
-            start_time = now.replace(second=0, microsecond=0)
-        elif window == TimeWindow.HOUR:
-            start_time = now.replace(minute=0, second=0, microsecond=0)
-        elif window == TimeWindow.DAY:
-            start_time = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        else:  # WEEK
-            days_since_monday = now.weekday()
-            start_time = (now - timedelta(days=days_since_monday)).replace(
-                hour=0, minute=0, second=0, microsecond=0
-            )
+        start_time = self._window_start(window, now)
+        self._window_ends[window] = start_time + _WINDOW_SPANS[window]
         
         self.current_statistics[window] = ErrorStatistics(
             time_window=window,
@@ -277,51 +334,31 @@ class ErrorAggregator:
             total_errors=0
         )
     
-    def _update_time_series(self, error: MarketPrismError):
-        """更新时间序列数据"""
-        now = datetime.now(timezone.utc)
-        
-        # 更新错误率时间序列（每分钟采样）
+    def _update_time_series(self, error: MarketPrismError, now: Optional[datetime] = None):
+        """更新时间序列数据（按分钟桶累加）"""
+        now = now or datetime.now(timezone.utc)
         minute_key = now.replace(second=0, microsecond=0)
         
-        # 计算当前分钟的错误数
-        minute_errors = len([
-            e for e in self.error_history
-            if e.timestamp >= minute_key and e.timestamp < minute_key + timedelta(minutes=1)
-        ])
+        self.error_rate_series.increment(minute_key)
         
-        self.error_rate_series.add_point(minute_key, minute_errors)
-        
-        # 更新严重错误时间序列
-        critical_errors = len([
-            e for e in self.error_history
-            if (e.timestamp >= minute_key and 
-                e.timestamp < minute_key + timedelta(minutes=1) and
-                e.severity == ErrorSeverity.CRITICAL)
-        ])
-        
-        self.critical_error_series.add_point(minute_key, critical_errors)
+        # 非严重错误也推进桶，保持与错误率序列对齐
+        self.critical_error_series.increment(
+            minute_key, 1 if error.severity == ErrorSeverity.CRITICAL else 0
+        )
         
         # 更新分类时间序列
         category = error.category.value
-        if category not in self.category_series:
-            self.category_series[category] = TimeSeriesData()
-        
-        category_errors = len([
-            e for e in self.error_history
-            if (e.timestamp >= minute_key and
-                e.timestamp < minute_key + timedelta(minutes=1) and
-                e.category == error.category)
-        ])
-        
-        self.category_series[category].add_point(minute_key, category_errors)
+        series = self.category_series.get(category)
+        if series is None:
+            series = self.category_series[category] = TimeSeriesData()
+        series.increment(minute_key)
     
     def _update_patterns(self, error: MarketPrismError):
         """更新错误模式"""
-        pattern_key = f"{error.error_type.name}_{error.category.value}"
+        signature = (error.error_type, error.category)
+        pattern = self._pattern_index.get(signature)
         
-        if pattern_key in self.error_patterns:
-            pattern = self.error_patterns[pattern_key]
+        if pattern is not None:
             pattern.frequency += 1
             pattern.last_seen = error.timestamp
             
@@ -336,6 +373,7 @@ class ErrorAggregator:
         
         else:
             # 创建新模式
+            pattern_key = f"{error.error_type.name}_{error.category.value}"
             component = error.get_context_value('component')
             components = [component] if component else []
             
@@ -351,6 +389,7 @@ class ErrorAggregator:
             )
             
             self.error_patterns[pattern_key] = pattern
+            self._pattern_index[signature] = pattern
     
     def get_statistics(self, window: TimeWindow = TimeWindow.HOUR) -> ErrorStatistics:
         """获取指定时间窗口的统计信息"""
@@ -414,18 +453,14 @@ class ErrorAggregator:
         """检测异常"""
         anomalies = []
         
-        # 检测错误率异常
-        recent_data = self.error_rate_series.get_data(
-            since=datetime.now(timezone.utc) - timedelta(hours=1)
-        )
+        since = datetime.now(timezone.utc) - timedelta(hours=1)
         
-        if len(recent_data) >= 10:
-            values = [val for _, val in recent_data]
-            mean_rate = sum(values) / len(values)
-            variance = sum((val - mean_rate) ** 2 for val in values) / len(values)
-            std_dev = variance ** 0.5
-            
-            current_rate = values[-1]
+        # 检测错误率异常（最近一小时的分钟桶）
+        recent_points = self.error_rate_series.count_since(since)
+        
+        if recent_points >= 10:
+            mean_rate, std_dev = self.error_rate_series.calculate_stats(recent_points)
+            current_rate = self.error_rate_series.get_latest_value()
             if current_rate > mean_rate + threshold * std_dev:
                 anomalies.append({
                     "type": "high_error_rate",
@@ -435,12 +470,8 @@ class ErrorAggregator:
                 })
         
         # 检测严重错误异常
-        critical_data = self.critical_error_series.get_data(
-            since=datetime.now(timezone.utc) - timedelta(hours=1)
-        )
-        
-        if critical_data:
-            current_critical = critical_data[-1][1]
+        if self.critical_error_series.count_since(since):
+            current_critical = self.critical_error_series.get_latest_value()
             if current_critical > 0:
                 anomalies.append({
                     "type": "critical_errors_detected",
@@ -497,6 +528,7 @@ class ErrorAggregator:
         with self._lock:
             self.error_history.clear()
             self.error_patterns.clear()
+            self._pattern_index.clear()
             self.category_series.clear()
             
             # 重新初始化
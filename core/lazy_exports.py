@@ -0,0 +1,76 @@
+"""
+MarketPrism 包级延迟导出（PEP 562）
+
+子包 __init__ 通过模块级 __getattr__ 按需导入子模块，公开名称保持不变：
+
+    from core.lazy_exports import lazy_exports
+
+    _LAZY_EXPORTS = {
+        'UnifiedStorageManager': ('.unified_storage_manager', 'UnifiedStorageManager'),
+    }
+    _LAZY_FACTORIES = {
+        'storage_manager': _create_storage_manager,  # 首次访问时创建的全局实例
+    }
+    __getattr__, __dir__ = lazy_exports(__name__, _LAZY_EXPORTS, _LAZY_FACTORIES)
+
+名称解析一次后写回模块命名空间，后续访问与普通属性相同，没有额外开销。
+"""
+
+import importlib
+import sys
+import types
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class _ShadowGuardModule(types.ModuleType):
+    """阻止子模块导入覆盖同名的导出对象
+
+    例如 core.networking 导出全局实例 websocket_manager，
+    而 core.networking.websocket_manager 同时也是子模块。急切导入时
+    __init__ 总是最后绑定实例；延迟导入时需要拦截导入系统的
+    setattr(package, 'websocket_manager', <module>)，保证语义一致。
+    """
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if isinstance(value, types.ModuleType) and name in self.__dict__.get('_lazy_shadowed', ()):
+            return
+        super().__setattr__(name, value)
+
+
+def lazy_exports(
+    module_name: str,
+    exports: Dict[str, Tuple[str, str]],
+    factories: Optional[Dict[str, Callable[[], Any]]] = None,
+) -> Tuple[Callable[[str], Any], Callable[[], List[str]]]:
+    """为包生成模块级 __getattr__ / __dir__
+
+    Args:
+        module_name: 包名，传入 __name__
+        exports: 导出名 -> (模块路径, 属性名)，模块路径可为相对路径
+        factories: 导出名 -> 无参工厂函数，用于全局实例和可选依赖
+    """
+    module = sys.modules[module_name]
+    namespace = module.__dict__
+    factories = factories or {}
+
+    submodules = {path.lstrip('.') for path, _ in exports.values() if path.startswith('.')}
+    shadowed = (set(exports) | set(factories)) & submodules
+    if shadowed:
+        namespace['_lazy_shadowed'] = frozenset(shadowed)
+        module.__class__ = _ShadowGuardModule
+
+    def __getattr__(name: str) -> Any:
+        if name in exports:
+            path, attr = exports[name]
+            value = getattr(importlib.import_module(path, module_name), attr)
+        elif name in factories:
+            value = factories[name]()
+        else:
+            raise AttributeError(f"module {module_name!r} has no attribute {name!r}")
+        namespace[name] = value
+        return value
+
+    def __dir__() -> List[str]:
+        return sorted(set(namespace) | set(exports) | set(factories))
+
+    return __getattr__, __dir__
@@ -17,12 +17,14 @@ import asyncio
 import time
 import jwt
 import hashlib
+import hmac
 import secrets
 import base64
 from abc import ABC, abstractmethod
+from collections import OrderedDict
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import Dict, List, Optional, Any, Callable, Union
+from typing import Dict, List, Optional, Any, Callable, Tuple, Union
 import threading
 from datetime import datetime, timedelta, timezone
 
@@ -162,6 +164,8 @@ class JWTConfig:
     verify_iss: bool = False
     verify_aud: bool = False
     leeway: int = 0  # 时间偏移容忍度（秒）
+    cache_size: int = 1024  # 已验证令牌缓存条目上限，0 表示关闭缓存
+    cache_ttl: int = 300  # 缓存条目最长存活（秒），且不超过令牌自身的 exp
     
     def get_decode_options(self) -> Dict[str, bool]:
         """获取JWT解码选项"""
@@ -174,41 +178,144 @@ class JWTConfig:
         }
 
 
+class VerifiedTokenCache:
+    """
+    已验证凭证的有界LRU缓存
+
+    键为凭证摘要（不保存令牌原文），值为验证后得到的声明；
+    条目过期时间取 min(写入时间 + ttl, 调用方给出的上限)，命中时仍检查过期。
+    """
+    
+    def __init__(self, max_size: int = 1024, ttl: float = 300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[bytes, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+    
+    def get(self, digest: bytes) -> Optional[Any]:
+        """获取未过期的条目"""
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            if entry[0] <= time.time():
+                del self._entries[digest]
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(digest)
+            self.stats['hits'] += 1
+            return entry[1]
+    
+    def put(self, digest: bytes, value: Any, expires_at: Optional[float] = None) -> None:
+        """写入条目，expires_at 为绝对时间戳上限（如令牌 exp）"""
+        if self.max_size <= 0:
+            return
+        now = time.time()
+        deadline = now + self.ttl
+        if expires_at is not None:
+            deadline = min(deadline, expires_at)
+        if deadline <= now:
+            return
+        with self._lock:
+            self._entries[digest] = (deadline, value)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+    
+    def invalidate(self, digest: bytes) -> bool:
+        """删除单个条目"""
+        with self._lock:
+            if self._entries.pop(digest, None) is None:
+                return False
+            self.stats['invalidations'] += 1
+            return True
+    
+    def invalidate_where(self, predicate: Callable[[Any], bool]) -> int:
+        """删除满足条件的条目，返回删除数量"""
+        with self._lock:
+            stale = [digest for digest, (_, value) in self._entries.items() if predicate(value)]
+            for digest in stale:
+                del self._entries[digest]
+            self.stats['invalidations'] += len(stale)
+            return len(stale)
+    
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self.stats['invalidations'] += len(self._entries)
+            self._entries.clear()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计"""
+        return {'size': len(self._entries), 'max_size': self.max_size, **self.stats}
+
+
 class JWTValidator:
     """JWT验证器"""
     
     def __init__(self, config: JWTConfig):
         self.config = config
+        # 签名校验通过的令牌摘要 -> JWTClaims；重复令牌不再执行 jwt.decode
+        self.cache = VerifiedTokenCache(config.cache_size, config.cache_ttl)
+        # 已吊销令牌摘要 -> 清理时间（令牌 exp）
+        self._revoked: Dict[bytes, float] = {}
+    
+    def _digest(self, token: str) -> bytes:
+        """令牌摘要；包含算法与密钥，密钥轮换后旧条目不会再命中"""
+        return hashlib.sha256(
+            f"{self.config.algorithm}\0{self.config.secret_key}\0{token}".encode('utf-8')
+        ).digest()
+    
+    def _decode_claims(self, token: str) -> JWTClaims:
+        """解码并校验JWT，返回声明"""
+        payload = jwt.decode(
+            token,
+            self.config.secret_key,
+            algorithms=[self.config.algorithm],
+            options=self.config.get_decode_options(),
+            leeway=self.config.leeway,
+            issuer=self.config.issuer if self.config.verify_iss else None,
+            audience=self.config.audience if self.config.verify_aud else None
+        )
+        
+        # 提取声明
+        return JWTClaims(
+            user_id=payload.get('sub', ''),
+            username=payload.get('username', ''),
+            email=payload.get('email', ''),
+            roles=payload.get('roles', []),
+            permissions=payload.get('permissions', []),
+            issued_at=datetime.fromtimestamp(payload.get('iat', 0), tz=timezone.utc) if payload.get('iat') else None,
+            expires_at=datetime.fromtimestamp(payload.get('exp', 0), tz=timezone.utc) if payload.get('exp') else None,
+            issuer=payload.get('iss', ''),
+            audience=payload.get('aud', ''),
+            custom_claims={k: v for k, v in payload.items() 
+                         if k not in ['sub', 'username', 'email', 'roles', 'permissions', 
+                                    'iat', 'exp', 'iss', 'aud']}
+        )
     
     async def validate_token(self, token: str) -> AuthenticationResult:
         """验证JWT令牌"""
         try:
-            # 解码JWT
-            payload = jwt.decode(
-                token,
-                self.config.secret_key,
-                algorithms=[self.config.algorithm],
-                options=self.config.get_decode_options(),
-                leeway=self.config.leeway,
-                issuer=self.config.issuer if self.config.verify_iss else None,
-                audience=self.config.audience if self.config.verify_aud else None
-            )
+            digest = self._digest(token)
+            if self._revoked and digest in self._revoked:
+                return AuthenticationResult.failure_result(
+                    "Token has been revoked", 
+                    "TOKEN_REVOKED"
+                )
             
-            # 提取声明
-            claims = JWTClaims(
-                user_id=payload.get('sub', ''),
-                username=payload.get('username', ''),
-                email=payload.get('email', ''),
-                roles=payload.get('roles', []),
-                permissions=payload.get('permissions', []),
-                issued_at=datetime.fromtimestamp(payload.get('iat', 0), tz=timezone.utc) if payload.get('iat') else None,
-                expires_at=datetime.fromtimestamp(payload.get('exp', 0), tz=timezone.utc) if payload.get('exp') else None,
-                issuer=payload.get('iss', ''),
-                audience=payload.get('aud', ''),
-                custom_claims={k: v for k, v in payload.items() 
-                             if k not in ['sub', 'username', 'email', 'roles', 'permissions', 
-                                        'iat', 'exp', 'iss', 'aud']}
-            )
+            claims = self.cache.get(digest)
+            if claims is None:
+                claims = self._decode_claims(token)
+                if not claims.is_expired():
+                    self.cache.put(digest, claims,
+                                   claims.expires_at.timestamp() if claims.expires_at else None)
             
             # 检查是否过期
             if claims.is_expired():
@@ -217,15 +324,15 @@ class JWTValidator:
                     "TOKEN_EXPIRED"
                 )
             
-            # 创建认证上下文
+            # 创建认证上下文（角色/权限复制一份，避免请求内修改污染缓存）
             context = AuthenticationContext(
                 is_authenticated=True,
                 authentication_type=AuthenticationType.JWT,
                 user_id=claims.user_id,
                 username=claims.username,
                 email=claims.email,
-                roles=claims.roles,
-                permissions=claims.permissions,
+                roles=list(claims.roles),
+                permissions=list(claims.permissions),
                 jwt_claims=claims,
                 authenticated_at=datetime.now(timezone.utc)
             )
@@ -248,6 +355,22 @@ class JWTValidator:
                 "VALIDATION_ERROR"
             )
     
+    def revoke_token(self, token: str) -> None:
+        """吊销令牌：移出缓存并在其过期前拒绝"""
+        digest = self._digest(token)
+        self.cache.invalidate(digest)
+        now = time.time()
+        try:
+            exp = jwt.decode(token, options={'verify_signature': False}).get('exp')
+        except jwt.InvalidTokenError:
+            exp = None
+        self._revoked = {d: t for d, t in self._revoked.items() if t > now}
+        self._revoked[digest] = float(exp) + self.config.leeway if exp else now + self.config.refresh_ttl
+    
+    def invalidate_user(self, user_id: str) -> int:
+        """移除某用户的全部缓存令牌（角色/权限变更后重新校验）"""
+        return self.cache.invalidate_where(lambda claims: claims.user_id == user_id)
+    
     def generate_token(self, claims: JWTClaims) -> str:
         """生成JWT令牌"""
         now = datetime.now(timezone.utc)
@@ -339,12 +462,32 @@ class APIKeyStore(ABC):
 
 
 class MemoryAPIKeyStore(APIKeyStore):
-    """内存API密钥存储"""
+    """
+    内存API密钥存储
+
+    除按原文索引的 keys 外，维护预先计算的 sha256 摘要表：
+    查找按固定长度摘要进行，再以 hmac.compare_digest 常量时间确认原文。
+    """
     
     def __init__(self):
         self.keys: Dict[str, Dict[str, Any]] = {}
+        self._digests: Dict[bytes, str] = {}
         self._lock = threading.Lock()
     
+    @staticmethod
+    def _digest(api_key: str) -> bytes:
+        return hashlib.sha256(api_key.encode('utf-8')).digest()
+    
+    def _lookup(self, api_key: str) -> Optional[str]:
+        """按摘要表查找已登记的密钥原文（调用方持有锁）"""
+        if len(self._digests) != len(self.keys):
+            # keys 被直接修改过，重建摘要表
+            self._digests = {self._digest(key): key for key in self.keys}
+        stored = self._digests.get(self._digest(api_key))
+        if stored is None or not hmac.compare_digest(stored.encode('utf-8'), api_key.encode('utf-8')):
+            return None
+        return stored
+    
     def add_key(self, api_key: str, user_info: Dict[str, Any]) -> None:
         """添加API密钥"""
         with self._lock:
@@ -358,11 +501,13 @@ class MemoryAPIKeyStore(APIKeyStore):
                 'last_used': None,
                 'metadata': user_info.get('metadata', {})
             }
+            self._digests[self._digest(api_key)] = api_key
     
     async def get_key_info(self, api_key: str) -> Optional[Dict[str, Any]]:
         """获取API密钥信息"""
         with self._lock:
-            info = self.keys.get(api_key)
+            stored = self._lookup(api_key)
+            info = self.keys.get(stored) if stored is not None else None
             if info:
                 # 更新最后使用时间
                 info['last_used'] = datetime.now(timezone.utc)
@@ -370,13 +515,15 @@ class MemoryAPIKeyStore(APIKeyStore):
     
     async def validate_key(self, api_key: str) -> bool:
         """验证API密钥"""
-        return api_key in self.keys
+        with self._lock:
+            return self._lookup(api_key) is not None
 
     def remove_key(self, api_key: str) -> bool:
-        """删除API密钥"""
+        """删除（吊销）API密钥，立即生效"""
         with self._lock:
             if api_key in self.keys:
                 del self.keys[api_key]
+                self._digests.pop(self._digest(api_key), None)
                 return True
             return False
 
@@ -389,6 +536,7 @@ class MemoryAPIKeyStore(APIKeyStore):
         """清空所有API密钥"""
         with self._lock:
             self.keys.clear()
+            self._digests.clear()
 
 
 class APIKeyValidator:
@@ -667,6 +815,28 @@ class AuthenticationMiddleware(BaseMiddleware):
             self.providers[AuthenticationType.BASIC_AUTH] = provider
             self.token_validator.register_validator(AuthenticationType.BASIC_AUTH, provider)
     
+    def revoke_token(self, token: str) -> bool:
+        """吊销JWT令牌"""
+        provider = self.providers.get(AuthenticationType.JWT)
+        if not isinstance(provider, JWTProvider):
+            return False
+        provider.validator.revoke_token(token)
+        return True
+    
+    def revoke_api_key(self, api_key: str) -> bool:
+        """吊销API密钥"""
+        provider = self.providers.get(AuthenticationType.API_KEY)
+        if isinstance(provider, APIKeyProvider) and hasattr(provider.store, 'remove_key'):
+            return provider.store.remove_key(api_key)
+        return False
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """获取已验证令牌缓存统计"""
+        provider = self.providers.get(AuthenticationType.JWT)
+        if isinstance(provider, JWTProvider):
+            return provider.validator.cache.get_stats()
+        return {}
+    
     def _should_skip_authentication(self, path: str) -> bool:
         """检查是否应该跳过认证"""
         for skip_path in self.auth_config.skip_paths:
@@ -11,23 +11,27 @@ MarketPrism 缓存中间件
 4. 缓存失效：主动缓存失效和更新
 5. 缓存预热：缓存预热和预加载
 6. 缓存统计：详细的缓存命中率统计
+7. 防击穿：同键单飞合并回源、后台有界重新验证、负缓存、过期前概率提前刷新
 """
 
 import asyncio
 import time
 import hashlib
 import json
+import math
 import pickle
+import random
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import Dict, List, Optional, Any, Union, Callable
+from typing import Awaitable, Dict, List, Optional, Any, Tuple, Union, Callable
 import threading
 from datetime import datetime, timedelta, timezone
 
 from .middleware_framework import (
     BaseMiddleware, MiddlewareConfig, MiddlewareContext, MiddlewareResult,
-    MiddlewareType, MiddlewarePriority
+    MiddlewareRequest, MiddlewareResponse, MiddlewareType, MiddlewarePriority,
+    DispatchEpoch, DispatchWatched
 )
 
 
@@ -51,8 +55,9 @@ class CacheScope(Enum):
 
 
 @dataclass
-class CacheRule:
+class CacheRule(DispatchWatched):
     """缓存规则"""
+    _dispatch_fields = frozenset({'path_pattern', 'method_pattern', 'enabled', 'priority'})
     rule_id: str
     name: str
     description: str = ""
@@ -93,9 +98,68 @@ class CacheRule:
         return status_code in cacheable_codes
 
 
+class _RouteNode:
+    """路径前缀树节点：exact 为精确匹配、prefix 为 "<path>/*" 匹配的最优 (排名, 规则)"""
+    __slots__ = ('children', 'exact', 'prefix')
+
+    def __init__(self):
+        self.children: Dict[str, '_RouteNode'] = {}
+        self.exact: Optional[Tuple[int, CacheRule]] = None
+        self.prefix: Optional[Tuple[int, CacheRule]] = None
+
+
+class _RouteTable:
+    """单个方法（或 "*"）下的规则索引"""
+    __slots__ = ('root', 'catch_all')
+
+    def __init__(self):
+        self.root = _RouteNode()
+        self.catch_all: Optional[Tuple[int, CacheRule]] = None
+
+    def add(self, rank: int, rule: CacheRule) -> None:
+        # 排名按优先级升序插入，已有的同位置规则优先
+        pattern = rule.path_pattern
+        if pattern == "*":
+            if self.catch_all is None:
+                self.catch_all = (rank, rule)
+            return
+        is_prefix = pattern.endswith("/*")
+        node = self.root
+        for segment in (pattern[:-2] if is_prefix else pattern).split('/'):
+            node = node.children.setdefault(segment, _RouteNode())
+        slot = 'prefix' if is_prefix else 'exact'
+        if getattr(node, slot) is None:
+            setattr(node, slot, (rank, rule))
+
+    def lookup(self, segments: List[str]) -> Optional[Tuple[int, CacheRule]]:
+        best = self.catch_all
+        node = self.root
+        for segment in segments:
+            node = node.children.get(segment)
+            if node is None:
+                return best
+            if node.prefix is not None and (best is None or node.prefix[0] < best[0]):
+                best = node.prefix
+        if node.exact is not None and (best is None or node.exact[0] < best[0]):
+            best = node.exact
+        return best
+
+
+def _compile_route_tables(rules: List['CacheRule']) -> Dict[str, _RouteTable]:
+    """启用的规则按优先级降序编号，按方法分组建立前缀树；与 CacheRule.matches_request 语义一致"""
+    tables: Dict[str, _RouteTable] = {}
+    ordered = sorted((r for r in rules if r.enabled), key=lambda r: r.priority, reverse=True)
+    for rank, rule in enumerate(ordered):
+        method = "*" if rule.method_pattern == "*" else rule.method_pattern.upper()
+        tables.setdefault(method, _RouteTable()).add(rank, rule)
+    return tables
+
+
 @dataclass
-class CachePolicy:
+class CachePolicy(DispatchWatched):
     """缓存策略"""
+    _dispatch_fields = frozenset({'rules'})
+
     policy_id: str
     name: str
     description: str = ""
@@ -103,30 +167,42 @@ class CachePolicy:
     default_rule: Optional[CacheRule] = None
     global_ttl: Optional[int] = None
     metadata: Dict[str, Any] = field(default_factory=dict)
+    # (版本号, 规则数, 方法 -> 前缀树)；规则或其路由属性变化后惰性重建
+    _routes: Optional[Tuple[int, int, Dict[str, _RouteTable]]] = field(
+        default=None, init=False, repr=False, compare=False)
     
     def add_rule(self, rule: CacheRule) -> None:
         """添加缓存规则"""
         self.rules.append(rule)
+        self._routes = None
     
     def remove_rule(self, rule_id: str) -> bool:
         """移除缓存规则"""
         for rule in self.rules:
             if rule.rule_id == rule_id:
                 self.rules.remove(rule)
+                self._routes = None
                 return True
         return False
     
     def find_matching_rule(self, method: str, path: str) -> Optional[CacheRule]:
-        """查找匹配的规则"""
-        # 按优先级排序
-        sorted_rules = sorted([r for r in self.rules if r.enabled], 
-                             key=lambda r: r.priority, reverse=True)
+        """查找匹配的规则（优先级最高者；按预编译前缀树查找，与规则数量无关）"""
+        routes = self._routes
+        if routes is None or routes[0] != DispatchEpoch.value or routes[1] != len(self.rules):
+            routes = (DispatchEpoch.value, len(self.rules), _compile_route_tables(self.rules))
+            self._routes = routes
+        tables = routes[2]
         
-        for rule in sorted_rules:
-            if rule.matches_request(method, path):
-                return rule
+        segments = path.split('/')
+        best = None
+        for table in (tables.get(method.upper()), tables.get("*")):
+            if table is None:
+                continue
+            found = table.lookup(segments)
+            if found is not None and (best is None or found[0] < best[0]):
+                best = found
         
-        return self.default_rule
+        return best[1] if best is not None else self.default_rule
 
 
 class CacheKeyGenerator:
@@ -670,9 +746,24 @@ class CachingConfig:
     skip_paths: List[str] = field(default_factory=list)
     skip_methods: List[str] = field(default_factory=lambda: ["POST", "PUT", "DELETE"])
     cache_store_config: Dict[str, Any] = field(default_factory=dict)
+    # 同一缓存键未命中时只放行一个请求回源，其余等待其结果（超时后各自回源）
+    coalesce_requests: bool = True
+    coalesce_timeout: float = 5.0
+    # STALE_WHILE_REVALIDATE：过期后继续保留的秒数，期间返回旧值并后台刷新
+    stale_window: int = 60
+    max_background_revalidations: int = 8
+    # 负缓存：这些状态码按 negative_ttl 短期缓存（0 关闭）
+    negative_ttl: int = 10
+    negative_status_codes: List[int] = field(default_factory=lambda: [404])
+    # 过期前概率提前刷新（XFetch）：回源越慢、越接近过期越可能提前刷新（0 关闭）
+    early_refresh_beta: float = 1.0
     metadata: Dict[str, Any] = field(default_factory=dict)
 
 
+# 后台重新验证回调：给定原请求重新回源，返回响应（None 表示放弃）
+Revalidator = Callable[[MiddlewareRequest], Awaitable[Optional[MiddlewareResponse]]]
+
+
 class CachingMiddleware(BaseMiddleware):
     """缓存中间件"""
     
@@ -686,6 +777,19 @@ class CachingMiddleware(BaseMiddleware):
         self.cache_control = CacheControl(self.store)
         self.invalidator = CacheInvalidator(self.store)
         self.warmer = CacheWarmer(self.store)
+        self.revalidator: Optional[Revalidator] = None
+        # cache_key -> (共享结果 future, 开始时间)；结果为 (status, body, headers) 或 None
+        self._flights: Dict[str, Tuple[asyncio.Future, float]] = {}
+        self._revalidations: Dict[str, asyncio.Task] = {}
+        self.flight_stats = {
+            'coalesced': 0,
+            'coalesce_timeouts': 0,
+            'early_refreshes': 0,
+            'negative_hits': 0,
+            'background_revalidations': 0,
+            'revalidations_dropped': 0,
+            'revalidation_errors': 0,
+        }
         self._setup_policies()
     
     def _setup_policies(self) -> None:
@@ -706,9 +810,7 @@ class CachingMiddleware(BaseMiddleware):
     
     def _find_applicable_policy(self, context: MiddlewareContext) -> Optional[CachePolicy]:
         """查找适用的策略"""
-        if self.policies:
-            return list(self.policies.values())[0]
-        return None
+        return next(iter(self.policies.values()), None)
     
     async def process_request(self, context: MiddlewareContext) -> MiddlewareResult:
         """处理缓存请求"""
@@ -765,12 +867,7 @@ class CachingMiddleware(BaseMiddleware):
         entry = await self.store.get(cache_context.key)
         if entry:
             # 缓存命中
-            context.set_data('caching_result', CachingResult(hit=True, key=cache_context.key))
-            return MiddlewareResult.stop_result(
-                status_code=200,
-                body=entry.value,
-                headers={'X-Cache': 'HIT'}
-            )
+            return self._hit_result(context, cache_context, entry, 'HIT')
         else:
             # 缓存未命中
             context.set_data('caching_result', CachingResult(hit=False, key=cache_context.key))
@@ -783,18 +880,16 @@ class CachingMiddleware(BaseMiddleware):
     async def _handle_cache_first(self, context: MiddlewareContext, cache_context: CachingContext) -> MiddlewareResult:
         """处理缓存优先策略"""
         entry = await self.store.get(cache_context.key)
-        if entry:
-            # 缓存命中
-            context.set_data('caching_result', CachingResult(hit=True, key=cache_context.key))
-            return MiddlewareResult.stop_result(
-                status_code=200,
-                body=entry.value,
-                headers={'X-Cache': 'HIT'}
-            )
-        else:
-            # 缓存未命中，继续处理请求
+        if entry and self._is_fresh(entry):
+            if self._flight_active(cache_context.key) or not self._should_refresh_early(entry):
+                return self._hit_result(context, cache_context, entry, 'HIT')
+            # 临近过期：本请求提前回源，其余请求继续命中旧值
+            self.flight_stats['early_refreshes'] += 1
+            self._start_flight(context, cache_context.key)
             context.set_data('caching_result', CachingResult(hit=False, key=cache_context.key))
             return MiddlewareResult.success_result()
+        # 缓存未命中，合并回源
+        return await self._handle_miss(context, cache_context)
     
     async def _handle_network_first(self, context: MiddlewareContext, cache_context: CachingContext) -> MiddlewareResult:
         """处理网络优先策略"""
@@ -806,27 +901,195 @@ class CachingMiddleware(BaseMiddleware):
         """处理过期时重新验证策略"""
         entry = await self.store.get(cache_context.key)
         if entry:
-            if not entry.is_expired():
-                # 缓存有效
-                context.set_data('caching_result', CachingResult(hit=True, key=cache_context.key))
-                return MiddlewareResult.stop_result(
-                    status_code=200,
-                    body=entry.value,
-                    headers={'X-Cache': 'HIT'}
-                )
-            elif entry.is_stale():
-                # 缓存过期但在容忍范围内，返回缓存内容但标记需要重新验证
-                context.set_data('caching_result', CachingResult(hit=True, key=cache_context.key))
-                context.set_data('cache_needs_revalidation', True)
-                return MiddlewareResult.stop_result(
-                    status_code=200,
-                    body=entry.value,
-                    headers={'X-Cache': 'STALE'}
-                )
+            if self._is_fresh(entry):
+                # 缓存有效；临近过期时按概率提前刷新
+                if self._should_refresh_early(entry) and self._refresh(context, cache_context):
+                    self.flight_stats['early_refreshes'] += 1
+                    return MiddlewareResult.success_result()
+                return self._hit_result(context, cache_context, entry, 'HIT')
+            # 缓存过期但在容忍范围内（存储保留 stale_window），返回旧值并刷新
+            if self._refresh(context, cache_context):
+                return MiddlewareResult.success_result()
+            context.set_data('cache_needs_revalidation', True)
+            return self._hit_result(context, cache_context, entry, 'STALE')
         
         # 缓存未命中或完全过期
-        context.set_data('caching_result', CachingResult(hit=False, key=cache_context.key))
+        return await self._handle_miss(context, cache_context)
+
+    # ---------------- 防击穿 ----------------
+
+    @staticmethod
+    def _is_fresh(entry: CacheEntry) -> bool:
+        return time.time() <= entry.metadata.get('fresh_until', entry.expires_at)
+
+    def _should_refresh_early(self, entry: CacheEntry) -> bool:
+        """XFetch：now - compute_time * beta * ln(rand) >= fresh_until 时提前刷新"""
+        beta = self.cache_config.early_refresh_beta
+        compute_time = entry.metadata.get('compute_time', 0.0)
+        if beta <= 0 or compute_time <= 0:
+            return False
+        fresh_until = entry.metadata.get('fresh_until', entry.expires_at)
+        return time.time() - compute_time * beta * math.log(1.0 - random.random()) >= fresh_until
+
+    def _hit_result(self, context: MiddlewareContext, cache_context: CachingContext,
+                    entry: CacheEntry, cache_header: str) -> MiddlewareResult:
+        if entry.metadata.get('negative'):
+            self.flight_stats['negative_hits'] += 1
+        context.set_data('caching_result', CachingResult(hit=True, key=cache_context.key))
+        return MiddlewareResult.stop_result(
+            status_code=entry.metadata.get('status_code', 200),
+            body=entry.value,
+            headers={'X-Cache': cache_header}
+        )
+
+    def _flight_active(self, key: str) -> bool:
+        flight = self._flights.get(key)
+        return flight is not None and time.monotonic() - flight[1] < self.cache_config.coalesce_timeout
+
+    def _start_flight(self, context: MiddlewareContext, key: str) -> None:
+        """
+        当前请求成为该键的回源者，process_response 时向等待者发布结果
+
+        回源出错或链被短路时不会进入 process_response，由上下文清理回调以 None 结束单飞，
+        等待者立即自行回源。
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._flights[key] = (future, time.monotonic())
+        context.set_data('caching_flight', future)
+        context.set_data('caching_flight_started', time.perf_counter())
+        context.add_cleanup(lambda: self._finish_flight(context, key, None))
+
+    def _finish_flight(self, context: MiddlewareContext, key: str,
+                       payload: Optional[Tuple[int, bytes, Dict[str, str]]]) -> None:
+        future = context.get_data('caching_flight')
+        if future is None:
+            return
+        context.set_data('caching_flight', None)
+        flight = self._flights.get(key)
+        if flight is not None and flight[0] is future:
+            del self._flights[key]
+        if not future.done():
+            future.set_result(payload)
+
+    async def _handle_miss(self, context: MiddlewareContext, cache_context: CachingContext) -> MiddlewareResult:
+        """未命中：已有同键回源时等待其结果，否则本请求回源"""
+        key = cache_context.key
+        if self.cache_config.coalesce_requests:
+            if self._flight_active(key):
+                future, started = self._flights[key]
+                remaining = self.cache_config.coalesce_timeout - (time.monotonic() - started)
+                try:
+                    payload = await asyncio.wait_for(asyncio.shield(future), max(remaining, 0.001))
+                except asyncio.TimeoutError:
+                    payload = None
+                    self.flight_stats['coalesce_timeouts'] += 1
+                if payload is not None:
+                    self.flight_stats['coalesced'] += 1
+                    status_code, body, headers = payload
+                    context.set_data('caching_result', CachingResult(hit=True, key=key))
+                    return MiddlewareResult.stop_result(
+                        status_code=status_code, body=body, headers={**headers, 'X-Cache': 'COALESCED'})
+                # 回源者失败或结果不可缓存：自行回源
+            else:
+                self._start_flight(context, key)
+        if context.get_data('caching_flight_started') is None:
+            context.set_data('caching_flight_started', time.perf_counter())
+        context.set_data('caching_result', CachingResult(hit=False, key=key))
         return MiddlewareResult.success_result()
+
+    def _refresh(self, context: MiddlewareContext, cache_context: CachingContext) -> bool:
+        """
+        刷新即将过期/已过期的条目
+
+        有 revalidator 时提交后台任务，当前请求直接返回缓存（返回 False）；
+        否则同一时刻只放行一个请求同步回源（返回 True），其余请求继续返回旧值。
+        """
+        key = cache_context.key
+        if self.revalidator is not None:
+            self._schedule_revalidation(cache_context, context.request)
+            return False
+        if self._flight_active(key):
+            return False
+        self._start_flight(context, key)
+        context.set_data('caching_result', CachingResult(hit=False, key=key))
+        return True
+
+    def set_revalidator(self, revalidator: Optional[Revalidator]) -> None:
+        """注册后台重新验证回调（如直接调用查询处理函数）"""
+        self.revalidator = revalidator
+
+    def _schedule_revalidation(self, cache_context: CachingContext, request: MiddlewareRequest) -> None:
+        key = cache_context.key
+        if key in self._revalidations:
+            return
+        if len(self._revalidations) >= self.cache_config.max_background_revalidations:
+            self.flight_stats['revalidations_dropped'] += 1
+            return
+        task = asyncio.ensure_future(self._revalidate(cache_context, request))
+        self._revalidations[key] = task
+        task.add_done_callback(lambda t, k=key: self._revalidations.pop(k, None))
+
+    async def _revalidate(self, cache_context: CachingContext, request: MiddlewareRequest) -> None:
+        started = time.perf_counter()
+        try:
+            response = await self.revalidator(request)
+            if response is not None:
+                await self._store_response(
+                    MiddlewareContext(request=request, response=response), cache_context,
+                    time.perf_counter() - started)
+                self.flight_stats['background_revalidations'] += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.flight_stats['revalidation_errors'] += 1
+
+    async def _store_response(self, context: MiddlewareContext, cache_context: CachingContext,
+                              compute_time: float = 0.0) -> Optional[int]:
+        """按规则缓存响应（含负缓存）；返回写入的 TTL，未缓存返回 None"""
+        response, rule = context.response, cache_context.rule
+        if response is None or rule is None:
+            return None
+        negative = False
+        if rule.should_cache_response(response.status_code):
+            if not response.body:
+                return None
+            ttl = self.ttl_calculator.calculate_ttl(context, rule)
+        elif self.cache_config.negative_ttl > 0 and response.status_code in self.cache_config.negative_status_codes:
+            negative = True
+            ttl = min(self.cache_config.negative_ttl, rule.ttl)
+        else:
+            return None
+
+        now = time.time()
+        # SWR 条目多保留 stale_window 秒，过期后仍可返回旧值；新鲜期记录在 fresh_until
+        hold = ttl
+        if rule.cache_strategy == CacheStrategy.STALE_WHILE_REVALIDATE and not negative:
+            hold += self.cache_config.stale_window
+        success = await self.store.set(
+            cache_context.key,
+            response.body or b'',
+            hold,
+            {
+                'status_code': response.status_code,
+                'content_type': response.content_type,
+                'cached_at': now,
+                'fresh_until': now + ttl,
+                'compute_time': compute_time,
+                'negative': negative,
+            }
+        )
+        return ttl if success else None
+
+    async def shutdown(self) -> bool:
+        """取消后台重新验证，释放等待中的合并请求"""
+        for task in list(self._revalidations.values()):
+            task.cancel()
+        self._revalidations.clear()
+        for future, _ in self._flights.values():
+            if not future.done():
+                future.set_result(None)
+        self._flights.clear()
+        return await super().shutdown()
     
     async def process_response(self, context: MiddlewareContext) -> MiddlewareResult:
         """处理缓存响应"""
@@ -844,34 +1107,25 @@ class CachingMiddleware(BaseMiddleware):
                 # 已经从缓存返回，不需要再处理
                 return MiddlewareResult.success_result()
             
-            # 检查响应是否应该缓存
-            if context.response and cache_context.rule:
-                if cache_context.rule.should_cache_response(context.response.status_code):
-                    # 计算TTL
-                    ttl = self.ttl_calculator.calculate_ttl(context, cache_context.rule)
+            payload = None
+            try:
+                started = context.get_data('caching_flight_started')
+                compute_time = time.perf_counter() - started if started else 0.0
+                ttl = await self._store_response(context, cache_context, compute_time)
+                if ttl is not None:
+                    payload = (context.response.status_code, context.response.body or b'',
+                               {'Content-Type': context.response.content_type})
+                    context.response.set_header('X-Cache', 'MISS')
+                    context.response.set_header('X-Cache-TTL', str(ttl))
                     
-                    # 缓存响应
-                    if context.response.body:
-                        success = await self.store.set(
-                            cache_context.key,
-                            context.response.body,
-                            ttl,
-                            {
-                                'status_code': context.response.status_code,
-                                'content_type': context.response.content_type,
-                                'cached_at': time.time(),
-                            }
-                        )
-                        
-                        if success:
-                            context.response.set_header('X-Cache', 'MISS')
-                            context.response.set_header('X-Cache-TTL', str(ttl))
-                            
-                            # 更新缓存结果
-                            if caching_result:
-                                caching_result.cached = True
-                                caching_result.ttl = ttl
-                                caching_result.size = len(context.response.body)
+                    # 更新缓存结果
+                    if caching_result:
+                        caching_result.cached = True
+                        caching_result.ttl = ttl
+                        caching_result.size = len(context.response.body or b'')
+            finally:
+                # 无论是否缓存成功都释放单飞，等待者拿到结果或自行回源
+                self._finish_flight(context, cache_context.key, payload)
             
             return MiddlewareResult.success_result()
             
@@ -897,7 +1151,13 @@ class CachingMiddleware(BaseMiddleware):
     
     async def get_cache_stats(self) -> Dict[str, Any]:
         """获取缓存统计"""
-        return await self.store.get_stats()
+        stats = await self.store.get_stats()
+        return {
+            **stats,
+            **self.flight_stats,
+            'inflight_keys': len(self._flights),
+            'pending_revalidations': len(self._revalidations),
+        }
     
     def add_policy(self, policy: CachePolicy) -> bool:
         """添加缓存策略"""
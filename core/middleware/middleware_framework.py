@@ -12,6 +12,7 @@ MarketPrism API网关中间件框架
 5. 上下文管理：请求处理上下文管理
 6. 配置管理：中间件配置和参数管理
 7. 错误处理：完善的错误处理机制
+8. 预编译分发：中间件链在变更时编译为不可变元组，请求路径上无锁、无排序，耗时按采样统计
 """
 
 from datetime import datetime, timezone
@@ -58,6 +59,30 @@ class MiddlewarePriority(Enum):
     LOWEST = 100                          # 最低优先级
 
 
+class DispatchEpoch:
+    """
+    分发表版本号
+
+    影响请求分发的属性（启用状态、优先级、路由模式等）变化时递增；
+    预编译的分发表（中间件链、缓存规则索引）发现版本变化后惰性重建。
+    """
+    value = 0
+
+    @classmethod
+    def bump(cls) -> None:
+        cls.value += 1
+
+
+class DispatchWatched:
+    """赋值 _dispatch_fields 中的属性时递增 DispatchEpoch"""
+    _dispatch_fields: frozenset = frozenset()
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        object.__setattr__(self, name, value)
+        if name in self._dispatch_fields:
+            DispatchEpoch.value += 1
+
+
 @dataclass
 class RequestHeaders:
     """请求头部管理"""
@@ -191,6 +216,7 @@ class MiddlewareContext:
     middleware_data: Dict[str, Any] = field(default_factory=dict)
     user_context: Dict[str, Any] = field(default_factory=dict)
     errors: List[Exception] = field(default_factory=list)
+    cleanups: List[Callable[[], None]] = field(default_factory=list)
     
     def set_data(self, key: str, value: Any) -> None:
         """设置中间件数据"""
@@ -220,6 +246,16 @@ class MiddlewareContext:
         """完成处理，计算处理时间"""
         self.end_time = time.time()
         self.processing_time = self.end_time - self.start_time
+    
+    def add_cleanup(self, callback: Callable[[], None]) -> None:
+        """注册请求结束时的清理回调（无论成功、出错还是被短路都会执行）"""
+        self.cleanups.append(callback)
+    
+    def run_cleanups(self) -> None:
+        """执行并清空清理回调；回调需幂等"""
+        cleanups, self.cleanups = self.cleanups, []
+        for callback in cleanups:
+            callback()
 
 
 @dataclass
@@ -251,8 +287,10 @@ class MiddlewareResult:
 
 
 @dataclass
-class MiddlewareConfig:
+class MiddlewareConfig(DispatchWatched):
     """中间件配置"""
+    _dispatch_fields = frozenset({'enabled', 'priority'})
+
     middleware_id: str
     middleware_type: MiddlewareType
     name: str = ""
@@ -279,8 +317,9 @@ class MiddlewareConfig:
         self.metadata[key] = value
 
 
-class BaseMiddleware(ABC):
+class BaseMiddleware(DispatchWatched, ABC):
     """基础中间件抽象类"""
+    _dispatch_fields = frozenset({'status', 'config'})
     
     def __init__(self, config: MiddlewareConfig):
         self.config = config
@@ -289,6 +328,7 @@ class BaseMiddleware(ABC):
             'requests_processed': 0,
             'requests_success': 0,
             'requests_error': 0,
+            'timed_requests': 0,
             'total_processing_time': 0.0,
             'average_processing_time': 0.0,
         }
@@ -313,8 +353,8 @@ class BaseMiddleware(ABC):
         self.status = MiddlewareStatus.INACTIVE
         return True
     
-    def update_stats(self, processing_time: float, success: bool) -> None:
-        """更新统计信息"""
+    def update_stats(self, processing_time: Optional[float], success: bool) -> None:
+        """更新统计信息；processing_time 为 None 时只计数（未采样计时的请求）"""
         with self._lock:
             self.stats['requests_processed'] += 1
             if success:
@@ -322,9 +362,12 @@ class BaseMiddleware(ABC):
             else:
                 self.stats['requests_error'] += 1
             
+            if processing_time is None:
+                return
+            self.stats['timed_requests'] += 1
             self.stats['total_processing_time'] += processing_time
             self.stats['average_processing_time'] = (
-                self.stats['total_processing_time'] / self.stats['requests_processed']
+                self.stats['total_processing_time'] / self.stats['timed_requests']
             )
     
     def get_stats(self) -> Dict[str, Any]:
@@ -352,6 +395,8 @@ class MiddlewareChain:
         self.middlewares: List[BaseMiddleware] = []
         self._sorted = False
         self._lock = threading.Lock()
+        # (版本号, 中间件数量, 请求阶段元组, 响应阶段元组)
+        self._dispatch: Optional[Tuple[int, int, Tuple[BaseMiddleware, ...], Tuple[BaseMiddleware, ...]]] = None
     
     def add_middleware(self, middleware: BaseMiddleware) -> bool:
         """添加中间件到链"""
@@ -360,6 +405,7 @@ class MiddlewareChain:
                 if middleware not in self.middlewares:
                     self.middlewares.append(middleware)
                     self._sorted = False
+                    self._dispatch = None
                     return True
                 return False
         except Exception:
@@ -373,6 +419,7 @@ class MiddlewareChain:
                     if middleware.config.middleware_id == middleware_id:
                         self.middlewares.remove(middleware)
                         self._sorted = False
+                        self._dispatch = None
                         return True
                 return False
         except Exception:
@@ -394,6 +441,26 @@ class MiddlewareChain:
                 self._sorted = True
             return [m for m in self.middlewares if m.is_enabled()]
     
+    def get_dispatch_table(self) -> Tuple[Tuple[BaseMiddleware, ...], Tuple[BaseMiddleware, ...]]:
+        """
+        获取预编译的分发表：(请求阶段顺序, 响应阶段顺序)，均只含启用的中间件
+
+        仅在链或中间件启用状态/优先级变化后重建；其余情况下只比较版本号，不加锁。
+        """
+        table = self._dispatch
+        if table is None or table[0] != DispatchEpoch.value or table[1] != len(self.middlewares):
+            table = self._compile_dispatch_table()
+        return table[2], table[3]
+    
+    def _compile_dispatch_table(self):
+        with self._lock:
+            # 先取版本号：编译期间发生的变更会使下一次请求重新编译
+            epoch = DispatchEpoch.value
+            ordered = tuple(m for m in sorted(self.middlewares, key=lambda m: m.get_priority()) if m.is_enabled())
+            table = (epoch, len(self.middlewares), ordered, ordered[::-1])
+            self._dispatch = table
+            return table
+    
     def get_enabled_count(self) -> int:
         """获取启用的中间件数量"""
         return len(self.get_ordered_middlewares())
@@ -403,12 +470,13 @@ class MiddlewareChain:
         with self._lock:
             self.middlewares.clear()
             self._sorted = False
+            self._dispatch = None
 
 
 class MiddlewareProcessor:
     """中间件处理器"""
     
-    def __init__(self, chain: MiddlewareChain):
+    def __init__(self, chain: MiddlewareChain, timing_sample_every: int = 16):
         self.chain = chain
         self.executor = ThreadPoolExecutor(max_workers=10)
         self.stats = {
@@ -418,74 +486,71 @@ class MiddlewareProcessor:
             'average_processing_time': 0.0,
         }
         self._lock = threading.Lock()
+        # 每 N 个请求对各中间件计时一次（首个请求总是计时）；中间件计数覆盖全部请求，耗时只取采样请求
+        self.timing_sample_every = max(1, int(timing_sample_every))
+        self._request_seq = 0
     
     async def process_request(self, context: MiddlewareContext) -> MiddlewareResult:
         """处理请求通过中间件链"""
-        middlewares = self.chain.get_ordered_middlewares()
-        start_time = time.time()
+        request_chain, response_chain = self.chain.get_dispatch_table()
+        perf_counter = time.perf_counter
+        start_time = perf_counter()
+        sampled = self._request_seq % self.timing_sample_every == 0
+        self._request_seq += 1
         
         try:
             # 处理请求阶段
-            for middleware in middlewares:
-                if not middleware.is_enabled():
-                    continue
-                
-                middleware_start = time.time()
+            for middleware in request_chain:
+                middleware_start = perf_counter() if sampled else 0.0
                 try:
                     result = await middleware.process_request(context)
-                    middleware_time = time.time() - middleware_start
-                    middleware.update_stats(middleware_time, result.success)
-                    
-                    if not result.success:
-                        if result.error:
-                            context.add_error(result.error)
-                        self._update_stats(time.time() - start_time, False)
-                        return result
-                    
-                    if not result.continue_chain:
-                        self._update_stats(time.time() - start_time, True)
-                        return result
-                        
                 except Exception as e:
-                    middleware_time = time.time() - middleware_start
-                    middleware.update_stats(middleware_time, False)
+                    middleware.update_stats(perf_counter() - middleware_start if sampled else None, False)
                     context.add_error(e)
-                    self._update_stats(time.time() - start_time, False)
+                    self._update_stats(perf_counter() - start_time, False)
                     return MiddlewareResult.error_result(e)
+                middleware.update_stats(perf_counter() - middleware_start if sampled else None, result.success)
+                
+                if not result.success:
+                    if result.error:
+                        context.add_error(result.error)
+                    self._update_stats(perf_counter() - start_time, False)
+                    return result
+                
+                if not result.continue_chain:
+                    self._update_stats(perf_counter() - start_time, True)
+                    return result
             
             # 如果有响应，处理响应阶段
             if context.response:
-                for middleware in reversed(middlewares):
-                    if not middleware.is_enabled():
-                        continue
-                    
-                    middleware_start = time.time()
+                for middleware in response_chain:
+                    middleware_start = perf_counter() if sampled else 0.0
                     try:
                         result = await middleware.process_response(context)
-                        middleware_time = time.time() - middleware_start
-                        middleware.update_stats(middleware_time, result.success)
-                        
-                        if not result.success:
-                            if result.error:
-                                context.add_error(result.error)
-                            self._update_stats(time.time() - start_time, False)
-                            return result
-                            
                     except Exception as e:
-                        middleware_time = time.time() - middleware_start
-                        middleware.update_stats(middleware_time, False)
+                        middleware.update_stats(perf_counter() - middleware_start if sampled else None, False)
                         context.add_error(e)
-                        self._update_stats(time.time() - start_time, False)
+                        self._update_stats(perf_counter() - start_time, False)
                         return MiddlewareResult.error_result(e)
+                    middleware.update_stats(perf_counter() - middleware_start if sampled else None, result.success)
+                    
+                    if not result.success:
+                        if result.error:
+                            context.add_error(result.error)
+                        self._update_stats(perf_counter() - start_time, False)
+                        return result
             
             context.finalize()
-            self._update_stats(time.time() - start_time, True)
+            self._update_stats(perf_counter() - start_time, True)
             return MiddlewareResult.success_result()
             
         except Exception as e:
             context.add_error(e)
-            self._update_stats(time.time() - start_time, False)
+            self._update_stats(perf_counter() - start_time, False)
             return MiddlewareResult.error_result(e)
+        finally:
+            if context.cleanups:
+                context.run_cleanups()
     
     def _update_stats(self, processing_time: float, success: bool) -> None:
         """更新处理器统计信息"""
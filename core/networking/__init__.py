@@ -14,28 +14,46 @@ MarketPrism 核心网络模块
 from datetime import datetime, timezone
 import warnings
 
-# 主要导入 - 统一会话管理器（整合重复功能）
-from .unified_session_manager import (
-    UnifiedSessionManager,
-    UnifiedSessionManager as AioHTTPSessionManager, # 向后兼容
-    UnifiedSessionConfig
-)
-
-# 其他网络组件
-from .proxy_manager import ProxyConfigManager, ProxyConfig, proxy_manager
-from .websocket_manager import (
-    WebSocketConnectionManager, WebSocketConfig, websocket_manager, BaseWebSocketClient,
-    DataType, DataSubscription,  # 导出数据类型
-    create_binance_websocket_config, create_okx_websocket_config  # 导出工厂函数
-)
-from .connection_manager import NetworkConnectionManager, NetworkConfig, network_manager
-# 暂时注释掉，避免ExchangeConfig类型冲突
-# from .enhanced_exchange_connector import (
-#     EnhancedExchangeConnector,
-#     create_exchange_connector,
-#     EXCHANGE_CONFIGS,
-#     BinanceErrorHandler
-# )
+from core.lazy_exports import lazy_exports
+
+# 所有组件均按需导入（PEP 562），公开名称与原先一致
+_LAZY_EXPORTS = {
+    # 主要导入 - 统一会话管理器（整合重复功能）
+    'UnifiedSessionManager': ('.unified_session_manager', 'UnifiedSessionManager'),
+    'AioHTTPSessionManager': ('.unified_session_manager', 'UnifiedSessionManager'),  # 向后兼容
+    'UnifiedSessionConfig': ('.unified_session_manager', 'UnifiedSessionConfig'),
+
+    # 其他网络组件
+    'ProxyConfigManager': ('.proxy_manager', 'ProxyConfigManager'),
+    'ProxyConfig': ('.proxy_manager', 'ProxyConfig'),
+    'proxy_manager': ('.proxy_manager', 'proxy_manager'),
+    'WebSocketConnectionManager': ('.websocket_manager', 'WebSocketConnectionManager'),
+    'WebSocketConfig': ('.websocket_manager', 'WebSocketConfig'),
+    'websocket_manager': ('.websocket_manager', 'websocket_manager'),
+    'BaseWebSocketClient': ('.websocket_manager', 'BaseWebSocketClient'),
+    'DataType': ('.websocket_manager', 'DataType'),  # 导出数据类型
+    'DataSubscription': ('.websocket_manager', 'DataSubscription'),
+    'create_binance_websocket_config': ('.websocket_manager', 'create_binance_websocket_config'),  # 导出工厂函数
+    'create_okx_websocket_config': ('.websocket_manager', 'create_okx_websocket_config'),
+    'NetworkConnectionManager': ('.connection_manager', 'NetworkConnectionManager'),
+    'NetworkConfig': ('.connection_manager', 'NetworkConfig'),
+    'network_manager': ('.connection_manager', 'network_manager'),
+    # 暂时不导出，避免ExchangeConfig类型冲突
+    # 'EnhancedExchangeConnector': ('.enhanced_exchange_connector', 'EnhancedExchangeConnector'),
+}
+
+
+def _create_unified_session_manager():
+    """全局统一会话管理器实例，首次访问时创建"""
+    from .unified_session_manager import UnifiedSessionManager
+    return UnifiedSessionManager()
+
+
+_LAZY_FACTORIES = {
+    'unified_session_manager': _create_unified_session_manager,
+}
+
+__getattr__, __dir__ = lazy_exports(__name__, _LAZY_EXPORTS, _LAZY_FACTORIES)
 
 # 向后兼容函数
 def get_session_manager(*args, **kwargs):
@@ -45,7 +63,7 @@ def get_session_manager(*args, **kwargs):
         DeprecationWarning,
         stacklevel=2
     )
-    return unified_session_manager
+    return _global_session_manager()
 
 async def close_global_session_manager():
     """废弃：请使用 unified_session_manager.close()"""
@@ -54,12 +72,13 @@ async def close_global_session_manager():
         DeprecationWarning,
         stacklevel=2
     )
-    await unified_session_manager.close()
-
-# 全局实例（移到导入之后）
+    await _global_session_manager().close()
 
-# 创建全局实例
-unified_session_manager = UnifiedSessionManager()
+def _global_session_manager():
+    """获取全局会话管理器（模块内的全局名称查找不会经过 __getattr__）"""
+    if 'unified_session_manager' in globals():
+        return globals()['unified_session_manager']
+    return __getattr__('unified_session_manager')
 
 __all__ = [
     # 统一会话管理（推荐使用）
@@ -12,10 +12,12 @@ MarketPrism 交易所API统一代理
 """
 
 import asyncio
+import heapq
+import itertools
 import logging
 import time
 import json
-from typing import Dict, Any, Optional, List, Union
+from typing import Dict, Any, Optional, List, Tuple, Union
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta, timezone
 from enum import Enum
@@ -45,22 +47,46 @@ except ImportError:
 try:
     from config.core.dynamic_weight_calculator import DynamicWeightCalculator
 except ImportError:
-    # 简化版权重计算器
-    class DynamicWeightCalculator:
-        def calculate_weight(self, exchange, endpoint, params):
-            # 基础权重映射
-            weight_map = {
-                '/api/v3/ping': 1,
-                '/api/v3/time': 1,
-                '/api/v3/ticker/24hr': 1,
-                '/api/v3/ticker/price': 1,
-                '/api/v3/depth': 1,
-                '/api/v3/exchangeInfo': 10
-            }
-            return weight_map.get(endpoint, 1)
+    try:
+        from ..reliability.dynamic_weight_calculator import DynamicWeightCalculator
+    except ImportError:
+        # 简化版权重计算器
+        class DynamicWeightCalculator:
+            def calculate_weight(self, exchange, endpoint, params):
+                # 基础权重映射
+                weight_map = {
+                    '/api/v3/ping': 1,
+                    '/api/v3/time': 1,
+                    '/api/v3/ticker/24hr': 1,
+                    '/api/v3/ticker/price': 1,
+                    '/api/v3/depth': 1,
+                    '/api/v3/exchangeInfo': 10
+                }
+                return weight_map.get(endpoint, 1)
 
 logger = logging.getLogger(__name__)
 
+# 交易所返回的已用权重响应头（当前分钟窗口内该IP的累计权重），按优先级排列
+USED_WEIGHT_HEADERS = (
+    'X-MBX-USED-WEIGHT-1M',       # Binance 现货/合约
+    'X-SAPI-USED-IP-WEIGHT-1M',   # Binance SAPI
+    'X-MBX-USED-WEIGHT',          # 旧版不带区间后缀
+)
+
+
+def parse_used_weight(headers) -> Optional[int]:
+    """从响应头解析已用权重，不存在或无法解析时返回 None"""
+    if not headers:
+        return None
+    for name in USED_WEIGHT_HEADERS:
+        value = headers.get(name)
+        if value is not None:
+            try:
+                return int(value)
+            except (TypeError, ValueError):
+                return None
+    return None
+
 
 class ProxyMode(Enum):
     """代理模式"""
@@ -80,6 +106,8 @@ class IPResource:
     last_reset: datetime = field(default_factory=datetime.now)
     banned_until: Optional[datetime] = None
     health_score: float = 1.0  # 0.0-1.0
+    pending_weight: int = 0  # 已发出、尚未收到响应的请求的预测权重
+    weight_synced_at: Optional[datetime] = None  # 最近一次按响应头校准权重的时间
     
     @property
     def is_available(self) -> bool:
@@ -91,11 +119,16 @@ class IPResource:
             return False
         
         # 检查权重是否超限
-        if self.current_weight >= self.max_weight_per_minute * 0.9:  # 90%阈值
+        if self.current_weight + self.pending_weight >= self.max_weight_per_minute * 0.9:  # 90%阈值
             return False
         
         return True
     
+    @property
+    def headroom(self) -> int:
+        """当前窗口剩余权重（扣除在途请求）"""
+        return self.max_weight_per_minute - self.current_weight - self.pending_weight
+    
     def reset_weight_if_needed(self):
         """如果需要重置权重"""
         now = datetime.now()
@@ -112,6 +145,43 @@ class IPResource:
             return True
         return False
     
+    def reserve_weight(self, weight: int, limit_ratio: float = 0.9) -> bool:
+        """为即将发出的请求预占权重，不超过 max_weight_per_minute * limit_ratio"""
+        if self.banned_until and datetime.now() < self.banned_until:
+            return False
+        self.reset_weight_if_needed()
+        if self.current_weight + self.pending_weight + weight > self.max_weight_per_minute * limit_ratio:
+            return False
+        self.pending_weight += weight
+        return True
+    
+    def release_weight(self, weight: int, synced: bool):
+        """请求结束：响应头已校准时只移除预占，否则按预测权重计入"""
+        self.pending_weight = max(0, self.pending_weight - weight)
+        if not synced:
+            self.reset_weight_if_needed()
+            self.current_weight += weight
+    
+    def sync_used_weight(self, used_weight: int):
+        """
+        按交易所响应头校准已用权重
+        
+        交易所按自然分钟计权重：窗口起点对齐到整分钟，之后由 reset_weight_if_needed
+        在交易所窗口切换时清零；同一窗口内已用权重单调递增，乱序到达的旧响应不回退。
+        """
+        now = datetime.now()
+        window_start = now.replace(second=0, microsecond=0)
+        if self.weight_synced_at is None or self.last_reset < window_start:
+            self.current_weight = used_weight
+            self.last_reset = window_start
+        else:
+            self.current_weight = max(self.current_weight, used_weight)
+        self.weight_synced_at = now
+    
+    def next_window_reset(self) -> datetime:
+        """当前权重窗口结束时间"""
+        return self.last_reset + timedelta(minutes=1)
+    
     def handle_rate_limit_response(self, status_code: int, retry_after: Optional[int] = None):
         """处理速率限制响应"""
         now = datetime.now()
@@ -131,6 +201,180 @@ class IPResource:
                 self.banned_until = now + timedelta(minutes=2)
 
 
+@dataclass
+class WeightTicket:
+    """一次请求在某个IP上的权重预占"""
+    resource: IPResource
+    weight: int
+    synced: bool = False
+
+
+class WeightDispatcher:
+    """
+    按剩余权重调度IP
+    
+    - 堆按 剩余权重 × 健康分数 排序，IP状态变化时压入新条目，旧条目按版本号惰性丢弃
+    - 窗口切换或封禁到期时重建堆（每个窗口至多一次）
+    - 所有IP都接近上限时请求按 FIFO 排队，直到权重释放/校准或最近的窗口切换，而不是直接失败
+    """
+    
+    def __init__(self, resources: Dict[str, IPResource], limit_ratio: float = 0.9):
+        self.resources = resources
+        self.limit_ratio = limit_ratio
+        self._heap: List[Tuple[float, int, str]] = []
+        self._versions: Dict[str, int] = {}
+        self._counter = itertools.count()
+        self._next_rebuild: Optional[datetime] = None
+        self._queue_lock: Optional[asyncio.Lock] = None
+        self._queue_cond: Optional[asyncio.Condition] = None
+        self._queue_loop = None
+        self._waiting = 0
+        self.stats = {
+            'dispatched': 0,
+            'queued': 0,
+            'queue_wait_seconds': 0.0,
+            'queue_timeouts': 0,
+            'weight_syncs': 0,
+        }
+    
+    def _score(self, resource: IPResource) -> Optional[float]:
+        if resource.banned_until and datetime.now() < resource.banned_until:
+            return None
+        headroom = resource.headroom
+        if headroom <= 0:
+            return None
+        return headroom * resource.health_score
+    
+    def refresh(self, resource: IPResource):
+        """IP状态变化后重新入堆"""
+        version = next(self._counter)
+        self._versions[resource.ip] = version
+        score = self._score(resource)
+        if score is not None:
+            heapq.heappush(self._heap, (-score, version, resource.ip))
+        if len(self._heap) > 4 * len(self.resources) + 16:
+            self.rebuild()
+    
+    def rebuild(self):
+        """按当前时间重置各IP窗口并重建堆"""
+        self._heap = []
+        next_change = None
+        for resource in self.resources.values():
+            resource.reset_weight_if_needed()
+            self.refresh(resource)
+            change = resource.next_window_reset()
+            if resource.banned_until and resource.banned_until > datetime.now():
+                change = min(change, resource.banned_until)
+            if next_change is None or change < next_change:
+                next_change = change
+        self._next_rebuild = next_change
+    
+    def try_acquire(self, weight: int) -> Optional[IPResource]:
+        """选择剩余权重最多且能容纳本次请求的IP并预占权重"""
+        if self._next_rebuild is None or datetime.now() >= self._next_rebuild \
+                or len(self._versions) != len(self.resources):
+            self.rebuild()
+        
+        skipped = []
+        chosen = None
+        while self._heap:
+            _, version, ip = heapq.heappop(self._heap)
+            resource = self.resources.get(ip)
+            if resource is None or self._versions.get(ip) != version:
+                continue
+            if resource.reserve_weight(weight, self.limit_ratio):
+                chosen = resource
+                break
+            skipped.append(resource)
+        
+        for resource in skipped:
+            self.refresh(resource)
+        if chosen is not None:
+            self.refresh(chosen)
+            self.stats['dispatched'] += 1
+        return chosen
+    
+    def seconds_until_available(self) -> float:
+        """距最近一个IP窗口切换或解封的秒数"""
+        now = datetime.now()
+        waits = []
+        for resource in self.resources.values():
+            if resource.banned_until and resource.banned_until > now:
+                waits.append((resource.banned_until - now).total_seconds())
+            else:
+                waits.append((resource.next_window_reset() - now).total_seconds())
+        return max(0.01, min(waits)) if waits else 0.01
+    
+    async def acquire(self, weight: int, timeout: float) -> WeightTicket:
+        """预占权重；无余量时排队等待，超过 timeout 抛出异常"""
+        if not self.resources:
+            raise Exception("没有可用的IP资源")
+        
+        # 已有排队请求时新请求排在其后
+        if not self._waiting:
+            resource = self.try_acquire(weight)
+            if resource is not None:
+                return WeightTicket(resource, weight)
+        
+        loop = asyncio.get_running_loop()
+        if self._queue_lock is None or self._queue_loop is not loop:
+            self._queue_lock = asyncio.Lock()
+            self._queue_cond = asyncio.Condition()
+            self._queue_loop = loop
+        
+        self._waiting += 1
+        self.stats['queued'] += 1
+        start = time.monotonic()
+        try:
+            # 队首持有条件锁完成 尝试→等待，release()/observe_used_weight() 的唤醒不会丢失
+            async with self._queue_lock, self._queue_cond:
+                while True:
+                    resource = self.try_acquire(weight)
+                    if resource is not None:
+                        self.stats['queue_wait_seconds'] += time.monotonic() - start
+                        return WeightTicket(resource, weight)
+                    remaining = timeout - (time.monotonic() - start)
+                    if remaining <= 0:
+                        self.stats['queue_timeouts'] += 1
+                        raise Exception(f"所有IP权重已耗尽，排队 {timeout}s 后仍无可用余量")
+                    try:
+                        await asyncio.wait_for(self._queue_cond.wait(),
+                                               min(self.seconds_until_available(), remaining))
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            self._waiting -= 1
+    
+    def observe_used_weight(self, ticket: WeightTicket, used_weight: int):
+        """响应头携带的已用权重"""
+        ticket.resource.sync_used_weight(used_weight)
+        ticket.synced = True
+        self.stats['weight_syncs'] += 1
+        self.refresh(ticket.resource)
+        self._notify_waiters()
+    
+    def release(self, ticket: WeightTicket):
+        """请求结束，结算预占权重"""
+        ticket.resource.release_weight(ticket.weight, ticket.synced)
+        self.refresh(ticket.resource)
+        self._notify_waiters()
+    
+    def _notify_waiters(self):
+        """权重释放或校准后唤醒排队请求重新尝试"""
+        loop = self._queue_loop
+        if not self._waiting or loop is None or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(loop.create_task, self._notify(self._queue_cond))
+    
+    @staticmethod
+    async def _notify(cond: asyncio.Condition):
+        async with cond:
+            cond.notify_all()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, 'waiting': self._waiting}
+
+
 @dataclass
 class RequestRecord:
     """请求记录"""
@@ -156,6 +400,8 @@ class ExchangeAPIProxy:
         # IP资源管理
         self.ip_resources: Dict[str, IPResource] = {}
         self.current_ip_index = 0
+        self.dispatcher = WeightDispatcher(self.ip_resources)
+        self.max_queue_wait = 60.0  # 权重耗尽时最长排队时间（秒）
         
         # 请求统计
         self.request_records: List[RequestRecord] = []
@@ -226,6 +472,7 @@ class ExchangeAPIProxy:
         """添加IP资源"""
         if ip not in self.ip_resources:
             self.ip_resources[ip] = IPResource(ip=ip, location=location)
+            self.dispatcher.refresh(self.ip_resources[ip])
             logger.info(f"添加IP资源: {ip} ({location})")
     
     def get_best_ip(self, exchange: str) -> Optional[IPResource]:
@@ -236,11 +483,8 @@ class ExchangeAPIProxy:
             logger.error("没有可用的IP资源")
             return None
         
-        # 简单策略：选择健康分数最高且权重使用最少的IP
-        best_ip = max(available_ips, key=lambda ip: (
-            ip.health_score, 
-            (ip.max_weight_per_minute - ip.current_weight)
-        ))
+        # 与调度器一致：剩余权重 × 健康分数 最高的IP
+        best_ip = max(available_ips, key=lambda ip: ip.headroom * ip.health_score)
         
         return best_ip
     
@@ -266,32 +510,15 @@ class ExchangeAPIProxy:
         start_time = time.time()
         params = params or {}
         
-        # 获取最佳IP
-        ip_resource = self.get_best_ip(exchange)
-        if not ip_resource:
-            raise Exception("没有可用的IP资源")
-        
-        # 计算请求权重
+        # 预测请求权重，并在剩余权重最多的IP上预占（无余量时排队）
         weight = self.weight_calculator.calculate_weight(exchange, endpoint, params)
-        
-        # 检查权重是否可用
-        if not ip_resource.consume_weight(weight):
-            # 权重不足，等待或切换IP
-            if self.mode == ProxyMode.DISTRIBUTED:
-                # 尝试其他IP
-                for other_ip in self.ip_resources.values():
-                    if other_ip != ip_resource and other_ip.is_available and other_ip.consume_weight(weight):
-                        ip_resource = other_ip
-                        break
-                else:
-                    raise Exception(f"所有IP权重已耗尽，需要等待重置")
-            else:
-                raise Exception(f"IP {ip_resource.ip} 权重不足，需要等待重置")
+        ticket = await self.dispatcher.acquire(weight, self.max_queue_wait)
+        ip_resource = ticket.resource
         
         # 发送请求
         try:
             response = await self._send_request(
-                exchange, method, endpoint, params, ip_resource, **kwargs
+                exchange, method, endpoint, params, ip_resource, ticket=ticket, **kwargs
             )
             
             # 处理响应
@@ -307,6 +534,8 @@ class ExchangeAPIProxy:
             await self._handle_error(exchange, endpoint, method, weight, 
                                    ip_resource, e, response_time)
             raise
+        finally:
+            self.dispatcher.release(ticket)
     
     async def _send_request(self, 
                           exchange: str, 
@@ -314,6 +543,7 @@ class ExchangeAPIProxy:
                           endpoint: str, 
                           params: Dict[str, Any],
                           ip_resource: IPResource,
+                          ticket: Optional[WeightTicket] = None,
                           **kwargs) -> Dict[str, Any]:
         """发送HTTP请求"""
         # 构建请求URL
@@ -338,6 +568,11 @@ class ExchangeAPIProxy:
             }
             
             async with session.request(method, url, **request_kwargs) as response:
+                # 按响应头校准该IP的已用权重（429/418 响应同样携带）
+                used_weight = parse_used_weight(response.headers)
+                if used_weight is not None and ticket is not None:
+                    self.dispatcher.observe_used_weight(ticket, used_weight)
+                
                 # 检查响应状态
                 if response.status in [429, 418]:
                     # 速率限制或IP封禁
@@ -491,11 +726,13 @@ class ExchangeAPIProxy:
             ip_status[ip] = {
                 'available': resource.is_available,
                 'current_weight': resource.current_weight,
+                'pending_weight': resource.pending_weight,
                 'max_weight': resource.max_weight_per_minute,
                 'weight_usage': f"{resource.current_weight / resource.max_weight_per_minute * 100:.1f}%",
                 'health_score': f"{resource.health_score:.2f}",
                 'banned_until': resource.banned_until.isoformat() if resource.banned_until else None,
-                'location': resource.location
+                'location': resource.location,
+                'weight_synced_at': resource.weight_synced_at.isoformat() if resource.weight_synced_at else None
             }
         
         # 最近请求统计
@@ -511,6 +748,7 @@ class ExchangeAPIProxy:
             'available_ips': len([ip for ip in self.ip_resources.values() if ip.is_available]),
             'ip_details': ip_status,
             'statistics': self.stats,
+            'dispatcher': self.dispatcher.get_stats(),
             'recent_success_rate': f"{recent_success_rate:.1f}%",
             'recent_requests_count': len(recent_records),
             'total_weight_consumed': sum(self.stats['weight_consumed_by_exchange'].values()),
@@ -7,7 +7,7 @@ MarketPrism 告警聚合和去重机制
 import hashlib
 from datetime import datetime, timezone, timedelta
 from typing import Dict, List, Optional, Set, Tuple
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
 import structlog
 
 from .alert_types import Alert, AlertSeverity, AlertCategory, AlertStatus
@@ -16,49 +16,106 @@ from .alert_types import Alert, AlertSeverity, AlertCategory, AlertStatus
 logger = structlog.get_logger(__name__)
 
 
+def _enum_value(value) -> str:
+    """Alert 启用了 use_enum_values，枚举字段可能已是字符串"""
+    return getattr(value, 'value', value)
+
+
 class AlertDeduplicator:
-    """告警去重器"""
+    """
+    告警去重器
+    
+    活跃告警按相似键登记在哈希表中，去重检查为 O(1)，不再线性扫描现有告警。
+    相似键为 (名称, 严重程度, 类别, 关键标签名, 标签值)，每个关键标签一个。
+    """
+    
+    # 相似判断使用的关键标签
+    KEY_LABELS = ('service', 'instance', 'component')
     
     def __init__(self, time_window: int = 300):  # 5分钟时间窗口
         self.time_window = time_window  # 去重时间窗口（秒）
-        self.alert_fingerprints: Dict[str, datetime] = {}  # 告警指纹 -> 最后创建时间
+        # 告警指纹 -> 最后创建时间；按时间先后排列，过期清理从头部弹出
+        self.alert_fingerprints: "OrderedDict[str, datetime]" = OrderedDict()
+        self.active_index: Dict[Tuple[str, str, str, str, str], Alert] = {}  # 相似键 -> 活跃告警
+        
+    def should_create_alert(self, alert: Alert, existing_alerts: Optional[List[Alert]] = None) -> bool:
+        """
+        判断是否应该创建告警（去重检查）
         
-    def should_create_alert(self, alert: Alert, existing_alerts: List[Alert]) -> bool:
-        """判断是否应该创建告警（去重检查）"""
+        通过检查的告警自动登记为活跃告警；传入 existing_alerts 时
+        额外对该列表做相似检查（兼容旧调用方式）。
+        """
         fingerprint = self._generate_fingerprint(alert)
         current_time = datetime.now(timezone.utc)
         
         # 检查指纹缓存
-        if fingerprint in self.alert_fingerprints:
-            last_time = self.alert_fingerprints[fingerprint]
-            if (current_time - last_time).total_seconds() < self.time_window:
-                logger.debug("告警被去重", fingerprint=fingerprint)
-                return False
+        last_time = self.alert_fingerprints.get(fingerprint)
+        if last_time is not None and (current_time - last_time).total_seconds() < self.time_window:
+            logger.debug("告警被去重", fingerprint=fingerprint)
+            return False
         
         # 检查现有活跃告警
-        for existing_alert in existing_alerts:
-            if existing_alert.status == AlertStatus.ACTIVE:
-                if self._are_similar_alerts(alert, existing_alert):
-                    logger.debug("发现相似活跃告警", 
-                               new_alert=alert.name, 
-                               existing_alert=existing_alert.name)
-                    return False
+        similar = self._find_similar_active(alert)
+        if similar is None and existing_alerts:
+            similar = next(
+                (a for a in existing_alerts
+                 if a.status == AlertStatus.ACTIVE and self._are_similar_alerts(alert, a)),
+                None
+            )
+        if similar is not None:
+            logger.debug("发现相似活跃告警", 
+                       new_alert=alert.name, 
+                       existing_alert=similar.name)
+            return False
         
         # 更新指纹缓存
         self.alert_fingerprints[fingerprint] = current_time
+        self.alert_fingerprints.move_to_end(fingerprint)
+        self.register_alert(alert)
         
         # 清理过期指纹
         self._cleanup_fingerprints()
         
         return True
     
+    def register_alert(self, alert: Alert) -> None:
+        """登记活跃告警"""
+        for key in self._similarity_keys(alert):
+            self.active_index[key] = alert
+    
+    def release_alert(self, alert: Alert) -> None:
+        """告警解决后撤销登记"""
+        for key in self._similarity_keys(alert):
+            if self.active_index.get(key) is alert:
+                del self.active_index[key]
+    
+    def _find_similar_active(self, alert: Alert) -> Optional[Alert]:
+        """按相似键查找活跃告警；状态已变更的登记顺带清除"""
+        for key in self._similarity_keys(alert):
+            existing = self.active_index.get(key)
+            if existing is None:
+                continue
+            if existing.status == AlertStatus.ACTIVE:
+                return existing
+            del self.active_index[key]
+        return None
+    
+    def _similarity_keys(self, alert: Alert) -> List[Tuple[str, str, str, str, str]]:
+        """生成相似键，与 _are_similar_alerts 的判断等价"""
+        labels = alert.labels
+        return [
+            (alert.name, _enum_value(alert.severity), _enum_value(alert.category), label, labels[label])
+            for label in self.KEY_LABELS
+            if labels.get(label)
+        ]
+    
     def _generate_fingerprint(self, alert: Alert) -> str:
         """生成告警指纹"""
         # 基于关键字段生成唯一指纹
         key_fields = [
             alert.name,
-            alert.severity.value,
-            alert.category.value,
+            _enum_value(alert.severity),
+            _enum_value(alert.category),
             alert.metadata.get('source', ''),
             alert.metadata.get('component', ''),
             alert.labels.get('service', ''),
@@ -76,8 +133,7 @@ class AlertDeduplicator:
             alert1.category == alert2.category):
             
             # 检查关键标签
-            key_labels = ['service', 'instance', 'component']
-            for label in key_labels:
+            for label in self.KEY_LABELS:
                 if (alert1.labels.get(label) and alert2.labels.get(label) and
                     alert1.labels[label] == alert2.labels[label]):
                     return True
@@ -85,17 +141,16 @@ class AlertDeduplicator:
         return False
     
     def _cleanup_fingerprints(self) -> None:
-        """清理过期的指纹"""
+        """清理过期的指纹（按时间有序，只弹出头部过期项）"""
         current_time = datetime.now(timezone.utc)
         cutoff_time = current_time - timedelta(seconds=self.time_window * 2)
         
-        expired_fingerprints = [
-            fp for fp, timestamp in self.alert_fingerprints.items()
-            if timestamp < cutoff_time
-        ]
-        
-        for fp in expired_fingerprints:
-            del self.alert_fingerprints[fp]
+        fingerprints = self.alert_fingerprints
+        while fingerprints:
+            fp, timestamp = next(iter(fingerprints.items()))
+            if timestamp >= cutoff_time:
+                break
+            del fingerprints[fp]
 
 
 class AlertAggregator:
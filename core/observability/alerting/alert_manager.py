@@ -155,7 +155,7 @@ class AlertManager:
             )
         
         # 去重检查
-        if not self.deduplicator.should_create_alert(alert, list(self.active_alerts.values())):
+        if not self.deduplicator.should_create_alert(alert):
             logger.debug("告警被去重过滤", alert_name=name)
             return None
         
@@ -222,6 +222,7 @@ class AlertManager:
         # 移动到已解决列表
         self.resolved_alerts[alert_id] = alert
         del self.active_alerts[alert_id]
+        self.deduplicator.release_alert(alert)
         
         self.stats['active_alerts'] -= 1
         self.stats['resolved_alerts'] += 1
@@ -7,8 +7,9 @@ MarketPrism 告警规则引擎
 import re
 import ast
 import operator
+from collections import deque
 from datetime import datetime, timezone, timedelta
-from typing import Dict, List, Optional, Any, Callable, Union
+from typing import Deque, Dict, List, Optional, Any, Callable, Set, Tuple, Union
 from dataclasses import dataclass, field
 from enum import Enum
 import structlog
@@ -58,13 +59,19 @@ class AlertCondition:
     def evaluate(self, metric_value: float, metric_labels: Dict[str, str] = None) -> bool:
         """评估条件"""
         # 检查标签匹配
+        if not self.matches_labels(metric_labels):
+            return False
+        
+        # 评估条件
+        return self._evaluate_condition(metric_value)
+    
+    def matches_labels(self, metric_labels: Dict[str, str] = None) -> bool:
+        """检查指标标签是否满足条件的标签过滤"""
         if self.labels and metric_labels:
             for key, value in self.labels.items():
                 if metric_labels.get(key) != value:
                     return False
-        
-        # 评估条件
-        return self._evaluate_condition(metric_value)
+        return True
     
     def _evaluate_condition(self, value: float) -> bool:
         """评估具体条件"""
@@ -93,6 +100,72 @@ class AlertCondition:
         return False
 
 
+class RollingWindow:
+    """
+    单个条件的滚动窗口聚合状态
+    
+    样本按时间淘汰；求和增量维护，最值用单调队列维护，
+    每个样本只入队出队一次，聚合查询为 O(1)。
+    """
+    
+    def __init__(self, window: float):
+        self.window = window
+        self.samples: Deque[Tuple[float, float]] = deque()
+        self.total = 0.0
+        self._max: Deque[Tuple[float, float]] = deque()  # 值单调递减
+        self._min: Deque[Tuple[float, float]] = deque()  # 值单调递增
+    
+    def add(self, ts: float, value: float) -> None:
+        """追加样本并淘汰窗口外的旧样本"""
+        self.samples.append((ts, value))
+        self.total += value
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((ts, value))
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append((ts, value))
+        self.expire(ts)
+    
+    def expire(self, now: float) -> None:
+        """淘汰早于 now - window 的样本"""
+        cutoff = now - self.window
+        samples = self.samples
+        while samples and samples[0][0] < cutoff:
+            self.total -= samples.popleft()[1]
+        if not samples:
+            self.total = 0.0  # 清除浮点累计误差
+        while self._max and self._max[0][0] < cutoff:
+            self._max.popleft()
+        while self._min and self._min[0][0] < cutoff:
+            self._min.popleft()
+    
+    def value(self, function: "AggregationFunction") -> Optional[float]:
+        """窗口聚合值；窗口为空时返回 None"""
+        samples = self.samples
+        if not samples:
+            return None
+        if function == AggregationFunction.AVG:
+            return self.total / len(samples)
+        if function == AggregationFunction.SUM:
+            return self.total
+        if function == AggregationFunction.MAX:
+            return self._max[0][1]
+        if function == AggregationFunction.MIN:
+            return self._min[0][1]
+        if function == AggregationFunction.COUNT:
+            return float(len(samples))
+        
+        first_ts, first_value = samples[0]
+        last_ts, last_value = samples[-1]
+        if function == AggregationFunction.INCREASE:
+            return last_value - first_value
+        if function == AggregationFunction.RATE:
+            elapsed = last_ts - first_ts
+            return (last_value - first_value) / elapsed if elapsed > 0 else 0.0
+        return None
+
+
 @dataclass
 class AlertRule:
     """告警规则"""
@@ -181,13 +254,28 @@ class AlertRule:
 
 
 class AlertRuleEngine:
-    """告警规则引擎"""
+    """
+    告警规则引擎
+    
+    增量评估：规则按依赖的指标名建立索引，每次评估只处理输入发生变化的规则，
+    以及上次条件成立、仍在等待持续时间的规则。带聚合函数的条件在规则级
+    滚动窗口中维护聚合值（窗口只在新样本到达或规则被评估时推进）。
+    """
     
     def __init__(self, config: Dict[str, Any] = None):
         self.config = config or {}
         self.rules: Dict[str, AlertRule] = {}
         self.rule_states: Dict[str, Dict[str, Any]] = {}  # 规则状态跟踪
-        self.metrics_cache: Dict[str, Any] = {}
+        self.metrics_cache: Dict[str, Any] = {}  # 指标名 -> 最近一次上报的数据
+        
+        # 增量评估索引
+        self._metric_index: Dict[str, Set[str]] = {}  # 指标名 -> 依赖它的规则
+        self._rule_windows: Dict[str, List[Optional[RollingWindow]]] = {}  # 与 conditions 一一对应
+        self._rule_order: Dict[str, int] = {}  # 保持按添加顺序产出告警
+        self._rule_seq = 0
+        self._metric_seen_at: Dict[str, float] = {}
+        self._dirty_rules: Set[str] = set()    # 输入已变化、待评估
+        self._pending_rules: Set[str] = set()  # 条件成立、等待持续时间
         
         # 加载默认规则
         self._load_default_rules()
@@ -351,6 +439,8 @@ class AlertRuleEngine:
     
     def add_rule(self, rule: AlertRule) -> None:
         """添加告警规则"""
+        if rule.id in self.rules:
+            self._unindex_rule(self.rules[rule.id])
         self.rules[rule.id] = rule
         self.rule_states[rule.id] = {
             'last_evaluation': None,
@@ -358,14 +448,19 @@ class AlertRuleEngine:
             'trigger_count': 0,
             'active_alerts': []
         }
+        self._rule_seq += 1
+        self._rule_order[rule.id] = self._rule_seq
+        self._index_rule(rule)
         
         logger.info("添加告警规则", rule_id=rule.id, name=rule.name)
     
     def remove_rule(self, rule_id: str) -> bool:
         """移除告警规则"""
         if rule_id in self.rules:
+            self._unindex_rule(self.rules[rule_id])
             del self.rules[rule_id]
             del self.rule_states[rule_id]
+            del self._rule_order[rule_id]
             logger.info("移除告警规则", rule_id=rule_id)
             return True
         return False
@@ -373,11 +468,38 @@ class AlertRuleEngine:
     def update_rule(self, rule: AlertRule) -> bool:
         """更新告警规则"""
         if rule.id in self.rules:
+            self._unindex_rule(self.rules[rule.id])
             self.rules[rule.id] = rule
+            self._index_rule(rule)
             logger.info("更新告警规则", rule_id=rule.id, name=rule.name)
             return True
         return False
     
+    def _index_rule(self, rule: AlertRule) -> None:
+        """登记规则依赖的指标并创建聚合窗口"""
+        for condition in rule.conditions:
+            self._metric_index.setdefault(condition.metric_name, set()).add(rule.id)
+        self._rule_windows[rule.id] = [
+            RollingWindow(condition.time_window) if condition.aggregation else None
+            for condition in rule.conditions
+        ]
+        # 已缓存的指标可能已满足新规则，下次评估时处理
+        self._dirty_rules.add(rule.id)
+    
+    def _unindex_rule(self, rule: AlertRule) -> None:
+        """撤销规则的指标索引与评估状态"""
+        for condition in rule.conditions:
+            rule_ids = self._metric_index.get(condition.metric_name)
+            if rule_ids is not None:
+                rule_ids.discard(rule.id)
+                if not rule_ids:
+                    del self._metric_index[condition.metric_name]
+                    self.metrics_cache.pop(condition.metric_name, None)
+                    self._metric_seen_at.pop(condition.metric_name, None)
+        self._rule_windows.pop(rule.id, None)
+        self._dirty_rules.discard(rule.id)
+        self._pending_rules.discard(rule.id)
+    
     def get_rule(self, rule_id: str) -> Optional[AlertRule]:
         """获取告警规则"""
         return self.rules.get(rule_id)
@@ -395,32 +517,117 @@ class AlertRuleEngine:
         
         return rules
     
-    def evaluate_rules(self, metrics_data: Dict[str, Any]) -> List[Alert]:
-        """评估所有告警规则"""
+    def evaluate_rules(self, metrics_data: Dict[str, Any],
+                       current_time: Optional[datetime] = None) -> List[Alert]:
+        """
+        增量评估告警规则
+        
+        metrics_data 可以只包含本轮变化的指标，未上报的指标沿用最近一次的值；
+        超过条件时间窗口未上报的指标视为缺失。
+        """
         alerts = []
-        current_time = datetime.now(timezone.utc)
+        current_time = current_time or datetime.now(timezone.utc)
+        now = current_time.timestamp()
+        
+        self._ingest_metrics(metrics_data, now)
+        
+        candidates = self._dirty_rules | self._pending_rules
+        if not candidates:
+            return alerts
         
-        for rule_id, rule in self.rules.items():
+        for rule_id in sorted(candidates, key=self._rule_order.__getitem__):
+            rule = self.rules[rule_id]
+            if not rule.enabled:
+                self._dirty_rules.discard(rule_id)
+                self._pending_rules.discard(rule_id)
+                continue
             try:
-                if self._should_evaluate_rule(rule, current_time):
-                    if rule.evaluate(metrics_data):
-                        # 检查持续时间
-                        if self._check_duration(rule_id, current_time):
-                            alert = rule.create_alert(metrics_data)
-                            alerts.append(alert)
-                            
-                            # 更新规则状态
-                            self.rule_states[rule_id]['last_triggered'] = current_time
-                            self.rule_states[rule_id]['trigger_count'] += 1
-                    
-                    # 更新评估时间
-                    self.rule_states[rule_id]['last_evaluation'] = current_time
+                # 未到评估间隔的规则保留脏标记，留待下一轮
+                if not self._should_evaluate_rule(rule, current_time):
+                    continue
+                self._dirty_rules.discard(rule_id)
+                
+                if self._evaluate_rule(rule, now):
+                    self._pending_rules.add(rule_id)
+                    # 检查持续时间
+                    if self._check_duration(rule_id, current_time):
+                        alert = rule.create_alert(self._rule_metrics(rule))
+                        alerts.append(alert)
+                        
+                        # 更新规则状态
+                        self.rule_states[rule_id]['last_triggered'] = current_time
+                        self.rule_states[rule_id]['trigger_count'] += 1
+                else:
+                    self._pending_rules.discard(rule_id)
+                
+                # 更新评估时间
+                self.rule_states[rule_id]['last_evaluation'] = current_time
                     
             except Exception as e:
+                self._pending_rules.discard(rule_id)
                 logger.error("告警规则评估失败", rule_id=rule_id, error=str(e))
         
         return alerts
     
+    def _ingest_metrics(self, metrics_data: Dict[str, Any], now: float) -> None:
+        """写入指标缓存，标记输入变化的规则并推进聚合窗口"""
+        for metric_name, metric_data in metrics_data.items():
+            rule_ids = self._metric_index.get(metric_name)
+            if not rule_ids:
+                continue  # 没有规则依赖的指标不缓存
+            
+            changed = self.metrics_cache.get(metric_name) != metric_data
+            self.metrics_cache[metric_name] = metric_data
+            self._metric_seen_at[metric_name] = now
+            
+            for rule_id in rule_ids:
+                windows = self._rule_windows[rule_id]
+                fed = False
+                for condition, window in zip(self.rules[rule_id].conditions, windows):
+                    if window is None or condition.metric_name != metric_name:
+                        continue
+                    if not metric_data or not condition.matches_labels(metric_data.get('labels', {})):
+                        continue
+                    try:
+                        window.add(now, float(metric_data.get('value', 0)))
+                    except (TypeError, ValueError):
+                        continue
+                    fed = True
+                if changed or fed:
+                    self._dirty_rules.add(rule_id)
+    
+    def _evaluate_rule(self, rule: AlertRule, now: float) -> bool:
+        """基于指标缓存与聚合窗口评估规则（AND逻辑）"""
+        if not rule.enabled:
+            return False
+        
+        for condition, window in zip(rule.conditions, self._rule_windows[rule.id]):
+            if window is not None:
+                window.expire(now)
+                value = window.value(condition.aggregation)
+                # 样本入窗时已按标签过滤
+                if value is None or not condition._evaluate_condition(value):
+                    return False
+                continue
+            
+            metric_data = self.metrics_cache.get(condition.metric_name)
+            if not metric_data:
+                return False
+            if now - self._metric_seen_at[condition.metric_name] > condition.time_window:
+                return False
+            if not condition.evaluate(metric_data.get('value', 0), metric_data.get('labels', {})):
+                return False
+        
+        return True
+    
+    def _rule_metrics(self, rule: AlertRule) -> Dict[str, Any]:
+        """规则相关指标的当前数据"""
+        return {
+            condition.metric_name: self.metrics_cache[condition.metric_name]
+            for condition in rule.conditions
+            if condition.metric_name in self.metrics_cache
+        }
+    
     def _should_evaluate_rule(self, rule: AlertRule, current_time: datetime) -> bool:
         """判断是否应该评估规则"""
         if not rule.enabled:
@@ -472,4 +679,9 @@ class AlertRuleEngine:
         for rule_id, state in self.rule_states.items():
             stats['trigger_counts'][rule_id] = state['trigger_count']
         
+        # 增量评估状态
+        stats['indexed_metrics'] = len(self._metric_index)
+        stats['dirty_rules'] = len(self._dirty_rules)
+        stats['pending_rules'] = len(self._pending_rules)
+        
         return stats
@@ -4,9 +4,12 @@ MarketPrism 异常检测模块
 基于机器学习的智能异常检测系统
 """
 
+import math
 import numpy as np
+from bisect import bisect_left, insort
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Callable, Dict, List, Optional, Tuple, Any
 from collections import deque
 import structlog
 
@@ -75,45 +78,233 @@ class AnomalyResult:
         }
 
 
+class RunningStats:
+    """滑动窗口均值/方差（Welford 增量更新）
+
+    固定容量的环形缓冲区，新值写入时同时扣除被淘汰的旧值，
+    每次 push 的开销与窗口大小无关。
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = max(1, capacity)
+        self._buffer: deque = deque()
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def push(self, value: float) -> None:
+        buffer = self._buffer
+        if len(buffer) < self.capacity:
+            buffer.append(value)
+            delta = value - self._mean
+            self._mean += delta / len(buffer)
+            self._m2 += delta * (value - self._mean)
+            return
+
+        old = buffer.popleft()
+        buffer.append(value)
+        old_mean = self._mean
+        self._mean = old_mean + (value - old) / self.capacity
+        self._m2 += (value - old) * (value - self._mean + old - old_mean)
+
+        # 周期性全量重算，抵消浮点累积误差（摊还后仍为 O(1)）
+        self._evictions += 1
+        if self._evictions >= self.capacity:
+            self._evictions = 0
+            self._recompute()
+
+    def _recompute(self) -> None:
+        n = len(self._buffer)
+        mean = math.fsum(self._buffer) / n
+        self._mean = mean
+        self._m2 = math.fsum((v - mean) ** 2 for v in self._buffer)
+
+    def center(self) -> float:
+        return self._mean
+
+    def spread(self) -> float:
+        n = len(self._buffer)
+        if n == 0 or self._m2 <= 0:
+            return 0.0
+        return math.sqrt(self._m2 / n)
+
+
+class EWMAStats:
+    """指数加权均值/方差，只保存两个标量"""
+
+    def __init__(self, alpha: float = 0.05):
+        self.alpha = alpha
+        self._count = 0
+        self._mean = 0.0
+        self._var = 0.0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def push(self, value: float) -> None:
+        self._count += 1
+        if self._count == 1:
+            self._mean = value
+            return
+        diff = value - self._mean
+        incr = self.alpha * diff
+        self._mean += incr
+        self._var = (1 - self.alpha) * (self._var + diff * incr)
+
+    def center(self) -> float:
+        return self._mean
+
+    def spread(self) -> float:
+        return math.sqrt(self._var) if self._var > 0 else 0.0
+
+
+class RollingMedianStats:
+    """滚动中位数/MAD，对离群点不敏感
+
+    维护窗口的有序副本：中位数 O(1) 读取，MAD 通过两个有序距离序列
+    求第 k 小元素得到（O(log n)），无需每次重新排序。
+    """
+
+    # 正态分布下 MAD 到标准差的换算系数
+    MAD_SCALE = 1.4826
+
+    def __init__(self, capacity: int):
+        self.capacity = max(1, capacity)
+        self._buffer: deque = deque()
+        self._sorted: List[float] = []
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def push(self, value: float) -> None:
+        if len(self._buffer) >= self.capacity:
+            old = self._buffer.popleft()
+            del self._sorted[bisect_left(self._sorted, old)]
+        self._buffer.append(value)
+        insort(self._sorted, value)
+
+    def center(self) -> float:
+        s = self._sorted
+        n = len(s)
+        if n == 0:
+            return 0.0
+        mid = n // 2
+        return s[mid] if n % 2 else (s[mid - 1] + s[mid]) / 2
+
+    def spread(self) -> float:
+        s = self._sorted
+        n = len(s)
+        if n == 0:
+            return 0.0
+        median = self.center()
+        split = bisect_left(s, median)
+
+        # 左侧距离 median - s[split-1-i] 与右侧距离 s[split+i] - median 均为升序
+        def left(i: int) -> float:
+            return median - s[split - 1 - i]
+
+        def right(i: int) -> float:
+            return s[split + i] - median
+
+        left_len, right_len = split, n - split
+        mid = n // 2
+        if n % 2:
+            mad = _kth_of_sorted_pair(left_len, left, right_len, right, mid)
+        else:
+            mad = (_kth_of_sorted_pair(left_len, left, right_len, right, mid - 1) +
+                   _kth_of_sorted_pair(left_len, left, right_len, right, mid)) / 2
+        return mad * self.MAD_SCALE
+
+
+def _kth_of_sorted_pair(a_len: int, a_at: Callable[[int], float],
+                        b_len: int, b_at: Callable[[int], float], k: int) -> float:
+    """返回两个升序序列合并后第 k 小（从0计）的元素"""
+    lo, hi = max(0, k + 1 - b_len), min(a_len, k + 1)
+    while lo < hi:
+        i = (lo + hi) // 2
+        if a_at(i) >= b_at(k - i):
+            hi = i
+        else:
+            lo = i + 1
+    i, j = lo, k + 1 - lo
+    candidates = []
+    if i > 0:
+        candidates.append(a_at(i - 1))
+    if j > 0:
+        candidates.append(b_at(j - 1))
+    return max(candidates)
+
+
+STATS_ESTIMATORS = ('welford', 'ewma', 'median')
+
+
 class BaseAnomalyDetector:
-    """基础异常检测器"""
+    """基础异常检测器
+
+    每个指标维护一份增量统计量（不含当前点），检测开销为常数，
+    不随窗口大小增长。estimator 可选：
+    - welford: 滑动窗口均值/标准差（默认，与全量计算结果一致）
+    - ewma:    指数加权均值/标准差
+    - median:  滚动中位数/MAD，适合有尖峰的指标
+    """
     
-    def __init__(self, window_size: int = 100, threshold: float = 2.0):
+    def __init__(self, window_size: int = 100, threshold: float = 2.0,
+                 estimator: str = 'welford', ewma_alpha: float = 0.05):
+        if estimator not in STATS_ESTIMATORS:
+            raise ValueError(f"不支持的统计估计器: {estimator}")
         self.window_size = window_size
         self.threshold = threshold
+        self.estimator = estimator
+        self.ewma_alpha = ewma_alpha
         self.data_windows: Dict[str, deque] = {}
+        self.running_stats: Dict[str, Any] = {}
+    
+    def _make_stats(self, capacity: int):
+        """按配置创建统计量对象"""
+        if self.estimator == 'ewma':
+            return EWMAStats(self.ewma_alpha)
+        if self.estimator == 'median':
+            return RollingMedianStats(capacity)
+        return RunningStats(capacity)
         
     def add_metric_point(self, metric_name: str, point: MetricPoint) -> Optional[AnomalyResult]:
         """添加指标数据点并检测异常"""
         if metric_name not in self.data_windows:
             self.data_windows[metric_name] = deque(maxlen=self.window_size)
+            # 统计量只覆盖历史点（窗口去掉当前点）
+            self.running_stats[metric_name] = self._make_stats(self.window_size - 1)
         
         window = self.data_windows[metric_name]
         window.append(point)
         
-        # 需要足够的历史数据才能检测异常
-        if len(window) < 10:
-            return None
-        
-        return self._detect_anomaly(metric_name, point, window)
+        try:
+            # 需要足够的历史数据才能检测异常
+            if len(window) < 10:
+                return None
+            
+            return self._detect_anomaly(metric_name, point, window)
+        finally:
+            self.running_stats[metric_name].push(point.value)
     
-    def _detect_anomaly(self, metric_name: str, point: MetricPoint, window: deque) -> AnomalyResult:
-        """检测异常（基于统计方法）"""
-        values = [p.value for p in window]
-        
-        # 计算统计指标
-        mean = np.mean(values[:-1])  # 排除当前点
-        std = np.std(values[:-1])
-        
-        # Z-score异常检测
-        if std > 0:
-            z_score = abs(point.value - mean) / std
+    def _score(self, value: float, center: float, spread: float) -> Tuple[float, bool, Tuple[float, float]]:
+        """根据中心值和离散度计算 z-score"""
+        if spread > 0:
+            z_score = abs(value - center) / spread
             is_anomaly = z_score > self.threshold
-            expected_range = (mean - self.threshold * std, mean + self.threshold * std)
+            expected_range = (center - self.threshold * spread, center + self.threshold * spread)
         else:
-            z_score = 0
+            z_score = 0.0
             is_anomaly = False
-            expected_range = (mean, mean)
+            expected_range = (center, center)
+        return z_score, is_anomaly, expected_range
+    
+    def _detect_anomaly(self, metric_name: str, point: MetricPoint, window: deque) -> AnomalyResult:
+        """检测异常（基于统计方法）"""
+        stats = self.running_stats[metric_name]
+        z_score, is_anomaly, expected_range = self._score(point.value, stats.center(), stats.spread())
         
         return AnomalyResult(
             is_anomaly=is_anomaly,
@@ -128,40 +319,52 @@ class BaseAnomalyDetector:
 
 
 class MLAnomalyDetector(BaseAnomalyDetector):
-    """基于机器学习的异常检测器"""
+    """基于机器学习的异常检测器
+
+    模型训练在后台线程池中进行，请求路径只做单点预测；
+    首个模型就绪前回退到统计检测。
+    """
     
-    def __init__(self, window_size: int = 200, contamination: float = 0.1):
+    def __init__(self, window_size: int = 200, contamination: float = 0.1,
+                 executor: Optional[ThreadPoolExecutor] = None):
         super().__init__(window_size)
         self.contamination = contamination
-        self.models: Dict[str, IsolationForest] = {}
-        self.scalers: Dict[str, StandardScaler] = {}
+        # 每个指标的 (模型, 标准化器) 成对保存，重训后整体替换，读取方不会拿到新旧混搭的一对
+        self._fitted: Dict[str, Tuple["IsolationForest", "StandardScaler"]] = {}
         self.retrain_interval = 100  # 每100个数据点重新训练
         self.point_counts: Dict[str, int] = {}
+        self._executor = executor
+        self._owns_executor = executor is None
+        self._training_futures: Dict[str, Future] = {}
         
         if not SKLEARN_AVAILABLE:
             logger.warning("scikit-learn不可用，回退到基础异常检测")
     
+    @property
+    def models(self) -> Dict[str, "IsolationForest"]:
+        return {name: model for name, (model, _) in self._fitted.items()}
+
+    @property
+    def scalers(self) -> Dict[str, "StandardScaler"]:
+        return {name: scaler for name, (_, scaler) in self._fitted.items()}
+
     def _detect_anomaly(self, metric_name: str, point: MetricPoint, window: deque) -> AnomalyResult:
         """使用机器学习检测异常"""
         if not SKLEARN_AVAILABLE:
             return super()._detect_anomaly(metric_name, point, window)
         
-        # 准备训练数据
-        values = np.array([p.value for p in window]).reshape(-1, 1)
-        
-        # 检查是否需要重新训练模型
-        if (metric_name not in self.models or 
+        # 检查是否需要重新训练模型（后台执行，不阻塞检测）
+        if (metric_name not in self._fitted or 
             self.point_counts.get(metric_name, 0) % self.retrain_interval == 0):
-            self._train_model(metric_name, values)
+            self._schedule_training(metric_name, window)
         
         self.point_counts[metric_name] = self.point_counts.get(metric_name, 0) + 1
         
         # 预测异常
-        model = self.models.get(metric_name)
-        scaler = self.scalers.get(metric_name)
-        
-        if model is None or scaler is None:
+        fitted = self._fitted.get(metric_name)
+        if fitted is None:
             return super()._detect_anomaly(metric_name, point, window)
+        model, scaler = fitted
         
         # 标准化当前值
         current_value = np.array([[point.value]])
@@ -171,12 +374,12 @@ class MLAnomalyDetector(BaseAnomalyDetector):
         prediction = model.predict(scaled_value)[0]
         anomaly_score = model.decision_function(scaled_value)[0]
         
-        is_anomaly = prediction == -1
+        is_anomaly = bool(prediction == -1)
         
-        # 计算期望范围（基于历史数据）
-        historical_values = values[:-1]
-        mean = np.mean(historical_values)
-        std = np.std(historical_values)
+        # 计算期望范围（基于历史数据的增量统计量）
+        stats = self.running_stats[metric_name]
+        mean = stats.center()
+        std = stats.spread()
         expected_range = (mean - 2 * std, mean + 2 * std)
         
         return AnomalyResult(
@@ -190,6 +393,30 @@ class MLAnomalyDetector(BaseAnomalyDetector):
             confidence=abs(anomaly_score) if is_anomaly else 0.0
         )
     
+    def _schedule_training(self, metric_name: str, window: deque) -> None:
+        """提交后台训练任务，同一指标同时只保留一个训练任务"""
+        pending = self._training_futures.get(metric_name)
+        if pending is not None and not pending.done():
+            return
+        
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="anomaly-train")
+        
+        # 复制窗口快照，训练期间窗口仍可继续写入
+        values = np.fromiter((p.value for p in window), dtype=float, count=len(window)).reshape(-1, 1)
+        self._training_futures[metric_name] = self._executor.submit(self._train_model, metric_name, values)
+    
+    def wait_for_training(self, timeout: Optional[float] = None) -> None:
+        """等待当前所有后台训练任务完成"""
+        for future in list(self._training_futures.values()):
+            future.result(timeout=timeout)
+    
+    def shutdown(self, wait: bool = True) -> None:
+        """关闭自建的训练线程池"""
+        if self._executor is not None and self._owns_executor:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+    
     def _train_model(self, metric_name: str, values: np.ndarray) -> None:
         """训练异常检测模型"""
         try:
@@ -205,9 +432,8 @@ class MLAnomalyDetector(BaseAnomalyDetector):
             )
             model.fit(scaled_values)
             
-            # 保存模型和标准化器
-            self.models[metric_name] = model
-            self.scalers[metric_name] = scaler
+            # 模型与标准化器一次赋值，保证读取方看到的是同一次训练的结果
+            self._fitted[metric_name] = (model, scaler)
             
             logger.debug("异常检测模型训练完成", metric_name=metric_name, samples=len(values))
             
@@ -216,12 +442,20 @@ class MLAnomalyDetector(BaseAnomalyDetector):
 
 
 class SeasonalAnomalyDetector(BaseAnomalyDetector):
-    """季节性异常检测器"""
+    """季节性异常检测器
+
+    每个时间槽（一天中的分钟）维护独立的增量统计量，
+    保留最近30个周期的同槽数据。
+    """
     
-    def __init__(self, window_size: int = 1440, seasonal_period: int = 1440):  # 默认24小时周期
-        super().__init__(window_size)
+    seasonal_history = 30  # 保留最近30天的数据
+    seasonal_min_history = 6  # 至少7天数据（含当前点）
+    
+    def __init__(self, window_size: int = 1440, seasonal_period: int = 1440,  # 默认24小时周期
+                 estimator: str = 'welford'):
+        super().__init__(window_size, estimator=estimator)
         self.seasonal_period = seasonal_period
-        self.seasonal_data: Dict[str, Dict[int, List[float]]] = {}
+        self.seasonal_data: Dict[str, Dict[int, Any]] = {}
     
     def _detect_anomaly(self, metric_name: str, point: MetricPoint, window: deque) -> AnomalyResult:
         """基于季节性模式检测异常"""
@@ -231,39 +465,23 @@ class SeasonalAnomalyDetector(BaseAnomalyDetector):
         time_index = hour_of_day * 60 + minute_of_hour  # 一天中的分钟数
         
         # 初始化季节性数据
-        if metric_name not in self.seasonal_data:
-            self.seasonal_data[metric_name] = {}
-        
-        seasonal_data = self.seasonal_data[metric_name]
-        
-        # 收集同一时间点的历史数据
-        if time_index not in seasonal_data:
-            seasonal_data[time_index] = []
-        
-        seasonal_data[time_index].append(point.value)
+        seasonal_data = self.seasonal_data.setdefault(metric_name, {})
         
-        # 保持数据窗口大小
-        if len(seasonal_data[time_index]) > 30:  # 保留最近30天的数据
-            seasonal_data[time_index] = seasonal_data[time_index][-30:]
+        slot_stats = seasonal_data.get(time_index)
+        if slot_stats is None:
+            slot_stats = seasonal_data[time_index] = self._make_stats(self.seasonal_history - 1)
         
-        # 需要足够的历史数据
-        if len(seasonal_data[time_index]) < 7:  # 至少7天数据
-            return super()._detect_anomaly(metric_name, point, window)
-        
-        # 计算季节性期望值
-        historical_values = seasonal_data[time_index][:-1]  # 排除当前值
-        mean = np.mean(historical_values)
-        std = np.std(historical_values)
-        
-        # 季节性异常检测
-        if std > 0:
-            z_score = abs(point.value - mean) / std
-            is_anomaly = z_score > self.threshold
-            expected_range = (mean - self.threshold * std, mean + self.threshold * std)
-        else:
-            z_score = 0
-            is_anomaly = False
-            expected_range = (mean, mean)
+        try:
+            # 需要足够的历史数据
+            if len(slot_stats) < self.seasonal_min_history:
+                return super()._detect_anomaly(metric_name, point, window)
+            
+            # 季节性期望值（槽内统计量不含当前值）
+            z_score, is_anomaly, expected_range = self._score(
+                point.value, slot_stats.center(), slot_stats.spread()
+            )
+        finally:
+            slot_stats.push(point.value)
         
         return AnomalyResult(
             is_anomaly=is_anomaly,
@@ -287,11 +505,14 @@ class AnomalyDetector:
         self.detectors = {
             'statistical': BaseAnomalyDetector(
                 window_size=self.config.get('statistical_window', 100),
-                threshold=self.config.get('statistical_threshold', 2.0)
+                threshold=self.config.get('statistical_threshold', 2.0),
+                estimator=self.config.get('statistical_estimator', 'welford'),
+                ewma_alpha=self.config.get('ewma_alpha', 0.05)
             ),
             'seasonal': SeasonalAnomalyDetector(
                 window_size=self.config.get('seasonal_window', 1440),
-                seasonal_period=self.config.get('seasonal_period', 1440)
+                seasonal_period=self.config.get('seasonal_period', 1440),
+                estimator=self.config.get('seasonal_estimator', 'welford')
             )
         }
         
@@ -401,8 +401,21 @@ class ManagedLogger:
             criticality, healthy=healthy, **kwargs
         )
 
+    def is_debug_enabled(self) -> bool:
+        """
+        数据处理/调试日志是否会实际输出
+
+        info()/debug() 最终经 data_processing 输出，仅在 MARKETPRISM_DEBUG 开启时生效；
+        热路径可据此跳过日志参数的构造。
+        """
+        return self.base_logger.enable_debug
+
     def info(self, message: str, **kwargs):
         """通用信息日志 - 向后兼容"""
+        if not self.base_logger.enable_debug:
+            # data_processing 不会输出，跳过过滤与去重
+            self._local_stats["logs_suppressed"] += 1
+            return
         # 🔧 修复：移除可能冲突的operation参数
         clean_kwargs = {k: v for k, v in kwargs.items() if k != 'operation'}
         self._log_with_management(
@@ -412,6 +425,9 @@ class ManagedLogger:
 
     def debug(self, message: str, **kwargs):
         """调试日志 - 向后兼容"""
+        if not self.base_logger.enable_debug:
+            self._local_stats["logs_suppressed"] += 1
+            return
         # 🔧 修复：移除可能冲突的operation参数
         clean_kwargs = {k: v for k, v in kwargs.items() if k != 'operation'}
         self._log_with_management(
@@ -6,6 +6,7 @@
 
 from datetime import datetime, timezone
 import threading
+from bisect import bisect_left
 from typing import Dict, List, Optional, Set, Any, Union, Callable, Type
 from collections import defaultdict
 import time
@@ -70,8 +71,188 @@ class SummaryValue(MetricValue):
         self.count += 1
 
 
+class _ThreadLocalCells:
+    """按线程分片的累加单元
+
+    每个线程只写自己的单元，记录路径无需加锁；读取（抓取）时合并所有单元。
+    """
+    
+    __slots__ = ('_local', '_cells', '_lock', '_size')
+    
+    def __init__(self, size: int):
+        self._local = threading.local()
+        self._cells: List[list] = []
+        self._lock = threading.Lock()
+        self._size = size
+    
+    def get(self) -> list:
+        """获取当前线程的累加单元"""
+        try:
+            return self._local.cell
+        except AttributeError:
+            cell = [0] * self._size
+            with self._lock:
+                self._cells.append(cell)
+            self._local.cell = cell
+            return cell
+    
+    def merge(self) -> list:
+        """合并所有线程的累加结果"""
+        totals = [0] * self._size
+        with self._lock:
+            cells = list(self._cells)
+        for cell in cells:
+            for i, v in enumerate(cell):
+                totals[i] += v
+        return totals
+    
+    def clear(self) -> None:
+        """原地清零（线程持有的单元引用保持有效）"""
+        with self._lock:
+            for cell in self._cells:
+                cell[:] = [0] * self._size
+
+
+class MetricChild:
+    """预绑定标签的指标子项
+
+    通过 MetricInstance.labels() 获取并由调用方缓存，记录时不再计算标签键，
+    也不获取实例锁。累加结果在 get_values()/get_value() 时合并到 value。
+    """
+    
+    def __init__(self, instance: 'MetricInstance', labels: Dict[str, str], label_key: str,
+                 value: MetricValue):
+        self.instance = instance
+        self.labels = labels
+        self.label_key = label_key
+        self.value = value
+    
+    def _sync(self) -> bool:
+        """将累加结果写入 value，返回是否有变化"""
+        return False
+    
+    def _reset(self) -> None:
+        """清零累加结果"""
+
+
+class CounterChild(MetricChild):
+    """计数器子项"""
+    
+    def __init__(self, instance, labels, label_key):
+        super().__init__(instance, labels, label_key, MetricValue(value=0, labels=labels))
+        self._cells = _ThreadLocalCells(1)
+    
+    def inc(self, amount: Union[int, float] = 1) -> None:
+        """增加计数"""
+        self._cells.get()[0] += amount
+    
+    def _sync(self) -> bool:
+        total = self._cells.merge()[0]
+        changed = total != self.value.value
+        self.value.value = total
+        return changed
+    
+    def _reset(self) -> None:
+        self._cells.clear()
+        self.value.value = 0
+
+
+class GaugeChild(MetricChild):
+    """仪表子项（最后写入生效，直接写 value）"""
+    
+    def __init__(self, instance, labels, label_key):
+        super().__init__(instance, labels, label_key, MetricValue(value=0, labels=labels))
+    
+    def set(self, value: Union[int, float]) -> None:
+        """设置当前值"""
+        self.value.value = value
+        self.value.timestamp = time.time()
+        self.instance.last_updated = self.value.timestamp
+    
+    def _reset(self) -> None:
+        self.value.value = 0
+
+
+class HistogramChild(MetricChild):
+    """直方图子项
+
+    每个线程记录非累积的桶计数，bisect 定位所在桶；
+    合并时再转换成 Prometheus 语义的累积计数。
+    """
+    
+    def __init__(self, instance, labels, label_key, buckets: List[float]):
+        bounds = sorted(buckets)
+        value = HistogramValue(value=0, labels=labels,
+                               buckets=[HistogramBucket(upper_bound=b) for b in bounds])
+        super().__init__(instance, labels, label_key, value)
+        self._bounds = bounds
+        # 布局：[各桶计数..., 溢出桶, sum, count]
+        self._sum_index = len(bounds) + 1
+        self._cells = _ThreadLocalCells(len(bounds) + 3)
+    
+    def observe(self, value: float) -> None:
+        """观察一个值"""
+        cell = self._cells.get()
+        cell[bisect_left(self._bounds, value)] += 1
+        cell[self._sum_index] += value
+        cell[self._sum_index + 1] += 1
+    
+    def _sync(self) -> bool:
+        totals = self._cells.merge()
+        hist_value = self.value
+        count = totals[self._sum_index + 1]
+        changed = count != hist_value.count
+        cumulative = 0
+        for bucket, bucket_count in zip(hist_value.buckets, totals):
+            cumulative += bucket_count
+            bucket.count = cumulative
+        hist_value.sum = totals[self._sum_index]
+        hist_value.count = count
+        return changed
+    
+    def _reset(self) -> None:
+        self._cells.clear()
+        self._sync()
+
+
+class SummaryChild(MetricChild):
+    """摘要子项"""
+    
+    def __init__(self, instance, labels, label_key):
+        super().__init__(instance, labels, label_key, SummaryValue(value=0, labels=labels))
+        self._cells = _ThreadLocalCells(2)
+    
+    def observe(self, value: float) -> None:
+        """观察一个值"""
+        cell = self._cells.get()
+        cell[0] += value
+        cell[1] += 1
+    
+    def _sync(self) -> bool:
+        total, count = self._cells.merge()
+        changed = count != self.value.count
+        self.value.sum = total
+        self.value.count = count
+        return changed
+    
+    def _reset(self) -> None:
+        self._cells.clear()
+        self._sync()
+
+
+DEFAULT_HISTOGRAM_BUCKETS = [0.1, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf')]
+
+
 class MetricInstance:
-    """指标实例"""
+    """指标实例
+
+    高频路径建议先用 labels() 获取子项并缓存：
+
+        child = metric.labels(exchange="binance", symbol="BTCUSDT")
+        child.inc()
+
+    increment/set_value/observe_* 仍然可用，内部复用同一套子项。
+    """
     
     def __init__(self, definition: MetricDefinition):
         self.definition = definition
@@ -79,6 +260,9 @@ class MetricInstance:
         self.created_at = time.time()
         self.last_updated = time.time()
         self._lock = threading.RLock()
+        self._children: Dict[str, MetricChild] = {}
+        # 按调用方传入的标签顺序缓存，命中时免去排序和字符串拼接
+        self._children_by_items: Dict[tuple, MetricChild] = {}
         
     def _get_label_key(self, labels: Dict[str, str]) -> str:
         """生成标签键"""
@@ -86,88 +270,103 @@ class MetricInstance:
             return ""
         return "|".join(f"{k}={v}" for k, v in sorted(labels.items()))
     
+    def labels(self, labels: Dict[str, str] = None, **label_kwargs: str) -> MetricChild:
+        """获取预绑定标签的子项（已缓存）"""
+        if label_kwargs:
+            labels = {**(labels or {}), **label_kwargs}
+        return self._get_child(labels or {})
+    
+    def _get_child(self, labels: Dict[str, str], buckets: List[float] = None) -> MetricChild:
+        """查找或创建子项"""
+        items = tuple(labels.items())
+        child = self._children_by_items.get(items)
+        if child is not None:
+            return child
+        
+        label_key = self._get_label_key(labels)
+        with self._lock:
+            child = self._children.get(label_key)
+            if child is None:
+                child = self._create_child(dict(labels), label_key, buckets)
+                self._children[label_key] = child
+                self.values[label_key] = child.value
+            self._children_by_items[items] = child
+        return child
+    
+    def _create_child(self, labels: Dict[str, str], label_key: str,
+                      buckets: List[float] = None) -> MetricChild:
+        metric_type = self.definition.metric_type
+        if metric_type == MetricType.COUNTER:
+            return CounterChild(self, labels, label_key)
+        if metric_type == MetricType.GAUGE:
+            return GaugeChild(self, labels, label_key)
+        if metric_type == MetricType.HISTOGRAM:
+            return HistogramChild(self, labels, label_key, buckets or DEFAULT_HISTOGRAM_BUCKETS)
+        return SummaryChild(self, labels, label_key)
+    
     def set_value(self, value: Union[int, float], labels: Dict[str, str] = None) -> None:
         """设置指标值（适用于Gauge）"""
         if self.definition.metric_type != MetricType.GAUGE:
             raise ValueError(f"set_value只能用于GAUGE类型指标")
         
-        labels = labels or {}
-        label_key = self._get_label_key(labels)
-        
-        with self._lock:
-            self.values[label_key] = MetricValue(value=value, labels=labels)
-            self.last_updated = time.time()
+        self._get_child(labels or {}).set(value)
     
     def increment(self, amount: Union[int, float] = 1, labels: Dict[str, str] = None) -> None:
         """增加计数器值"""
         if self.definition.metric_type != MetricType.COUNTER:
             raise ValueError(f"increment只能用于COUNTER类型指标")
         
-        labels = labels or {}
-        label_key = self._get_label_key(labels)
-        
-        with self._lock:
-            if label_key in self.values:
-                self.values[label_key].value += amount
-            else:
-                self.values[label_key] = MetricValue(value=amount, labels=labels)
-            self.last_updated = time.time()
+        self._get_child(labels or {}).inc(amount)
     
     def observe_histogram(self, value: float, labels: Dict[str, str] = None, 
                          buckets: List[float] = None) -> None:
-        """观察直方图值"""
+        """观察直方图值（桶边界在该标签组合首次观察时确定）"""
         if self.definition.metric_type != MetricType.HISTOGRAM:
             raise ValueError(f"observe_histogram只能用于HISTOGRAM类型指标")
         
-        labels = labels or {}
-        label_key = self._get_label_key(labels)
-        buckets = buckets or [0.1, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf')]
-        
-        with self._lock:
-            if label_key not in self.values:
-                histogram_buckets = [HistogramBucket(upper_bound=b) for b in buckets]
-                self.values[label_key] = HistogramValue(
-                    value=0, labels=labels, buckets=histogram_buckets
-                )
-            
-            hist_value = self.values[label_key]
-            hist_value.add_observation(value)
-            self.last_updated = time.time()
+        self._get_child(labels or {}, buckets).observe(value)
     
     def observe_summary(self, value: float, labels: Dict[str, str] = None) -> None:
         """观察摘要值"""
         if self.definition.metric_type != MetricType.SUMMARY:
             raise ValueError(f"observe_summary只能用于SUMMARY类型指标")
         
-        labels = labels or {}
-        label_key = self._get_label_key(labels)
-        
-        with self._lock:
-            if label_key not in self.values:
-                self.values[label_key] = SummaryValue(value=0, labels=labels)
-            
-            summary_value = self.values[label_key]
-            summary_value.add_observation(value)
+        self._get_child(labels or {}).observe(value)
+    
+    def _sync_children(self, children) -> None:
+        """合并各线程累加结果（调用方持有锁）"""
+        changed = False
+        for child in children:
+            changed = child._sync() or changed
+        if changed:
             self.last_updated = time.time()
     
     def get_values(self) -> Dict[str, MetricValue]:
         """获取所有值"""
         with self._lock:
+            self._sync_children(self._children.values())
             return dict(self.values)
     
     def get_value(self, labels: Dict[str, str] = None) -> Optional[MetricValue]:
         """获取特定标签的值"""
         label_key = self._get_label_key(labels or {})
         with self._lock:
+            child = self._children.get(label_key)
+            if child is not None:
+                self._sync_children((child,))
             return self.values.get(label_key)
     
     def reset(self) -> None:
-        """重置指标（仅适用于计数器）"""
+        """重置指标（仅适用于计数器）
+
+        子项原地清零并保留，重置前通过 labels() 缓存的子项继续有效。
+        """
         if self.definition.metric_type not in [MetricType.COUNTER, MetricType.HISTOGRAM, MetricType.SUMMARY]:
             logger.warning(f"重置指标 {self.definition.name} 可能不安全")
         
         with self._lock:
-            self.values.clear()
+            for child in self._children.values():
+                child._reset()
             self.last_updated = time.time()
 
 
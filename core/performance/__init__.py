@@ -6,17 +6,33 @@ from datetime import datetime, timezone
 import logging
 from typing import Dict, Any, Optional, List
 
-# 导入实际的性能分析器
-try:
-    from core.reliability.performance_analyzer import PerformanceAnalyzer
-    PERFORMANCE_ANALYZER_AVAILABLE = True
-except ImportError as e:
-    logging.warning(f"PerformanceAnalyzer不可用: {e}")
-    PERFORMANCE_ANALYZER_AVAILABLE = False
-    PerformanceAnalyzer = None
+from core.lazy_exports import lazy_exports
 
 logger = logging.getLogger(__name__)
 
+
+def _load_performance_analyzer():
+    """导入实际的性能分析器（首次使用时导入，避免启动时加载可靠性模块）"""
+    try:
+        from core.reliability.performance_analyzer import PerformanceAnalyzer
+    except ImportError as e:
+        logging.warning(f"PerformanceAnalyzer不可用: {e}")
+        PerformanceAnalyzer = None
+    return PerformanceAnalyzer
+
+
+def _performance_analyzer_class():
+    """返回 PerformanceAnalyzer 类，不可用时返回 None"""
+    if 'PerformanceAnalyzer' in globals():
+        return globals()['PerformanceAnalyzer']
+    return __getattr__('PerformanceAnalyzer')
+
+
+__getattr__, __dir__ = lazy_exports(__name__, {}, {
+    'PerformanceAnalyzer': _load_performance_analyzer,
+    'PERFORMANCE_ANALYZER_AVAILABLE': lambda: _performance_analyzer_class() is not None,
+})
+
 class UnifiedPerformancePlatform:
     """统一性能平台"""
     
@@ -26,9 +42,10 @@ class UnifiedPerformancePlatform:
         self.metrics = {}
         self.benchmarks = {}
         
-        if PERFORMANCE_ANALYZER_AVAILABLE:
+        analyzer_class = _performance_analyzer_class()
+        if analyzer_class is not None:
             try:
-                self.analyzer = PerformanceAnalyzer()
+                self.analyzer = analyzer_class()
                 self.logger.info("✅ 性能分析器初始化成功")
             except Exception as e:
                 self.logger.warning(f"性能分析器初始化失败: {e}")
@@ -107,9 +124,10 @@ class PerformanceFactory:
     @staticmethod
     def create_analyzer():
         """创建性能分析器"""
-        if PERFORMANCE_ANALYZER_AVAILABLE:
+        analyzer_class = _performance_analyzer_class()
+        if analyzer_class is not None:
             try:
-                return PerformanceAnalyzer()
+                return analyzer_class()
             except Exception as e:
                 logger.warning(f"无法创建性能分析器: {e}")
         
@@ -37,48 +37,73 @@ SLA目标: 99.9%可用性
 
 # 核心组件
 from datetime import datetime, timezone
-from .circuit_breaker import (
-    MarketPrismCircuitBreaker,
-    CircuitBreakerConfig,
-    CircuitState,
-    OperationResult,
-    CircuitBreakerOpenException,
-    circuit_breaker
-)
-
-# 使用统一限流管理器
-from .unified_rate_limit_manager import (
-    UnifiedRateLimitManager,
-    RateLimitConfig,
-    RequestPriority
-)
-
-# 创建别名以保持向后兼容性
-AdaptiveRateLimiter = UnifiedRateLimitManager
-RateLimiterManager = UnifiedRateLimitManager
-
-from .retry_handler import (
-    ExponentialBackoffRetry,
-    RetryPolicy,
-    RetryErrorType,
-    RetryableException
-)
-
-from .redundancy_manager import (
-    ColdStorageMonitor,
-    ColdStorageConfig,
-    StorageType,
-    MigrationStatus
-)
-
-from .load_balancer import (
-    LoadBalancer,
-    LoadBalancingStrategy,
-    InstanceInfo
-)
-
-# 限流管理 - 使用统一限流管理器
-from .unified_rate_limit_manager import UnifiedRateLimitManager
+from typing import TYPE_CHECKING
+
+from core.lazy_exports import lazy_exports
+
+if TYPE_CHECKING:
+    from .manager import ReliabilityManager
+
+# 所有组件均按需导入（PEP 562），公开名称与原先一致
+_LAZY_EXPORTS = {
+    "MarketPrismCircuitBreaker": (".circuit_breaker", "MarketPrismCircuitBreaker"),
+    "CircuitBreakerConfig": (".circuit_breaker", "CircuitBreakerConfig"),
+    "CircuitState": (".circuit_breaker", "CircuitState"),
+    "OperationResult": (".circuit_breaker", "OperationResult"),
+    "SlidingWindowCounter": (".circuit_breaker", "SlidingWindowCounter"),
+    "CircuitBreakerOpenException": (".circuit_breaker", "CircuitBreakerOpenException"),
+    "circuit_breaker": (".circuit_breaker", "circuit_breaker"),
+
+    # 使用统一限流管理器
+    "UnifiedRateLimitManager": (".unified_rate_limit_manager", "UnifiedRateLimitManager"),
+    "RateLimitConfig": (".unified_rate_limit_manager", "RateLimitConfig"),
+    "RequestPriority": (".unified_rate_limit_manager", "RequestPriority"),
+
+    "ExponentialBackoffRetry": (".retry_handler", "ExponentialBackoffRetry"),
+    "RetryPolicy": (".retry_handler", "RetryPolicy"),
+    "RetryErrorType": (".retry_handler", "RetryErrorType"),
+    "RetryableException": (".retry_handler", "RetryableException"),
+
+    "ColdStorageMonitor": (".redundancy_manager", "ColdStorageMonitor"),
+    "ColdStorageConfig": (".redundancy_manager", "ColdStorageConfig"),
+    "StorageType": (".redundancy_manager", "StorageType"),
+    "MigrationStatus": (".redundancy_manager", "MigrationStatus"),
+
+    "LoadBalancer": (".load_balancer", "LoadBalancer"),
+    "LoadBalancingStrategy": (".load_balancer", "LoadBalancingStrategy"),
+    "InstanceInfo": (".load_balancer", "InstanceInfo"),
+
+    # 智能分析和管理
+    "ReliabilityManager": (".manager", "ReliabilityManager"),
+    "ReliabilityConfig": (".manager", "ReliabilityConfig"),
+    "HealthStatus": (".manager", "HealthStatus"),
+    "AlertLevel": (".manager", "AlertLevel"),
+    "DataQualityMetrics": (".manager", "DataQualityMetrics"),
+    "AnomalyAlert": (".manager", "AnomalyAlert"),
+    "SystemMetrics": (".manager", "SystemMetrics"),
+    "get_reliability_manager": (".manager", "get_reliability_manager"),
+    "initialize_reliability_manager": (".manager", "initialize_reliability_manager"),
+
+    "PerformanceAnalyzer": (".performance_analyzer", "PerformanceAnalyzer"),
+    "PerformanceMetric": (".performance_analyzer", "PerformanceMetric"),
+    "ResponseTimeStats": (".performance_analyzer", "ResponseTimeStats"),
+    "ThroughputStats": (".performance_analyzer", "ThroughputStats"),
+    "ResourceStats": (".performance_analyzer", "ResourceStats"),
+    "PerformanceBottleneck": (".performance_analyzer", "PerformanceBottleneck"),
+    "OptimizationSuggestion": (".performance_analyzer", "OptimizationSuggestion"),
+    "PerformanceLevel": (".performance_analyzer", "PerformanceLevel"),
+    "BottleneckType": (".performance_analyzer", "BottleneckType"),
+
+    # 创建别名以保持向后兼容性
+    "AdaptiveRateLimiter": (".unified_rate_limit_manager", "UnifiedRateLimitManager"),
+    "RateLimiterManager": (".unified_rate_limit_manager", "UnifiedRateLimitManager"),
+    "CircuitBreaker": (".circuit_breaker", "MarketPrismCircuitBreaker"),
+    "RateLimiter": (".unified_rate_limit_manager", "UnifiedRateLimitManager"),
+    "GlobalRateLimitManager": (".unified_rate_limit_manager", "UnifiedRateLimitManager"),
+    "ExchangeRateLimitManager": (".unified_rate_limit_manager", "UnifiedRateLimitManager"),
+}
+
+__getattr__, __dir__ = lazy_exports(__name__, _LAZY_EXPORTS)
 
 # 定义兼容性类型和函数
 class ExchangeRateLimitConfig:
@@ -97,36 +122,12 @@ class RateLimitViolation(Exception):
     pass
 
 def get_rate_limit_manager():
+    from .unified_rate_limit_manager import UnifiedRateLimitManager
     return UnifiedRateLimitManager()
 
 def with_rate_limit(func):
     return func
 
-# 智能分析和管理
-from .manager import (
-    ReliabilityManager,
-    ReliabilityConfig,
-    HealthStatus,
-    AlertLevel,
-    DataQualityMetrics,
-    AnomalyAlert,
-    SystemMetrics,
-    get_reliability_manager,
-    initialize_reliability_manager
-)
-
-from .performance_analyzer import (
-    PerformanceAnalyzer,
-    PerformanceMetric,
-    ResponseTimeStats,
-    ThroughputStats,
-    ResourceStats,
-    PerformanceBottleneck,
-    OptimizationSuggestion,
-    PerformanceLevel,
-    BottleneckType
-)
-
 # 配置管理器导入（暂时注释，文件不存在）
 # from .config_manager import (
 #     ConfigManager,
@@ -146,12 +147,6 @@ from .performance_analyzer import (
 #     run_integrated_tests
 # )
 
-# 创建别名以保持向后兼容性
-CircuitBreaker = MarketPrismCircuitBreaker
-RateLimiter = AdaptiveRateLimiter
-GlobalRateLimitManager = UnifiedRateLimitManager
-ExchangeRateLimitManager = UnifiedRateLimitManager
-
 # 版本信息
 __version__ = "3.0.0"
 __author__ = "MarketPrism Team"
@@ -164,6 +159,7 @@ __all__ = [
     "CircuitBreakerConfig", 
     "CircuitState",
     "OperationResult",
+    "SlidingWindowCounter",
     "CircuitBreakerOpenException",
     "circuit_breaker",
     
@@ -270,8 +266,9 @@ def get_system_info():
     }
 
 
-def quick_setup(config_path: str = None) -> ReliabilityManager:
+def quick_setup(config_path: str = None) -> "ReliabilityManager":
     """快速设置可靠性系统"""
+    from .manager import get_reliability_manager, initialize_reliability_manager
     # 简化版本，直接初始化可靠性管理器
     reliability_manager = get_reliability_manager()
     if reliability_manager is None:
@@ -282,6 +279,7 @@ def quick_setup(config_path: str = None) -> ReliabilityManager:
 
 async def health_check() -> dict:
     """系统健康检查"""
+    from .manager import get_reliability_manager
     manager = get_reliability_manager()
     if not manager:
         return {
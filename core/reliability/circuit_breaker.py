@@ -9,6 +9,9 @@ MarketPrism 熔断器系统
 
 状态转换：
 CLOSED -> OPEN -> HALF_OPEN -> CLOSED
+
+失败率/慢调用率基于按秒分桶的环形窗口计数，判断为常数时间；
+半开状态按许可数放行并发试探请求。
 """
 
 from datetime import datetime, timezone
@@ -45,6 +48,8 @@ class CircuitBreakerConfig:
     failure_rate_threshold: float = 0.5 # 失败率阈值 (50%)
     minimum_requests: int = 10          # 最小请求数
     window_size: int = 60               # 时间窗口 (秒)
+    slow_call_duration_threshold: float = 60.0  # 慢调用耗时阈值 (秒)
+    slow_call_rate_threshold: float = 1.0       # 慢调用率阈值 (100% 即仅全部慢调用时触发)
 
 
 @dataclass
@@ -56,6 +61,82 @@ class OperationResult:
     response_time: float = 0.0
 
 
+class SlidingWindowCounter:
+    """
+    按秒分桶的环形计数窗口
+
+    每个桶记录一秒内的调用数、失败数、慢调用数与耗时之和，并维护窗口总计；
+    时间前进时只清理过期的桶，记录与查询均摊为常数时间。
+    """
+
+    __slots__ = ('window_size', '_seconds', '_calls', '_failures', '_slow', '_durations',
+                 '_head', 'calls', 'failures', 'slow_calls', 'total_duration')
+
+    def __init__(self, window_size: int):
+        self.window_size = max(1, int(window_size))
+        self.reset()
+
+    def reset(self):
+        size = self.window_size
+        self._calls = [0] * size
+        self._failures = [0] * size
+        self._slow = [0] * size
+        self._durations = [0.0] * size
+        self._head = -1  # 最新桶对应的秒
+        self.calls = 0
+        self.failures = 0
+        self.slow_calls = 0
+        self.total_duration = 0.0
+
+    def advance(self, now: float):
+        """将窗口推进到 now 所在的秒，清理滑出窗口的桶"""
+        second = int(now)
+        head = self._head
+        if second <= head:
+            return
+        size = self.window_size
+        if second - head >= size:
+            if self.calls:
+                self.reset()
+        else:
+            for expired in range(head + 1, second + 1):
+                index = expired % size
+                if self._calls[index]:
+                    self.calls -= self._calls[index]
+                    self.failures -= self._failures[index]
+                    self.slow_calls -= self._slow[index]
+                    self.total_duration -= self._durations[index]
+                    self._calls[index] = 0
+                    self._failures[index] = 0
+                    self._slow[index] = 0
+                    self._durations[index] = 0.0
+        self._head = second
+
+    def record(self, now: float, success: bool, duration: float, slow: bool):
+        self.advance(now)
+        # 时钟回拨时计入最新桶
+        index = self._head % self.window_size
+        self._calls[index] += 1
+        self.calls += 1
+        self._durations[index] += duration
+        self.total_duration += duration
+        if not success:
+            self._failures[index] += 1
+            self.failures += 1
+        if slow:
+            self._slow[index] += 1
+            self.slow_calls += 1
+
+    def failure_rate(self) -> float:
+        return self.failures / self.calls if self.calls else 0.0
+
+    def slow_call_rate(self) -> float:
+        return self.slow_calls / self.calls if self.calls else 0.0
+
+    def avg_duration(self) -> float:
+        return self.total_duration / self.calls if self.calls else 0.0
+
+
 class MarketPrismCircuitBreaker:
     """企业级熔断器系统"""
     
@@ -68,8 +149,16 @@ class MarketPrismCircuitBreaker:
         self.last_failure_time = 0.0
         self.last_state_change = time.time()
         
-        # 操作历史记录 (用于故障率计算)
+        # 滑动窗口计数 (用于失败率/慢调用率计算)
+        self.window = SlidingWindowCounter(self.config.window_size)
+
+        # 最近的操作记录与失败记录 (便于排查，不参与熔断判断)
         self.operation_history: deque = deque(maxlen=1000)
+        self.failure_history: deque = deque(maxlen=1000)
+
+        # 半开状态的在途试探请求；状态切换时递增代数，旧代请求完成后不再归还许可
+        self._half_open_inflight = 0
+        self._state_generation = 0
         
         # 缓存数据 (用于降级策略)
         self.cached_responses: Dict[str, Any] = {}
@@ -114,23 +203,21 @@ class MarketPrismCircuitBreaker:
                 # TDD修复：OPEN状态应该拒绝请求，而不是执行操作
                 return await self._execute_fallback(fallback, cache_key, CircuitBreakerOpenException(f"熔断器 '{self.name}' 处于开放状态"))
         
-        # 半开状态下限制请求数
+        # 半开状态：已成功数 + 在途试探数不超过许可数
+        trial_generation = None
         if self.state == CircuitState.HALF_OPEN:
-            if self.success_count >= self.config.half_open_limit:
+            if self.success_count + self._half_open_inflight >= self.config.half_open_limit:
                 return await self._execute_fallback(fallback, cache_key, CircuitBreakerOpenException(f"熔断器 '{self.name}' 半开状态请求限制"))
+            self._half_open_inflight += 1
+            trial_generation = self._state_generation
         
         # 执行主要操作
-        start_time = time.time()
+        start_time = time.perf_counter()
         try:
             result = await operation(*args, **kwargs)
-            response_time = time.time() - start_time
-            
-            # 记录成功
-            await self._on_success(result, response_time, cache_key)
-            return result
-            
         except Exception as e:
-            response_time = time.time() - start_time
+            self._release_half_open_permit(trial_generation)
+            response_time = time.perf_counter() - start_time
             
             # 记录失败
             await self._on_failure(e, response_time)
@@ -138,14 +225,31 @@ class MarketPrismCircuitBreaker:
             # 执行降级策略
             self.total_fallbacks += 1
             return await self._execute_fallback(fallback, cache_key, e)
+        except BaseException:
+            # 取消等：不计入统计，但归还许可
+            self._release_half_open_permit(trial_generation)
+            raise
+
+        self._release_half_open_permit(trial_generation)
+        # 记录成功
+        await self._on_success(result, time.perf_counter() - start_time, cache_key)
+        return result
+
+    def _release_half_open_permit(self, trial_generation: Optional[int]):
+        """归还半开试探许可（仅限同一次半开期间发出的许可）"""
+        if trial_generation is not None and trial_generation == self._state_generation:
+            self._half_open_inflight -= 1
     
     async def _on_success(self, result: Any, response_time: float, cache_key: Optional[str]):
         """处理成功结果"""
-        operation_result = OperationResult(
+        now = time.time()
+        slow = response_time >= self.config.slow_call_duration_threshold
+        self.window.record(now, True, response_time, slow)
+        self.operation_history.append(OperationResult(
             success=True,
+            timestamp=now,
             response_time=response_time
-        )
-        self.operation_history.append(operation_result)
+        ))
         
         # 更新缓存
         if cache_key:
@@ -163,24 +267,35 @@ class MarketPrismCircuitBreaker:
         elif self.state == CircuitState.CLOSED:
             # 清零失败计数
             self.failure_count = 0
+            # 慢调用只在本次调用为慢调用时才可能使慢调用率越过阈值
+            if slow and self._slow_call_rate_exceeded():
+                self._transition_to_open()
     
     async def _on_failure(self, error: Exception, response_time: float):
         """处理失败结果"""
-        operation_result = OperationResult(
+        now = time.time()
+        self.window.record(now, False, response_time,
+                           response_time >= self.config.slow_call_duration_threshold)
+        failure = OperationResult(
             success=False,
+            timestamp=now,
             response_time=response_time,
             error=error
         )
-        self.operation_history.append(operation_result)
+        self.operation_history.append(failure)
+        self.failure_history.append(failure)
         
         self.failure_count += 1
         self.total_failures += 1
-        self.last_failure_time = time.time()
+        self.last_failure_time = now
         
         logger.warning(f"熔断器 '{self.name}' 操作失败: {error}, 失败计数: {self.failure_count}")
         
-        # 检查是否需要开启熔断
-        if self._should_trip():
+        # 半开状态下任一试探失败即重新熔断
+        if self.state == CircuitState.HALF_OPEN:
+            self._transition_to_open()
+        # 检查是否需要开启熔断（已开启时不重复切换）
+        elif self.state != CircuitState.OPEN and self._should_trip():
             self._transition_to_open()
     
     def _should_trip(self) -> bool:
@@ -190,14 +305,30 @@ class MarketPrismCircuitBreaker:
             return True
         
         # 检查失败率阈值 (需要最小请求数)
-        recent_operations = self._get_recent_operations()
-        if len(recent_operations) >= self.config.minimum_requests:
-            failure_rate = self._calculate_failure_rate(recent_operations)
+        window = self.window
+        window.advance(time.time())
+        if window.calls >= self.config.minimum_requests:
+            failure_rate = window.failures / window.calls
             if failure_rate >= self.config.failure_rate_threshold:
                 logger.warning(f"熔断器 '{self.name}' 失败率过高: {failure_rate:.2%}")
                 return True
+            if window.slow_calls / window.calls >= self.config.slow_call_rate_threshold:
+                logger.warning(f"熔断器 '{self.name}' 慢调用率过高: {window.slow_call_rate():.2%}")
+                return True
         
         return False
+
+    def _slow_call_rate_exceeded(self) -> bool:
+        """慢调用率是否越过阈值 (需要最小请求数)"""
+        window = self.window
+        window.advance(time.time())
+        if window.calls < self.config.minimum_requests:
+            return False
+        slow_call_rate = window.slow_calls / window.calls
+        if slow_call_rate >= self.config.slow_call_rate_threshold:
+            logger.warning(f"熔断器 '{self.name}' 慢调用率过高: {slow_call_rate:.2%}")
+            return True
+        return False
     
     def _should_attempt_reset(self) -> bool:
         """判断是否应该尝试重置"""
@@ -208,7 +339,7 @@ class MarketPrismCircuitBreaker:
         return time_since_open >= self.config.recovery_timeout
     
     def _get_recent_operations(self) -> List[OperationResult]:
-        """获取时间窗口内的操作记录"""
+        """获取时间窗口内的全部操作记录（仅用于排查，熔断判断使用滑动窗口计数）"""
         current_time = time.time()
         cutoff_time = current_time - self.config.window_size
         
@@ -274,6 +405,7 @@ class MarketPrismCircuitBreaker:
         self.state = CircuitState.OPEN
         self.last_state_change = time.time()
         self.success_count = 0
+        self._reset_half_open_permits()
         logger.warning(f"熔断器 '{self.name}' 转换到开放状态")
         
         # TDD改进：触发回调通知
@@ -286,6 +418,7 @@ class MarketPrismCircuitBreaker:
         self.state = CircuitState.HALF_OPEN
         self.last_state_change = time.time()
         self.success_count = 0
+        self._reset_half_open_permits()
         logger.info(f"熔断器 '{self.name}' 转换到半开状态")
         
         # TDD改进：触发回调通知
@@ -299,28 +432,35 @@ class MarketPrismCircuitBreaker:
         self.last_state_change = time.time()
         self.failure_count = 0
         self.success_count = 0
+        self._reset_half_open_permits()
         logger.info(f"熔断器 '{self.name}' 转换到关闭状态")
         
         # TDD改进：触发回调通知
         self._notify_state_change(old_state, CircuitState.CLOSED)
         self._notify_close()
     
+    def _reset_half_open_permits(self):
+        self._half_open_inflight = 0
+        self._state_generation += 1
+
     def get_status(self) -> Dict[str, Any]:
         """获取熔断器状态"""
-        recent_operations = self._get_recent_operations()
-        failure_rate = self._calculate_failure_rate(recent_operations)
+        window = self.window
+        window.advance(time.time())
         
         return {
             "name": self.name,
             "state": self.state.value,
             "failure_count": self.failure_count,
             "success_count": self.success_count,
-            "failure_rate": failure_rate,
+            "failure_rate": window.failure_rate(),
+            "slow_call_rate": window.slow_call_rate(),
+            "half_open_inflight": self._half_open_inflight,
             "total_requests": self.total_requests,
             "total_failures": self.total_failures,
             "total_fallbacks": self.total_fallbacks,
             "last_state_change": self.last_state_change,
-            "recent_operations": len(recent_operations),
+            "recent_operations": window.calls,
             "config": {
                 "failure_threshold": self.config.failure_threshold,
                 "recovery_timeout": self.config.recovery_timeout,
@@ -336,6 +476,9 @@ class MarketPrismCircuitBreaker:
         self.last_failure_time = 0.0
         self.last_state_change = time.time()
         self.operation_history.clear()
+        self.failure_history.clear()
+        self.window.reset()
+        self._reset_half_open_permits()
         logger.info(f"熔断器 '{self.name}' 已重置")
 
     async def call(
@@ -379,16 +522,8 @@ class MarketPrismCircuitBreaker:
     
     def get_metrics(self) -> Dict[str, Any]:
         """TDD改进：获取详细监控指标"""
-        recent_operations = [
-            op for op in self.operation_history 
-            if op.timestamp > time.time() - self.config.window_size
-        ]
-        
-        failure_rate = self._calculate_failure_rate(recent_operations)
-        avg_response_time = (
-            sum(op.response_time for op in recent_operations) / len(recent_operations)
-            if recent_operations else 0.0
-        )
+        window = self.window
+        window.advance(time.time())
         
         return {
             **self.get_stats(),
@@ -399,12 +534,15 @@ class MarketPrismCircuitBreaker:
                 "success_threshold": self.config.success_threshold,
                 "failure_rate_threshold": self.config.failure_rate_threshold,
                 "minimum_requests": self.config.minimum_requests,
-                "window_size": self.config.window_size
+                "window_size": self.config.window_size,
+                "slow_call_duration_threshold": self.config.slow_call_duration_threshold,
+                "slow_call_rate_threshold": self.config.slow_call_rate_threshold
             },
             "performance": {
-                "failure_rate": failure_rate,
-                "avg_response_time": avg_response_time,
-                "recent_operations_count": len(recent_operations),
+                "failure_rate": window.failure_rate(),
+                "slow_call_rate": window.slow_call_rate(),
+                "avg_response_time": window.avg_duration(),
+                "recent_operations_count": window.calls,
                 "cache_size": len(self.cached_responses)
             },
             "health": {
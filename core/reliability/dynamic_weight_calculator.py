@@ -16,8 +16,10 @@ MarketPrism 动态权重计算器
 """
 
 from datetime import datetime, timezone
+import ast
+import operator
 import re
-from typing import Dict, Any, Optional, List, Union
+from typing import Dict, Any, Callable, Iterable, Optional, List, Tuple, Union
 from dataclasses import dataclass, field
 from enum import Enum
 import logging
@@ -50,6 +52,176 @@ class WeightRule:
     description: str = ""                         # 规则描述
 
 
+# 公式允许的运算（不使用 eval）
+_FORMULA_BINOPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+}
+_FORMULA_UNARYOPS = {ast.UAdd: operator.pos, ast.USub: operator.neg}
+
+# 区间规则展开为数组查找表的最大跨度
+_TIER_TABLE_MAX_SPAN = 10000
+
+# 备忘表上限，超过后整体清空
+_MEMO_MAX_SIZE = 8192
+
+
+def _compile_formula_node(node: ast.AST) -> Callable[[int], Any]:
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) \
+            and not isinstance(node.value, bool):
+        value = node.value
+        return lambda count: value
+    if isinstance(node, ast.Name) and node.id == "count":
+        return lambda count: count
+    if isinstance(node, ast.BinOp) and type(node.op) in _FORMULA_BINOPS:
+        op = _FORMULA_BINOPS[type(node.op)]
+        left, right = _compile_formula_node(node.left), _compile_formula_node(node.right)
+        return lambda count: op(left(count), right(count))
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _FORMULA_UNARYOPS:
+        op = _FORMULA_UNARYOPS[type(node.op)]
+        operand = _compile_formula_node(node.operand)
+        return lambda count: op(operand(count))
+    raise ValueError(f"不支持的公式元素: {ast.dump(node)}")
+
+
+def compile_formula(formula: str) -> Callable[[int], int]:
+    """
+    把 "count * 2" 之类的权重公式编译为函数
+    
+    只接受 count、数字与四则运算；不含 count 或无法解析的公式权重为1。
+    """
+    if "count" not in formula:
+        return lambda count: 1
+    try:
+        expr = _compile_formula_node(ast.parse(formula, mode="eval").body)
+    except (SyntaxError, ValueError) as e:
+        logger.error(f"公式编译错误: {formula}, 错误: {e}")
+        return lambda count: 1
+    
+    def evaluate(count: int) -> int:
+        try:
+            return int(expr(count))
+        except Exception as e:
+            logger.error(f"公式计算错误: {formula}, count: {count}, 错误: {e}")
+            return 1
+    
+    return evaluate
+
+
+def _item_count(param_value: Any) -> int:
+    """列表或逗号分隔字符串的元素个数，其余按1个计"""
+    if isinstance(param_value, list):
+        return len(param_value)
+    if isinstance(param_value, str) and "," in param_value:
+        return len(param_value.split(","))
+    return 1
+
+
+def _to_number(param_value: Any) -> Optional[Union[int, float]]:
+    if isinstance(param_value, str):
+        if param_value.isdigit():
+            return int(param_value)
+        try:
+            return float(param_value)
+        except ValueError:
+            return None
+    if isinstance(param_value, (int, float)):
+        return param_value
+    return None
+
+
+def compile_parameter_rule(param_rule: Dict[str, Any]) -> Callable[[Any], int]:
+    """
+    把单个参数规则编译为 参数值 -> 权重 的函数
+    
+    优先级与规则定义一致：None 取 "none"；数值命中 "rules" 区间；其后 "single"、
+    "calculation"；都不满足时为0。整数区间在跨度不大时展开为数组查找表。
+    """
+    none_weight = param_rule.get("none", 0)
+    tiers = tuple((item["range"][0], item["range"][1], item["weight"])
+                  for item in param_rule.get("rules", []) if "range" in item)
+    has_single = "single" in param_rule
+    single_weight = param_rule.get("single")
+    formula = compile_formula(param_rule["calculation"]) if "calculation" in param_rule else None
+    
+    table: List[Optional[int]] = []
+    table_low = 0
+    int_tiers = tiers and all(isinstance(low, int) and isinstance(high, int) for low, high, _ in tiers)
+    if int_tiers:
+        table_low = min(low for low, _, _ in tiers)
+        span = max(high for _, high, _ in tiers) - table_low + 1
+        if span <= _TIER_TABLE_MAX_SPAN:
+            table = [None] * span
+            # 倒序写入，重叠区间以先定义的规则为准
+            for low, high, weight in reversed(tiers):
+                table[low - table_low:high - table_low + 1] = [weight] * (high - low + 1)
+    
+    def tier_weight(number: Union[int, float]) -> Optional[int]:
+        if table and isinstance(number, int):
+            index = number - table_low
+            return table[index] if 0 <= index < len(table) else None
+        for low, high, weight in tiers:
+            if low <= number <= high:
+                return weight
+        return None
+    
+    def evaluate(param_value: Any) -> int:
+        if param_value is None:
+            return none_weight
+        if tiers:
+            number = _to_number(param_value)
+            if number is not None:
+                weight = tier_weight(number)
+                if weight is not None:
+                    return weight
+        if has_single:
+            return single_weight
+        if formula is not None:
+            return formula(_item_count(param_value))
+        return 0
+    
+    return evaluate
+
+
+class CompiledWeightRule:
+    """加载时编译的端点权重规则"""
+    
+    __slots__ = ('base_weight', 'max_weight', 'none_weight', 'parameters')
+    
+    def __init__(self, rule: WeightRule):
+        self.base_weight = rule.base_weight
+        self.max_weight = rule.max_weight
+        # 未提供任何参数时的特殊权重（如 ticker/24hr 无参数为40）
+        self.none_weight: Optional[int] = next(
+            (param_rule["none"] for param_rule in rule.parameter_weights.values() if "none" in param_rule),
+            None
+        )
+        self.parameters: Dict[str, Callable[[Any], int]] = {
+            name: compile_parameter_rule(param_rule)
+            for name, param_rule in rule.parameter_weights.items()
+        }
+    
+    def cap(self, weight: int) -> int:
+        if self.max_weight is not None:
+            return min(weight, self.max_weight)
+        return weight
+
+
+def _memo_value(param_value: Any) -> Any:
+    """参数值归一化为备忘表键：列表只关心元素个数"""
+    if isinstance(param_value, list):
+        return ('__count__', len(param_value))
+    try:
+        hash(param_value)
+    except TypeError:
+        return ('__count__', 1)
+    return param_value
+
+
 class DynamicWeightCalculator:
     """动态权重计算器"""
     
@@ -59,6 +231,17 @@ class DynamicWeightCalculator:
         self._load_binance_weight_rules()
         self._load_okx_weight_rules()
         self._load_deribit_weight_rules()
+        self._compiled: Dict[str, Dict[str, CompiledWeightRule]] = {}
+        self._memo: Dict[Tuple[str, str, str, Any], int] = {}
+        self.compile_rules()
+    
+    def compile_rules(self):
+        """编译 weight_rules；修改规则后需重新调用"""
+        self._compiled = {
+            exchange: {endpoint: CompiledWeightRule(rule) for endpoint, rule in rules.items()}
+            for exchange, rules in self.weight_rules.items()
+        }
+        self._memo.clear()
     
     def _load_binance_weight_rules(self):
         """加载Binance的权重规则（基于官方文档）"""
@@ -346,116 +529,76 @@ class DynamicWeightCalculator:
             return 1
             
         exchange = exchange.lower()
-        parameters = parameters or {}
         
         # 获取权重规则
-        if exchange not in self.weight_rules:
+        rules = self._compiled.get(exchange)
+        if rules is None:
             logger.warning(f"未知交易所: {exchange}, 使用默认权重1")
             return 1
         
         # 特殊处理WebSocket连接
         if request_type == "websocket" or endpoint == "websocket_connection":
-            if "websocket_connection" in self.weight_rules[exchange]:
-                return self.weight_rules[exchange]["websocket_connection"].base_weight
+            if "websocket_connection" in rules:
+                return rules["websocket_connection"].base_weight
             return 2  # Binance默认WebSocket权重
         
         # 查找端点规则
-        if endpoint not in self.weight_rules[exchange]:
+        rule = rules.get(endpoint)
+        if rule is None:
             logger.debug(f"端点 {endpoint} 无特定权重规则，使用默认权重1")
             return 1
         
-        rule = self.weight_rules[exchange][endpoint]
-        
-        # 处理特殊权重规则（如 ticker/24hr 无参数时的40权重）
-        special_weight = self._apply_special_rules(rule, parameters)
-        if special_weight is not None:
-            return min(special_weight, rule.max_weight or special_weight)
-        
-        # 计算参数权重
-        calculated_weight = rule.base_weight
-        
-        if parameters:
-            for param_name, param_value in parameters.items():
-                if param_name in rule.parameter_weights:
-                    param_weight = self._calculate_parameter_weight(rule.parameter_weights[param_name], param_value)
-                    calculated_weight = param_weight  # 参数权重替换基础权重
-                    break  # 只使用第一个匹配的参数权重
-
-        # 应用最大权重限制
-        if rule.max_weight is not None:
-            calculated_weight = min(calculated_weight, rule.max_weight)
-        
-        logger.debug(f"权重计算: {exchange} {endpoint} = {calculated_weight}")
-        return calculated_weight
+        return self._rule_weight(exchange, endpoint, rule, parameters)
     
-    def _calculate_parameter_weight(self, param_rule: Dict[str, Any], param_value: Any) -> int:
-        """计算单个参数的权重贡献"""
-        if param_value is None:
-            # 参数为空的情况
-            return param_rule.get("none", 0)
-        
-        # 如果有范围规则（针对数值参数）
-        if "rules" in param_rule:
-            # 尝试将字符串转换为数值
-            numeric_value = param_value
-            if isinstance(param_value, str) and param_value.isdigit():
-                numeric_value = int(param_value)
-            elif isinstance(param_value, str):
-                try:
-                    numeric_value = float(param_value)
-                except ValueError:
-                    pass
+    def _rule_weight(self, exchange: str, endpoint: str, rule: CompiledWeightRule,
+                     parameters: Optional[Dict[str, Any]]) -> int:
+        # 处理特殊权重规则（如 ticker/24hr 无参数时的40权重）
+        if not parameters:
+            if rule.none_weight is not None:
+                return min(rule.none_weight, rule.max_weight or rule.none_weight)
+            return rule.cap(rule.base_weight)
+        
+        # 只使用第一个有规则的参数，参数权重替换基础权重
+        for name, value in parameters.items():
+            evaluate = rule.parameters.get(name)
+            if evaluate is None:
+                continue
             
-            if isinstance(numeric_value, (int, float)):
-                for rule_item in param_rule["rules"]:
-                    if "range" in rule_item:
-                        min_val, max_val = rule_item["range"]
-                        if min_val <= numeric_value <= max_val:
-                            return rule_item["weight"]
-        
-        # 如果是单个值（有symbol参数）
-        if param_value is not None and "single" in param_rule:
-            return param_rule["single"]
-        
-        # 如果有计算公式（symbols列表或字符串）
-        if "calculation" in param_rule:
-            return self._calculate_formula_weight(param_rule["calculation"], param_value)
-        
-        # 默认返回0
-        return 0
+            # 备忘表键只含决定权重的参数，签名、时间戳等其它参数不影响命中
+            key = (exchange, endpoint, name, _memo_value(value))
+            weight = self._memo.get(key)
+            if weight is None:
+                weight = rule.cap(evaluate(value))
+                if len(self._memo) >= _MEMO_MAX_SIZE:
+                    self._memo.clear()
+                self._memo[key] = weight
+            return weight
+        
+        return rule.cap(rule.base_weight)
     
-    def _calculate_formula_weight(self, formula: str, param_value: Any) -> int:
-        """计算基于公式的权重"""
-        try:
-            if isinstance(param_value, list):
-                count = len(param_value)
-            elif isinstance(param_value, str) and "," in param_value:
-                count = len(param_value.split(","))
-            else:
-                count = 1
-            
-            if formula == "count * 1":
-                return count
-            elif formula == "count * 2":
-                return count * 2
-            elif "count" in formula:
-                # 解析更复杂的公式
-                formula = formula.replace("count", str(count))
-                return int(eval(formula))
-            
-        except Exception as e:
-            logger.error(f"公式计算错误: {formula}, 参数: {param_value}, 错误: {e}")
+    def calculate_weights(
+        self,
+        exchange: str,
+        endpoint: str,
+        parameter_sets: Iterable[Optional[Dict[str, Any]]],
+        request_type: str = "rest_api"
+    ) -> List[int]:
+        """
+        批量计算同一端点多组参数的权重
+        
+        用于一次调度多个交易对的请求（如逐个 symbol 拉取深度快照），
+        交易所与端点规则只解析一次。
+        """
+        parameter_sets = list(parameter_sets)
+        rules = self._compiled.get(exchange.lower()) if exchange is not None else None
+        if rules is None or request_type == "websocket" or endpoint == "websocket_connection" \
+                or endpoint not in rules:
+            return [self.calculate_weight(exchange, endpoint, parameters, request_type)
+                    for parameters in parameter_sets]
         
-        return 1
-    
-    def _apply_special_rules(self, rule: WeightRule, parameters: Dict[str, Any]) -> Optional[int]:
-        """应用特殊计算规则，返回None表示使用常规计算"""
-        if not parameters:
-            # 如果没有提供参数，检查是否有 "none" 规则
-            for param_name, param_rule in rule.parameter_weights.items():
-                if "none" in param_rule:
-                    return param_rule["none"]
-        return None
+        exchange = exchange.lower()
+        rule = rules[endpoint]
+        return [self._rule_weight(exchange, endpoint, rule, parameters) for parameters in parameter_sets]
     
     def get_weight_info(self, exchange: str, endpoint: str) -> Optional[WeightRule]:
         """获取端点的权重规则信息"""
@@ -527,6 +670,17 @@ def calculate_request_weight(
     return calculator.calculate_weight(exchange, endpoint, parameters, request_type)
 
 
+def calculate_request_weights(
+    exchange: str,
+    endpoint: str,
+    parameter_sets: Iterable[Optional[Dict[str, Any]]],
+    request_type: str = "rest_api"
+) -> List[int]:
+    """便利函数：批量计算请求权重"""
+    calculator = get_weight_calculator()
+    return calculator.calculate_weights(exchange, endpoint, parameter_sets, request_type)
+
+
 def validate_request_parameters(exchange: str, endpoint: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
     """便利函数：验证请求参数"""
     calculator = get_weight_calculator()
@@ -5,15 +5,19 @@ MarketPrism 服务发现模块
 支持多种后端：Consul、etcd、NATS、Redis等
 """
 
-from .registry import ServiceRegistry, ServiceInstance, ServiceStatus
+from .registry import ServiceRegistry, ServiceInstance, ServiceStatus, WatchEvent, WatchEventType
 from .discovery_client import ServiceDiscoveryClient
+from .discovery_cache import ServiceDiscoveryCache
 from .backends import ConsulBackend, EtcdBackend, NATSBackend, RedisBackend, InMemoryBackend
 
 __all__ = [
     'ServiceRegistry',
     'ServiceInstance', 
     'ServiceStatus',
+    'WatchEvent',
+    'WatchEventType',
     'ServiceDiscoveryClient',
+    'ServiceDiscoveryCache',
     'ConsulBackend',
     'EtcdBackend', 
     'NATSBackend',
@@ -6,10 +6,13 @@
 import asyncio
 import json
 import time
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, List, Optional, Any
+from urllib.parse import urlparse
 import logging
 
-from .registry import ServiceRegistryBackend, ServiceInstance, ServiceStatus
+from .registry import (
+    ServiceRegistryBackend, ServiceInstance, ServiceStatus, WatchEvent, WatchEventType
+)
 
 logger = logging.getLogger(__name__)
 
@@ -82,23 +85,7 @@ class ConsulBackend(ServiceRegistryBackend):
             url = f"{self.consul_url}/v1/health/service/{service_name}?passing=true"
             async with self.session.get(url) as response:
                 if response.status == 200:
-                    data = await response.json()
-                    instances = []
-                    
-                    for item in data:
-                        service = item['Service']
-                        instance = ServiceInstance(
-                            service_name=service['Service'],
-                            instance_id=service['ID'],
-                            host=service['Address'],
-                            port=service['Port'],
-                            status=ServiceStatus.HEALTHY,
-                            metadata=service.get('Meta', {}),
-                            tags=service.get('Tags', [])
-                        )
-                        instances.append(instance)
-                    
-                    return instances
+                    return self._parse_health_entries(await response.json())
                 else:
                     logger.error(f"Consul发现服务失败: {response.status}")
                     return []
@@ -133,6 +120,52 @@ class ConsulBackend(ServiceRegistryBackend):
         """更新服务状态"""
         # Consul通过健康检查自动更新状态
         return True
+    
+    async def watch(self, service_name: str, emit: Callable[[WatchEvent], None], wait: str = "55s") -> None:
+        """Consul 阻塞查询：索引变化时推送健康实例快照"""
+        import aiohttp
+        
+        url = f"{self.consul_url}/v1/health/service/{service_name}"
+        index = 0
+        backoff = 1.0
+        while True:
+            try:
+                params = {"passing": "true", "index": str(index), "wait": wait}
+                async with self.session.get(url, params=params,
+                                            timeout=aiohttp.ClientTimeout(total=90)) as response:
+                    if response.status != 200:
+                        raise RuntimeError(f"HTTP {response.status}")
+                    new_index = int(response.headers.get("X-Consul-Index", 0))
+                    data = await response.json()
+                
+                # 等待超时（索引未变）也推送：通过检查的实例视为心跳新鲜，缓存按内容去重
+                emit(WatchEvent(WatchEventType.SNAPSHOT, service_name,
+                                instances=self._parse_health_entries(data)))
+                # 索引回退或非正数时从头开始（Consul 文档要求）
+                index = new_index if new_index > index else (1 if new_index > 0 else 0)
+                backoff = 1.0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Consul watch失败 {service_name}: {e}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+    
+    @staticmethod
+    def _parse_health_entries(data: List[Dict[str, Any]]) -> List[ServiceInstance]:
+        instances = []
+        for item in data:
+            service = item['Service']
+            instances.append(ServiceInstance(
+                service_name=service['Service'],
+                instance_id=service['ID'],
+                host=service['Address'],
+                port=service['Port'],
+                status=ServiceStatus.HEALTHY,
+                metadata=service.get('Meta', {}),
+                tags=service.get('Tags', [])
+            ))
+        return instances
 
 
 class EtcdBackend(ServiceRegistryBackend):
@@ -285,6 +318,59 @@ class EtcdBackend(ServiceRegistryBackend):
             logger.error(f"etcd更新服务状态失败: {e}")
             return False
     
+    async def watch(self, service_name: str, emit: Callable[[WatchEvent], None]) -> None:
+        """etcd watch：先取快照与修订号，再从下一修订号开始接收变更流"""
+        import aiohttp
+        
+        prefix = f"{self.key_prefix}/{service_name}/"
+        key_range = {
+            "key": self._encode_base64(prefix),
+            "range_end": self._encode_base64(self._prefix_range_end(prefix))
+        }
+        backoff = 1.0
+        while True:
+            try:
+                async with self.session.post(f"{self.etcd_url}/v3/kv/range", json=key_range) as response:
+                    if response.status != 200:
+                        raise RuntimeError(f"HTTP {response.status}")
+                    result = await response.json()
+                revision = int(result.get('header', {}).get('revision', 0))
+                emit(WatchEvent(WatchEventType.SNAPSHOT, service_name, instances=[
+                    ServiceInstance.from_dict(json.loads(self._decode_base64(kv['value'])))
+                    for kv in result.get('kvs', [])
+                ]))
+                
+                request = {"create_request": {**key_range, "start_revision": str(revision + 1)}}
+                async with self.session.post(f"{self.etcd_url}/v3/watch", json=request,
+                                             timeout=aiohttp.ClientTimeout(total=None)) as response:
+                    if response.status != 200:
+                        raise RuntimeError(f"HTTP {response.status}")
+                    backoff = 1.0
+                    async for line in response.content:
+                        if line.strip():
+                            for event in json.loads(line).get('result', {}).get('events', []):
+                                emit(self._watch_event(service_name, prefix, event))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"etcd watch失败 {service_name}: {e}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+    
+    def _watch_event(self, service_name: str, prefix: str, event: Dict[str, Any]) -> WatchEvent:
+        kv = event.get('kv', {})
+        instance_id = self._decode_base64(kv.get('key', ''))[len(prefix):]
+        # PUT 为默认类型，JSON 中省略
+        if event.get('type') == 'DELETE':
+            return WatchEvent(WatchEventType.DELETE, service_name, instance_id)
+        instance = ServiceInstance.from_dict(json.loads(self._decode_base64(kv['value'])))
+        return WatchEvent(WatchEventType.PUT, service_name, instance.instance_id, instance)
+    
+    @staticmethod
+    def _prefix_range_end(prefix: str) -> str:
+        """前缀查询的 range_end：最后一个字节加一"""
+        return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    
     def _encode_base64(self, text: str) -> str:
         """Base64编码"""
         import base64
@@ -409,6 +495,39 @@ class NATSBackend(ServiceRegistryBackend):
                     # 重新发布更新
                     return await self.register(instance)
         return False
+    
+    async def watch(self, service_name: str, emit: Callable[[WatchEvent], None]) -> None:
+        """订阅服务主题：先回放流中每个主题的最新消息，之后实时推送"""
+        from nats.js.api import ConsumerConfig, DeliverPolicy
+        
+        emit(WatchEvent(WatchEventType.SNAPSHOT, service_name,
+                        instances=list(self.services.get(service_name, []))))
+        sub = await self.js.subscribe(
+            f"{self.subject_prefix}.{service_name}.>",
+            ordered_consumer=True,
+            config=ConsumerConfig(deliver_policy=DeliverPolicy.LAST_PER_SUBJECT)
+        )
+        try:
+            async for msg in sub.messages:
+                event = self._parse_subject_event(service_name, msg.subject, msg.data)
+                if event:
+                    emit(event)
+        finally:
+            await sub.unsubscribe()
+    
+    def _parse_subject_event(self, service_name: str, subject: str, data: bytes) -> Optional[WatchEvent]:
+        # 实例ID可能含 "."（如IP），按首尾token解析
+        tokens = subject[len(self.subject_prefix) + 1:].split('.')
+        if len(tokens) < 2 or tokens[0] != service_name:
+            return None
+        if tokens[-1] == 'deregister':
+            return WatchEvent(WatchEventType.DELETE, service_name, '.'.join(tokens[1:-1]))
+        try:
+            instance = ServiceInstance.from_dict(json.loads(data))
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"NATS服务消息解析失败 {subject}: {e}")
+            return None
+        return WatchEvent(WatchEventType.PUT, service_name, instance.instance_id, instance)
 
 
 class RedisBackend(ServiceRegistryBackend):
@@ -532,6 +651,42 @@ class RedisBackend(ServiceRegistryBackend):
         except Exception as e:
             logger.error(f"Redis更新服务状态失败: {e}")
             return False
+    
+    async def watch(self, service_name: str, emit: Callable[[WatchEvent], None]) -> None:
+        """Redis 键空间通知：实例键写入/删除/过期时推送"""
+        emit(WatchEvent(WatchEventType.SNAPSHOT, service_name,
+                        instances=await self.discover(service_name)))
+        try:
+            # K: 键空间事件，g: del/expire，$: 字符串写入，x: 过期
+            await self.redis.config_set('notify-keyspace-events', 'Kg$x')
+        except Exception as e:
+            logger.warning(f"Redis键空间通知配置失败（需服务端已开启）: {e}")
+        
+        db = urlparse(self.redis_url).path.strip('/') or '0'
+        key_prefix = f"{self.key_prefix}:{service_name}:"
+        pattern = f"__keyspace@{db}__:{key_prefix}*"
+        pubsub = self.redis.pubsub()
+        await pubsub.psubscribe(pattern)
+        try:
+            async for message in pubsub.listen():
+                if message.get('type') != 'pmessage':
+                    continue
+                channel = message['channel']
+                operation = message['data']
+                channel = channel.decode() if isinstance(channel, bytes) else channel
+                operation = operation.decode() if isinstance(operation, bytes) else operation
+                key = channel.split(':', 1)[1]
+                instance_id = key[len(key_prefix):]
+                
+                if operation in ('del', 'expired', 'evicted'):
+                    emit(WatchEvent(WatchEventType.DELETE, service_name, instance_id))
+                elif operation == 'set':
+                    value = await self.redis.get(key)
+                    if value:
+                        instance = ServiceInstance.from_dict(json.loads(value.decode()))
+                        emit(WatchEvent(WatchEventType.PUT, service_name, instance_id, instance))
+        finally:
+            await pubsub.punsubscribe(pattern)
 
 
 class InMemoryBackend(ServiceRegistryBackend):
@@ -539,6 +694,12 @@ class InMemoryBackend(ServiceRegistryBackend):
     
     def __init__(self):
         self.services: Dict[str, List[ServiceInstance]] = {}
+        # 服务名 -> watch 回调；注册/注销/状态变更时同步模拟后端推送
+        self._watchers: Dict[str, List[Callable[[WatchEvent], None]]] = {}
+    
+    def _notify(self, event: WatchEvent):
+        for emit in list(self._watchers.get(event.service_name, [])):
+            emit(event)
     
     async def register(self, instance: ServiceInstance) -> bool:
         """注册服务到内存"""
@@ -557,6 +718,7 @@ class InMemoryBackend(ServiceRegistryBackend):
         else:
             self.services[instance.service_name].append(instance)
         
+        self._notify(WatchEvent(WatchEventType.PUT, instance.service_name, instance.instance_id, instance))
         logger.info(f"内存服务注册成功: {instance.service_name}#{instance.instance_id}")
         return True
     
@@ -570,6 +732,7 @@ class InMemoryBackend(ServiceRegistryBackend):
             if not self.services[service_name]:
                 del self.services[service_name]
             
+            self._notify(WatchEvent(WatchEventType.DELETE, service_name, instance_id))
             logger.info(f"内存服务注销成功: {service_name}#{instance_id}")
             return True
         
@@ -590,5 +753,18 @@ class InMemoryBackend(ServiceRegistryBackend):
                 if instance.instance_id == instance_id:
                     instance.status = status
                     instance.update_heartbeat()
+                    self._notify(WatchEvent(WatchEventType.PUT, service_name, instance_id, instance))
                     return True
-        return False 
\ No newline at end of file
+        return False
+    
+    async def watch(self, service_name: str, emit: Callable[[WatchEvent], None]) -> None:
+        """推送当前快照，之后推送注册/注销/状态变更事件"""
+        emit(WatchEvent(WatchEventType.SNAPSHOT, service_name,
+                        instances=list(self.services.get(service_name, []))))
+        self._watchers.setdefault(service_name, []).append(emit)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            self._watchers[service_name].remove(emit)
+            if not self._watchers[service_name]:
+                del self._watchers[service_name] 
\ No newline at end of file
@@ -0,0 +1,224 @@
+"""
+服务发现本地缓存
+由后端 watch 推送保持新鲜，查询不访问后端；按在途请求数做负载感知选择
+"""
+
+import asyncio
+import random
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import logging
+
+from .registry import (
+    ServiceInstance, ServiceRegistryBackend, ServiceStatus, WatchEvent, WatchEventType
+)
+
+logger = logging.getLogger(__name__)
+
+
+class _CachedService:
+    """单个服务的缓存条目"""
+
+    __slots__ = ('instances', 'candidates', 'in_flight', 'ready', 'changed',
+                 'version', 'signature', 'next_expiry', 'task')
+
+    def __init__(self):
+        self.instances: Dict[str, ServiceInstance] = {}
+        # 可选实例（健康 > 状态未知 > 任一存活实例），变更时重建
+        self.candidates: Tuple[ServiceInstance, ...] = ()
+        self.in_flight: Dict[str, int] = {}
+        self.ready = asyncio.Event()
+        self.changed = asyncio.Event()
+        self.version = 0
+        self.signature: Optional[Tuple] = None
+        # 最早一个实例过期的时间戳，到期前无需逐个检查心跳
+        self.next_expiry = float('inf')
+        self.task: Optional[asyncio.Task] = None
+
+
+class ServiceDiscoveryCache:
+    """
+    服务发现本地缓存
+
+    每个服务首次查询时启动一个 backend.watch 任务，之后的发现/选择都只读本地数据。
+    watch 首个快照在 ready_timeout 内未到达时回退为一次 backend.discover。
+    """
+
+    def __init__(
+        self,
+        backend: ServiceRegistryBackend,
+        instance_ttl: float = 300,
+        ready_timeout: float = 5.0,
+        on_change: Optional[Callable[[str, List[ServiceInstance]], None]] = None
+    ):
+        self.backend = backend
+        self.instance_ttl = instance_ttl
+        self.ready_timeout = ready_timeout
+        self.on_change = on_change
+        self._services: Dict[str, _CachedService] = {}
+        self.stats = {'events': 0, 'changes': 0, 'selections': 0, 'fallbacks': 0, 'watch_errors': 0}
+
+    async def ensure_watch(self, service_name: str) -> _CachedService:
+        """确保服务已被 watch，并等待首个快照"""
+        entry = self._services.get(service_name)
+        if entry is None:
+            entry = self._services[service_name] = _CachedService()
+            entry.task = asyncio.create_task(self._run_watch(service_name))
+
+        if not entry.ready.is_set():
+            try:
+                await asyncio.wait_for(entry.ready.wait(), self.ready_timeout)
+            except asyncio.TimeoutError:
+                self.stats['fallbacks'] += 1
+                logger.warning(f"服务 {service_name} watch 快照超时，回退为直接查询")
+                instances = await self.backend.discover(service_name)
+                if not entry.ready.is_set():
+                    self.apply(WatchEvent(WatchEventType.SNAPSHOT, service_name, instances=instances))
+        return entry
+
+    async def _run_watch(self, service_name: str):
+        backoff = 1.0
+        while True:
+            try:
+                await self.backend.watch(service_name, self.apply)
+                backoff = 1.0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats['watch_errors'] += 1
+                logger.error(f"服务 {service_name} watch 失败: {e}")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+
+    def apply(self, event: WatchEvent):
+        """应用一条后端推送事件"""
+        entry = self._services.get(event.service_name)
+        if entry is None:
+            return
+        self.stats['events'] += 1
+
+        if event.event_type == WatchEventType.SNAPSHOT:
+            entry.instances = {inst.instance_id: inst for inst in event.instances}
+        elif event.event_type == WatchEventType.PUT and event.instance is not None:
+            entry.instances[event.instance.instance_id] = event.instance
+        elif event.event_type == WatchEventType.DELETE:
+            entry.instances.pop(event.instance_id, None)
+            entry.in_flight.pop(event.instance_id, None)
+
+        self._rebuild(entry)
+        entry.ready.set()
+
+        signature = tuple(sorted(
+            (inst.instance_id, inst.host, inst.port, inst.status.value, inst.weight)
+            for inst in entry.instances.values()
+        ))
+        if signature == entry.signature:
+            # 内容未变（如 Consul 等待超时返回的快照），只刷新了心跳
+            return
+        entry.signature = signature
+        entry.version += 1
+        self.stats['changes'] += 1
+        # 唤醒等待者，换新 Event 供下一轮等待
+        entry.changed.set()
+        entry.changed = asyncio.Event()
+
+        if self.on_change:
+            try:
+                self.on_change(event.service_name, self._live(entry))
+            except Exception as e:
+                logger.error(f"服务变更回调失败 {event.service_name}: {e}")
+
+    def _live(self, entry: _CachedService) -> List[ServiceInstance]:
+        now = time.time()
+        return [inst for inst in entry.instances.values()
+                if now - inst.last_heartbeat.timestamp() <= self.instance_ttl]
+
+    def _rebuild(self, entry: _CachedService):
+        live = self._live(entry)
+        entry.next_expiry = min(
+            (inst.last_heartbeat.timestamp() + self.instance_ttl for inst in live),
+            default=float('inf')
+        )
+
+        # 与 ServiceRegistry.get_service_instance 的选择顺序一致
+        healthy = tuple(inst for inst in live if inst.is_healthy())
+        if not healthy:
+            healthy = tuple(inst for inst in live if inst.status == ServiceStatus.UNKNOWN)
+        entry.candidates = healthy or tuple(live[:1])
+
+    def _fresh(self, entry: _CachedService) -> _CachedService:
+        if time.time() > entry.next_expiry:
+            self._rebuild(entry)
+        return entry
+
+    async def instances(self, service_name: str) -> List[ServiceInstance]:
+        """未过期的全部实例"""
+        return self._live(await self.ensure_watch(service_name))
+
+    async def select(self, service_name: str) -> Optional[ServiceInstance]:
+        """
+        按负载选择实例
+
+        加权二选一：随机取两个候选，选 (在途请求数+1)/权重 较小者。
+        """
+        candidates = self._fresh(await self.ensure_watch(service_name)).candidates
+        self.stats['selections'] += 1
+        if not candidates:
+            return None
+        if len(candidates) == 1:
+            return candidates[0]
+
+        in_flight = self._services[service_name].in_flight
+        a, b = random.sample(candidates, 2)
+        score_a = (in_flight.get(a.instance_id, 0) + 1) / max(a.weight, 1)
+        score_b = (in_flight.get(b.instance_id, 0) + 1) / max(b.weight, 1)
+        return a if score_a <= score_b else b
+
+    async def get_instance(self, service_name: str, instance_id: str) -> Optional[ServiceInstance]:
+        """按实例ID查找"""
+        return (await self.ensure_watch(service_name)).instances.get(instance_id)
+
+    async def wait_for_change(self, service_name: str):
+        """等待服务实例发生变化"""
+        entry = await self.ensure_watch(service_name)
+        await entry.changed.wait()
+
+    def begin(self, instance: ServiceInstance):
+        """记录一个发往实例的在途请求"""
+        entry = self._services.get(instance.service_name)
+        if entry is not None:
+            entry.in_flight[instance.instance_id] = entry.in_flight.get(instance.instance_id, 0) + 1
+
+    def end(self, instance: ServiceInstance):
+        """请求结束"""
+        entry = self._services.get(instance.service_name)
+        if entry is not None:
+            count = entry.in_flight.get(instance.instance_id, 0) - 1
+            if count > 0:
+                entry.in_flight[instance.instance_id] = count
+            else:
+                entry.in_flight.pop(instance.instance_id, None)
+
+    async def close(self):
+        """停止所有 watch 任务"""
+        tasks = [entry.task for entry in self._services.values() if entry.task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._services.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计"""
+        return {
+            **self.stats,
+            'services': {
+                name: {
+                    'instances': len(entry.instances),
+                    'candidates': len(entry.candidates),
+                    'in_flight': sum(entry.in_flight.values()),
+                    'version': entry.version,
+                }
+                for name, entry in self._services.items()
+            }
+        }
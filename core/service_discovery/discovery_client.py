@@ -5,7 +5,8 @@
 
 import asyncio
 import os
-from typing import Dict, List, Optional, Any, Callable
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Any, Callable
 import logging
 
 from .registry import ServiceRegistry, ServiceInstance, ServiceStatus
@@ -13,6 +14,7 @@ from .backends import (
     ConsulBackend, EtcdBackend, NATSBackend, 
     RedisBackend, InMemoryBackend
 )
+from .discovery_cache import ServiceDiscoveryCache
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +28,8 @@ class ServiceDiscoveryClient:
         self.backend = None
         self.my_instance: Optional[ServiceInstance] = None
         self.auto_register = self.config.get('auto_register', True)
+        # watch 推送维护的本地缓存；关闭后每次查询直接访问后端
+        self.cache: Optional[ServiceDiscoveryCache] = None
         
     async def initialize(self):
         """初始化服务发现客户端"""
@@ -58,10 +62,22 @@ class ServiceDiscoveryClient:
         # 启动注册表
         await self.registry.start()
         
+        if self.config.get('discovery_cache', True):
+            self.cache = ServiceDiscoveryCache(
+                self.backend,
+                instance_ttl=self.registry.instance_ttl,
+                ready_timeout=self.config.get('discovery_ready_timeout', 5.0),
+                on_change=self._on_cache_change
+            )
+        
         logger.info(f"服务发现客户端初始化完成，后端: {backend_type}")
     
     async def shutdown(self):
         """关闭服务发现客户端"""
+        if self.cache:
+            await self.cache.close()
+            self.cache = None
+        
         if self.registry:
             await self.registry.stop()
         
@@ -116,6 +132,8 @@ class ServiceDiscoveryClient:
         if not self.registry:
             raise RuntimeError("服务发现客户端未初始化")
         
+        if self.cache:
+            return await self.cache.instances(service_name)
         return await self.registry.discover_service(service_name)
     
     async def get_service(self, service_name: str) -> Optional[ServiceInstance]:
@@ -123,8 +141,25 @@ class ServiceDiscoveryClient:
         if not self.registry:
             raise RuntimeError("服务发现客户端未初始化")
         
+        if self.cache:
+            return await self.cache.select(service_name)
         return await self.registry.get_service_instance(service_name)
     
+    @asynccontextmanager
+    async def use_service(self, service_name: str) -> AsyncIterator[ServiceInstance]:
+        """获取服务实例并在使用期间计入在途请求，供负载感知选择"""
+        instance = await self.get_service(service_name)
+        if instance is None:
+            raise RuntimeError(f"无可用服务实例: {service_name}")
+        
+        if self.cache:
+            self.cache.begin(instance)
+        try:
+            yield instance
+        finally:
+            if self.cache:
+                self.cache.end(instance)
+    
     async def get_service_url(self, service_name: str) -> Optional[str]:
         """获取服务的URL"""
         instance = await self.get_service(service_name)
@@ -164,7 +199,7 @@ class ServiceDiscoveryClient:
         timeout: int = 60,
         check_interval: int = 5
     ) -> Optional[ServiceInstance]:
-        """等待服务可用"""
+        """等待服务可用（启用缓存时由变更推送唤醒，否则按 check_interval 轮询）"""
         start_time = asyncio.get_event_loop().time()
         
         while True:
@@ -178,10 +213,20 @@ class ServiceDiscoveryClient:
                 logger.warning(f"等待服务 {service_name} 超时")
                 return None
             
-            await asyncio.sleep(check_interval)
+            if self.cache:
+                try:
+                    await asyncio.wait_for(self.cache.wait_for_change(service_name), timeout - elapsed)
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                await asyncio.sleep(check_interval)
     
     async def health_check_service(self, service_name: str, instance_id: str) -> bool:
         """检查特定服务实例的健康状态"""
+        if self.cache:
+            instance = await self.cache.get_instance(service_name, instance_id)
+            return bool(instance) and await self.registry._check_instance_health(instance)
+        
         instances = await self.discover(service_name)
         
         for instance in instances:
@@ -190,6 +235,18 @@ class ServiceDiscoveryClient:
                     return await self.registry._check_instance_health(instance)
         
         return False
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """获取发现缓存统计"""
+        return self.cache.get_stats() if self.cache else {}
+    
+    def _on_cache_change(self, service_name: str, instances: List[ServiceInstance]):
+        # 缓存变更代替逐次查询触发 service_discovered 事件
+        if self.registry and self.registry.event_handlers.get('service_discovered'):
+            asyncio.ensure_future(self.registry._emit_event('service_discovered', {
+                'service_name': service_name,
+                'instances': instances
+            }))
 
 
 # 全局服务发现客户端实例
@@ -90,9 +90,29 @@ class ServiceInstance:
         return cls(**data)
 
 
+class WatchEventType(Enum):
+    """服务变更事件类型"""
+    SNAPSHOT = "snapshot"  # 服务的完整实例列表
+    PUT = "put"            # 实例新增或更新
+    DELETE = "delete"      # 实例注销或过期
+
+
+@dataclass
+class WatchEvent:
+    """后端推送的服务变更事件"""
+    event_type: WatchEventType
+    service_name: str
+    instance_id: str = ""
+    instance: Optional[ServiceInstance] = None
+    instances: List[ServiceInstance] = field(default_factory=list)
+
+
 class ServiceRegistryBackend(ABC):
     """服务注册表后端抽象基类"""
     
+    # 未实现推送的后端按此间隔拉取快照
+    watch_interval: float = 5.0
+    
     @abstractmethod
     async def register(self, instance: ServiceInstance) -> bool:
         """注册服务实例"""
@@ -117,6 +137,18 @@ class ServiceRegistryBackend(ABC):
     async def update_status(self, service_name: str, instance_id: str, status: ServiceStatus) -> bool:
         """更新服务状态"""
         pass
+    
+    async def watch(self, service_name: str, emit: Callable[[WatchEvent], None]) -> None:
+        """
+        持续推送服务变更，直到被取消
+        
+        默认实现定期拉取快照；支持推送的后端（Consul 阻塞查询、etcd watch、
+        NATS 主题、Redis 键空间通知）覆盖此方法。
+        """
+        while True:
+            instances = await self.discover(service_name)
+            emit(WatchEvent(WatchEventType.SNAPSHOT, service_name, instances=list(instances)))
+            await asyncio.sleep(self.watch_interval)
 
 
 class ServiceRegistry:
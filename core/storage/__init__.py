@@ -21,90 +21,93 @@ MarketPrism Collector 存储模块
 from datetime import datetime, timezone
 import warnings
 
-# 数据类型定义
-from .types import (
-    NormalizedTrade,
-    BookLevel,
-    NormalizedOrderBook,
-    NormalizedTicker,
-    MarketData,
-    ExchangeConfig,
-    SymbolConfig,
-    ErrorInfo,
-    PerformanceMetric,
-    MonitoringAlert
-)
+from core.lazy_exports import lazy_exports
 
-# 统一存储管理器（阶段3整合 - 主要导入）
-from .unified_storage_manager import (
-    UnifiedStorageManager,
-    UnifiedStorageConfig,
-    UnifiedStorageConfig as StorageConfig,  # TDD测试兼容别名
+# 所有导出均按需导入（PEP 562）：只使用数据类型的服务不会加载
+# ClickHouse 驱动、Redis 和 aiohttp 等依赖
+_LAZY_EXPORTS = {
+    # 数据类型定义
+    'NormalizedTrade': ('.types', 'NormalizedTrade'),
+    'BookLevel': ('.types', 'BookLevel'),
+    'NormalizedOrderBook': ('.types', 'NormalizedOrderBook'),
+    'NormalizedTicker': ('.types', 'NormalizedTicker'),
+    'MarketData': ('.types', 'MarketData'),
+    'ExchangeConfig': ('.types', 'ExchangeConfig'),
+    'SymbolConfig': ('.types', 'SymbolConfig'),
+    'ErrorInfo': ('.types', 'ErrorInfo'),
+    'PerformanceMetric': ('.types', 'PerformanceMetric'),
+    'MonitoringAlert': ('.types', 'MonitoringAlert'),
+
+    # 统一存储管理器（阶段3整合 - 主要导入）
+    'UnifiedStorageManager': ('.unified_storage_manager', 'UnifiedStorageManager'),
+    'UnifiedStorageConfig': ('.unified_storage_manager', 'UnifiedStorageConfig'),
+    'StorageConfig': ('.unified_storage_manager', 'UnifiedStorageConfig'),  # TDD测试兼容别名
     # 向后兼容别名（零迁移成本）
-    HotStorageManager,
-    SimpleHotStorageManager,
-    ColdStorageManager,
-    StorageManager,
-    HotStorageConfig,
-    SimpleHotStorageConfig,
-    ColdStorageConfig,
+    'HotStorageManager': ('.unified_storage_manager', 'HotStorageManager'),
+    'SimpleHotStorageManager': ('.unified_storage_manager', 'SimpleHotStorageManager'),
+    'ColdStorageManager': ('.unified_storage_manager', 'ColdStorageManager'),
+    'StorageManager': ('.unified_storage_manager', 'StorageManager'),
+    'HotStorageConfig': ('.unified_storage_manager', 'HotStorageConfig'),
+    'SimpleHotStorageConfig': ('.unified_storage_manager', 'SimpleHotStorageConfig'),
+    'ColdStorageConfig': ('.unified_storage_manager', 'ColdStorageConfig'),
     # 工厂函数
-    get_hot_storage_manager,
-    get_simple_hot_storage_manager,
-    get_cold_storage_manager,
-    get_storage_manager,
-    initialize_hot_storage_manager,
-    initialize_simple_hot_storage_manager,
-    initialize_cold_storage_manager,
-    initialize_storage_manager
-)
+    'get_hot_storage_manager': ('.unified_storage_manager', 'get_hot_storage_manager'),
+    'get_simple_hot_storage_manager': ('.unified_storage_manager', 'get_simple_hot_storage_manager'),
+    'get_cold_storage_manager': ('.unified_storage_manager', 'get_cold_storage_manager'),
+    'get_storage_manager': ('.unified_storage_manager', 'get_storage_manager'),
+    'initialize_hot_storage_manager': ('.unified_storage_manager', 'initialize_hot_storage_manager'),
+    'initialize_simple_hot_storage_manager': ('.unified_storage_manager', 'initialize_simple_hot_storage_manager'),
+    'initialize_cold_storage_manager': ('.unified_storage_manager', 'initialize_cold_storage_manager'),
+    'initialize_storage_manager': ('.unified_storage_manager', 'initialize_storage_manager'),
+    # 兼容性管理器（原始 manager 模块已移除，指向统一管理器）
+    'ClickHouseManager': ('.unified_storage_manager', 'UnifiedStorageManager'),
+    'DatabaseManager': ('.unified_storage_manager', 'UnifiedStorageManager'),
+    'WriterManager': ('.unified_storage_manager', 'UnifiedStorageManager'),
 
-# 统一ClickHouse写入器（阶段2整合）
-from .unified_clickhouse_writer import (
-    UnifiedClickHouseWriter,
-    unified_clickhouse_writer,
-    ClickHouseWriter,  # 向后兼容
-    OptimizedClickHouseWriter  # 向后兼容
-)
+    # 统一ClickHouse写入器（阶段2整合）
+    'UnifiedClickHouseWriter': ('.unified_clickhouse_writer', 'UnifiedClickHouseWriter'),
+    'unified_clickhouse_writer': ('.unified_clickhouse_writer', 'unified_clickhouse_writer'),
+    'ClickHouseWriter': ('.unified_clickhouse_writer', 'ClickHouseWriter'),  # 向后兼容
+    'OptimizedClickHouseWriter': ('.unified_clickhouse_writer', 'OptimizedClickHouseWriter'),  # 向后兼容
 
-# 统一网络会话管理器（阶段1整合）
-try:
-    from .unified_session_manager import (
-        UnifiedSessionManager,
-        HTTPSessionManager as _HTTPSessionManager,  # 向后兼容
-        OptimizedSessionManager as _OptimizedSessionManager  # 向后兼容
-    )
-except ImportError:
-    # 如果unified_session_manager不在storage模块中，跳过
-    UnifiedSessionManager = None
-    _HTTPSessionManager = None
-    _OptimizedSessionManager = None
+    # 工厂模式
+    'create_clickhouse_writer': ('.factory', 'create_clickhouse_writer'),
+    'create_optimized_writer': ('.factory', 'create_optimized_writer'),
+    'get_writer_instance': ('.factory', 'get_writer_instance'),
+    'create_writer_from_config': ('.factory', 'create_writer_from_config'),
+    'create_writer_pool': ('.factory', 'create_writer_pool'),
+    'get_available_writer_types': ('.factory', 'get_available_writer_types'),
+    'is_writer_type_supported': ('.factory', 'is_writer_type_supported'),
+    'create_storage_writer': ('.factory', 'create_storage_writer'),  # 向后兼容
+    'create_default_writer': ('.factory', 'create_default_writer'),
+}
 
-# 工厂模式
-from .factory import (
-    create_clickhouse_writer,
-    create_optimized_writer,
-    get_writer_instance,
-    create_writer_from_config,
-    create_writer_pool,
-    get_available_writer_types,
-    is_writer_type_supported,
-    create_storage_writer,  # 向后兼容
-    create_default_writer
-)
 
-# 兼容性管理器（保留原始导入以防万一）
-try:
-    from .manager import (
-        ClickHouseManager,
-        DatabaseManager,
-        WriterManager
-    )
-except ImportError:
-    # 如果原始manager不存在，创建兼容包装器
-    ClickHouseManager = UnifiedStorageManager
-    DatabaseManager = UnifiedStorageManager
-    WriterManager = UnifiedStorageManager
+def _optional_session_manager(attr: str):
+    """统一网络会话管理器（阶段1整合），不在storage模块中时返回None"""
+    def load():
+        try:
+            from . import unified_session_manager
+        except ImportError:
+            return None
+        return getattr(unified_session_manager, attr)
+    return load
+
+
+def _create_storage_manager():
+    """全局存储管理器实例（向后兼容），首次访问时创建"""
+    from .unified_storage_manager import get_storage_manager
+    return get_storage_manager()
+
+
+_LAZY_FACTORIES = {
+    'UnifiedSessionManager': _optional_session_manager('UnifiedSessionManager'),
+    '_HTTPSessionManager': _optional_session_manager('HTTPSessionManager'),
+    '_OptimizedSessionManager': _optional_session_manager('OptimizedSessionManager'),
+    'storage_manager': _create_storage_manager,
+}
+
+__getattr__, __dir__ = lazy_exports(__name__, _LAZY_EXPORTS, _LAZY_FACTORIES)
 
 # 向后兼容函数
 def get_clickhouse_writer(*args, **kwargs):
@@ -114,6 +117,7 @@ def get_clickhouse_writer(*args, **kwargs):
         DeprecationWarning,
         stacklevel=2
     )
+    from .unified_clickhouse_writer import unified_clickhouse_writer
     return unified_clickhouse_writer
 
 def get_optimized_writer(*args, **kwargs):
@@ -123,6 +127,7 @@ def get_optimized_writer(*args, **kwargs):
         DeprecationWarning,
         stacklevel=2
     )
+    from .unified_clickhouse_writer import unified_clickhouse_writer
     return unified_clickhouse_writer
 
 # 导出列表（优先统一管理器）
@@ -198,19 +203,19 @@ __all__ = [
 # 模块级便利函数
 def create_hot_storage_manager(*args, **kwargs):
     """创建热存储管理器（统一接口）"""
+    from .unified_storage_manager import get_hot_storage_manager
     return get_hot_storage_manager(*args, **kwargs)
 
 def create_cold_storage_manager(*args, **kwargs):
     """创建冷存储管理器（统一接口）"""
+    from .unified_storage_manager import get_cold_storage_manager
     return get_cold_storage_manager(*args, **kwargs)
 
 def create_storage_manager(*args, **kwargs):
     """创建统一存储管理器（统一接口）"""
+    from .unified_storage_manager import get_storage_manager
     return get_storage_manager(*args, **kwargs)
 
-# 全局存储管理器实例（向后兼容）
-storage_manager = get_storage_manager()
-
 # 阶段3整合状态报告
 def get_integration_status():
     """获取整合状态报告"""
@@ -0,0 +1,199 @@
+"""
+ClickHouse查询结果缓存
+
+缓存键为规范化后的查询语句 + 参数；每个条目记录其覆盖的 (表, 交易所, 交易对) 水位标签。
+热端写入推进水位（经NATS或本地调用）时，只失效带有对应标签的条目；按内存占用做LRU淘汰。
+"""
+
+import json
+import pickle
+import re
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 水位消息主题：marketprism.watermark.<table>
+WATERMARK_SUBJECT_PREFIX = "marketprism.watermark"
+
+WatermarkTag = Tuple[str, str, str]  # (table, exchange, symbol)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """折叠空白，使格式不同的同一查询共用缓存条目"""
+    return _WHITESPACE.sub(" ", query).strip()
+
+
+def encode_watermarks(table: str, watermarks: Iterable[Tuple[str, str, int]]) -> bytes:
+    """编码水位消息：{"table": ..., "watermarks": [[exchange, symbol, ts_ms], ...]}"""
+    return json.dumps({"table": table, "watermarks": [list(w) for w in watermarks]}).encode()
+
+
+def decode_watermarks(payload: bytes) -> Tuple[str, List[Tuple[str, str, int]]]:
+    data = json.loads(payload)
+    return data["table"], [(str(ex), str(sym), int(ts)) for ex, sym, ts in data.get("watermarks", [])]
+
+
+def _estimate_size(value: Any) -> int:
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+class _Entry:
+    __slots__ = ('value', 'tags', 'size', 'expires_at')
+
+    def __init__(self, value: Any, tags: Tuple[WatermarkTag, ...], size: int, expires_at: float):
+        self.value = value
+        self.tags = tags
+        self.size = size
+        self.expires_at = expires_at
+
+
+class QueryResultCache:
+    """
+    按水位失效的查询结果缓存
+
+    每条写入通知都失效对应标签：迟到数据的时间戳可能不大于当前水位，但同样改变了查询结果。
+    水位只记录各标签见过的最大时间戳，用于统计。
+    加载期间若标签收到写入通知，结果不写入缓存，避免把写入前读到的旧结果缓存下来。
+    """
+
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 64 * 1024 * 1024, ttl: Optional[float] = 300):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple[str, str], _Entry]" = OrderedDict()
+        self._tag_index: Dict[WatermarkTag, set] = {}
+        self._watermarks: Dict[WatermarkTag, int] = {}
+        self._versions: Dict[WatermarkTag, int] = {}
+        self._bytes = 0
+        self.stats = {
+            'hits': 0, 'misses': 0, 'invalidations': 0, 'evictions': 0,
+            'expirations': 0, 'stale_fills': 0, 'watermark_updates': 0
+        }
+
+    @staticmethod
+    def make_key(query: str, params: Optional[Dict[str, Any]] = None) -> Tuple[str, str]:
+        return normalize_query(query), json.dumps(params or {}, sort_keys=True, default=str)
+
+    def get(self, query: str, params: Optional[Dict[str, Any]] = None) -> Tuple[bool, Any]:
+        """返回 (是否命中, 结果)；结果本身可能为 None/空列表"""
+        key = self.make_key(query, params)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats['misses'] += 1
+            return False, None
+        if entry.expires_at <= time.time():
+            self.stats['expirations'] += 1
+            self.stats['misses'] += 1
+            self._remove(key)
+            return False, None
+        self._entries.move_to_end(key)
+        self.stats['hits'] += 1
+        return True, entry.value
+
+    def versions(self, tags: Sequence[WatermarkTag]) -> Tuple[int, ...]:
+        """标签当前版本，加载前取得，写入时比对"""
+        return tuple(self._versions.get(tag, 0) for tag in tags)
+
+    def put(self, query: str, params: Optional[Dict[str, Any]], tags: Sequence[WatermarkTag], value: Any,
+            versions: Optional[Tuple[int, ...]] = None) -> bool:
+        """写入结果；versions 与当前标签版本不一致时放弃写入"""
+        tags = tuple(tags)
+        if versions is not None and versions != self.versions(tags):
+            self.stats['stale_fills'] += 1
+            return False
+
+        size = _estimate_size(value)
+        if size > self.max_bytes:
+            return False
+
+        key = self.make_key(query, params)
+        self._remove(key)
+        expires_at = time.time() + self.ttl if self.ttl else float('inf')
+        self._entries[key] = _Entry(value, tags, size, expires_at)
+        self._bytes += size
+        for tag in tags:
+            self._tag_index.setdefault(tag, set()).add(key)
+
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.stats['evictions'] += 1
+        return True
+
+    async def get_or_load(self, query: str, params: Optional[Dict[str, Any]], tags: Sequence[WatermarkTag],
+                          loader: Callable[[], Awaitable[Any]]) -> Any:
+        """命中则直接返回，否则调用 loader 查询并缓存"""
+        hit, value = self.get(query, params)
+        if hit:
+            return value
+        versions = self.versions(tags)
+        value = await loader()
+        self.put(query, params, tags, value, versions)
+        return value
+
+    def advance(self, table: str, exchange: str, symbol: str, ts_ms: Optional[int] = None) -> bool:
+        """记录一次写入通知并失效相关条目（含迟到数据），返回 True"""
+        tag = (table, exchange, symbol)
+        if ts_ms is not None and ts_ms > self._watermarks.get(tag, -1):
+            self._watermarks[tag] = ts_ms
+        self.stats['watermark_updates'] += 1
+        self._versions[tag] = self._versions.get(tag, 0) + 1
+
+        keys = self._tag_index.pop(tag, None)
+        if keys:
+            for key in keys:
+                self._remove(key)
+            self.stats['invalidations'] += len(keys)
+        return True
+
+    def apply_watermarks(self, payload: bytes) -> int:
+        """应用一条水位消息，返回失效的标签数"""
+        table, watermarks = decode_watermarks(payload)
+        return sum(1 for ex, sym, ts in watermarks if self.advance(table, ex, sym, ts))
+
+    def watermark(self, table: str, exchange: str, symbol: str) -> Optional[int]:
+        return self._watermarks.get((table, exchange, symbol))
+
+    def _remove(self, key: Tuple[str, str]):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= entry.size
+        for tag in entry.tags:
+            keys = self._tag_index.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_index[tag]
+
+    def clear(self):
+        self._entries.clear()
+        self._tag_index.clear()
+        self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.stats['hits'] + self.stats['misses']
+        return self.stats['hits'] / total if total else 0.0
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            'entries': len(self._entries),
+            'bytes': self._bytes,
+            'tracked_watermarks': len(self._watermarks),
+            'hit_ratio': self.hit_ratio,
+        }
@@ -54,6 +54,7 @@ import aiochclient
 import aiohttp
 from prometheus_client import Counter, Histogram, Gauge
 from .unified_clickhouse_writer import UnifiedClickHouseWriter
+from .query_cache import QueryResultCache, WATERMARK_SUBJECT_PREFIX
 
 # 尝试相对导入，失败则使用绝对导入
 try:
@@ -133,6 +134,14 @@ def _get_cache_hit_rate_metric():
         ["storage_type"]
     )
 
+def _get_query_cache_hit_ratio_metric():
+    return _get_metric(
+        "marketprism_unified_query_cache_hit_ratio",
+        "gauge",
+        "查询结果缓存命中率",
+        ["storage_type"]
+    )
+
 
 @dataclass
 class UnifiedStorageConfig:
@@ -189,6 +198,13 @@ class UnifiedStorageConfig:
     cache_strategy: str = "write_through"  # write_through, write_back, write_around
     memory_cache_enabled: bool = True
 
+    # 查询结果缓存（按热端水位失效）
+    query_cache_max_entries: int = 10000
+    query_cache_max_mb: int = 64
+    query_cache_ttl: int = 300  # 未订阅水位时的过期时间（其它进程的写入只能靠过期体现）
+    query_cache_subscribed_ttl: int = 3600  # 订阅水位后的兜底过期，正常由写入通知失效
+    watermark_nats_url: str = ""  # 为空时只由本进程写入推进水位
+
     @classmethod
     def from_yaml(cls, config_path: str, storage_type: str = "hot") -> 'UnifiedStorageConfig':
         """从YAML文件加载配置"""
@@ -257,7 +273,13 @@ class UnifiedStorageConfig:
                 archive_interval_hours=storage_config.get('archiving', {}).get('interval_hours', 24),
 
                 cache_strategy=storage_config.get('cache_strategy', 'write_through'),
-                memory_cache_enabled=storage_config.get('memory_cache_enabled', True)
+                memory_cache_enabled=storage_config.get('memory_cache_enabled', True),
+
+                query_cache_max_entries=storage_config.get('query_cache', {}).get('max_entries', 10000),
+                query_cache_max_mb=storage_config.get('query_cache', {}).get('max_mb', 64),
+                query_cache_ttl=storage_config.get('query_cache', {}).get('ttl', 300),
+                query_cache_subscribed_ttl=storage_config.get('query_cache', {}).get('subscribed_ttl', 3600),
+                watermark_nats_url=storage_config.get('query_cache', {}).get('watermark_nats_url', '')
             )
 
         except Exception as e:
@@ -546,8 +568,14 @@ class UnifiedStorageManager:
         # 内存缓存
         self.memory_cache = {} if self.config.memory_cache_enabled else {}
         self.memory_cache_expire = {} if self.config.memory_cache_enabled else {}
-        self.query_cache = {}  # 查询缓存（冷存储用）
-        self.query_cache_expire = {}
+        # 查询结果缓存：热端写入推进 (表, 交易所, 交易对) 水位时精确失效
+        self.query_cache = QueryResultCache(
+            max_entries=self.config.query_cache_max_entries,
+            max_bytes=self.config.query_cache_max_mb * 1024 * 1024,
+            ttl=self.config.query_cache_ttl
+        )
+        self.watermark_nc = None
+        self._watermark_sub = None
 
         # 归档管理器（可选）
         self.archiver_manager = None
@@ -611,6 +639,10 @@ class UnifiedStorageManager:
                 await self.migration_service.start()
                 logger.info("数据迁移服务已启动")
 
+            # 订阅热端水位（如果配置）
+            if self.config.watermark_nats_url:
+                await self._init_watermark_subscription()
+
             self.is_running = True
             logger.info(f"统一存储管理器已启动，类型: {self.config.storage_type}")
 
@@ -638,6 +670,14 @@ class UnifiedStorageManager:
                 await self.clickhouse_writer.stop()
 
             # 关闭连接
+            if self._watermark_sub:
+                await self._watermark_sub.unsubscribe()
+                self._watermark_sub = None
+                self.query_cache.ttl = self.config.query_cache_ttl
+            if self.watermark_nc:
+                await self.watermark_nc.close()
+                self.watermark_nc = None
+
             if self.redis_client and hasattr(self.redis_client, 'close'):
                 await self.redis_client.close()
 
@@ -650,6 +690,32 @@ class UnifiedStorageManager:
         except Exception as e:
             logger.error(f"停止存储管理器失败: {e}")
 
+    async def _init_watermark_subscription(self):
+        """连接NATS并订阅热端水位，连接失败时缓存只依赖本地写入与兜底过期"""
+        try:
+            import nats
+        except ImportError:
+            logger.warning("未安装nats-py，跳过水位订阅")
+            return
+        try:
+            self.watermark_nc = await nats.connect(servers=[self.config.watermark_nats_url], name="unified-storage-query-cache")
+            await self.subscribe_watermarks(self.watermark_nc)
+        except Exception as e:
+            logger.warning(f"水位订阅失败，查询缓存仅按兜底过期失效: {e}")
+            self.watermark_nc = None
+
+    async def subscribe_watermarks(self, nc):
+        """在已有NATS连接上订阅热端水位消息"""
+        async def _on_watermark(msg):
+            try:
+                self.query_cache.apply_watermarks(msg.data)
+            except Exception as e:
+                logger.warning(f"水位消息解析失败: {e}")
+
+        self._watermark_sub = await nc.subscribe(f"{WATERMARK_SUBJECT_PREFIX}.>", cb=_on_watermark)
+        self.query_cache.ttl = self.config.query_cache_subscribed_ttl
+        logger.info("已订阅热端水位")
+
     async def _init_redis(self):
         """初始化Redis连接（统一的Redis初始化逻辑）"""
         try:
@@ -913,8 +979,12 @@ class UnifiedStorageManager:
             if self.config.redis_enabled:
                 await self._cache_latest_trade(trade_data)
 
+            # 本地写入推进水位，并回填最新成交
+            exchange, symbol = trade_data.get('exchange'), trade_data.get('symbol')
+            self.query_cache.advance('trades', exchange, symbol)
             if self.config.memory_cache_enabled:
-                self._cache_in_memory(f"latest_trade:{trade_data.get('exchange')}:{trade_data.get('symbol')}", trade_data)
+                self.query_cache.put(self._latest_trade_query(exchange, symbol), None,
+                                     [('trades', exchange, symbol)], trade_data)
 
             self.stats['writes'] += 1
 
@@ -1022,14 +1092,17 @@ class UnifiedStorageManager:
         self.stats['reads'] += 1
 
         try:
-            # 1. 检查内存缓存
+            query = self._latest_trade_query(exchange, symbol)
+            tags = [('trades', exchange, symbol)]
+
+            # 1. 检查查询结果缓存
             if self.config.memory_cache_enabled:
-                memory_key = f"latest_trade:{exchange}:{symbol}"
-                cached_data = self._get_from_memory(memory_key)
-                if cached_data:
+                hit, cached_data = self.query_cache.get(query)
+                if hit and cached_data:
                     self.stats['cache_hits'] += 1
-                    logger.debug(f"内存缓存命中: {symbol}")
+                    logger.debug(f"查询缓存命中: {symbol}")
                     return cached_data
+            versions = self.query_cache.versions(tags)
 
             # 2. 检查Redis缓存（如果启用）
             if self.config.redis_enabled:
@@ -1038,20 +1111,14 @@ class UnifiedStorageManager:
                 if redis_data:
                     self.stats['cache_hits'] += 1
                     data = json.loads(redis_data) if isinstance(redis_data, str) else redis_data
-                    # 回填内存缓存
+                    # 回填查询缓存
                     if self.config.memory_cache_enabled:
-                        self._cache_in_memory(memory_key, data)
+                        self.query_cache.put(query, None, tags, data, versions)
                     logger.debug(f"Redis缓存命中: {symbol}")
                     return data
 
             # 3. 从ClickHouse查询
-            table_prefix = "cold_" if self.config.storage_type == "cold" else "hot_"
-            result = await self.clickhouse_client.fetchone(f"""
-                SELECT * FROM {self.config.clickhouse_database}.{table_prefix}trades
-                WHERE exchange = '{exchange}' AND symbol = '{symbol}'
-                ORDER BY timestamp DESC
-                LIMIT 1
-            """)
+            result = await self.clickhouse_client.fetchone(query)
 
             if result:
                 self.stats['cache_misses'] += 1
@@ -1060,7 +1127,7 @@ class UnifiedStorageManager:
                 if self.config.redis_enabled:
                     await self._cache_latest_trade(data)
                 if self.config.memory_cache_enabled:
-                    self._cache_in_memory(memory_key, data)
+                    self.query_cache.put(query, None, tags, data, versions)
                 logger.debug(f"从ClickHouse查询: {symbol}")
                 return data
 
@@ -1082,22 +1149,34 @@ class UnifiedStorageManager:
 
 
     async def get_recent_trades(self, exchange: str, symbol: str, limit: int = 100) -> List[Dict[str, Any]]:
-        """获取最近交易数据"""
+        """获取最近交易数据（结果按 trades 水位缓存）"""
         try:
-            table_prefix = "cold_" if self.config.storage_type == "cold" else "hot_"
-            results = await self.clickhouse_client.fetchall(f"""
-                SELECT * FROM {self.config.clickhouse_database}.{table_prefix}trades
-                WHERE exchange = '{exchange}' AND symbol = '{symbol}'
-                ORDER BY timestamp DESC
-                LIMIT {limit}
-            """)
+            query = self._trades_query(exchange, symbol, limit)
+
+            async def load():
+                results = await self.clickhouse_client.fetchall(query)
+                return [dict(row) for row in results] if results else []
 
-            return [dict(row) for row in results] if results else []
+            if not self.config.memory_cache_enabled:
+                return await load()
+            return await self.query_cache.get_or_load(query, None, [('trades', exchange, symbol)], load)
 
         except Exception as e:
             logger.error(f"获取最近交易数据失败: {e}")
             return []
 
+    def _trades_query(self, exchange: str, symbol: str, limit: int) -> str:
+        table_prefix = "cold_" if self.config.storage_type == "cold" else "hot_"
+        return f"""
+                SELECT * FROM {self.config.clickhouse_database}.{table_prefix}trades
+                WHERE exchange = '{exchange}' AND symbol = '{symbol}'
+                ORDER BY timestamp DESC
+                LIMIT {limit}
+            """
+
+    def _latest_trade_query(self, exchange: str, symbol: str) -> str:
+        return self._trades_query(exchange, symbol, 1)
+
     # ==================== 内部写入方法 ====================
 
     async def _write_trade_to_clickhouse(self, trade_data: Dict[str, Any]):
@@ -1245,10 +1324,12 @@ class UnifiedStorageManager:
         # 添加存储类型特定的统计
         if self.config.memory_cache_enabled:
             stats['memory_cache_size'] = len(self.memory_cache)
+        stats['query_cache'] = self.query_cache.get_stats()
 
         # 更新Prometheus指标
         try:
             _get_cache_hit_rate_metric().labels(storage_type=self.config.storage_type).set(cache_hit_rate)
+            _get_query_cache_hit_ratio_metric().labels(storage_type=self.config.storage_type).set(self.query_cache.hit_ratio)
         except Exception:
             pass  # 忽略指标记录错误
 
@@ -6,7 +6,9 @@ MarketPrism 任务发布器 - NATS任务队列发布
 import asyncio
 import json
 import logging
-from typing import Dict, Any, Optional, List
+import time
+from collections import deque
+from typing import Dict, Any, Optional, List, Tuple
 from datetime import datetime, timezone
 import nats
 from nats.js import JetStreamContext
@@ -18,15 +20,79 @@ from .task_types import AsyncTask, TaskEvent, TaskEventType, TaskPriority, TaskS
 logger = logging.getLogger(__name__)
 
 
+class TimerWheel:
+    """
+    单层时间轮
+    
+    按 tick 取整把条目放入槽位，超过一圈的条目记录绝对 tick 号，轮到时再比较；
+    添加/取消 O(1)，每个 tick 只扫描一个槽。
+    """
+    
+    def __init__(self, tick: float = 1.0, slots: int = 512):
+        self.tick = tick
+        self.slots: List[Dict[str, Tuple[int, Any]]] = [{} for _ in range(slots)]
+        self._index: Dict[str, int] = {}  # key -> 槽位
+        self._cursor: Optional[int] = None  # 下一个待扫描的 tick 号
+    
+    def add(self, key: str, due: float, item: Any):
+        """添加条目，due 为到期时间戳（秒）；同 key 覆盖"""
+        self.cancel(key)
+        tick_no = int(due // self.tick)
+        if self._cursor is not None and tick_no < self._cursor:
+            tick_no = self._cursor
+        slot = tick_no % len(self.slots)
+        self.slots[slot][key] = (tick_no, item)
+        self._index[key] = slot
+    
+    def cancel(self, key: str) -> bool:
+        slot = self._index.pop(key, None)
+        if slot is None:
+            return False
+        del self.slots[slot][key]
+        return True
+    
+    def pop_due(self, now: float) -> List[Any]:
+        """取出截至 now 到期的条目"""
+        now_tick = int(now // self.tick)
+        if self._cursor is None:
+            self._cursor = min((tick_no for slot in self.slots for tick_no, _ in slot.values()),
+                               default=now_tick)
+        due = []
+        # 时钟跳变超过一圈时最多扫描一圈
+        for tick_no in range(max(self._cursor, now_tick - len(self.slots) + 1), now_tick + 1):
+            slot = self.slots[tick_no % len(self.slots)]
+            for key in [k for k, (t, _) in slot.items() if t <= now_tick]:
+                due.append(slot.pop(key)[1])
+                del self._index[key]
+        self._cursor = max(self._cursor, now_tick + 1)
+        return due
+    
+    def drain(self) -> List[Any]:
+        """取出全部条目"""
+        items = [item for slot in self.slots for _, item in slot.values()]
+        for slot in self.slots:
+            slot.clear()
+        self._index.clear()
+        return items
+    
+    def __len__(self) -> int:
+        return len(self._index)
+
+
 class NATSTaskPublisher:
     """NATS任务发布器 - 异步发布任务到队列"""
     
-    def __init__(self, nats_url: str = "nats://localhost:4222"):
+    def __init__(self, nats_url: str = "nats://localhost:4222",
+                 max_in_flight: int = 256, scheduler_tick: float = 1.0,
+                 scheduled_max_retries: int = 5):
         """
         初始化NATS任务发布器
         
         Args:
             nats_url: NATS服务器URL
+            max_in_flight: 批量发布时同时等待确认的最大消息数
+            scheduler_tick: 定时任务时间轮精度（秒）
+            scheduled_max_retries: 到期任务发布失败后放回时间轮重试的最大次数
         """
         self.nats_url = nats_url
         self.nc = None
@@ -35,6 +101,18 @@ class NATSTaskPublisher:
         self.published_count = 0
         self.error_count = 0
         self.last_publish_time = None
+        self.max_in_flight = max_in_flight
+        
+        # 任务消息发送到收到确认的耗时（秒），保留最近样本
+        self._ack_latencies: deque = deque(maxlen=4096)
+        
+        # 未到期的定时任务留在本地时间轮，到期后批量发布
+        self._timer_wheel = TimerWheel(tick=scheduler_tick)
+        self._timer_task: Optional[asyncio.Task] = None
+        self.scheduled_max_retries = scheduled_max_retries
+        self._scheduled_attempts: Dict[str, int] = {}  # 任务ID -> 已失败的发布次数
+        self.scheduled_retry_count = 0
+        self.scheduled_failed_count = 0
         
         logger.info("NATS任务发布器初始化完成")
     
@@ -65,6 +143,7 @@ class NATSTaskPublisher:
             await self._setup_task_streams()
             
             self.is_connected = True
+            self._timer_task = asyncio.create_task(self._timer_loop())
             logger.info("✅ NATS任务发布器启动成功")
             
         except Exception as e:
@@ -79,6 +158,20 @@ class NATSTaskPublisher:
         
         logger.info("停止NATS任务发布器...")
         
+        if self._timer_task:
+            self._timer_task.cancel()
+            await asyncio.gather(self._timer_task, return_exceptions=True)
+            self._timer_task = None
+        
+        # 未到期的定时任务按延迟任务发布，由工作者等待执行，避免丢失
+        pending = self._timer_wheel.drain()
+        self._scheduled_attempts.clear()
+        if pending:
+            now = datetime.now(timezone.utc)
+            for task in pending:
+                task.delay_seconds = max(int((task.scheduled_at - now).total_seconds()), 0)
+            await self.publish_task_batch(pending)
+        
         # 关闭连接
         if self.nc:
             await self.nc.close()
@@ -150,37 +243,11 @@ class NATSTaskPublisher:
             return False
         
         try:
-            # 确定任务队列主题
-            subject = TaskSubjects.get_task_subject(task.priority)
-            
-            # 构建任务消息
-            task_message = task.to_message()
-            
-            # 发布消息
-            message_data = json.dumps(task_message, ensure_ascii=False, default=str)
-            
-            # 设置消息头
-            headers = {
-                'task-id': task.task_id,
-                'task-type': str(task.task_type),
-                'task-priority': str(task.priority),
-                'target-service': task.target_service,
-                'timestamp': datetime.now(timezone.utc).isoformat()
-            }
-            
-            # 发布到JetStream
-            ack = await self.js.publish(
-                subject=subject,
-                payload=message_data.encode('utf-8'),
-                headers=headers
-            )
-            
-            self.published_count += 1
-            self.last_publish_time = datetime.now(timezone.utc)
+            ack = await self._send_task(task)
             
             logger.info(
                 f"任务发布成功: task_id={task.task_id}, "
-                f"subject={subject}, priority={task.priority}, "
+                f"subject={TaskSubjects.get_task_subject(task.priority)}, priority={task.priority}, "
                 f"sequence={ack.seq}"
             )
             
@@ -196,20 +263,82 @@ class NATSTaskPublisher:
             logger.error(traceback.format_exc())
             return False
     
-    async def publish_task_batch(self, tasks: List[AsyncTask]) -> Dict[str, bool]:
+    async def _send_task(self, task: AsyncTask):
+        """发布任务消息并等待JetStream确认"""
+        # 确定任务队列主题
+        subject = TaskSubjects.get_task_subject(task.priority)
+        
+        # 构建任务消息
+        task_message = task.to_message()
+        
+        # 发布消息
+        message_data = json.dumps(task_message, ensure_ascii=False, default=str)
+        
+        # 设置消息头；Nats-Msg-Id 使重试/重复提交在流的去重窗口内只入队一次
+        headers = {
+            'Nats-Msg-Id': task.task_id,
+            'task-id': task.task_id,
+            'task-type': str(task.task_type),
+            'task-priority': str(task.priority),
+            'target-service': task.target_service,
+            'timestamp': datetime.now(timezone.utc).isoformat()
+        }
+        
+        # 发布到JetStream
+        start = time.perf_counter()
+        ack = await self.js.publish(
+            subject=subject,
+            payload=message_data.encode('utf-8'),
+            headers=headers
+        )
+        self._ack_latencies.append(time.perf_counter() - start)
+        
+        self.published_count += 1
+        self.last_publish_time = datetime.now(timezone.utc)
+        return ack
+    
+    async def publish_task_batch(self, tasks: List[AsyncTask],
+                                 max_in_flight: Optional[int] = None) -> Dict[str, bool]:
         """
         批量发布任务
         
+        任务消息与 QUEUED 事件并发发布，同时等待确认的消息数不超过 max_in_flight；
+        每个任务确认后立即发出其事件，不等待事件确认即继续。
+        
         Args:
             tasks: 任务列表
+            max_in_flight: 在途消息上限，默认使用发布器配置
             
         Returns:
             Dict[str, bool]: 任务ID -> 发布结果映射
         """
-        results = {}
+        if not self.is_connected:
+            logger.error("NATS未连接，无法发布任务")
+            return {task.task_id: False for task in tasks}
         
-        for task in tasks:
-            results[task.task_id] = await self.publish_task(task)
+        window = asyncio.Semaphore(max_in_flight or self.max_in_flight)
+        event_publishes: List[asyncio.Future] = []
+        
+        async def publish_event(task: AsyncTask):
+            async with window:
+                await self._publish_task_event(task, TaskEventType.QUEUED)
+        
+        async def publish_one(task: AsyncTask) -> bool:
+            async with window:
+                try:
+                    ack = await self._send_task(task)
+                except Exception as e:
+                    self.error_count += 1
+                    logger.error(f"任务发布失败: task_id={task.task_id}, {e}")
+                    return False
+            logger.debug(f"任务发布成功: task_id={task.task_id}, sequence={ack.seq}")
+            event_publishes.append(asyncio.ensure_future(publish_event(task)))
+            return True
+        
+        outcomes = await asyncio.gather(*(publish_one(task) for task in tasks))
+        if event_publishes:
+            await asyncio.gather(*event_publishes)
+        results = {task.task_id: ok for task, ok in zip(tasks, outcomes)}
         
         success_count = sum(1 for success in results.values() if success)
         logger.info(
@@ -272,13 +401,14 @@ class NATSTaskPublisher:
                 task_snapshot=task.to_message()
             )
             
-            return await self._publish_task_event_obj(event)
+            # 以任务ID派生消息ID，重复提交同一任务时事件同样去重
+            return await self._publish_task_event_obj(event, msg_id=f"{task.task_id}.{event_type.value}")
             
         except Exception as e:
             logger.error(f"内部任务事件发布失败: {e}")
             return False
     
-    async def _publish_task_event_obj(self, event: TaskEvent) -> bool:
+    async def _publish_task_event_obj(self, event: TaskEvent, msg_id: Optional[str] = None) -> bool:
         """发布任务事件对象"""
         try:
             # 确定事件主题
@@ -292,6 +422,7 @@ class NATSTaskPublisher:
             
             # 设置消息头
             headers = {
+                'Nats-Msg-Id': msg_id or event.event_id,
                 'event-id': event.event_id,
                 'event-type': str(event.event_type),
                 'task-id': event.task_id,
@@ -324,24 +455,91 @@ class NATSTaskPublisher:
         """
         发布定时任务
         
+        调度时间在一个时间轮 tick 之后的任务先留在本地时间轮，到期时与同批到期任务一起批量发布。
+        
         Args:
             task: 任务对象
             schedule_time: 调度时间
             
         Returns:
-            bool: 发布是否成功
+            bool: 发布（或加入时间轮）是否成功
         """
+        if not self.is_connected:
+            logger.error("NATS未连接，无法发布任务")
+            return False
+        
         # 设置调度时间
         task.scheduled_at = schedule_time
         
-        # 计算延迟时间
         now = datetime.now(timezone.utc)
-        if schedule_time > now:
-            delay_seconds = int((schedule_time - now).total_seconds())
-            task.delay_seconds = delay_seconds
+        if (schedule_time - now).total_seconds() > self._timer_wheel.tick:
+            self._timer_wheel.add(task.task_id, schedule_time.timestamp(), task)
+            logger.debug(f"定时任务加入时间轮: task_id={task.task_id}, scheduled_at={schedule_time.isoformat()}")
+            return True
         
         return await self.publish_task(task)
     
+    def cancel_scheduled_task(self, task_id: str) -> bool:
+        """取消尚未发布的定时任务"""
+        self._scheduled_attempts.pop(task_id, None)
+        return self._timer_wheel.cancel(task_id)
+    
+    async def _timer_loop(self):
+        """时间轮驱动：每个 tick 批量发布到期任务，发布失败的任务退避后重新放回时间轮"""
+        while True:
+            await asyncio.sleep(self._timer_wheel.tick)
+            due = self._timer_wheel.pop_due(time.time())
+            if not due:
+                continue
+            try:
+                results = await self.publish_task_batch(due)
+            except asyncio.CancelledError:
+                # stop() 取消时批次可能只发布了一部分：整批放回时间轮，由 stop() 统一补发（Nats-Msg-Id 去重）
+                now = time.time()
+                for task in due:
+                    self._timer_wheel.add(task.task_id, now, task)
+                raise
+            except Exception as e:
+                logger.error(f"定时任务发布失败: {e}")
+                results = {}
+            self._requeue_failed_scheduled(due, results)
+    
+    def _requeue_failed_scheduled(self, tasks: List[AsyncTask], results: Dict[str, bool]):
+        """发布失败的到期任务按指数退避放回时间轮，超过重试次数后放弃并计数"""
+        now = time.time()
+        for task in tasks:
+            if results.get(task.task_id):
+                self._scheduled_attempts.pop(task.task_id, None)
+                continue
+            attempts = self._scheduled_attempts.get(task.task_id, 0) + 1
+            if attempts > self.scheduled_max_retries:
+                self._scheduled_attempts.pop(task.task_id, None)
+                self.scheduled_failed_count += 1
+                logger.error(f"定时任务发布失败，已放弃: task_id={task.task_id}, attempts={attempts}")
+                continue
+            self._scheduled_attempts[task.task_id] = attempts
+            self.scheduled_retry_count += 1
+            delay = min(self._timer_wheel.tick * 2 ** attempts, 60.0)
+            self._timer_wheel.add(task.task_id, now + delay, task)
+            logger.warning(f"定时任务发布失败，{delay:.1f}s 后重试: task_id={task.task_id}, attempts={attempts}")
+    
+    def get_ack_latency_stats(self) -> Dict[str, Any]:
+        """任务发布确认延迟分布（毫秒）"""
+        samples = sorted(self._ack_latencies)
+        if not samples:
+            return {"count": 0}
+        
+        def percentile(p: float) -> float:
+            return round(samples[min(int(len(samples) * p / 100), len(samples) - 1)] * 1000, 3)
+        
+        return {
+            "count": len(samples),
+            "p50_ms": percentile(50),
+            "p90_ms": percentile(90),
+            "p99_ms": percentile(99),
+            "max_ms": round(samples[-1] * 1000, 3),
+        }
+    
     async def _error_callback(self, error):
         """NATS错误回调"""
         logger.error(f"NATS错误: {error}")
@@ -363,5 +561,9 @@ class NATSTaskPublisher:
             "published_count": self.published_count,
             "error_count": self.error_count,
             "last_publish_time": self.last_publish_time.isoformat() if self.last_publish_time else None,
-            "nats_url": self.nats_url
+            "nats_url": self.nats_url,
+            "scheduled_pending": len(self._timer_wheel),
+            "scheduled_retries": self.scheduled_retry_count,
+            "scheduled_failed": self.scheduled_failed_count,
+            "ack_latency_ms": self.get_ack_latency_stats()
         }
@@ -13,8 +13,9 @@ import os
 import json
 import time
 import asyncio
-from typing import Dict, Any, Optional
-from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+import re
 import subprocess
 
 from core.observability.logging.structured_logger import get_logger
@@ -30,6 +31,9 @@ DEFAULT_TABLES = [
     "volatility_indices",
 ]
 
+# system.parts.partition 文本：(20250101,'binance') / ('2025-01-01 10:00:00.000','binance')
+_RE_PARTITION = re.compile(r"^\((\d+|'[^']*'),\s*'([^']*)'\)$")
+
 
 class HotToColdReplicator:
     def __init__(self, service_config: Dict[str, Any], logger: Optional[StructuredLogger] = None):
@@ -50,9 +54,26 @@ class HotToColdReplicator:
         self.bootstrap_minutes_low: int = int(rep.get("bootstrap_minutes_low", 180))
         self.max_catchup_windows_low: int = int(rep.get("max_catchup_windows_low", 2))
         self.max_catchup_windows_high: int = int(rep.get("max_catchup_windows_high", 5))
+        # 自适应窗口：按热端分钟行数规划窗口边界（keyset：timestamp 为排序键首列）
+        self.target_rows_per_window: int = int(rep.get("target_rows_per_window", 2_000_000))
+        self.max_window_minutes: int = max(int(rep.get("max_window_minutes", 60)), self.window_minutes_all)
+        # 大窗口按 cityHash64(exchange, symbol) 分片并行复制；shard_count<=1 关闭
+        self.shard_count: int = int(rep.get("shard_count", 4))
+        self.shard_threshold_rows: int = int(rep.get("shard_threshold_rows", 500_000))
+        # 校验：每段（多个窗口）结束时按分区比对 count + sum(cityHash64(*))
+        self.verify_segment_minutes: int = int(rep.get("verify_segment_minutes", 60))
         # 复制确认后的热端清理策略（默认关闭，避免误删）
         self.cleanup_enabled: bool = bool(rep.get("cleanup_enabled", False))
         self.cleanup_delay_minutes: int = int(rep.get("cleanup_delay_minutes", 60))
+        # 清理以热端分区为单位 DROP PARTITION；部分覆盖的尾部分区默认留给 TTL/后续轮次，
+        # 开启 cleanup_partial_tail 后才用删除变更处理，且同一表两次变更至少间隔 cleanup_tail_interval_minutes
+        self.cleanup_partial_tail: bool = bool(rep.get("cleanup_partial_tail", False))
+        self.cleanup_tail_interval_minutes: int = int(rep.get("cleanup_tail_interval_minutes", 60))
+        self._last_tail_cleanup: Dict[str, float] = {}  # 表 -> 上次尾部删除变更的时间（秒）
+        self._coarse_partition_warned: set = set()
+        self.cleanup_stats: Dict[str, int] = {
+            "dropped_partitions": 0, "dropped_rows": 0, "skipped_partitions": 0, "tail_mutations": 0,
+        }
 
         hot = self.cfg.get("hot_storage", {})
         cold = self.cfg.get("cold_storage", {})
@@ -80,6 +101,7 @@ class HotToColdReplicator:
             run_dir = os.path.join(os.path.dirname(__file__), "run")
         os.makedirs(run_dir, exist_ok=True)
         self.state_path = os.path.join(run_dir, "sync_state.json")
+        self._state: Optional[Dict[str, Any]] = None
 
         self._stop = False
         self.last_run_ts: Optional[float] = None
@@ -157,6 +179,8 @@ class HotToColdReplicator:
             "lag_minutes": self.table_lag_minutes,
             "cleanup_enabled": self.cleanup_enabled,
             "cleanup_delay_minutes": self.cleanup_delay_minutes,
+            "cleanup_partial_tail": self.cleanup_partial_tail,
+            "cleanup_stats": dict(self.cleanup_stats),
             # 兼容旧字段，同时提供结构化新字段
             "last_error": last_error_msg,
             "last_error_utc": last_error_utc,
@@ -199,13 +223,8 @@ class HotToColdReplicator:
     async def _bootstrap_if_needed(self):
         if not self.bootstrap_enabled:
             return
-        try:
-            with open(self.state_path, "r", encoding="utf-8") as f:
-                d = json.load(f) or {}
-                if d.get("_BOOTSTRAP_DONE"):
-                    return
-        except Exception:
-            pass
+        if self._load_state().get("_BOOTSTRAP_DONE"):
+            return
 
         def _min_ts_ms(sql_fn_hot, sql_fn_cold, tbl: str) -> tuple[int, int]:
             hot_min = sql_fn_hot(f"SELECT toInt64(min(toUnixTimestamp64Milli(timestamp))) FROM marketprism_hot.{tbl}")
@@ -300,114 +319,235 @@ class HotToColdReplicator:
                     pass
 
         try:
-            d = {}
-            if os.path.exists(self.state_path):
-                with open(self.state_path, "r", encoding="utf-8") as f:
-                    d = json.load(f) or {}
-            d["_BOOTSTRAP_DONE"] = True
-            with open(self.state_path, "w", encoding="utf-8") as f:
-                json.dump(d, f)
+            self._load_state()["_BOOTSTRAP_DONE"] = True
+            self._persist_state()
         except Exception:
             pass
 
+    # 校验分组键（与 clickhouse_schema.sql 中冷端 PARTITION BY 一致；热端按天分区，是其细分）
+    PARTITION_KEY = "toYYYYMM(timestamp), exchange"
+
     async def _replicate_table_window(self, table: str, safety_end_ms: int):
+        """
+        追赶复制一张表
+
+        - 一次分钟直方图查询规划本轮所有窗口，窗口按行数自适应（空闲时段合并，繁忙时段切小）
+        - 行数超过阈值的窗口按 (exchange, symbol) 哈希分片并行 INSERT ... SELECT
+        - 不再逐窗口双端 count()；每段结束时按分区比对校验和，通过后才推进水位
+        """
         max_windows = self.max_catchup_windows_high if table in self.high else self.max_catchup_windows_low
-        processed = 0
         last_ms = self._get_state_ms(table)
         if last_ms <= 0:
             last_ms = safety_end_ms - self.window_minutes_all * 60 * 1000
-        while processed < max_windows:
-            end_ms = min(last_ms + self.window_minutes_all * 60 * 1000, safety_end_ms)
-            if end_ms <= last_ms:
+        if last_ms >= safety_end_ms:
+            return
+
+        plan_end = min(safety_end_ms, last_ms + max_windows * self.max_window_minutes * 60 * 1000)
+        if plan_end - last_ms <= self.window_minutes_all * 60 * 1000:
+            # 稳态：只剩一个基础窗口，省去规划查询（行数未知，不分片）
+            windows = [(last_ms, plan_end, -1)]
+        else:
+            windows = self._plan_windows(table, last_ms, plan_end)[:max(max_windows, 1)]
+
+        segment_ms = self.verify_segment_minutes * 60 * 1000
+        seg_start = last_ms
+        seg_windows = 0
+        # 只按已完成复制的窗口提交；中途停止时尚未复制的窗口不得计入校验范围
+        copied_end = last_ms
+        for start_ms, end_ms, rows in windows:
+            if self._stop:
                 break
-            start_dt = f"toDateTime64({last_ms}/1000.0, 3, 'UTC')"
-            end_dt = f"toDateTime64({end_ms}/1000.0, 3, 'UTC')"
-
-            # 构造与 INSERT 同源的 hot 端计数 SQL，避免与可见性/remote 差异引入抖动
-            if self.cross_instance:
-                remote_src = f"remote('{self.hot_host}:{self.hot_port}', 'marketprism_hot', '{table}', '{self.hot_user}', '{self.hot_pwd}')"
-                insert_sql = (
-                    f"INSERT INTO marketprism_cold.{table} "
-                    f"SELECT * FROM {remote_src} "
-                    f"WHERE timestamp >= {start_dt} AND timestamp < {end_dt}"
-                )
-                hot_count_sql = (
-                    f"SELECT count() FROM {remote_src} WHERE timestamp >= {start_dt} AND timestamp < {end_dt}"
-                )
-                self._exec_cold(insert_sql)
-                hot_cnt = self._scalar_cold(hot_count_sql)
-            else:
-                insert_sql = (
-                    f"INSERT INTO marketprism_cold.{table} "
-                    f"SELECT * FROM marketprism_hot.{table} "
-                    f"WHERE timestamp >= {start_dt} AND timestamp < {end_dt}"
-                )
-                hot_count_sql = (
-                    f"SELECT count() FROM marketprism_hot.{table} WHERE timestamp >= {start_dt} AND timestamp < {end_dt}"
-                )
-                self._exec_cold(insert_sql)
-                hot_cnt = self._scalar_hot(hot_count_sql)
-
-            # 冷端计数短重试，缓解 INSERT 后的可见性瞬态导致的假阴性
-            attempts = 0
-            cold_cnt = 0
-            while attempts < 3:
-                cold_cnt = self._scalar_cold(
-                    f"SELECT count() FROM marketprism_cold.{table} WHERE timestamp >= {start_dt} AND timestamp < {end_dt}"
-                )
-                if cold_cnt >= hot_cnt:
-                    break
-                time.sleep(0.2 * (attempts + 1))
-                attempts += 1
+            await self._copy_window(table, start_ms, end_ms, rows)
+            copied_end = end_ms
+            seg_windows += 1
+            if copied_end - seg_start >= segment_ms:
+                self._commit_segment(table, seg_start, copied_end, seg_windows)
+                seg_start, seg_windows = copied_end, 0
+
+        if seg_windows:
+            self._commit_segment(table, seg_start, copied_end, seg_windows)
+
+    def _hot_source(self, table: str):
+        """热端数据源表达式及执行查询的一侧（跨实例时经冷端 remote() 访问热端）"""
+        if self.cross_instance:
+            remote_src = f"remote('{self.hot_host}:{self.hot_port}', 'marketprism_hot', '{table}', '{self.hot_user}', '{self.hot_pwd}')"
+            return remote_src, self._rows_cold
+        return f"marketprism_hot.{table}", self._rows_hot
+
+    @staticmethod
+    def _range_sql(start_ms: int, end_ms: int) -> str:
+        return (f"timestamp >= toDateTime64({start_ms}/1000.0, 3, 'UTC') "
+                f"AND timestamp < toDateTime64({end_ms}/1000.0, 3, 'UTC')")
+
+    def _plan_windows(self, table: str, start_ms: int, end_ms: int) -> List[Tuple[int, int, int]]:
+        """按热端分钟行数把 [start_ms, end_ms) 切成 (start, end, rows) 窗口"""
+        src, query = self._hot_source(table)
+        buckets = query(
+            f"SELECT toInt64(toUnixTimestamp(toStartOfMinute(timestamp))) * 1000 AS m, count() "
+            f"FROM {src} WHERE {self._range_sql(start_ms, end_ms)} GROUP BY m ORDER BY m"
+        )
+        return self._pack_windows(
+            [(int(m), int(c)) for m, c in buckets], start_ms, end_ms,
+            self.target_rows_per_window, self.max_window_minutes * 60 * 1000,
+        )
+
+    @staticmethod
+    def _pack_windows(buckets: List[Tuple[int, int]], start_ms: int, end_ms: int,
+                      target_rows: int, max_window_ms: int) -> List[Tuple[int, int, int]]:
+        """
+        合并分钟桶为窗口：累计行数将超过 target_rows 或跨度将超过 max_window_ms 时，
+        在下一个有数据的分钟处切开（单个分钟桶超出目标行数时独占一个窗口）。
+        无数据的区间并入相邻窗口，不单独产生往返。
+        """
+        windows = []
+        cur = start_ms
+        rows = 0
+        for minute_ms, count in buckets:
+            b_start = max(minute_ms, start_ms)
+            if rows and (rows + count > target_rows or b_start + 60000 - cur > max_window_ms):
+                windows.append((cur, b_start, rows))
+                cur, rows = b_start, 0
+            rows += count
+        if cur < end_ms:
+            windows.append((cur, end_ms, rows))
+        return windows
+
+    async def _copy_window(self, table: str, start_ms: int, end_ms: int, rows: int):
+        """复制单个窗口；大窗口按 (exchange, symbol) 哈希分片并行，失败分片单独重试（rows<0 表示未知）"""
+        if rows == 0:
+            return
+        src, _ = self._hot_source(table)
+        base_sql = (
+            f"INSERT INTO marketprism_cold.{table} SELECT * FROM {src} "
+            f"WHERE {self._range_sql(start_ms, end_ms)}"
+        )
+        if self.shard_count <= 1 or rows < self.shard_threshold_rows:
+            await asyncio.to_thread(self._exec_cold, base_sql)
+            return
 
-            self.logger.debug("window replicated", table=table, start=start_dt, end=end_dt, hot=hot_cnt, cold=cold_cnt, attempts=attempts)
-            if cold_cnt >= hot_cnt:
-                self._set_state_ms(table, end_ms)
-                self.success_windows += 1
-                processed += 1
-                last_ms = end_ms
-                #  update last success time
-                try:
-                    self.last_success_ts = time.time()
-                except Exception:
-                    pass
-            else:
-                raise RuntimeError(f"cold insufficient after retry: hot={hot_cnt}, cold={cold_cnt}, attempts={attempts}")
+        pending = list(range(self.shard_count))
+        for attempt in range(3):
+            results = await asyncio.gather(*(
+                asyncio.to_thread(
+                    self._exec_cold,
+                    f"{base_sql} AND cityHash64(exchange, symbol) % {self.shard_count} = {shard}",
+                )
+                for shard in pending
+            ), return_exceptions=True)
+            pending = [shard for shard, r in zip(pending, results) if isinstance(r, Exception)]
+            if not pending:
+                self.logger.debug("window replicated (sharded)", table=table, rows=rows, shards=self.shard_count)
+                return
+            await asyncio.sleep(0.2 * (attempt + 1))
+        raise RuntimeError(f"shard insert failed: table={table}, shards={pending}")
+
+    def _partition_checksums(self, table: str, start_ms: int, end_ms: int, cold: bool) -> Dict[Tuple[str, str], Tuple[int, int]]:
+        """按分区汇总 (count, sum(cityHash64(*)))"""
+        if cold:
+            src, query = f"marketprism_cold.{table}", self._rows_cold
+        else:
+            src, query = self._hot_source(table)
+        rows = query(
+            f"SELECT toString(toYYYYMM(timestamp)) AS p, toString(exchange) AS e, count(), sum(cityHash64(*)) "
+            f"FROM {src} WHERE {self._range_sql(start_ms, end_ms)} GROUP BY {self.PARTITION_KEY}"
+        )
+        return {(r[0], r[1]): (int(r[2]), int(r[3])) for r in rows}
+
+    def _commit_segment(self, table: str, start_ms: int, end_ms: int, windows: int):
+        """段级校验：各分区行数与校验和一致后推进水位"""
+        hot = self._partition_checksums(table, start_ms, end_ms, cold=False)
+        attempts = 0
+        while True:
+            cold = self._partition_checksums(table, start_ms, end_ms, cold=True)
+            missing = [p for p, (cnt, _) in hot.items() if cold.get(p, (0, 0))[0] < cnt]
+            # 冷端短重试，缓解 INSERT 后的可见性瞬态导致的假阴性
+            if not missing or attempts >= 2:
+                break
+            attempts += 1
+            time.sleep(0.2 * attempts)
+
+        if missing:
+            raise RuntimeError(
+                f"cold insufficient after retry: partitions={missing}, "
+                f"hot={[hot[p] for p in missing]}, cold={[cold.get(p) for p in missing]}"
+            )
+        # 行数一致但校验和不同：内容不一致；冷端多于热端（历史重试产生的重复）与旧逻辑一致放行
+        diverged = [p for p, v in hot.items() if cold.get(p) != v and cold.get(p, (0, 0))[0] == v[0]]
+        if diverged:
+            raise RuntimeError(f"checksum mismatch: table={table}, partitions={diverged}")
+
+        self._set_state_ms(table, end_ms)
+        self.success_windows += windows
+        self.last_success_ts = time.time()
+        self.logger.debug("segment verified", table=table, windows=windows,
+                          rows=sum(c for c, _ in hot.values()), partitions=len(hot))
 
     async def _update_lags(self):
+        """
+        延迟 = 热端最新时间 - 已复制水位
+
+        热端最新时间取自 system.parts 元数据（一次查询覆盖所有表）；不再对每张表双端 max(timestamp) 扫描。
+        DateTime64 列的分区 min/max_time 可能不可用（为 0），此时按排序键倒序取一行（只读最后的 granule）。
+        """
+        hot_max = {t: 0 for t in DEFAULT_TABLES}
+        try:
+            for table, max_ms in self._rows_hot(
+                "SELECT table, toInt64(toUnixTimestamp(max(max_time))) * 1000 FROM system.parts "
+                "WHERE database = 'marketprism_hot' AND active GROUP BY table"
+            ):
+                if table in hot_max:
+                    hot_max[table] = int(max_ms)
+        except Exception as e:
+            self.logger.debug("system.parts lag lookup failed", exception=e)
         for t in DEFAULT_TABLES:
-            hot_max = self._scalar_hot(f"SELECT toInt64(max(toUnixTimestamp64Milli(timestamp))) FROM marketprism_hot.{t}") or 0
-            cold_max = self._scalar_cold(f"SELECT toInt64(max(toUnixTimestamp64Milli(timestamp))) FROM marketprism_cold.{t}") or 0
+            if hot_max[t] <= 0:
+                hot_max[t] = self._scalar_hot(
+                    f"SELECT toInt64(toUnixTimestamp64Milli(timestamp)) FROM marketprism_hot.{t} "
+                    f"ORDER BY timestamp DESC LIMIT 1"
+                )
+            wm = self._get_state_ms(t)
             lag_min = 0
-            if hot_max > 0:
-                lag_min = (hot_max - cold_max) // 60000 if cold_max > 0 else 999999
-                if lag_min < 0:
-                    lag_min = 0
+            if hot_max[t] > 0:
+                lag_min = max((hot_max[t] - wm) // 60000, 0) if wm > 0 else 999999
             self.table_lag_minutes[t] = int(lag_min)
 
     # ----------------- 状态持久化 -----------------
-    def _get_state_ms(self, table: str) -> int:
+    def _load_state(self) -> Dict[str, Any]:
+        """水位常驻内存；仅首次访问时读取状态文件"""
+        if self._state is None:
+            try:
+                with open(self.state_path, "r", encoding="utf-8") as f:
+                    self._state = json.load(f) or {}
+            except Exception:
+                self._state = {}
+        return self._state
+
+    def _persist_state(self):
+        """原子落盘：写临时文件 + fsync 后 rename，崩溃时不会留下半截的状态文件"""
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.state_path)
         try:
-            with open(self.state_path, "r", encoding="utf-8") as f:
-                d = json.load(f) or {}
-            v = d.get(table)
-            return int(v) if isinstance(v, int) else 0
-        except Exception:
-            return 0
+            dir_fd = os.open(os.path.dirname(self.state_path), os.O_RDONLY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+        except OSError:
+            pass
+
+    def _get_state_ms(self, table: str) -> int:
+        v = self._load_state().get(table)
+        return int(v) if isinstance(v, int) and not isinstance(v, bool) else 0
 
     def _set_state_ms(self, table: str, ts_ms: int):
-        try:
-            d = {}
-            if os.path.exists(self.state_path):
-                with open(self.state_path, "r", encoding="utf-8") as f:
-                    d = json.load(f) or {}
-        except Exception:
-            d = {}
-        d[table] = int(ts_ms)
-        # fix: ensure dir exists before write
-        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
-        with open(self.state_path, "w", encoding="utf-8") as f:
-            json.dump(d, f)
+        """仅在窗口/段校验通过后调用：更新内存水位并落盘"""
+        self._load_state()[table] = int(ts_ms)
+        self._persist_state()
 
     # ----------------- CH 执行（HTTP） -----------------
     def _http_query(self, host: str, port: int, sql: str, user: Optional[str] = None, pwd: Optional[str] = None) -> str:
@@ -443,6 +583,18 @@ class HotToColdReplicator:
             self.logger.error("exec_cold error", exception=e, sql=sql)
             raise
 
+    @staticmethod
+    def _parse_rows(text: str) -> List[List[str]]:
+        return [line.split("\t") for line in text.splitlines() if line]
+
+    def _rows_cold(self, sql: str) -> List[List[str]]:
+        return self._parse_rows(self._http_query(
+            self.cold_host, self.cold_http_port, f"{sql} FORMAT TabSeparated", self.cold_user, self.cold_pwd))
+
+    def _rows_hot(self, sql: str) -> List[List[str]]:
+        return self._parse_rows(self._http_query(
+            self.hot_host, self.hot_http_port, f"{sql} FORMAT TabSeparated", self.hot_user, self.hot_pwd))
+
     def _scalar_cold(self, sql: str) -> int:
         try:
             s = self._http_query(self.cold_host, self.cold_http_port, f"{sql} FORMAT TabSeparated", self.cold_user, self.cold_pwd)
@@ -470,8 +622,8 @@ class HotToColdReplicator:
 
     async def _cleanup_by_watermark(self):
         """
-        基于各表水位进行清理：删除 (watermark - delay) 之前的热端数据。
-        注意：此处使用 ClickHouse 删除变更（mutation），建议按较大窗口进行，避免碎片化。
+        基于各表水位进行清理：热端分区整体落后于 (watermark - delay) 且冷端行数已确认时 DROP PARTITION。
+        分区删除只改元数据；部分覆盖的尾部分区按需（cleanup_partial_tail）使用删除变更，并限制频率。
         """
         delay_ms = self.cleanup_delay_minutes * 60 * 1000
         if delay_ms <= 0:
@@ -481,10 +633,8 @@ class HotToColdReplicator:
             wm = self._get_state_ms(table)
             cutoff = wm - delay_ms
             if wm > 0 and cutoff > 0 and cutoff < now_ms:
-                cutoff_dt = f"toDateTime64({cutoff}/1000.0, 3, 'UTC')"
-                sql = f"ALTER TABLE marketprism_hot.{table} DELETE WHERE timestamp < {cutoff_dt}"
                 try:
-                    self._exec_hot(sql)
+                    await asyncio.to_thread(self._cleanup_table, table, cutoff)
                 except Exception as e:
                     self.logger.warning("cleanup failed", table=table, exception=e)
                     try:
@@ -492,3 +642,88 @@ class HotToColdReplicator:
                     except Exception:
                         pass
 
+    @staticmethod
+    def _partition_range(partition: str) -> Optional[Tuple[int, int, str]]:
+        """
+        解析 system.parts.partition 为 (start_ms, end_ms, exchange)
+        支持 (toYYYYMMDD, exchange) / (toYYYYMM, exchange) / (toStartOfHour, exchange)，其它返回 None
+        """
+        m = _RE_PARTITION.match(partition.strip())
+        if not m:
+            return None
+        value, exchange = m.group(1).strip("'"), m.group(2)
+        try:
+            if value.isdigit() and len(value) == 8:
+                start = datetime.strptime(value, "%Y%m%d").replace(tzinfo=timezone.utc)
+                end = start + timedelta(days=1)
+            elif value.isdigit() and len(value) == 6:
+                start = datetime.strptime(value, "%Y%m").replace(tzinfo=timezone.utc)
+                end = (start + timedelta(days=32)).replace(day=1)
+            else:
+                start = datetime.fromisoformat(value.split(".")[0]).replace(tzinfo=timezone.utc)
+                if start.minute or start.second:
+                    return None
+                end = start + timedelta(hours=1)
+        except ValueError:
+            return None
+        return int(start.timestamp() * 1000), int(end.timestamp() * 1000), exchange
+
+    def _cleanup_table(self, table: str, cutoff_ms: int):
+        """按分区清理单表：只删除整体早于 cutoff 且冷端行数不少于热端的分区"""
+        parts = self._rows_hot(
+            f"SELECT partition_id, partition, sum(rows) FROM system.parts "
+            f"WHERE database = 'marketprism_hot' AND table = '{table}' AND active "
+            f"GROUP BY partition_id, partition"
+        )
+        tails: List[Tuple[int, str]] = []
+        skipped = False
+        for partition_id, partition, rows in parts:
+            rng = self._partition_range(partition)
+            if rng is None:
+                continue
+            start_ms, end_ms, exchange = rng
+            if start_ms >= cutoff_ms:
+                continue
+            if end_ms > cutoff_ms:
+                # 尾部分区：只有部分数据早于 cutoff
+                if int(rows):
+                    tails.append((start_ms, exchange))
+                if end_ms - start_ms > 86_400_000 and table not in self._coarse_partition_warned:
+                    self._coarse_partition_warned.add(table)
+                    self.logger.warning("hot table partitioned coarser than daily; "
+                                        "run scripts/migrate_hot_partitioning.py", table=table)
+                continue
+            cold_rows = self._scalar_cold(
+                f"SELECT count() FROM marketprism_cold.{table} "
+                f"WHERE {self._range_sql(start_ms, end_ms)} AND exchange = '{exchange}'"
+            )
+            if cold_rows < int(rows):
+                skipped = True
+                self.cleanup_stats["skipped_partitions"] += 1
+                self.logger.warning("partition not fully replicated, keep", table=table,
+                                    partition=partition, hot_rows=int(rows), cold_rows=cold_rows)
+                continue
+            self._exec_hot(f"ALTER TABLE marketprism_hot.{table} DROP PARTITION ID '{partition_id}'")
+            self.cleanup_stats["dropped_partitions"] += 1
+            self.cleanup_stats["dropped_rows"] += int(rows)
+            self.logger.info("hot partition dropped", table=table, partition=partition, rows=int(rows))
+
+        if not (tails and self.cleanup_partial_tail):
+            return
+        if skipped:
+            # 有未确认复制的分区被保留时不做尾部删除，避免误删更早的数据
+            self.logger.info("tail cleanup deferred: unreplicated partitions kept", table=table)
+            return
+        now = time.time()
+        if now - self._last_tail_cleanup.get(table, 0) < self.cleanup_tail_interval_minutes * 60:
+            return
+        # 删除范围限定在各尾部分区内，不触及其它分区
+        ranges = " OR ".join(
+            f"(exchange = '{exchange}' AND timestamp >= toDateTime64({start_ms}/1000.0, 3, 'UTC'))"
+            for start_ms, exchange in tails
+        )
+        cutoff_dt = f"toDateTime64({cutoff_ms}/1000.0, 3, 'UTC')"
+        self._exec_hot(f"ALTER TABLE marketprism_hot.{table} DELETE WHERE timestamp < {cutoff_dt} AND ({ranges})")
+        self._last_tail_cleanup[table] = now
+        self.cleanup_stats["tail_mutations"] += 1
+
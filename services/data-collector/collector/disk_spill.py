@@ -0,0 +1,385 @@
+"""
+NATS发布本地磁盘溢写（WAL）
+
+NATS 断连、重连中或发布积压时，发布器把已序列化的消息追加到本地滚动段文件，
+连接恢复后再按限速回放，避免断连/GC停顿期间的静默丢数。
+
+段文件 spill-<seq>.wal 由长度前缀的二进制记录组成（小端）：
+
+    [u32 body_len][u32 crc32(body)][body]
+    body = [f64 ts][u8 flags][u16 subject_len][u16 msg_id_len][subject][msg_id][payload]
+
+读取位置保存在 cursor 文件中（"<seq> <offset>"），进程重启后从上次提交处继续回放。
+总大小超过 max_bytes 时丢弃最旧的段（有界，计入 dropped_records）。
+
+持久性：写入经缓冲文件句柄，在切换段、关闭以及距上次刷盘超过 sync_interval 的追加时 flush；
+fsync=True 时同时 fsync。因此进程或系统崩溃最多丢失最近 sync_interval 内追加的记录，
+fsync=False 时系统崩溃（断电）还可能丢失页缓存中尚未落盘的数据。
+cursor 不做 fsync，崩溃后可能回退到较早位置，已回放的消息会按 msg_id 去重后重复发布。
+"""
+
+import os
+import struct
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import structlog
+
+
+_RECORD_HEADER = struct.Struct('<II')
+_BODY_HEADER = struct.Struct('<dBHH')
+_FLAG_JETSTREAM = 0x01
+
+_SEGMENT_PREFIX = 'spill-'
+_SEGMENT_SUFFIX = '.wal'
+_CURSOR_FILE = 'cursor'
+
+
+@dataclass
+class SpillRecord:
+    """溢写记录"""
+    subject: str
+    payload: bytes
+    msg_id: Optional[str] = None
+    use_jetstream: bool = False
+    ts: float = 0.0
+
+
+@dataclass
+class _Segment:
+    seq: int
+    path: str
+    size: int = 0
+    records: int = 0
+
+
+def encode_record(record: SpillRecord) -> bytes:
+    """编码为带长度前缀和CRC的二进制记录"""
+    subject = record.subject.encode('utf-8')
+    msg_id = (record.msg_id or '').encode('utf-8')
+    flags = _FLAG_JETSTREAM if record.use_jetstream else 0
+    body = b''.join((
+        _BODY_HEADER.pack(record.ts or time.time(), flags, len(subject), len(msg_id)),
+        subject, msg_id, record.payload,
+    ))
+    return _RECORD_HEADER.pack(len(body), zlib.crc32(body)) + body
+
+
+def decode_body(body: bytes) -> SpillRecord:
+    """解码记录体"""
+    ts, flags, subject_len, msg_id_len = _BODY_HEADER.unpack_from(body)
+    pos = _BODY_HEADER.size
+    subject = body[pos:pos + subject_len].decode('utf-8')
+    pos += subject_len
+    msg_id = body[pos:pos + msg_id_len].decode('utf-8') or None
+    pos += msg_id_len
+    return SpillRecord(
+        subject=subject,
+        payload=bytes(body[pos:]),
+        msg_id=msg_id,
+        use_jetstream=bool(flags & _FLAG_JETSTREAM),
+        ts=ts,
+    )
+
+
+class DiskSpillQueue:
+    """
+    基于滚动段文件的有界磁盘队列
+
+    单事件循环内使用，不加锁。写入走缓冲文件句柄，按 sync_interval 及切换段时刷盘，读取前按需flush。
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 512 * 1024 * 1024,
+                 segment_bytes: int = 16 * 1024 * 1024, fsync: bool = False,
+                 sync_interval: float = 1.0):
+        self.directory = directory
+        self.max_bytes = max(int(max_bytes), 1)
+        self.segment_bytes = max(int(segment_bytes), 1)
+        self.fsync = fsync
+        self.sync_interval = max(float(sync_interval), 0.0)
+        self._last_sync = time.monotonic()
+        self.logger = structlog.get_logger(__name__)
+
+        self._segments: List[_Segment] = []
+        self._writer = None
+        self._reader = None
+        self._reader_seq: Optional[int] = None
+        # 已提交的读取位置
+        self._cursor_seq = 0
+        self._cursor_offset = 0
+
+        self.pending_records = 0
+        self.appended_total = 0
+        self.drained_total = 0
+        self.dropped_records = 0
+        self.corrupt_records = 0
+        self._head_ts: Optional[float] = None
+
+        os.makedirs(directory, exist_ok=True)
+        self._recover()
+
+    # ---------------- 恢复 ----------------
+
+    def _recover(self):
+        """扫描已有段文件与读取位置；总是在新段上继续写入"""
+        seqs = []
+        for name in os.listdir(self.directory):
+            if name.startswith(_SEGMENT_PREFIX) and name.endswith(_SEGMENT_SUFFIX):
+                try:
+                    seqs.append(int(name[len(_SEGMENT_PREFIX):-len(_SEGMENT_SUFFIX)]))
+                except ValueError:
+                    continue
+        seqs.sort()
+
+        self._load_cursor()
+        for seq in seqs:
+            path = self._segment_path(seq)
+            if seq < self._cursor_seq:
+                self._remove_file(path)
+                continue
+            start = self._cursor_offset if seq == self._cursor_seq else 0
+            records, size = self._scan_segment(path, start)
+            if not records:
+                self._remove_file(path)
+                continue
+            self._segments.append(_Segment(seq=seq, path=path, size=size, records=records))
+            self.pending_records += records
+
+        if self._segments and self._segments[0].seq != self._cursor_seq:
+            self._cursor_seq, self._cursor_offset = self._segments[0].seq, 0
+
+        next_seq = (self._segments[-1].seq + 1) if self._segments else self._cursor_seq
+        self._open_segment(next_seq)
+        if not self.pending_records:
+            self._cursor_seq, self._cursor_offset = next_seq, 0
+
+        if self.pending_records:
+            self.logger.info("发现未回放的溢写数据", directory=self.directory,
+                             records=self.pending_records, segments=len(self._segments) - 1)
+
+    def _scan_segment(self, path: str, start: int) -> Tuple[int, int]:
+        """统计段内从 start 起的完整记录数，返回 (记录数, 有效文件长度)"""
+        records = 0
+        with open(path, 'rb') as f:
+            f.seek(start)
+            offset = start
+            while True:
+                header = f.read(_RECORD_HEADER.size)
+                if len(header) < _RECORD_HEADER.size:
+                    break
+                length, _ = _RECORD_HEADER.unpack(header)
+                f.seek(length, os.SEEK_CUR)
+                if f.tell() > os.fstat(f.fileno()).st_size:
+                    break  # 崩溃时残留的半条记录
+                offset = f.tell()
+                records += 1
+        return records, offset
+
+    def _load_cursor(self):
+        try:
+            with open(os.path.join(self.directory, _CURSOR_FILE), 'r') as f:
+                seq, offset = f.read().split()
+                self._cursor_seq, self._cursor_offset = int(seq), int(offset)
+        except (OSError, ValueError):
+            self._cursor_seq, self._cursor_offset = 0, 0
+
+    def _save_cursor(self):
+        path = os.path.join(self.directory, _CURSOR_FILE)
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            f.write(f"{self._cursor_seq} {self._cursor_offset}")
+        os.replace(tmp, path)
+
+    # ---------------- 写入 ----------------
+
+    def _segment_path(self, seq: int) -> str:
+        return os.path.join(self.directory, f"{_SEGMENT_PREFIX}{seq:012d}{_SEGMENT_SUFFIX}")
+
+    def _open_segment(self, seq: int):
+        if self._writer is not None:
+            self._writer.close()
+        path = self._segment_path(seq)
+        self._writer = open(path, 'ab')
+        self._segments.append(_Segment(seq=seq, path=path, size=self._writer.tell()))
+
+    def append(self, record: SpillRecord) -> None:
+        """追加一条记录；超出容量时丢弃最旧的段"""
+        if not record.ts:
+            record.ts = time.time()
+        data = encode_record(record)
+        active = self._segments[-1]
+        if active.size and active.size + len(data) > self.segment_bytes:
+            self.flush()
+            self._open_segment(active.seq + 1)
+            active = self._segments[-1]
+
+        while len(self._segments) > 1 and self.pending_bytes + len(data) > self.max_bytes:
+            self._drop_oldest_segment()
+
+        self._writer.write(data)
+        active.size += len(data)
+        active.records += 1
+        self.pending_records += 1
+        self.appended_total += 1
+        if self._head_ts is None and self.pending_records == 1:
+            self._head_ts = record.ts
+        if time.monotonic() - self._last_sync >= self.sync_interval:
+            self.flush()
+
+    def _drop_oldest_segment(self):
+        oldest = self._segments.pop(0)
+        self.dropped_records += oldest.records
+        self.pending_records -= oldest.records
+        if self._reader_seq == oldest.seq:
+            self._close_reader()
+        self._remove_file(oldest.path)
+        self._cursor_seq, self._cursor_offset = self._segments[0].seq, 0
+        self._head_ts = None
+        self._save_cursor()
+        self.logger.warning("溢写超过容量上限，丢弃最旧的段", seq=oldest.seq, records=oldest.records)
+
+    def flush(self):
+        if self._writer is not None:
+            self._writer.flush()
+            if self.fsync:
+                os.fsync(self._writer.fileno())
+        self._last_sync = time.monotonic()
+
+    # ---------------- 读取 ----------------
+
+    def read_batch(self, max_records: int) -> Tuple[List[SpillRecord], Tuple[int, int, int]]:
+        """
+        从已提交位置读取至多 max_records 条记录（不移动读取位置）
+
+        Returns:
+            (记录列表, 位置令牌)，回放成功后将令牌交给 commit()
+        """
+        records: List[SpillRecord] = []
+        seq, offset, in_segment = self._cursor_seq, self._cursor_offset, 0
+
+        while len(records) < max_records:
+            segment = self._find_segment(seq)
+            if segment is None:
+                break
+            if segment.seq != seq:
+                seq, offset, in_segment = segment.seq, 0, 0
+            active = segment is self._segments[-1]
+            if active:
+                self.flush()
+
+            reader = self._open_reader(segment)
+            reader.seek(offset)
+            while len(records) < max_records and offset < segment.size:
+                header = reader.read(_RECORD_HEADER.size)
+                if len(header) < _RECORD_HEADER.size:
+                    offset = segment.size
+                    break
+                length, crc = _RECORD_HEADER.unpack(header)
+                body = reader.read(length)
+                offset += _RECORD_HEADER.size + length
+                in_segment += 1
+                if len(body) < length or zlib.crc32(body) != crc:
+                    # 段内剩余数据不可信，整段跳过
+                    self.corrupt_records += 1
+                    offset = segment.size
+                    break
+                records.append(decode_body(body))
+
+            if offset >= segment.size and not active:
+                seq, offset, in_segment = seq + 1, 0, 0
+                continue
+            break
+
+        if records:
+            self._head_ts = records[0].ts
+        return records, (seq, offset, in_segment)
+
+    def commit(self, position: Tuple[int, int, int]) -> None:
+        """确认 read_batch 返回的记录已回放，推进读取位置并删除已消费的段"""
+        seq, offset, in_segment = position
+        while len(self._segments) > 1 and self._segments[0].seq < seq:
+            done = self._segments.pop(0)
+            self.pending_records -= done.records
+            self.drained_total += done.records
+            if self._reader_seq == done.seq:
+                self._close_reader()
+            self._remove_file(done.path)
+
+        head = self._segments[0]
+        if head.seq == seq:
+            in_segment = min(in_segment, head.records)
+            head.records -= in_segment
+            self.pending_records -= in_segment
+            self.drained_total += in_segment
+
+        self._cursor_seq, self._cursor_offset = head.seq, offset if head.seq == seq else 0
+        self._head_ts = None
+        self._save_cursor()
+
+    def _find_segment(self, seq: int) -> Optional[_Segment]:
+        for segment in self._segments:
+            if segment.seq >= seq:
+                return segment
+        return None
+
+    def _open_reader(self, segment: _Segment):
+        if self._reader_seq != segment.seq:
+            self._close_reader()
+            self._reader = open(segment.path, 'rb')
+            self._reader_seq = segment.seq
+        return self._reader
+
+    def _close_reader(self):
+        if self._reader is not None:
+            self._reader.close()
+        self._reader = None
+        self._reader_seq = None
+
+    def _remove_file(self, path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    # ---------------- 状态 ----------------
+
+    @property
+    def pending_bytes(self) -> int:
+        total = sum(segment.size for segment in self._segments)
+        return max(0, total - self._cursor_offset) if self.pending_records else 0
+
+    def __len__(self) -> int:
+        return self.pending_records
+
+    def drain_lag_seconds(self) -> float:
+        """最旧未回放记录的滞留时间"""
+        if not self.pending_records:
+            return 0.0
+        if self._head_ts is None:
+            records, _ = self.read_batch(1)
+            if not records:
+                return 0.0
+        return max(0.0, time.time() - self._head_ts)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'pending_records': self.pending_records,
+            'pending_bytes': self.pending_bytes,
+            'segments': len(self._segments),
+            'appended_total': self.appended_total,
+            'drained_total': self.drained_total,
+            'dropped_records': self.dropped_records,
+            'corrupt_records': self.corrupt_records,
+            'drain_lag_seconds': self.drain_lag_seconds(),
+        }
+
+    def close(self):
+        """刷盘并关闭文件句柄"""
+        self.flush()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        self._close_reader()
+        self._save_cursor()
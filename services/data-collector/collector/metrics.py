@@ -11,11 +11,37 @@ import psutil
 from datetime import datetime, timezone
 from typing import Dict, Any, Optional
 from prometheus_client import Counter, Gauge, Histogram, Info, CollectorRegistry, REGISTRY
+from prometheus_client.core import HistogramMetricFamily
 import structlog
 
 logger = structlog.get_logger(__name__)
 
 
+class GCPauseCollector:
+    """
+    GC停顿直方图导出
+
+    停顿由 GCController 在 gc 回调中无锁记录，抓取时再转换为 Prometheus 直方图
+    （不能在 gc 回调里直接调用 Histogram.observe，其内部锁不可重入）。
+    """
+
+    def __init__(self):
+        self.controller = None
+
+    def collect(self):
+        family = HistogramMetricFamily(
+            'marketprism_gc_duration_seconds',
+            'Time spent in garbage collection',
+            labels=['generation'],
+        )
+        controller = self.controller
+        if controller is not None:
+            pauses = controller.pauses
+            for generation in range(3):
+                family.add_metric([str(generation)], pauses.cumulative(generation), pauses.sums[generation])
+        yield family
+
+
 class MetricsCollector:
     """指标收集器"""
 
@@ -152,6 +178,21 @@ class MetricsCollector:
             registry=self.registry
         )
 
+        self.snapshot_schedule_drift_seconds = Histogram(
+            'marketprism_snapshot_schedule_drift_seconds',
+            'Delay between a symbol snapshot tick being due and being dispatched',
+            ['exchange', 'market_type', 'symbol'],
+            buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+            registry=self.registry
+        )
+
+        self.snapshot_skipped_ticks_total = Counter(
+            'marketprism_snapshot_skipped_ticks_total',
+            'Total number of skipped snapshot ticks (reason=inflight|late)',
+            ['exchange', 'market_type', 'symbol', 'reason'],
+            registry=self.registry
+        )
+
 
         # WebSocket连接指标
         self.websocket_connected = Gauge(
@@ -204,6 +245,28 @@ class MetricsCollector:
             registry=self.registry
         )
 
+        # NATS 本地磁盘溢写
+        self.nats_spill_pending_records = Gauge(
+            'marketprism_nats_spill_pending_records',
+            'Number of messages waiting in the local NATS spill',
+            registry=self.registry
+        )
+        self.nats_spill_pending_bytes = Gauge(
+            'marketprism_nats_spill_pending_bytes',
+            'Size of the local NATS spill in bytes',
+            registry=self.registry
+        )
+        self.nats_spill_drain_lag_seconds = Gauge(
+            'marketprism_nats_spill_drain_lag_seconds',
+            'Age of the oldest message waiting in the local NATS spill',
+            registry=self.registry
+        )
+        self.nats_spill_dropped_records = Gauge(
+            'marketprism_nats_spill_dropped_records',
+            'Messages dropped because the local NATS spill exceeded its size limit',
+            registry=self.registry
+        )
+
         self.nats_publish_duration = Histogram(
             'marketprism_nats_publish_duration_seconds',
             'Time spent publishing messages to NATS',
@@ -298,10 +361,13 @@ class MetricsCollector:
             registry=self.registry
         )
 
-        self.gc_duration_seconds = Histogram(
-            'marketprism_gc_duration_seconds',
-            'Time spent in garbage collection',
-            ['generation'],
+        # GC停顿直方图（数据来自内存管理器的 GCController）
+        self.gc_duration_seconds = GCPauseCollector()
+        self.registry.register(self.gc_duration_seconds)
+
+        self.gc_deferred_full_collections = Gauge(
+            'marketprism_gc_deferred_full_collections',
+            'Full collections postponed because of orderbook queue backlog',
             registry=self.registry
         )
 
@@ -480,6 +546,12 @@ class MetricsCollector:
             self.forced_gc_count.set(float(counters.get('forced_gc_count', 0)))
             # 冷静期跳过计数
             self.forced_cleanup_cooldown_skips.set(float(counters.get('forced_cleanup_cooldown_skips', 0)))
+
+            # GC停顿与推迟的全量回收
+            gc_controller = getattr(memory_manager, 'gc_controller', None)
+            if gc_controller is not None:
+                self.gc_duration_seconds.controller = gc_controller
+                self.gc_deferred_full_collections.set(float(gc_controller.deferred_full_collections))
         except Exception as e:
             self.logger.error("更新内存管理器指标失败", error=str(e))
 
@@ -622,6 +694,15 @@ class MetricsCollector:
 
             self.nats_connected.set(connected)
 
+            # 磁盘溢写
+            get_spill_stats = getattr(nats_client, 'get_spill_stats', None)
+            spill_stats = get_spill_stats() if callable(get_spill_stats) else None
+            if spill_stats:
+                self.nats_spill_pending_records.set(spill_stats.get('pending_records', 0))
+                self.nats_spill_pending_bytes.set(spill_stats.get('pending_bytes', 0))
+                self.nats_spill_drain_lag_seconds.set(spill_stats.get('drain_lag_seconds', 0.0))
+                self.nats_spill_dropped_records.set(spill_stats.get('dropped_records', 0))
+
         except Exception as e:
             self.logger.error("更新NATS指标失败", error=str(e))
 
@@ -33,6 +33,7 @@ except ImportError:
 from .data_types import Exchange, MarketType, DataType
 from .normalizer import DataNormalizer
 from .log_sampler import should_log_data_processing
+from .disk_spill import DiskSpillQueue, SpillRecord
 
 
 
@@ -62,6 +63,18 @@ class NATSConfig:
     # 兼容发布模式：core=旧主题仅走Core NATS；jetstream=旧主题也走JetStream（需要热端过滤以避免双写）
     compat_publish_mode: str = 'core'
 
+    # 本地磁盘溢写：NATS 断连/重连中或发布积压时落盘，恢复后按限速回放（默认关闭，需显式开启）
+    # 持久性见 disk_spill：崩溃最多丢失最近 spill_sync_interval 秒内的记录；spill_fsync 关闭时断电还可能丢失页缓存
+    spill_enabled: bool = False
+    spill_fsync: bool = True
+    spill_sync_interval: float = 1.0
+    spill_dir: str = field(default_factory=lambda: os.getenv('MARKETPRISM_NATS_SPILL_DIR', '/tmp/marketprism/nats_spill'))
+    spill_max_bytes: int = 512 * 1024 * 1024
+    spill_segment_bytes: int = 16 * 1024 * 1024
+    spill_drain_rate: int = 2000  # 回放速率（条/秒）
+    max_inflight: int = 1000  # 同时等待中的发布数上限
+    max_pending_bytes: int = 8 * 1024 * 1024  # 客户端出站缓冲上限
+
 
 
 
@@ -125,6 +138,7 @@ def create_nats_config_from_yaml(config_dict: Dict[str, Any]) -> NATSConfig:
     publish_cfg = nats_cfg.get('publish', {})
     jetstream_cfg = nats_cfg.get('jetstream', {})
     naming_cfg = (publish_cfg.get('naming', {}) or {})
+    spill_cfg = (publish_cfg.get('spill', {}) or {})
 
     # 从 YAML 的 nats.streams 构建 subject_templates
     streams_map = nats_cfg.get('streams', {})
@@ -168,6 +182,15 @@ def create_nats_config_from_yaml(config_dict: Dict[str, Any]) -> NATSConfig:
         metrics_market_type_mode=naming_cfg.get('metrics_market_type_mode', 'strict'),
         compat_old_subjects=naming_cfg.get('compat_old_subjects', False),
         compat_publish_mode=naming_cfg.get('compat_publish_mode', 'core'),
+        spill_enabled=spill_cfg.get('enabled', False),
+        spill_fsync=spill_cfg.get('fsync', True),
+        spill_sync_interval=spill_cfg.get('sync_interval', 1.0),
+        spill_dir=os.getenv('MARKETPRISM_NATS_SPILL_DIR') or spill_cfg.get('dir', '/tmp/marketprism/nats_spill'),
+        spill_max_bytes=spill_cfg.get('max_bytes', 512 * 1024 * 1024),
+        spill_segment_bytes=spill_cfg.get('segment_bytes', 16 * 1024 * 1024),
+        spill_drain_rate=spill_cfg.get('drain_rate', 2000),
+        max_inflight=spill_cfg.get('max_inflight', 1000),
+        max_pending_bytes=spill_cfg.get('max_pending_bytes', 8 * 1024 * 1024),
     )
 
 
@@ -181,6 +204,8 @@ class PublishStats:
     connection_errors: int = 0
     publish_errors: int = 0
     data_quality_issues: int = 0
+    spilled: int = 0
+    replayed: int = 0
 
 
 class NATSPublisher:
@@ -226,6 +251,12 @@ class NATSPublisher:
         self.buffer_lock = asyncio.Lock()
         self.last_flush_time = time.time()
 
+        # 磁盘溢写（按需创建）与回放任务
+        self.spill: Optional[DiskSpillQueue] = None
+        self._spill_drain_task: Optional[asyncio.Task] = None
+        self._inflight = 0
+        self._last_connect_attempt = 0.0
+
         # 检查NATS可用性
         if not NATS_AVAILABLE:
             self.logger.warning("NATS客户端不可用，请安装: pip install nats-py")
@@ -254,6 +285,7 @@ class NATSPublisher:
             except Exception:
                 pass
 
+            self._last_connect_attempt = time.time()
             try:
                 self.logger.info("连接到NATS服务器", servers=self.config.servers)
 
@@ -296,6 +328,8 @@ class NATSPublisher:
 
                 self._is_connected = True
                 self.logger.info("NATS连接成功")
+                if self.config.spill_enabled:
+                    self._start_spill_drain()
                 return True
 
             except Exception as e:
@@ -306,6 +340,8 @@ class NATSPublisher:
 
     async def disconnect(self):
         """断开NATS连接"""
+        await self._stop_spill_drain()
+
         async with self.connection_lock:
             try:
                 # 刷新缓冲区
@@ -576,7 +612,7 @@ class NATSPublisher:
         Returns:
             发布是否成功
         """
-        if not self.is_connected:
+        if not self.is_connected and not self._defer_reconnect_to_spill():
             # 尝试重连
             self.logger.warning("NATS未连接，尝试重新连接",
                               exchange=exchange,
@@ -587,7 +623,8 @@ class NATSPublisher:
                                 exchange=exchange,
                                 market_type=market_type,
                                 symbol=symbol)
-                return False
+                if not self.config.spill_enabled:
+                    return False
 
         try:
             start_time = time.time()
@@ -724,26 +761,34 @@ class NATSPublisher:
                 # 低频数据：使用 JetStream 保证可靠性
                 use_js = (self.js is not None) if use_jetstream is None else (use_jetstream and self.js is not None)
 
-            # 发布消息
+            # 使用JetStream发布时附带 Msg-Id 以幂等去重（溢写回放同样使用）
+            msg_id = None
             if use_js:
-                # 使用JetStream发布，支持幂等去重（Msg-Id）
-                headers = None
                 try:
-                    dt_val = message_data.get('data_type')
-                    msg_id = self._build_msg_id(dt_val, exchange, normalized_symbol, message_data)
-                    if msg_id:
-                        headers = {'Nats-Msg-Id': msg_id}
+                    msg_id = self._build_msg_id(message_data.get('data_type'), exchange, normalized_symbol, message_data)
                 except Exception:
-                    headers = None
+                    msg_id = None
 
-                ack = await self.js.publish(subject, message_bytes, headers=headers)
-                self.logger.debug("JetStream消息发布成功",
-                                subject=subject, sequence=ack.seq)
+            # 断连、重连中或发布积压：写入本地溢写，由后台任务限速回放
+            if self.config.spill_enabled and self._should_spill():
+                self._spill(subject, message_bytes, msg_id, use_js)
+                return True
 
-            else:
-                # 使用核心NATS发布
-                await self.client.publish(subject, message_bytes)
-                self.logger.debug("NATS消息发布成功", subject=subject)
+            # 发布消息
+            self._inflight += 1
+            try:
+                if use_js:
+                    headers = {'Nats-Msg-Id': msg_id} if msg_id else None
+                    ack = await self.js.publish(subject, message_bytes, headers=headers)
+                    self.logger.debug("JetStream消息发布成功",
+                                    subject=subject, sequence=ack.seq)
+
+                else:
+                    # 使用核心NATS发布
+                    await self.client.publish(subject, message_bytes)
+                    self.logger.debug("NATS消息发布成功", subject=subject)
+            finally:
+                self._inflight -= 1
 
 
             # 6 兼容双发：短期过渡期向旧主题再发一份（默认走 Core，避免 JetStream 双写）
@@ -889,6 +934,16 @@ class NATSPublisher:
             except Exception:
                 pass
 
+            # 已序列化的消息转入本地溢写，不在热路径上重试
+            if self.config.spill_enabled and 'message_bytes' in locals():
+                try:
+                    self._spill(subject, message_bytes, locals().get('msg_id'), bool(locals().get('use_js')))
+                    self.stats.publish_errors += 1
+                    self.logger.warning("发布失败，消息已写入本地溢写", subject=subject, error=str(wrapped_error))
+                    return True
+                except Exception as spill_error:
+                    self.logger.error("写入本地溢写失败", subject=subject, error=str(spill_error))
+
             self.logger.error("发布消息失败",
                             subject=subject if 'subject' in locals() else 'unknown',
                             error=str(wrapped_error))
@@ -901,29 +956,29 @@ class NATSPublisher:
         """带重试机制的发布方法"""
         from collector.retry_mechanism import nats_retry
 
-        @nats_retry("nats_publish")
-        async def _do_publish():
-            message_bytes = message_data.encode('utf-8')
-
-            if self.config.enable_jetstream and self.js:
-                # 使用JetStream发布（附带Msg-Id以幂等去重）
-                headers = None
+        message_bytes = message_data.encode('utf-8')
+        use_js = bool(self.config.enable_jetstream and self.js)
+        msg_id = None
+        if use_js:
+            try:
                 try:
-                    try:
-                        payload = orjson.loads(message_data)
-                    except Exception:
-                        payload = {}
-                    parts = subject.split('.')
-                    dt = parts[0] if parts else payload.get('data_type')
-                    # 兼容可能的 "orderbook-data" 主题前缀
-                    dt = (dt.split('-')[0] if isinstance(dt, str) else dt) or ''
-                    ex = parts[1] if len(parts) > 1 else payload.get('exchange')
-                    sym = parts[3] if len(parts) > 3 else payload.get('symbol')
-                    msg_id = self._build_msg_id(dt, ex or '', sym or '', payload)
-                    if msg_id:
-                        headers = {'Nats-Msg-Id': msg_id}
+                    payload = orjson.loads(message_data)
                 except Exception:
-                    headers = None
+                    payload = {}
+                parts = subject.split('.')
+                dt = parts[0] if parts else payload.get('data_type')
+                # 兼容可能的 "orderbook-data" 主题前缀
+                dt = (dt.split('-')[0] if isinstance(dt, str) else dt) or ''
+                ex = parts[1] if len(parts) > 1 else payload.get('exchange')
+                sym = parts[3] if len(parts) > 3 else payload.get('symbol')
+                msg_id = self._build_msg_id(dt, ex or '', sym or '', payload)
+            except Exception:
+                msg_id = None
+
+        async def _do_publish():
+            if use_js:
+                # 使用JetStream发布（附带Msg-Id以幂等去重）
+                headers = {'Nats-Msg-Id': msg_id} if msg_id else None
                 ack = await self.js.publish(subject, message_bytes, headers=headers)
                 self.logger.debug("JetStream消息发布成功",
                                 subject=subject, sequence=ack.seq)
@@ -932,7 +987,141 @@ class NATSPublisher:
                 await self.client.publish(subject, message_bytes)
                 self.logger.debug("NATS消息发布成功", subject=subject)
 
-        await _do_publish()
+        if not self.config.spill_enabled:
+            await nats_retry("nats_publish")(_do_publish)()
+            return
+
+        # 启用溢写时不做原地重试：失败或积压直接落盘
+        if self._should_spill():
+            self._spill(subject, message_bytes, msg_id, use_js)
+            return
+        try:
+            await _do_publish()
+        except Exception as e:
+            self.logger.warning("发布失败，消息已写入本地溢写", subject=subject, error=str(e))
+            self._spill(subject, message_bytes, msg_id, use_js)
+
+    # ---------------- 本地磁盘溢写 ----------------
+
+    def _defer_reconnect_to_spill(self) -> bool:
+        """启用溢写时，客户端自动重连中或处于重连冷却期则不在热路径上等待重连"""
+        if not self.config.spill_enabled:
+            return False
+        if self.client is not None and not self.client.is_closed and self.client.is_reconnecting:
+            return True
+        return (time.time() - self._last_connect_attempt) < self.config.reconnect_time_wait
+
+    def _should_spill(self) -> bool:
+        """断连、重连中、在途发布数或出站缓冲超过上限时转入溢写"""
+        client = self.client
+        if not self.is_connected or client.is_reconnecting:
+            return True
+        if self._inflight >= self.config.max_inflight:
+            return True
+        try:
+            return client.pending_data_size > self.config.max_pending_bytes
+        except Exception:
+            return False
+
+    def _get_spill(self) -> DiskSpillQueue:
+        if self.spill is None:
+            self.spill = DiskSpillQueue(
+                self.config.spill_dir,
+                max_bytes=self.config.spill_max_bytes,
+                segment_bytes=self.config.spill_segment_bytes,
+                fsync=self.config.spill_fsync,
+                sync_interval=self.config.spill_sync_interval,
+            )
+        return self.spill
+
+    def _spill(self, subject: str, message_bytes: bytes, msg_id: Optional[str], use_js: bool):
+        """写入本地溢写并确保回放任务在运行"""
+        self._get_spill().append(SpillRecord(subject=subject, payload=message_bytes,
+                                             msg_id=msg_id, use_jetstream=use_js))
+        self.stats.spilled += 1
+        self._start_spill_drain()
+
+    def _start_spill_drain(self):
+        if self._spill_drain_task is not None and not self._spill_drain_task.done():
+            return
+        try:
+            self._get_spill()
+            self._spill_drain_task = asyncio.get_running_loop().create_task(self._spill_drain_loop())
+        except RuntimeError:
+            # 无运行中的事件循环（同步上下文），下次连接成功时再启动
+            pass
+
+    async def _stop_spill_drain(self):
+        task, self._spill_drain_task = self._spill_drain_task, None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        if self.spill is not None:
+            self.spill.close()
+            self.spill = None
+
+    async def _spill_drain_loop(self):
+        """连接健康时按 spill_drain_rate 限速回放溢写数据"""
+        interval = 0.1
+        while True:
+            try:
+                spill = self.spill
+                if spill is None or not len(spill) or self._should_spill():
+                    await asyncio.sleep(interval if spill is not None and len(spill) else 0.5)
+                    continue
+
+                started = time.monotonic()
+                budget = max(1, int(self.config.spill_drain_rate * interval))
+                records, position = spill.read_batch(budget)
+                sent = await self._replay_records(records)
+                if sent == len(records):
+                    spill.commit(position)
+                else:
+                    # 只提交已成功回放的前缀，其余等待下一轮
+                    _, prefix = spill.read_batch(sent)
+                    spill.commit(prefix)
+                self.stats.replayed += sent
+                if sent:
+                    self.logger.debug("溢写数据回放", replayed=sent, pending=len(spill))
+
+                await asyncio.sleep(max(0.0, interval - (time.monotonic() - started)))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.warning("溢写回放失败", error=str(e))
+                await asyncio.sleep(1.0)
+
+    async def _replay_records(self, records: List[SpillRecord]) -> int:
+        """按顺序回放记录，返回成功条数（遇到失败即停止）"""
+        sent = 0
+        for record in records:
+            self._inflight += 1
+            try:
+                if record.use_jetstream and self.js is not None:
+                    headers = {'Nats-Msg-Id': record.msg_id} if record.msg_id else None
+                    await self.js.publish(record.subject, record.payload, headers=headers)
+                else:
+                    await self.client.publish(record.subject, record.payload)
+            except Exception as e:
+                self.logger.warning("溢写回放发布失败", subject=record.subject, error=str(e))
+                break
+            finally:
+                self._inflight -= 1
+            sent += 1
+        return sent
+
+    def get_spill_stats(self) -> Optional[Dict[str, Any]]:
+        """磁盘溢写统计（未启用时返回 None）"""
+        if not self.config.spill_enabled:
+            return None
+        stats = self.spill.get_stats() if self.spill is not None else {
+            'pending_records': 0, 'pending_bytes': 0, 'drain_lag_seconds': 0.0, 'dropped_records': 0,
+        }
+        stats.update(spilled=self.stats.spilled, replayed=self.stats.replayed)
+        return stats
 
     async def publish_orderbook(self, exchange: str, market_type: str, symbol: str,
                                orderbook_data: Dict[str, Any]) -> bool:
@@ -1412,7 +1601,8 @@ class NATSPublisher:
             'connection_errors': self.stats.connection_errors,
             'publish_errors': self.stats.publish_errors,
             'is_connected': self.is_connected,
-            'buffer_size': len(self.publish_buffer)
+            'buffer_size': len(self.publish_buffer),
+            'spill': self.get_spill_stats(),
         }
 
     def get_health_status(self) -> Dict[str, Any]:
@@ -2037,6 +2037,10 @@ class BaseOrderBookManager(ABC):
         """获取统计信息"""
         return self.stats.copy()
 
+    def get_backlog_depth(self) -> int:
+        """所有交易对消息队列的当前积压总量（供GC控制器判断空闲期）"""
+        return sum(queue.qsize() for queue in list(self.message_queues.values()))
+
     def get_orderbook_state(self, symbol: str) -> Optional[OrderBookState]:
         """获取订单簿状态"""
         unique_key = self._get_unique_key(symbol)
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import asyncio
+import random
 import time
 from abc import ABC, abstractmethod
 from decimal import Decimal
@@ -10,6 +11,8 @@ import structlog
 
 from collector.data_types import PriceLevel
 
+from .shared_rest_session import SharedRestSession, acquire_shared_session, fetch_json, release_shared_session
+
 
 class BaseOrderBookSnapManager(ABC):
     """
@@ -17,15 +20,20 @@ class BaseOrderBookSnapManager(ABC):
 
     Responsibilities:
     - lifecycle (start/stop)
-    - fixed 1-second tick scheduling (no phase staggering)
+    - staggered tick scheduling: each symbol owns a phase slot of interval/len(symbols),
+      plus a small random jitter, so requests are spread across the interval instead of
+      bursting at the top of every tick
     - per-symbol fetch via _fetch_one(symbol)
+    - shared keep-alive REST session per exchange with request coalescing (REST managers)
     - normalization + publish helper hooks
-    - minimal metrics/log hooks (logger only for now)
-    
+    - per-symbol schedule drift / skipped tick metrics
+
     Notes:
     - Frequency is fixed to 1s (by config). We will NOT auto downscale interval.
     - If previous request for a symbol hasn't completed, we skip this tick for that symbol
       to avoid request piling.
+    - If the loop falls behind by a full interval (event loop stall), missed ticks are
+      skipped and the schedule re-aligns rather than firing a catch-up burst.
     """
 
     def __init__(
@@ -55,6 +63,16 @@ class BaseOrderBookSnapManager(ABC):
         self.snapshot_interval: float = float(self.config.get("snapshot_interval", 1))
         # depth used for fetching (subclasses should honor when calling API)
         self.snapshot_depth: int = int(self.config.get("snapshot_depth", self.config.get("depth_limit", 100)))
+        # jitter as a fraction of one symbol slot (0 disables)
+        self.snapshot_jitter: float = min(max(float(self.config.get("snapshot_jitter", 0.2)), 0.0), 1.0)
+
+        # shared REST session (REST managers only)
+        self._shared_rest: Optional[SharedRestSession] = None
+        self._session: Optional[Any] = None
+
+        # scheduling stats
+        self.skipped_ticks: Dict[str, int] = {}
+        self.last_drift: Dict[str, float] = {}
 
     async def start(self) -> bool:
         if self._running:
@@ -82,19 +100,41 @@ class BaseOrderBookSnapManager(ABC):
         self.logger.info("Snapshot manager stopped")
 
     async def _fetch_loop(self) -> None:
-        next_ts = time.monotonic()
+        symbols = list(self.symbols)
+        if not symbols:
+            return
+        n = len(symbols)
+        slot = self.snapshot_interval / n
+        jitter = slot * self.snapshot_jitter
+        start = time.monotonic()
+        k = 0  # global tick index; symbol = symbols[k % n]
         try:
             while self._running:
-                next_ts += self.snapshot_interval
-                for sym in self.symbols:
-                    # Skip if previous tick still in-flight for this symbol
-                    t = self._inflight.get(sym)
-                    if t and not t.done():
-                        # Skipping prevents piling
-                        continue
-                    self._inflight[sym] = asyncio.create_task(self._safe_fetch_one(sym))
-                # precise sleep to align to ticks
-                await asyncio.sleep(max(0.0, next_ts - time.monotonic()))
+                due = start + k * slot + (random.uniform(0.0, jitter) if jitter else 0.0)
+                delay = due - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                now = time.monotonic()
+
+                # Fell behind by a full round: skip missed ticks and re-align (no burst)
+                behind = int((now - start) / slot) - k
+                if behind >= n:
+                    for missed in range(k, k + behind):
+                        self._record_skip(symbols[missed % n], "late")
+                    k += behind
+                    continue
+
+                sym = symbols[k % n]
+                k += 1
+                self._record_drift(sym, now - due)
+
+                # Skip if previous tick still in-flight for this symbol
+                t = self._inflight.get(sym)
+                if t and not t.done():
+                    # Skipping prevents piling
+                    self._record_skip(sym, "inflight")
+                    continue
+                self._inflight[sym] = asyncio.create_task(self._safe_fetch_one(sym))
         except asyncio.CancelledError:
             pass
         except Exception as e:
@@ -106,6 +146,57 @@ class BaseOrderBookSnapManager(ABC):
                     task.cancel()
             self._inflight.clear()
 
+    def _record_drift(self, symbol: str, drift: float) -> None:
+        self.last_drift[symbol] = drift
+        if self.metrics:
+            try:
+                self.metrics.snapshot_schedule_drift_seconds.labels(
+                    exchange=self.exchange,
+                    market_type=self.market_type,
+                    symbol=symbol
+                ).observe(max(0.0, drift))
+            except Exception:
+                pass
+
+    def _record_skip(self, symbol: str, reason: str) -> None:
+        self.skipped_ticks[symbol] = self.skipped_ticks.get(symbol, 0) + 1
+        if self.metrics:
+            try:
+                self.metrics.snapshot_skipped_ticks_total.labels(
+                    exchange=self.exchange,
+                    market_type=self.market_type,
+                    symbol=symbol,
+                    reason=reason
+                ).inc()
+            except Exception:
+                pass
+
+    # ---------------- shared REST session ----------------
+
+    async def _acquire_rest_session(self, rest_base: str) -> None:
+        """Attach to the keep-alive session shared by all managers of this REST endpoint."""
+        self._shared_rest = await acquire_shared_session(
+            rest_base,
+            limit_per_host=int(self.config.get("rest_connection_limit", 32)),
+        )
+        self._session = self._shared_rest.session
+
+    async def _release_rest_session(self) -> None:
+        shared, self._shared_rest = self._shared_rest, None
+        self._session = None
+        if shared:
+            await release_shared_session(shared)
+
+    async def _rest_get_json(self, url: str, params: Dict[str, Any], timeout: Optional[float] = None):
+        """
+        GET via the shared session; concurrent identical requests are coalesced.
+
+        Returns (status, body): body is parsed JSON on 200, response text otherwise.
+        """
+        if self._shared_rest is not None:
+            return await self._shared_rest.get_json(url, params, timeout, session=self._session)
+        return await fetch_json(self._session, url, params, timeout)
+
     async def _safe_fetch_one(self, symbol: str) -> None:
         start_time = time.time()
         status = "success"
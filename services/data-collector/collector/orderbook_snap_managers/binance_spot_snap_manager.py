@@ -3,8 +3,6 @@ from __future__ import annotations
 import asyncio
 from typing import Any, Dict, List, Optional
 
-import aiohttp
-
 from .base_orderbook_snap_manager import BaseOrderBookSnapManager
 
 
@@ -15,7 +13,7 @@ class BinanceSpotSnapManager(BaseOrderBookSnapManager):
     要点：
     - 每个 1s tick 内对每个符号发起 REST GET 请求
     - 超时或错误时跳过本 tick，不降频
-    - 使用 aiohttp 会话池复用连接
+    - 同一 REST 入口的管理器共享 keep-alive 会话，相同请求并发时合并
     """
 
     def __init__(
@@ -31,19 +29,15 @@ class BinanceSpotSnapManager(BaseOrderBookSnapManager):
         super().__init__(exchange, market_type, symbols, normalizer, nats_publisher, config, metrics_collector)
         self.rest_base: str = (config or {}).get("rest_base") or "https://api.binance.com"
         self.request_timeout: float = float(self.config.get("request_timeout", min(0.9, self.snapshot_interval * 0.8)))
-        self._session: Optional[aiohttp.ClientSession] = None
 
     async def start(self) -> bool:
-        # 创建 aiohttp 会话（复用连接）
-        timeout = aiohttp.ClientTimeout(total=self.request_timeout)
-        self._session = aiohttp.ClientSession(timeout=timeout)
+        # 共享会话（按 REST 入口复用连接）
+        await self._acquire_rest_session(self.rest_base)
         return await super().start()
 
     async def stop(self) -> None:
         await super().stop()
-        if self._session:
-            await self._session.close()
-            self._session = None
+        await self._release_rest_session()
 
     async def _fetch_one(self, symbol: str) -> None:
         if not self._session:
@@ -53,17 +47,15 @@ class BinanceSpotSnapManager(BaseOrderBookSnapManager):
         url = f"{self.rest_base}/api/v3/depth"
         params = {"symbol": symbol, "limit": int(self.snapshot_depth)}
         try:
-            async with self._session.get(url, params=params) as resp:
-                if resp.status != 200:
-                    text = await resp.text()
-                    self.logger.warning("REST 快照请求失败", symbol=symbol, status=resp.status, body=text[:200])
-                    return
-                data = await resp.json()
-                bids = data.get("bids") or []
-                asks = data.get("asks") or []
-                last_update_id = data.get("lastUpdateId")
-                # Binance Spot REST 快照无事件时间，使用 None
-                await self._normalize_and_publish(symbol, bids, asks, last_update_id=last_update_id, event_time_ms=None)
+            status, data = await self._rest_get_json(url, params, self.request_timeout)
+            if status != 200:
+                self.logger.warning("REST 快照请求失败", symbol=symbol, status=status, body=str(data)[:200])
+                return
+            bids = data.get("bids") or []
+            asks = data.get("asks") or []
+            last_update_id = data.get("lastUpdateId")
+            # Binance Spot REST 快照无事件时间，使用 None
+            await self._normalize_and_publish(symbol, bids, asks, last_update_id=last_update_id, event_time_ms=None)
         except asyncio.TimeoutError:
             self.logger.warning("REST 快照超时，跳过", symbol=symbol, timeout=self.request_timeout)
         except Exception as e:
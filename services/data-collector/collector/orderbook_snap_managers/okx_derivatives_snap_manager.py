@@ -3,8 +3,6 @@ from __future__ import annotations
 import asyncio
 from typing import Any, Dict, List, Optional
 
-import aiohttp
-
 from .base_orderbook_snap_manager import BaseOrderBookSnapManager
 
 
@@ -15,7 +13,7 @@ class OKXDerivativesSnapManager(BaseOrderBookSnapManager):
     要点：
     - 每个 1s tick 内对每个符号发起 REST GET 请求
     - 超时或错误时跳过本 tick，不降频
-    - 使用 aiohttp 会话池复用连接
+    - 同一 REST 入口的管理器共享 keep-alive 会话，相同请求并发时合并
     - 与 OKXSpotSnapManager 共享相同的 REST 端点，仅 instId 不同（永续为 BTC-USDT-SWAP）
     """
 
@@ -32,18 +30,15 @@ class OKXDerivativesSnapManager(BaseOrderBookSnapManager):
         super().__init__(exchange, market_type, symbols, normalizer, nats_publisher, config, metrics_collector)
         self.rest_base: str = (config or {}).get("rest_base") or "https://www.okx.com"
         self.request_timeout: float = float(self.config.get("request_timeout", min(0.9, self.snapshot_interval * 0.8)))
-        self._session: Optional[aiohttp.ClientSession] = None
 
     async def start(self) -> bool:
-        timeout = aiohttp.ClientTimeout(total=self.request_timeout)
-        self._session = aiohttp.ClientSession(timeout=timeout)
+        # 共享会话（按 REST 入口复用连接）
+        await self._acquire_rest_session(self.rest_base)
         return await super().start()
 
     async def stop(self) -> None:
         await super().stop()
-        if self._session:
-            await self._session.close()
-            self._session = None
+        await self._release_rest_session()
 
     async def _fetch_one(self, symbol: str) -> None:
         if not self._session:
@@ -53,26 +48,24 @@ class OKXDerivativesSnapManager(BaseOrderBookSnapManager):
         url = f"{self.rest_base}/api/v5/market/books"
         params = {"instId": symbol, "sz": int(self.snapshot_depth)}
         try:
-            async with self._session.get(url, params=params) as resp:
-                if resp.status != 200:
-                    text = await resp.text()
-                    self.logger.warning("REST 快照请求失败", symbol=symbol, status=resp.status, body=text[:200])
-                    return
-                data = await resp.json()
-                # OKX 响应格式：{"code":"0", "msg":"", "data":[{"asks":[[p,q,...]...], "bids":...}]}
-                if data.get("code") != "0":
-                    self.logger.warning("OKX REST 返回错误", symbol=symbol, code=data.get("code"), msg=data.get("msg"))
-                    return
-                data_list = data.get("data") or []
-                if not data_list:
-                    self.logger.warning("OKX REST 返回空数据", symbol=symbol)
-                    return
-                book = data_list[0]
-                bids = book.get("bids") or []
-                asks = book.get("asks") or []
-                # OKX 快照无 lastUpdateId，使用 ts（毫秒时间戳）
-                ts_ms = int(book.get("ts", 0))
-                await self._normalize_and_publish(symbol, bids, asks, last_update_id=None, event_time_ms=ts_ms if ts_ms else None)
+            status, data = await self._rest_get_json(url, params, self.request_timeout)
+            if status != 200:
+                self.logger.warning("REST 快照请求失败", symbol=symbol, status=status, body=str(data)[:200])
+                return
+            # OKX 响应格式：{"code":"0", "msg":"", "data":[{"asks":[[p,q,...]...], "bids":...}]}
+            if data.get("code") != "0":
+                self.logger.warning("OKX REST 返回错误", symbol=symbol, code=data.get("code"), msg=data.get("msg"))
+                return
+            data_list = data.get("data") or []
+            if not data_list:
+                self.logger.warning("OKX REST 返回空数据", symbol=symbol)
+                return
+            book = data_list[0]
+            bids = book.get("bids") or []
+            asks = book.get("asks") or []
+            # OKX 快照无 lastUpdateId，使用 ts（毫秒时间戳）
+            ts_ms = int(book.get("ts", 0))
+            await self._normalize_and_publish(symbol, bids, asks, last_update_id=None, event_time_ms=ts_ms if ts_ms else None)
         except asyncio.TimeoutError:
             self.logger.warning("REST 快照超时，跳过", symbol=symbol, timeout=self.request_timeout)
         except Exception as e:
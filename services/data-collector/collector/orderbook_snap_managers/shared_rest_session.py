@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Dict, Optional, Tuple
+
+import aiohttp
+import structlog
+
+
+_logger = structlog.get_logger("snap_manager:shared_rest")
+
+# (rest_base, id(loop)) -> SharedRestSession；会话绑定事件循环，不跨循环复用
+_SESSIONS: Dict[Tuple[str, int], "SharedRestSession"] = {}
+
+
+class SharedRestSession:
+    """
+    按交易所 REST 入口共享的 keep-alive 会话。
+
+    - 同一 rest_base 的所有快照管理器共用一个 TCPConnector，避免每个管理器各自建连
+    - 相同 url+params 的并发 GET 合并为一次请求，所有等待方共享结果
+    - 引用计数：最后一个管理器释放时关闭会话
+    """
+
+    def __init__(self, rest_base: str, session: aiohttp.ClientSession) -> None:
+        self.rest_base = rest_base
+        self.session = session
+        self.refs = 0
+        self.inflight: Dict[Tuple[str, Tuple[Tuple[str, Any], ...]], asyncio.Task] = {}
+        self.requests_total = 0
+        self.coalesced_total = 0
+
+    async def get_json(
+        self,
+        url: str,
+        params: Dict[str, Any],
+        timeout: Optional[float] = None,
+        session: Optional[aiohttp.ClientSession] = None,
+    ) -> Tuple[int, Any]:
+        """
+        GET 并解析响应。
+
+        Returns:
+            (status, body)：200 时 body 为解析后的 JSON，否则为响应文本
+        """
+        key = (url, tuple(sorted(params.items())))
+        task = self.inflight.get(key)
+        if task is not None:
+            self.coalesced_total += 1
+            return await asyncio.shield(task)
+
+        self.requests_total += 1
+        task = asyncio.ensure_future(fetch_json(session or self.session, url, params, timeout))
+        self.inflight[key] = task
+        task.add_done_callback(lambda t, k=key: self._on_done(k, t))
+        # shield：首个调用方被取消时，请求继续为其他等待方完成
+        return await asyncio.shield(task)
+
+    def _on_done(self, key, task: asyncio.Task) -> None:
+        if self.inflight.get(key) is task:
+            del self.inflight[key]
+        if not task.cancelled():
+            # 标记异常已读取；所有等待方都被取消时避免 "exception was never retrieved"
+            task.exception()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "rest_base": self.rest_base,
+            "refs": self.refs,
+            "inflight": len(self.inflight),
+            "requests_total": self.requests_total,
+            "coalesced_total": self.coalesced_total,
+        }
+
+
+async def fetch_json(
+    session: aiohttp.ClientSession,
+    url: str,
+    params: Dict[str, Any],
+    timeout: Optional[float] = None,
+) -> Tuple[int, Any]:
+    """单次 GET；超时按请求设置，共享会话不绑定统一超时"""
+    kwargs: Dict[str, Any] = {"params": params}
+    if timeout:
+        kwargs["timeout"] = aiohttp.ClientTimeout(total=timeout)
+    async with session.get(url, **kwargs) as resp:
+        if resp.status != 200:
+            return resp.status, await resp.text()
+        return resp.status, await resp.json()
+
+
+async def acquire_shared_session(
+    rest_base: str,
+    limit_per_host: int = 32,
+    keepalive_timeout: float = 30.0,
+) -> SharedRestSession:
+    """获取（必要时创建）rest_base 对应的共享会话并增加引用"""
+    key = (rest_base, id(asyncio.get_running_loop()))
+    shared = _SESSIONS.get(key)
+    if shared is None or shared.session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=0,
+            limit_per_host=limit_per_host,
+            keepalive_timeout=keepalive_timeout,
+            ttl_dns_cache=300,
+        )
+        shared = SharedRestSession(rest_base, aiohttp.ClientSession(connector=connector))
+        _SESSIONS[key] = shared
+        _logger.info("创建共享REST会话", rest_base=rest_base, limit_per_host=limit_per_host)
+    shared.refs += 1
+    return shared
+
+
+async def release_shared_session(shared: SharedRestSession) -> None:
+    """释放引用；无人使用时关闭会话"""
+    shared.refs -= 1
+    if shared.refs > 0:
+        return
+    for key, value in list(_SESSIONS.items()):
+        if value is shared:
+            del _SESSIONS[key]
+    for task in list(shared.inflight.values()):
+        task.cancel()
+    shared.inflight.clear()
+    if not shared.session.closed:
+        await shared.session.close()
+    _logger.info("关闭共享REST会话", rest_base=shared.rest_base,
+                 requests_total=shared.requests_total, coalesced_total=shared.coalesced_total)
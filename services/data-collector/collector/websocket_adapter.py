@@ -306,14 +306,18 @@ class WebSocketAdapter:
                         await asyncio.sleep(1)
                         continue
 
+                    # 回调的协程判断按回调对象缓存，避免每条消息重复判断
+                    callback = None
+                    callback_is_async = False
+
                     # 接收消息
                     async for message in current_connection:
                         if not self.is_connected:
                             break
 
                         try:
-                            # 解析消息
-                            if isinstance(message, str):
+                            # 解析消息（二进制帧直接交给 orjson，无需先解码为 str）
+                            if isinstance(message, (str, bytes, bytearray, memoryview)):
                                 data = orjson.loads(message)
                             else:
                                 data = message
@@ -326,10 +330,13 @@ class WebSocketAdapter:
 
                             # 调用回调函数（保持向后兼容）
                             if self.on_message_callback:
-                                if asyncio.iscoroutinefunction(self.on_message_callback):
-                                    await self.on_message_callback(data)
+                                if callback is not self.on_message_callback:
+                                    callback = self.on_message_callback
+                                    callback_is_async = asyncio.iscoroutinefunction(callback)
+                                if callback_is_async:
+                                    await callback(data)
                                 else:
-                                    self.on_message_callback(data)
+                                    callback(data)
 
                         except (orjson.JSONDecodeError, ValueError) as e:  # orjson 抛出 ValueError
                             self.logger.error("消息解析失败", error=str(e))
@@ -0,0 +1,192 @@
+"""
+MarketPrism GC控制器
+
+- 启动完成后 gc.freeze()，长期存活的配置/管理器对象移入永久代，不再被分代回收扫描
+- 按消息处理的分配模式调大 gen0/gen1 阈值；gen2 不再自动触发，由控制器在空闲期执行
+- 通过 gc.callbacks 测量每次回收的停顿，按代记录为直方图
+- 全量回收推迟到订单簿队列积压较低的空闲期，超过最长间隔则强制执行
+"""
+
+import bisect
+import gc
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import structlog
+
+
+# 停顿直方图桶上界（秒）
+DEFAULT_PAUSE_BUCKETS: Tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+)
+
+# gen2 阈值为“gen1 回收次数”，取足够大的值即等价于手动触发
+MANUAL_GEN2_THRESHOLD = 1_000_000
+
+
+class GCPauseHistogram:
+    """
+    按代统计的GC停顿直方图
+
+    在 gc 回调中更新，只做计数与求和、不加锁
+    （prometheus_client 的锁不可重入，在回调中直接 observe 可能死锁）。
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_PAUSE_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        # 每代：[各桶计数..., 溢出桶]
+        self.counts: List[List[int]] = [[0] * (len(self.buckets) + 1) for _ in range(3)]
+        self.sums: List[float] = [0.0, 0.0, 0.0]
+        self.max_pause: List[float] = [0.0, 0.0, 0.0]
+
+    def observe(self, generation: int, pause: float):
+        self.counts[generation][bisect.bisect_left(self.buckets, pause)] += 1
+        self.sums[generation] += pause
+        if pause > self.max_pause[generation]:
+            self.max_pause[generation] = pause
+
+    def cumulative(self, generation: int) -> List[Tuple[str, int]]:
+        """Prometheus 累积桶 [(le, count), ..., ('+Inf', total)]"""
+        result = []
+        running = 0
+        for bound, count in zip(self.buckets, self.counts[generation]):
+            running += count
+            result.append((str(bound), running))
+        running += self.counts[generation][-1]
+        result.append(('+Inf', running))
+        return result
+
+    def count(self, generation: int) -> int:
+        return sum(self.counts[generation])
+
+
+class GCController:
+    """停顿感知的垃圾回收控制器"""
+
+    def __init__(self,
+                 gen0_threshold: int = 20000,
+                 gen1_threshold: int = 20,
+                 quiet_backlog: int = 200,
+                 max_full_interval: float = 600.0,
+                 pause_buckets: Tuple[float, ...] = DEFAULT_PAUSE_BUCKETS):
+        self.gen0_threshold = gen0_threshold
+        self.gen1_threshold = gen1_threshold
+        self.quiet_backlog = quiet_backlog
+        self.max_full_interval = max_full_interval
+        self.logger = structlog.get_logger(__name__)
+
+        self.pauses = GCPauseHistogram(pause_buckets)
+        self.backlog_sources: List[Callable[[], int]] = []
+
+        self._installed = False
+        self._original_thresholds: Optional[Tuple[int, int, int]] = None
+        self._gc_start = 0.0
+        self._perf_counter = time.perf_counter
+
+        self.last_full_collect = time.time()
+        self.full_collections = 0
+        self.deferred_full_collections = 0
+        self.frozen_objects = 0
+        self.last_collected = 0
+
+    # ---------------- 安装/卸载 ----------------
+
+    def install(self):
+        """注册停顿回调并调整分代阈值"""
+        if self._installed:
+            return
+        self._original_thresholds = gc.get_threshold()
+        gc.set_threshold(self.gen0_threshold, self.gen1_threshold, MANUAL_GEN2_THRESHOLD)
+        gc.callbacks.append(self._on_gc)
+        self._installed = True
+        self.last_full_collect = time.time()
+        self.logger.info("GC控制器已启用",
+                         thresholds=gc.get_threshold(),
+                         original_thresholds=self._original_thresholds)
+
+    def uninstall(self):
+        """移除回调并恢复原分代阈值"""
+        if not self._installed:
+            return
+        try:
+            gc.callbacks.remove(self._on_gc)
+        except ValueError:
+            pass
+        if self._original_thresholds:
+            gc.set_threshold(*self._original_thresholds)
+        self._installed = False
+
+    def freeze(self) -> int:
+        """
+        启动完成后冻结当前所有存活对象
+
+        先做一次全量回收，避免把垃圾一起冻结；之后这些对象不再参与任何代的扫描。
+        """
+        gc.collect()
+        gc.freeze()
+        self.frozen_objects = gc.get_freeze_count()
+        self.logger.info("启动对象已冻结", frozen_objects=self.frozen_objects)
+        return self.frozen_objects
+
+    def _on_gc(self, phase: str, info: Dict[str, Any]):
+        if phase == 'start':
+            self._gc_start = self._perf_counter()
+        else:
+            self.pauses.observe(info['generation'], self._perf_counter() - self._gc_start)
+
+    # ---------------- 全量回收调度 ----------------
+
+    def register_backlog_source(self, source: Callable[[], int]):
+        """注册积压深度来源（如 BaseOrderBookManager.get_backlog_depth）"""
+        self.backlog_sources.append(source)
+
+    def current_backlog(self) -> int:
+        total = 0
+        for source in self.backlog_sources:
+            try:
+                total += int(source())
+            except Exception:
+                continue
+        return total
+
+    def maybe_full_collect(self) -> Optional[int]:
+        """
+        空闲期执行全量回收
+
+        积压不高于 quiet_backlog 时执行；否则推迟，但距上次全量回收超过
+        max_full_interval 时仍强制执行，防止老年代无限增长。
+
+        Returns:
+            回收对象数；推迟时返回 None
+        """
+        backlog = self.current_backlog()
+        overdue = (time.time() - self.last_full_collect) >= self.max_full_interval
+        if backlog > self.quiet_backlog and not overdue:
+            self.deferred_full_collections += 1
+            self.logger.debug("积压较高，推迟全量GC", backlog=backlog,
+                              deferred=self.deferred_full_collections)
+            return None
+        return self.collect_full(reason='overdue' if backlog > self.quiet_backlog else 'quiet')
+
+    def collect_full(self, reason: str = 'manual') -> int:
+        """立即执行全量回收"""
+        collected = gc.collect(2)
+        self.last_full_collect = time.time()
+        self.full_collections += 1
+        self.last_collected = collected
+        self.logger.debug("全量GC完成", reason=reason, collected_objects=collected,
+                          max_pause_ms=round(self.pauses.max_pause[2] * 1000, 3))
+        return collected
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'installed': self._installed,
+            'thresholds': gc.get_threshold(),
+            'frozen_objects': self.frozen_objects,
+            'full_collections': self.full_collections,
+            'deferred_full_collections': self.deferred_full_collections,
+            'last_full_collect': self.last_full_collect,
+            'pause_count': [self.pauses.count(g) for g in range(3)],
+            'pause_seconds_sum': list(self.pauses.sums),
+            'pause_seconds_max': list(self.pauses.max_pause),
+        }
@@ -13,6 +13,8 @@ from dataclasses import dataclass, field
 from datetime import datetime, timezone
 import structlog
 
+from .gc_controller import GCController
+
 
 @dataclass
 class SystemResourceStats:
@@ -78,7 +80,13 @@ class SystemResourceConfig:
     # 监控间隔
     monitor_interval: int = 60  # 监控间隔60秒
     cleanup_interval: int = 300  # 清理间隔5分钟
-    gc_interval: int = 60  # GC间隔1分钟
+    gc_interval: int = 60  # 全量GC检查间隔1分钟（空闲期才执行）
+
+    # GC控制器：分代阈值按消息处理的短命对象分配模式调大，gen2 由控制器在空闲期触发
+    gc_gen0_threshold: int = 20000
+    gc_gen1_threshold: int = 20
+    gc_quiet_backlog: int = 200  # 订单簿队列总积压不高于该值视为空闲期
+    gc_max_full_interval: int = 600  # 全量GC最长推迟时间（秒）
 
     # 统计数据保留
     max_stats_history: int = 1000  # 最大统计历史记录
@@ -112,6 +120,12 @@ class SystemResourceManager:
         self.cleanup_task: Optional[asyncio.Task] = None
 
         self.gc_task: Optional[asyncio.Task] = None
+        self.gc_controller = GCController(
+            gen0_threshold=self.config.gc_gen0_threshold,
+            gen1_threshold=self.config.gc_gen1_threshold,
+            quiet_backlog=self.config.gc_quiet_backlog,
+            max_full_interval=self.config.gc_max_full_interval,
+        )
 
         # 进程信息
         self.process = psutil.Process()
@@ -155,6 +169,7 @@ class SystemResourceManager:
             return
 
         self.is_running = True
+        self.gc_controller.install()
 
         # 启动监控任务
         self.monitor_task = asyncio.create_task(self._system_monitor_loop())
@@ -195,6 +210,7 @@ class SystemResourceManager:
             except asyncio.CancelledError:
                 pass
 
+        self.gc_controller.uninstall()
         self.logger.info("内存管理器已停止")
 
     def register_connection_pool(self, pool: Any):
@@ -207,6 +223,18 @@ class SystemResourceManager:
         self.data_buffers.append(buffer)
         self.logger.debug("注册数据缓冲区", buffer_type=type(buffer).__name__)
 
+    def register_backlog_source(self, source: Any):
+        """注册积压深度来源，全量GC推迟到积压较低时执行"""
+        self.gc_controller.register_backlog_source(source)
+
+    def freeze_startup_objects(self) -> int:
+        """启动完成后冻结长期存活对象（配置、管理器等），之后不再被GC扫描"""
+        try:
+            return self.gc_controller.freeze()
+        except Exception as e:
+            self.logger.warning("冻结启动对象失败", error=str(e))
+            return 0
+
     async def _system_monitor_loop(self):
         """系统资源监控循环"""
         while self.is_running:
@@ -223,11 +251,12 @@ class SystemResourceManager:
 
     async def _gc_loop(self):
         """
-        周期性GC循环（与清理循环解耦，保证GC频率）
+        周期性GC循环（与清理循环解耦）：仅在空闲期执行全量回收
         """
         while self.is_running:
             try:
-                await self._force_garbage_collection()
+                if self.gc_controller.maybe_full_collect() is not None:
+                    self.last_gc_time = time.time()
             except asyncio.CancelledError:
                 break
             except Exception as e:
@@ -658,8 +687,11 @@ class SystemResourceManager:
                 gc_interval = min(gc_interval, 60)  # 最多60秒一次
 
             if time.time() - self.last_gc_time > gc_interval:
-                await self._force_garbage_collection()
-                self.last_gc_time = time.time()
+                if cleanup_intensity == "aggressive":
+                    await self._force_garbage_collection()
+                    self.last_gc_time = time.time()
+                elif self.gc_controller.maybe_full_collect() is not None:
+                    self.last_gc_time = time.time()
 
             self.counters['total_cleanups'] += 1
             self.last_cleanup_time = time.time()
@@ -882,21 +914,15 @@ class SystemResourceManager:
             self.logger.info("重置统计计数器", old_counters=old_counters)
 
     async def _force_garbage_collection(self):
-        """强制垃圾回收（分代）"""
+        """强制垃圾回收（紧急情况，不等待空闲期）"""
         try:
-            # 执行分代垃圾回收，尽量回收暂存的小对象/字符串池
-            gen0 = gc.collect(0)
-            gen1 = gc.collect(1)
-            gen2 = gc.collect(2)
-            total = gen0 + gen1 + gen2
+            # 全量回收已包含 gen0/gen1，无需逐代重复扫描
+            total = self.gc_controller.collect_full(reason='forced')
 
             self.counters['forced_gc_count'] += 1
 
             self.logger.debug(
                 "强制垃圾回收完成",
-                gen0=gen0,
-                gen1=gen1,
-                gen2=gen2,
                 collected_objects=total,
                 total_gc_count=self.counters['forced_gc_count'],
             )
@@ -989,6 +1015,7 @@ class SystemResourceManager:
 
             # 统计计数器
             "counters": self.counters.copy(),
+            "gc": self.gc_controller.get_stats(),
             "last_cleanup": self.last_cleanup_time,
             "is_running": self.is_running,
             "stats_count": len(self.stats_history)
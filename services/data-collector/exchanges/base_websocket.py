@@ -43,6 +43,10 @@ class BaseWebSocketClient(ABC):
         self.message_count = 0
         self.error_count = 0
         self.reconnect_count = 0
+
+        # 回调分发缓存：避免每条消息都做 iscoroutinefunction 判断
+        self._cached_callback: Optional[Callable] = None
+        self._cached_callback_is_async = False
     
     @abstractmethod
     async def start(self) -> bool:
@@ -123,6 +127,21 @@ class BaseWebSocketClient(ABC):
         """
         pass
     
+    async def _dispatch_update(self, symbol: str, data: Dict[str, Any]):
+        """
+        调用订单簿/成交回调（接收热路径）
+
+        协程判断按回调对象缓存，回调被替换后自动重新判断。
+        """
+        callback = self.on_orderbook_update
+        if callback is not self._cached_callback:
+            self._cached_callback = callback
+            self._cached_callback_is_async = asyncio.iscoroutinefunction(callback)
+        if self._cached_callback_is_async:
+            await callback(symbol, data)
+        else:
+            callback(symbol, data)
+
     def get_stats(self) -> Dict[str, Any]:
         """
         获取统计信息
@@ -38,6 +38,12 @@ if str(exchanges_dir) not in sys.path:
 from base_websocket import BaseWebSocketClient
 
 
+# 接收热路径的事件分发常量
+_TRADE_EVENTS = frozenset(('trade', 'aggTrade'))
+_SPOT_DEPTH_FIELDS = ('U', 'u', 'b', 'a')
+_PERPETUAL_DEPTH_FIELDS = _SPOT_DEPTH_FIELDS + ('pu',)
+
+
 class BinanceWebSocketClient(BaseWebSocketClient):
     """
     Binance WebSocket客户端
@@ -95,6 +101,10 @@ class BinanceWebSocketClient(BaseWebSocketClient):
         self.websocket = None
         self.listen_task = None
 
+        # 多流名称 -> symbol 缓存（避免每条消息 split/upper）
+        self._stream_symbols: Dict[str, str] = {}
+        self._depth_required_fields = _PERPETUAL_DEPTH_FIELDS if market_type == 'perpetual' else _SPOT_DEPTH_FIELDS
+
         # 观测与指标
         # 配置可能在 system.observability 或直接在 observability 下
         self._observability_cfg = (
@@ -526,15 +536,17 @@ class BinanceWebSocketClient(BaseWebSocketClient):
                 async for message in self.websocket:
                     try:
                         self.message_count += 1
-
-
-                        # 🔍 详细记录每条消息
-                        self.logger.debug("📨 收到WebSocket消息",
-                                       message_count=self.message_count,
-                                       message_size=len(str(message)),
-                                       connection_status="active")
+                        now = time.time()
+                        debug = self.logger.is_debug_enabled()
+
+                        # 🔍 详细记录每条消息（仅DEBUG开启时构造参数）
+                        if debug:
+                            self.logger.debug("📨 收到WebSocket消息",
+                                           message_count=self.message_count,
+                                           message_size=len(message),
+                                           connection_status="active")
                         # 摘要与阈值：每 interval 输出一次（受配置开关控制）
-                        if self._summary_enabled and (time.time() - self._last_summary_ts >= self._summary_interval_sec):
+                        if self._summary_enabled and (now - self._last_summary_ts >= self._summary_interval_sec):
                             try:
                                 if self._last_summary["reconnects"] > self._warn_reconnects:
                                     self.logger.warning("⚠️ WS重连频率偏高", interval_sec=self._summary_interval_sec, reconnects=self._last_summary["reconnects"])
@@ -546,7 +558,7 @@ class BinanceWebSocketClient(BaseWebSocketClient):
                                 self._last_summary = {"pings": 0, "pongs": 0, "failures": 0, "reconnects": 0}
 
                         # 更新最后消息时间
-                        self.last_message_time = time.time()
+                        self.last_message_time = now
 
                         # 处理心跳消息 - Binance服务器发送的PING
                         if message == 'ping':
@@ -596,7 +608,7 @@ class BinanceWebSocketClient(BaseWebSocketClient):
                             continue
 
                         # 定期报告状态（降级为DEBUG，减少频繁输出）
-                        if self.message_count % 100 == 0:  # 每100条消息报告一次
+                        if debug and self.message_count % 100 == 0:  # 每100条消息报告一次
                             self.logger.debug("📊 消息处理状态",
                                             processed=self.message_count,
                                             connection_alive=True,
@@ -663,18 +675,69 @@ class BinanceWebSocketClient(BaseWebSocketClient):
             self.logger.error("❌ 断开Binance WebSocket失败", error=str(e))
 
     async def _handle_message(self, message: Dict[str, Any]):
-        """处理WebSocket消息（参考OKX的消息处理结构和数据验证）"""
+        """
+        处理WebSocket消息（参考OKX的消息处理结构和数据验证）
+
+        按出现频率分发：先看事件类型 'e'（深度更新/逐笔成交），再看多流、API响应与快照。
+        """
         try:
+            debug = self.logger.is_debug_enabled()
             # 🔍 调试：记录所有接收到的消息
-            self.logger.debug("🔍 Binance WebSocket收到消息",
-                           message_keys=list(message.keys()) if isinstance(message, dict) else "非字典",
-                           market_type=self.market_type,
-                           message_preview=str(message)[:200])
+            if debug:
+                self.logger.debug("🔍 Binance WebSocket收到消息",
+                               message_keys=list(message.keys()) if isinstance(message, dict) else "非字典",
+                               market_type=self.market_type,
+                               message_preview=str(message)[:200])
 
             if not self.on_orderbook_update:
                 self.logger.warning("❌ 回调函数未设置")
                 return
 
+            event = message.get('e')
+
+            # 🔧 根据官方文档：处理深度更新消息
+            if event == 'depthUpdate':
+                await self._handle_depth_update(message)
+                return
+
+            # 🔧 新增：处理逐笔成交数据
+            if event in _TRADE_EVENTS:
+                symbol = message.get('s', '').upper()
+
+                if not symbol:
+                    # 🔧 修复：避免参数冲突，使用不同的参数名
+                    self.logger.warning("Trade message missing symbol", raw_message=str(message)[:200])
+                    return
+
+                if debug:
+                    self.logger.debug("💹 处理Binance逐笔成交数据",
+                                      symbol=symbol,
+                                      event_type=event,
+                                      trade_id=message.get('t', 'N/A'),
+                                      price=message.get('p', 'N/A'),
+                                      quantity=message.get('q', 'N/A'),
+                                      trade_time=message.get('T', 'N/A'))
+                await self._call_update_callback(symbol, message)
+                return
+
+            # 处理多流格式消息
+            if 'stream' in message and 'data' in message:
+                stream = message['stream']
+                data = message['data']
+                symbol = self._stream_symbols.get(stream)
+                if symbol is None:
+                    symbol = self._stream_symbols[stream] = stream.split('@')[0].upper()
+
+                if debug:
+                    self.logger.debug("处理Binance多流消息", symbol=symbol, stream=stream)
+
+                # 验证数据完整性（参考OKX的数据验证）
+                if self._validate_orderbook_data(data):
+                    await self._call_update_callback(symbol, data)
+                else:
+                    self.logger.warning("❌ 多流消息数据验证失败", symbol=symbol)
+                return
+
             # 处理WebSocket API响应（包括订阅确认和depth请求响应）
             if 'id' in message:
                 request_id = message.get('id')
@@ -694,48 +757,8 @@ class BinanceWebSocketClient(BaseWebSocketClient):
                         self.logger.warning("Subscription may have failed", subscription_message=message)
                     return
 
-            # 处理多流格式消息
-            if 'stream' in message and 'data' in message:
-                stream = message['stream']
-                data = message['data']
-                symbol = stream.split('@')[0].upper()
-
-                self.logger.debug("处理Binance多流消息", symbol=symbol, stream=stream)
-
-                # 验证数据完整性（参考OKX的数据验证）
-                if self._validate_orderbook_data(data):
-                    await self._call_update_callback(symbol, data)
-                else:
-                    self.logger.warning("❌ 多流消息数据验证失败", symbol=symbol)
-
-            # 🔧 新增：处理逐笔成交数据
-            elif 'e' in message and message.get('e') in ['trade', 'aggTrade']:
-                symbol = message.get('s', '').upper()
-
-                if not symbol:
-                    # 🔧 修复：避免参数冲突，使用不同的参数名
-                    self.logger.warning("Trade message missing symbol", raw_message=str(message)[:200])
-                    return
-
-                # 记录逐笔成交信息
-                trade_data = {
-                    'symbol': symbol,
-                    'event_type': message.get('e'),
-                    'trade_id': message.get('t', 'N/A'),
-                    'price': message.get('p', 'N/A'),
-                    'quantity': message.get('q', 'N/A'),
-                    'trade_time': message.get('T', 'N/A')
-                }
-
-                self.logger.debug("💹 处理Binance逐笔成交数据", **trade_data)
-                await self._call_update_callback(symbol, message)
-
-            # 🔧 根据官方文档：处理深度更新消息
-            elif 'e' in message and message.get('e') == 'depthUpdate':
-                await self._handle_depth_update(message)
-
             # 处理完整订单簿快照格式
-            elif 'lastUpdateId' in message and 'bids' in message and 'asks' in message:
+            if 'lastUpdateId' in message and 'bids' in message and 'asks' in message:
                 symbol = self.symbols[0].upper() if self.symbols else "UNKNOWN"
 
                 # 转换为增量更新格式
@@ -746,10 +769,11 @@ class BinanceWebSocketClient(BaseWebSocketClient):
                     'a': message['asks']
                 }
 
-                self.logger.debug("转换快照为增量格式", symbol=symbol, lastUpdateId=message['lastUpdateId'])
+                if debug:
+                    self.logger.debug("转换快照为增量格式", symbol=symbol, lastUpdateId=message['lastUpdateId'])
                 await self._call_update_callback(symbol, converted_data)
 
-            else:
+            elif debug:
                 # 其他格式的消息
                 self.logger.debug("收到其他格式的Binance消息",
                                 message_keys=list(message.keys()),
@@ -777,12 +801,8 @@ class BinanceWebSocketClient(BaseWebSocketClient):
                 self.logger.warning("⚠️ 收到未订阅交易对的数据", symbol=symbol, subscribed_symbols=self.symbols)
                 return
 
-            # 🔧 根据官方文档：验证必要字段
-            required_fields = ['U', 'u', 'b', 'a']  # 现货必需字段
-            if self.market_type == 'perpetual':
-                required_fields.append('pu')  # 衍生品还需要pu字段
-
-            missing_fields = [field for field in required_fields if field not in data]
+            # 🔧 根据官方文档：验证必要字段（现货 U/u/b/a，衍生品另需 pu）
+            missing_fields = [field for field in self._depth_required_fields if field not in data]
             if missing_fields:
                 self.logger.warning("❌ 深度更新消息缺少必要字段",
                                   symbol=symbol,
@@ -791,20 +811,21 @@ class BinanceWebSocketClient(BaseWebSocketClient):
                 return
 
             # 记录深度更新信息
-            log_data = {
-                'symbol': symbol,
-                'first_update_id': data.get('U'),
-                'final_update_id': data.get('u'),
-                'bids_count': len(data.get('b', [])),
-                'asks_count': len(data.get('a', [])),
-                'market_type': self.market_type
-            }
+            if self.logger.is_debug_enabled():
+                log_data = {
+                    'symbol': symbol,
+                    'first_update_id': data.get('U'),
+                    'final_update_id': data.get('u'),
+                    'bids_count': len(data.get('b', [])),
+                    'asks_count': len(data.get('a', [])),
+                    'market_type': self.market_type
+                }
 
-            # 衍生品特有的pu字段验证
-            if self.market_type == 'perpetual':
-                log_data['prev_update_id'] = data.get('pu')
+                # 衍生品特有的pu字段验证
+                if self.market_type == 'perpetual':
+                    log_data['prev_update_id'] = data.get('pu')
 
-            self.logger.debug("📊 处理Binance深度更新", **log_data)
+                self.logger.debug("📊 处理Binance深度更新", **log_data)
 
             # 调用回调函数
             await self._call_update_callback(symbol, data)
@@ -858,15 +879,7 @@ class BinanceWebSocketClient(BaseWebSocketClient):
     async def _call_update_callback(self, symbol: str, data: Dict[str, Any]):
         """调用更新回调函数（恢复简单错误处理）"""
         try:
-            # 🔍 调试：记录回调调用
-            self.logger.debug(f"🔧 调用Binance WebSocket回调: {symbol}")
-
-            if asyncio.iscoroutinefunction(self.on_orderbook_update):
-                await self.on_orderbook_update(symbol, data)
-            else:
-                self.on_orderbook_update(symbol, data)
-
-            self.logger.debug(f"✅ Binance WebSocket回调完成: {symbol}")
+            await self._dispatch_update(symbol, data)
 
         except Exception as e:
             self.error_count += 1
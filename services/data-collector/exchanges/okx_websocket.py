@@ -593,8 +593,9 @@ class OKXWebSocketManager(BaseWebSocketClient):
             async for message in self.websocket:
 
                 try:
+                    now = time.time()
                     # 定期输出汇总与阈值告警
-                    if time.time() - self._last_summary_ts >= self._summary_interval_sec:
+                    if now - self._last_summary_ts >= self._summary_interval_sec:
                         try:
                             if self._last_summary["reconnects"] > self._warn_reconnects:
                                 self.logger.warning("⚠️ WS重连频率偏高", interval_sec=self._summary_interval_sec, reconnects=self._last_summary["reconnects"])
@@ -605,7 +606,7 @@ class OKXWebSocketManager(BaseWebSocketClient):
                             self._last_summary_ts = time.time()
                             self._last_summary = {"pings": 0, "pongs": 0, "failures": 0, "reconnects": 0}
                     self.total_messages += 1
-                    self.last_message_time = time.time()
+                    self.last_message_time = now
 
                     # 处理心跳响应 - 符合OKX官方文档
                     # 统一文本心跳处理（若启用策略）
@@ -622,11 +623,8 @@ class OKXWebSocketManager(BaseWebSocketClient):
                     if self.total_messages % 1000 == 0:  # 每1000条消息记录一次（降低频率）
                         self.logger.info(f"📊 已接收 {self.total_messages} 条OKX消息")
 
-                    # 解析JSON消息
-                    if isinstance(message, str):
-                        data = loads(message)
-                    else:
-                        data = loads(message.decode('utf-8'))
+                    # 解析JSON消息（二进制帧直接交给解析器，不先解码为str）
+                    data = loads(message)
 
                     # 处理消息
                     await self._handle_message(data)
@@ -659,130 +657,105 @@ class OKXWebSocketManager(BaseWebSocketClient):
             self.logger.error("❌ 断开OKX WebSocket失败", error=str(e))
 
     async def _handle_message(self, message: Dict[str, Any]):
-        """处理WebSocket消息"""
+        """
+        处理WebSocket消息
+
+        热路径只做频道判断和字段补充；调试参数仅在DEBUG开启时构造。
+        """
         try:
-            self.logger.debug("🔍 处理OKX消息", message_keys=list(message.keys()) if isinstance(message, dict) else "非字典")
+            debug = self.logger.is_debug_enabled()
+            if debug:
+                self.logger.debug("🔍 处理OKX消息", message_keys=list(message.keys()) if isinstance(message, dict) else "非字典")
 
             # 🔧 修复：处理所有数据类型，不仅仅是订单簿数据
             if 'data' in message and self.on_orderbook_update:
                 # 获取频道信息
-                channel = message.get('arg', {}).get('channel', 'unknown')
-                self.logger.debug("🔍 OKX数据频道", channel=channel)
+                arg = message.get('arg', {})
+                channel = arg.get('channel', 'unknown')
 
-                # 解析OKX WebSocket消息格式
-                if 'data' in message:
+                # OKX数据格式（支持订单簿和Trades）
+                data_list = message['data']
+                if debug:
                     # 打印完整的外层消息结构用于调试
                     self.logger.debug("🔍 完整OKX消息结构", message_keys=list(message.keys()),
-                                   arg_info=message.get('arg', {}),
+                                   arg_info=arg,
                                    action=message.get('action', 'unknown'),
                                    channel=channel)
-
-                    # OKX数据格式（支持订单簿和Trades）
-                    data_list = message['data']
                     self.logger.debug(f"📊 收到OKX {channel} 数据", data_count=len(data_list))
 
-                    # 从外层消息中获取instId信息
-                    symbol = None
-                    if 'arg' in message and 'instId' in message['arg']:
-                        symbol = message['arg']['instId']
-                        self.logger.debug("🎯 从外层消息获取到symbol", symbol=symbol)
-
-                    for item in data_list:
-                        self.logger.debug("🔍 检查OKX数据项", item_keys=list(item.keys()) if isinstance(item, dict) else f"类型: {type(item)}")
-
-                        # 优先使用数据项中的instId，如果没有则使用外层的
-                        item_symbol = item.get('instId', symbol)
-
-                        if item_symbol:
-                            # 🔧 修复：根据频道类型处理不同的数据
-                            if channel == 'books':
-                                self.logger.debug("📊 处理OKX订单簿更新", symbol=item_symbol, item_keys=list(item.keys()))
-
-                                # 🎯 确保seqId、prevSeqId、checksum字段存在
-                                if 'seqId' in item:
-                                    self.logger.debug("✅ OKX订单簿数据包含seqId",
-                                                    symbol=item_symbol,
-                                                    seqId=item.get('seqId'),
-                                                    prevSeqId=item.get('prevSeqId'),
-                                                    checksum=item.get('checksum'))
-                                else:
-                                    self.logger.warning("⚠️ OKX订单簿数据缺少seqId字段",
-                                                      symbol=item_symbol,
-                                                      item_keys=list(item.keys()))
-
-                            elif channel == 'trades':
-                                self.logger.info("💹 处理OKX逐笔成交数据", symbol=item_symbol,
-                                                trade_id=item.get('tradeId', 'N/A'),
-                                                price=item.get('px', 'N/A'),
-                                                size=item.get('sz', 'N/A'),
-                                                side=item.get('side', 'N/A'))
-
-                            else:
-                                self.logger.info(f"📊 处理OKX {channel} 数据", symbol=item_symbol, item_keys=list(item.keys()))
-
-                            # 🎯 精确修复：基于OKX官方文档的消息格式判断
-                            enhanced_item = item.copy()
-
-                            # 根据OKX官方WebSocket API文档：
-                            # 1. 订单簿频道推送分为snapshot和update两种类型
-                            # 2. snapshot用于初始化订单簿（prevSeqId=-1）
-                            # 3. update用于增量更新订单簿
-                            # 4. 交易频道只有update类型
-
-                            if channel == 'books':
-                                prev_seq_id = item.get('prevSeqId')
-                                seq_id = item.get('seqId')
-
-                                # 根据OKX官方文档：prevSeqId=-1表示snapshot，其他为update
-                                if prev_seq_id == -1:
-                                    enhanced_item['action'] = 'snapshot'
-                                    self.logger.info(f"📊 OKX订单簿快照: {item.get('instId')}, seqId={seq_id}")
-                                else:
-                                    enhanced_item['action'] = 'update'
-                                    self.logger.debug(f"🔄 OKX订单簿更新: {item.get('instId')}, seqId={seq_id}, prevSeqId={prev_seq_id}")
-
-                            elif channel == 'trades':
-                                # 交易数据：根据OKX文档，交易数据只有update类型
-                                enhanced_item['action'] = 'update'
-                                self.logger.debug(f"💱 OKX交易数据: {item.get('instId')}")
-                            else:
-                                # 其他数据类型：默认为update
-                                enhanced_item['action'] = 'update'
-
-                            enhanced_item['channel'] = channel
-
-                            # 🔍 调试：记录回调调用
-                            self.logger.debug(f"🔧 调用OKX WebSocket回调: {item_symbol}")
-
-                            # 调用回调函数，传递symbol和增强的update数据
-                            if asyncio.iscoroutinefunction(self.on_orderbook_update):
-                                await self.on_orderbook_update(item_symbol, enhanced_item)
-                            else:
-                                self.on_orderbook_update(item_symbol, enhanced_item)
-
-                            self.logger.debug(f"✅ OKX WebSocket回调完成: {item_symbol}")
+                # 从外层消息中获取instId信息
+                symbol = arg.get('instId')
+
+                for item in data_list:
+                    # 优先使用数据项中的instId，如果没有则使用外层的
+                    item_symbol = item.get('instId', symbol)
+
+                    if not item_symbol:
+                        self.logger.warning("❌ OKX数据项和外层消息都缺少instId",
+                                          item_keys=list(item.keys()) if isinstance(item, dict) else f"类型: {type(item)}",
+                                          message_keys=list(message.keys()))
+                        # 打印完整的数据项内容用于调试
+                        self.logger.warning("完整数据项内容", item=str(item)[:500])
+                        continue
+
+                    # 🎯 基于OKX官方WebSocket API文档的消息格式判断：
+                    # 1. 订单簿频道推送分为snapshot和update两种类型
+                    # 2. snapshot用于初始化订单簿（prevSeqId=-1）
+                    # 3. update用于增量更新订单簿
+                    # 4. 交易频道只有update类型
+                    # 解析结果归本连接独有，直接在数据项上补充字段，无需复制
+                    if channel == 'books':
+                        seq_id = item.get('seqId')
+                        prev_seq_id = item.get('prevSeqId')
+                        if seq_id is None:
+                            self.logger.warning("⚠️ OKX订单簿数据缺少seqId字段",
+                                              symbol=item_symbol,
+                                              item_keys=list(item.keys()))
+
+                        # 根据OKX官方文档：prevSeqId=-1表示snapshot，其他为update
+                        if prev_seq_id == -1:
+                            item['action'] = 'snapshot'
+                            self.logger.info(f"📊 OKX订单簿快照: {item.get('instId')}, seqId={seq_id}")
                         else:
-                            self.logger.warning("❌ OKX数据项和外层消息都缺少instId",
-                                              item_keys=list(item.keys()) if isinstance(item, dict) else f"类型: {type(item)}",
-                                              message_keys=list(message.keys()))
-                            # 打印完整的数据项内容用于调试
-                            self.logger.warning("完整数据项内容", item=str(item)[:500])
-
-                elif 'event' in message:
-                    # 订阅确认或错误消息
-                    if message['event'] == 'subscribe':
-                        # 🔧 修复：避免参数冲突，使用不同的参数名
-                        self.logger.info("OKX subscription successful", event_message=message)
-                    elif message['event'] == 'error':
-                        # 🔧 修复：避免参数冲突，使用不同的参数名
-                        self.logger.error("OKX subscription error", event_message=message)
+                            item['action'] = 'update'
+                            if debug:
+                                self.logger.debug(f"🔄 OKX订单簿更新: {item_symbol}, seqId={seq_id}, "
+                                                  f"prevSeqId={prev_seq_id}, checksum={item.get('checksum')}")
+
+                    elif channel == 'trades':
+                        item['action'] = 'update'
+                        if debug:
+                            self.logger.info("💹 处理OKX逐笔成交数据", symbol=item_symbol,
+                                            trade_id=item.get('tradeId', 'N/A'),
+                                            price=item.get('px', 'N/A'),
+                                            size=item.get('sz', 'N/A'),
+                                            side=item.get('side', 'N/A'))
                     else:
-                        # 🔧 修复：避免参数冲突，使用不同的参数名
-                        self.logger.debug("Received OKX event message", event_message=message)
-                else:
-                    # 其他格式的消息
+                        # 其他数据类型：默认为update
+                        item['action'] = 'update'
+                        if debug:
+                            self.logger.info(f"📊 处理OKX {channel} 数据", symbol=item_symbol, item_keys=list(item.keys()))
+
+                    item['channel'] = channel
+
+                    # 调用回调函数，传递symbol和补充后的update数据
+                    await self._dispatch_update(item_symbol, item)
+
+            elif 'event' in message:
+                # 订阅确认或错误消息（原先嵌套在 data 分支内，永远不会命中）
+                if message['event'] == 'subscribe':
+                    # 🔧 修复：避免参数冲突，使用不同的参数名
+                    self.logger.info("OKX subscription successful", event_message=message)
+                elif message['event'] == 'error':
+                    # 🔧 修复：避免参数冲突，使用不同的参数名
+                    self.logger.error("OKX subscription error", event_message=message)
+                elif debug:
                     # 🔧 修复：避免参数冲突，使用不同的参数名
-                    self.logger.warning("Received unknown format OKX message", raw_message=str(message)[:200])
+                    self.logger.debug("Received OKX event message", event_message=message)
+            elif debug:
+                # 其他格式的消息
+                # 🔧 修复：避免参数冲突，使用不同的参数名
+                self.logger.debug("Received unknown format OKX message", raw_message=str(message)[:200])
 
         except Exception as e:
             # 🔧 修复：避免参数冲突，使用不同的参数名
@@ -49,6 +49,8 @@ if PROM_AVAILABLE:
         ['exchange', 'channel']
     )
 
+# 心跳帧（'ping'/'pong'/{"op":"pong"} 等）都很短，超过该长度的入站帧直接视为数据帧
+HEARTBEAT_FRAME_MAX_LEN = 64
 
 
 def get_ws_policy(exchange: str) -> Dict[str, Any]:
@@ -109,6 +111,11 @@ class TextHeartbeatRunner:
         self.total_pings_sent = 0
         self.total_pongs_received = 0
 
+        # 入站时间戳指标的标签子项（每条消息都会更新，预先绑定）
+        self._inbound_ts_gauge = (
+            WS_LAST_INBOUND_TS.labels(exchange=exchange_label, channel=channel_label) if PROM_AVAILABLE else None
+        )
+
     def bind(self, websocket, running_flag_cb) -> None:
         self.websocket = websocket
         self._running_flag_cb = running_flag_cb
@@ -140,8 +147,12 @@ class TextHeartbeatRunner:
         """
         # 记录入站时间
         self.last_message_time = time.time()
-        if PROM_AVAILABLE:
-            WS_LAST_INBOUND_TS.labels(exchange=self.exchange_label, channel=self.channel_label).set(self.last_message_time)
+        if self._inbound_ts_gauge is not None:
+            self._inbound_ts_gauge.set(self.last_message_time)
+
+        # 数据帧快速返回，不做解码与JSON解析（由调用方统一解析）
+        if isinstance(message, (str, bytes, bytearray)) and len(message) > HEARTBEAT_FRAME_MAX_LEN:
+            return False
 
         # bytes/binary -> 尝试解码为utf-8再按文本处理
         if isinstance(message, (bytes, bytearray)):
@@ -206,8 +217,8 @@ class TextHeartbeatRunner:
         return False
     def notify_inbound(self) -> None:
         self.last_message_time = time.time()
-        if PROM_AVAILABLE:
-            WS_LAST_INBOUND_TS.labels(exchange=self.exchange_label, channel=self.channel_label).set(self.last_message_time)
+        if self._inbound_ts_gauge is not None:
+            self._inbound_ts_gauge.set(self.last_message_time)
         # 隐式pong：在等待文本pong且仍在超时窗口内，任意入站视为pong
         now = self.last_message_time
         if self.waiting_for_pong and (now - self.ping_sent_time) <= self.pong_timeout:
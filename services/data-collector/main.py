@@ -575,6 +575,9 @@ class ParallelManagerLauncher:
                 'snapshot_depth': orderbook_config.get('snapshot_depth', orderbook_config.get('depth_limit', 100)),
                 'ws_api_url': orderbook_config.get('ws_api_url', None),
                 'rest_base': orderbook_config.get('rest_base', api_base_url),
+                # 快照错峰抖动（单符号时隙的比例）与共享 REST 连接上限
+                'snapshot_jitter': orderbook_config.get('snapshot_jitter', 0.2),
+                'rest_connection_limit': orderbook_config.get('rest_connection_limit', 32),
                 # 🔧 修复：传递缓冲区配置，确保配置文件的值能正确传递到管理器
                 'buffer_max_size': orderbook_config.get('buffer_max_size', 5000),
                 'buffer_timeout': orderbook_config.get('buffer_timeout', 10.0),
@@ -1962,9 +1965,15 @@ class UnifiedDataCollector:
                                 self.memory_manager.register_data_buffer(getattr(manager, attr))
                             except Exception:
                                 pass
+                    # 队列积压深度：全量GC推迟到空闲期
+                    if hasattr(manager, 'get_backlog_depth'):
+                        self.memory_manager.register_backlog_source(manager.get_backlog_depth)
 
                 self.logger.info("✅ 连接池和数据缓冲区已注册到内存管理器")
 
+                # 启动完成：冻结配置/管理器等长期存活对象，后续GC不再扫描
+                self.memory_manager.freeze_startup_objects()
+
             # 显示管理器启动统计
             manager_stats = self.manager_launcher.get_manager_stats()
             self.logger.info("🎯 管理器启动完成统计",
@@ -0,0 +1,122 @@
+"""
+DiskSpillQueue 与 NATSPublisher 溢写单元测试
+"""
+
+import os
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from collector.disk_spill import DiskSpillQueue, SpillRecord
+from collector.nats_publisher import NATSPublisher, NATSConfig
+
+
+def make_record(i: int) -> SpillRecord:
+    return SpillRecord(subject=f"trade.binance.spot.BTC-USDT.{i}", payload=b'{"i":%d}' % i,
+                       msg_id=f"id-{i}", use_jetstream=bool(i % 2))
+
+
+class TestDiskSpillQueue:
+    """测试段文件队列"""
+
+    def test_round_trip_across_segments(self, tmp_path):
+        """测试跨段读取保持顺序与字段"""
+        spill = DiskSpillQueue(str(tmp_path), segment_bytes=256)
+        for i in range(20):
+            spill.append(make_record(i))
+
+        records, position = spill.read_batch(100)
+        spill.commit(position)
+
+        assert [r.subject for r in records] == [make_record(i).subject for i in range(20)]
+        assert records[3].msg_id == "id-3" and records[3].use_jetstream
+        assert len(spill) == 0
+        assert spill.get_stats()['segments'] == 1
+
+    def test_uncommitted_records_survive_restart(self, tmp_path):
+        """测试未提交的记录在重启后继续回放"""
+        spill = DiskSpillQueue(str(tmp_path), segment_bytes=256)
+        for i in range(10):
+            spill.append(make_record(i))
+        _, position = spill.read_batch(4)
+        spill.commit(position)
+        spill.read_batch(3)  # 读取但未提交
+        spill.close()
+
+        reopened = DiskSpillQueue(str(tmp_path), segment_bytes=256)
+        records, _ = reopened.read_batch(100)
+
+        assert len(reopened) == 6
+        assert [r.subject for r in records] == [make_record(i).subject for i in range(4, 10)]
+
+    def test_records_synced_without_close(self, tmp_path, monkeypatch):
+        """测试按刷盘间隔 fsync，未正常关闭（崩溃）时已刷盘的记录仍可恢复"""
+        synced = []
+        real_fsync = os.fsync
+        monkeypatch.setattr("collector.disk_spill.os.fsync", lambda fd: (synced.append(fd), real_fsync(fd)))
+        spill = DiskSpillQueue(str(tmp_path), fsync=True, sync_interval=0)
+        for i in range(3):
+            spill.append(make_record(i))
+
+        assert len(synced) == 3
+        crashed = DiskSpillQueue(str(tmp_path))  # 不调用 close()
+        assert len(crashed) == 3
+
+        buffered = DiskSpillQueue(str(tmp_path / "b"), fsync=True, sync_interval=3600)
+        buffered.append(make_record(0))
+        assert len(DiskSpillQueue(str(tmp_path / "b"))) == 0  # 未到刷盘间隔，仍在缓冲中
+
+    def test_size_limit_drops_oldest_segment(self, tmp_path):
+        """测试超出容量时丢弃最旧的段"""
+        spill = DiskSpillQueue(str(tmp_path), max_bytes=1024, segment_bytes=256)
+        for i in range(100):
+            spill.append(make_record(i))
+
+        stats = spill.get_stats()
+        records, _ = spill.read_batch(1000)
+
+        assert stats['pending_bytes'] <= 1024
+        assert stats['dropped_records'] + stats['pending_records'] == 100
+        assert records[-1].subject == make_record(99).subject
+
+    def test_corrupt_segment_is_skipped(self, tmp_path):
+        """测试CRC校验失败时跳过损坏段"""
+        spill = DiskSpillQueue(str(tmp_path), segment_bytes=128)
+        for i in range(6):
+            spill.append(make_record(i))
+        spill.flush()
+        first = spill._segments[0]
+        with open(first.path, 'r+b') as f:
+            f.seek(20)
+            f.write(b'\xff\xff')
+
+        records, position = spill.read_batch(100)
+        spill.commit(position)
+
+        assert spill.corrupt_records == 1
+        assert records and records[-1].subject == make_record(5).subject
+        assert len(spill) == 0
+
+
+class TestPublisherSpill:
+    """测试发布器溢写与回放"""
+
+    @pytest.mark.asyncio
+    async def test_spill_while_disconnected_then_replay(self, tmp_path):
+        """测试断连期间落盘，连接恢复后按顺序回放"""
+        publisher = NATSPublisher(NATSConfig(spill_enabled=True, spill_dir=str(tmp_path), enable_jetstream=False))
+        publisher._last_connect_attempt = float('inf')  # 处于重连冷却期
+
+        for i in range(5):
+            assert await publisher.publish_data('funding_rate', 'binance', 'perpetual', 'BTC-USDT', {'i': i})
+        assert publisher.get_spill_stats()['pending_records'] == 5
+
+        client = MagicMock(is_closed=False, is_reconnecting=False, pending_data_size=0)
+        client.publish = AsyncMock()
+        publisher.client = client
+        publisher._is_connected = True
+
+        records, _ = publisher.spill.read_batch(10)
+        assert await publisher._replay_records(records) == 5
+        assert [c.args[0] for c in client.publish.await_args_list] == [r.subject for r in records]
+        await publisher._stop_spill_drain()
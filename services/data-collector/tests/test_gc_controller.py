@@ -0,0 +1,69 @@
+"""
+GCController 单元测试
+"""
+
+import gc
+
+import pytest
+
+from core.gc_controller import GCController, GCPauseHistogram, MANUAL_GEN2_THRESHOLD
+
+
+@pytest.fixture
+def controller():
+    ctrl = GCController(gen0_threshold=5000, gen1_threshold=15, quiet_backlog=100, max_full_interval=600)
+    ctrl.install()
+    try:
+        yield ctrl
+    finally:
+        ctrl.uninstall()
+
+
+class TestGCController:
+    """测试GC控制器"""
+
+    def test_install_sets_thresholds_and_restores(self):
+        """测试安装调整阈值、卸载恢复原值"""
+        original = gc.get_threshold()
+        ctrl = GCController(gen0_threshold=5000, gen1_threshold=15)
+        ctrl.install()
+        try:
+            assert gc.get_threshold() == (5000, 15, MANUAL_GEN2_THRESHOLD)
+            assert ctrl._on_gc in gc.callbacks
+        finally:
+            ctrl.uninstall()
+        assert gc.get_threshold() == original
+        assert ctrl._on_gc not in gc.callbacks
+
+    def test_pauses_recorded_per_generation(self, controller):
+        """测试每次回收的停顿按代记录"""
+        gc.collect(0)
+        controller.collect_full()
+
+        assert controller.pauses.count(0) >= 1
+        assert controller.pauses.count(2) >= 1
+        assert controller.pauses.cumulative(2)[-1] == ('+Inf', controller.pauses.count(2))
+
+    def test_full_collection_deferred_under_backlog(self, controller):
+        """测试积压较高时推迟全量回收，超时后仍执行"""
+        backlog = {'depth': 500}
+        controller.register_backlog_source(lambda: backlog['depth'])
+
+        assert controller.maybe_full_collect() is None
+        assert controller.deferred_full_collections == 1
+
+        controller.last_full_collect -= 601
+        assert controller.maybe_full_collect() is not None
+
+        backlog['depth'] = 10
+        assert controller.maybe_full_collect() is not None
+        assert controller.full_collections == 2
+
+    def test_histogram_buckets(self):
+        """测试直方图桶边界（le 为闭区间）"""
+        hist = GCPauseHistogram(buckets=(0.001, 0.01))
+        for pause in (0.0005, 0.001, 0.005, 0.5):
+            hist.observe(1, pause)
+
+        assert hist.cumulative(1) == [('0.001', 2), ('0.01', 3), ('+Inf', 4)]
+        assert hist.max_pause[1] == 0.5
@@ -336,3 +336,105 @@ class TestOKXSpotSnapManager:
             # 验证请求参数
             mock_session.get.assert_called_once()
 
+
+
+class TestSnapshotScheduling:
+    """测试错峰调度、跳过统计与请求合并"""
+
+    def _manager(self, fetch, symbols, interval=0.2):
+        class ScheduledSnapManager(BaseOrderBookSnapManager):
+            async def _fetch_one(self, symbol: str):
+                await fetch(symbol)
+
+        return ScheduledSnapManager(
+            exchange="test_exchange",
+            market_type="spot",
+            symbols=symbols,
+            normalizer=MagicMock(),
+            nats_publisher=MagicMock(),
+            config={"snapshot_interval": interval, "snapshot_jitter": 0},
+        )
+
+    @pytest.mark.asyncio
+    async def test_symbols_spread_across_interval(self):
+        """测试各符号在周期内错峰发起请求（假时钟，断言请求的等待时长）"""
+        import collector.orderbook_snap_managers.base_orderbook_snap_manager as base_module
+
+        clock = [100.0]
+        delays = []
+        fired = {}
+        real_sleep = asyncio.sleep
+
+        async def fake_sleep(delay, *args, **kwargs):
+            if delay > 0:
+                delays.append(delay)
+                clock[0] += delay
+            await real_sleep(0)
+
+        async def fetch(symbol):
+            fired.setdefault(symbol, clock[0])
+
+        symbols = ["A", "B", "C", "D"]
+        manager = self._manager(fetch, symbols, interval=0.2)
+        fake_time = MagicMock(monotonic=lambda: clock[0], time=lambda: clock[0])
+        with patch.object(base_module, "time", fake_time), patch.object(base_module.asyncio, "sleep", fake_sleep):
+            await manager.start()
+            while len(fired) < len(symbols):
+                await real_sleep(0)
+            await manager.stop()
+
+        assert delays[:3] == pytest.approx([0.05, 0.05, 0.05])
+        times = [fired[s] for s in symbols]
+        assert [b - a for a, b in zip(times, times[1:])] == pytest.approx([0.05, 0.05, 0.05])
+
+    @pytest.mark.asyncio
+    async def test_inflight_symbol_tick_is_skipped(self):
+        """测试上一次请求未完成时跳过本 tick 并计数"""
+        release = asyncio.Event()
+
+        async def fetch(symbol):
+            await release.wait()
+
+        manager = self._manager(fetch, ["A"], interval=0.05)
+        manager.metrics = MagicMock()
+        await manager.start()
+        await asyncio.sleep(0.18)
+        release.set()
+        await manager.stop()
+
+        assert manager.skipped_ticks["A"] >= 2
+        manager.metrics.snapshot_skipped_ticks_total.labels.assert_any_call(
+            exchange="test_exchange", market_type="spot", symbol="A", reason="inflight")
+        assert "A" in manager.last_drift
+
+    @pytest.mark.asyncio
+    async def test_shared_session_coalesces_identical_requests(self):
+        """测试共享会话合并相同的并发请求，并按引用计数关闭"""
+        from collector.orderbook_snap_managers import shared_rest_session
+
+        shared = await shared_rest_session.acquire_shared_session("https://example.invalid")
+        again = await shared_rest_session.acquire_shared_session("https://example.invalid")
+        assert shared is again and shared.refs == 2
+
+        calls = []
+
+        async def fake_fetch(session, url, params, timeout=None):
+            calls.append(params["symbol"])
+            await asyncio.sleep(0.01)
+            return 200, {"symbol": params["symbol"]}
+
+        with patch.object(shared_rest_session, "fetch_json", fake_fetch):
+            results = await asyncio.gather(
+                shared.get_json("https://example.invalid/depth", {"symbol": "BTCUSDT", "limit": 100}),
+                shared.get_json("https://example.invalid/depth", {"limit": 100, "symbol": "BTCUSDT"}),
+                shared.get_json("https://example.invalid/depth", {"symbol": "ETHUSDT", "limit": 100}),
+            )
+
+        assert calls == ["BTCUSDT", "ETHUSDT"]
+        assert results[0] == results[1] == (200, {"symbol": "BTCUSDT"})
+        assert shared.coalesced_total == 1 and not shared.inflight
+
+        await shared_rest_session.release_shared_session(again)
+        assert not shared.session.closed
+        await shared_rest_session.release_shared_session(shared)
+        assert shared.session.closed
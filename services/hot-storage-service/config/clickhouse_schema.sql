@@ -4,6 +4,8 @@
 -- 1) 所有时间列统一为 DateTime64(3, 'UTC')，created_at 默认 now64(3)
 -- 2) 热端（marketprism_hot）TTL=3天，用于快速查询；冷端（marketprism_cold）长期保留（不设置 TTL，永久保存）
 -- 3) 本文件为唯一权威 schema；脚本与 CI 将据此做一致性检查（忽略 TTL 差异）
+-- 4) 热端按天分区，冷端复制确认后整分区 DROP PARTITION（元数据操作，避免 DELETE 变更重写数据）；
+--    冷端按月分区。已有按月分区的热端表用 scripts/migrate_hot_partitioning.py 迁移
 
 -- 为7种金融数据类型设计的高性能表结构
 
@@ -41,7 +43,7 @@ CREATE TABLE IF NOT EXISTS marketprism_hot.orderbooks (
     created_at DateTime64(3, 'UTC') DEFAULT now64(3) CODEC(Delta, ZSTD)
 )
 ENGINE = MergeTree()
-PARTITION BY (toYYYYMM(timestamp), exchange)
+PARTITION BY (toYYYYMMDD(timestamp), exchange)
 ORDER BY (timestamp, exchange, symbol, last_update_id)
 TTL toDateTime(timestamp) + INTERVAL 3 DAY DELETE
 SETTINGS index_granularity = 8192;
@@ -69,7 +71,7 @@ CREATE TABLE IF NOT EXISTS marketprism_hot.trades (
     created_at DateTime64(3, 'UTC') DEFAULT now64(3) CODEC(Delta, ZSTD)
 )
 ENGINE = MergeTree()
-PARTITION BY (toYYYYMM(timestamp), exchange)
+PARTITION BY (toYYYYMMDD(timestamp), exchange)
 ORDER BY (timestamp, exchange, symbol, trade_id)
 TTL toDateTime(timestamp) + INTERVAL 3 DAY DELETE
 SETTINGS index_granularity = 8192;
@@ -96,7 +98,7 @@ CREATE TABLE IF NOT EXISTS marketprism_hot.funding_rates (
     created_at DateTime64(3, 'UTC') DEFAULT now64(3) CODEC(Delta, ZSTD)
 )
 ENGINE = MergeTree()
-PARTITION BY (toYYYYMM(timestamp), exchange)
+PARTITION BY (toYYYYMMDD(timestamp), exchange)
 ORDER BY (timestamp, exchange, symbol)
 TTL toDateTime(timestamp) + INTERVAL 3 DAY DELETE
 SETTINGS index_granularity = 8192;
@@ -121,7 +123,7 @@ CREATE TABLE IF NOT EXISTS marketprism_hot.open_interests (
     created_at DateTime64(3, 'UTC') DEFAULT now64(3) CODEC(Delta, ZSTD)
 )
 ENGINE = MergeTree()
-PARTITION BY (toYYYYMM(timestamp), exchange)
+PARTITION BY (toYYYYMMDD(timestamp), exchange)
 ORDER BY (timestamp, exchange, symbol)
 TTL toDateTime(timestamp) + INTERVAL 3 DAY DELETE
 SETTINGS index_granularity = 8192;
@@ -147,7 +149,7 @@ CREATE TABLE IF NOT EXISTS marketprism_hot.liquidations (
     created_at DateTime64(3, 'UTC') DEFAULT now64(3) CODEC(Delta, ZSTD)
 )
 ENGINE = MergeTree()
-PARTITION BY (toYYYYMM(timestamp), exchange)
+PARTITION BY (toYYYYMMDD(timestamp), exchange)
 ORDER BY (timestamp, exchange, symbol)
 TTL toDateTime(timestamp) + INTERVAL 3 DAY DELETE
 SETTINGS index_granularity = 8192;
@@ -172,7 +174,7 @@ CREATE TABLE IF NOT EXISTS marketprism_hot.lsr_top_positions (
     created_at DateTime64(3, 'UTC') DEFAULT now64(3) CODEC(Delta, ZSTD)
 )
 ENGINE = MergeTree()
-PARTITION BY (toYYYYMM(timestamp), exchange)
+PARTITION BY (toYYYYMMDD(timestamp), exchange)
 ORDER BY (timestamp, exchange, symbol, period)
 TTL toDateTime(timestamp) + INTERVAL 3 DAY DELETE
 SETTINGS index_granularity = 8192;
@@ -197,7 +199,7 @@ CREATE TABLE IF NOT EXISTS marketprism_hot.lsr_all_accounts (
     created_at DateTime64(3, 'UTC') DEFAULT now64(3) CODEC(Delta, ZSTD)
 )
 ENGINE = MergeTree()
-PARTITION BY (toYYYYMM(timestamp), exchange)
+PARTITION BY (toYYYYMMDD(timestamp), exchange)
 ORDER BY (timestamp, exchange, symbol, period)
 TTL toDateTime(timestamp) + INTERVAL 3 DAY DELETE
 SETTINGS index_granularity = 8192;
@@ -222,7 +224,7 @@ CREATE TABLE IF NOT EXISTS marketprism_hot.volatility_indices (
     created_at DateTime64(3, 'UTC') DEFAULT now64(3) CODEC(Delta, ZSTD)
 )
 ENGINE = MergeTree()
-PARTITION BY (toYYYYMM(timestamp), exchange)
+PARTITION BY (toYYYYMMDD(timestamp), exchange)
 ORDER BY (timestamp, exchange, symbol)
 TTL toDateTime(timestamp) + INTERVAL 3 DAY DELETE
 SETTINGS index_granularity = 8192;
@@ -230,7 +232,7 @@ SETTINGS index_granularity = 8192;
 -- ==================== 创建冷端数据库表结构 ====================
 
 
--- 冷端表结构与热端相同，但TTL更长
+-- 冷端表结构与热端相同，但TTL更长、按月分区（AS 只复制列结构，分区/排序键在此显式声明）
 CREATE TABLE IF NOT EXISTS marketprism_cold.orderbooks AS marketprism_hot.orderbooks
 ENGINE = MergeTree()
 PARTITION BY (toYYYYMM(timestamp), exchange)
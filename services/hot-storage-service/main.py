@@ -28,6 +28,7 @@ import sys
 import time
 import logging
 import fcntl
+from collections import Counter
 from datetime import datetime, timezone
 from typing import Dict, List, Optional, Any, Union
 import yaml
@@ -42,6 +43,7 @@ sys.path.append(str(project_root))
 
 from core.observability.logging.structured_logger import get_logger, configure_logging
 from core.observability.logging.log_config import LogConfig, LogLevel, LogOutput, LogOutputConfig, LogFormat
+from core.storage.query_cache import WATERMARK_SUBJECT_PREFIX, encode_watermarks
 
 
 def _make_json_console_log_config() -> LogConfig:
@@ -67,11 +69,11 @@ HOT_LOGGER = get_logger("hot-storage-service")
 
 # 导入优化的ClickHouse客户端
 try:
-    from services.data_storage_service.storage import get_clickhouse_client, close_clickhouse_client
+    from services.data_storage_service.storage import ClickHouseClient, ClickHouseQueryError, ColumnBatch, get_clickhouse_client, close_clickhouse_client
 except ImportError:
     # 如果模块路径不对，尝试其他路径
     sys.path.append(str(Path(__file__).parent))
-    from storage import get_clickhouse_client, close_clickhouse_client
+    from storage import ClickHouseClient, ClickHouseQueryError, ColumnBatch, get_clickhouse_client, close_clickhouse_client
 from aiohttp import web
 from pathlib import Path
 from core.api_response import APIResponse
@@ -80,12 +82,6 @@ from decimal import Decimal, InvalidOperation
 import traceback
 import resource
 
-# 可选引入 clickhouse-driver（优先使用TCP驱动，失败回退HTTP）
-try:
-    from clickhouse_driver import Client as CHClient
-except Exception:
-    CHClient = None
-
 
 class DataValidationError(Exception):
     """数据验证错误"""
@@ -233,6 +229,21 @@ class DataFormatValidator:
 class SimpleHotStorageService:
     """简化的热端数据存储服务"""
 
+    # 数据类型 -> 表名（8种数据类型的分离表）
+    TABLE_MAPPING = {
+        "orderbook": "orderbooks",
+        "trade": "trades",
+        "funding_rate": "funding_rates",
+        "open_interest": "open_interests",
+        "liquidation": "liquidations",
+        "lsr_top_position": "lsr_top_positions",    # 分离的LSR顶级持仓表
+        "lsr_all_account": "lsr_all_accounts",      # 分离的LSR全账户表
+        "volatility_index": "volatility_indices"
+    }
+
+    # 拉取消费者ACK等待（秒）：写入重试期间通过 in_progress() 续期
+    PULL_ACK_WAIT = 60
+
     def __init__(self, config: Dict[str, Any]):
         """
         初始化服务
@@ -318,7 +329,7 @@ class SimpleHotStorageService:
 
 
         # 🔧 批量写入缓冲区
-        self.batch_buffers = {}  # {data_type: [validated_data, ...]}
+        self.batch_buffers = {}  # {data_type: ColumnBatch} 校验后按列写入，不保留逐行字典
         self.batch_locks = {}    # {data_type: asyncio.Lock()}
         self.batch_tasks = {}    # {data_type: asyncio.Task}
         self.batch_buffer_bytes = {}  # {data_type: int} 估算缓冲区字节数（近似）
@@ -360,8 +371,23 @@ class SimpleHotStorageService:
         except Exception as _e:
             self.logger.warning(f"批量参数配置解析失败，使用默认值: {_e}")
 
-        # ClickHouse 驱动客户端（懒初始化）
-        self._ch_client = None
+        # JetStream 消费模式：push（默认，回调式）或 pull（批量拉取，写入成功后ACK）
+        self.consumer_mode = str(os.getenv('HOT_CONSUMER_MODE', self.nats_config.get('consumer_mode', 'push'))).strip().lower()
+        self.pull_config = {
+            "min_batch": int(self.nats_config.get('pull_batch_min', 50)),
+            "max_batch": int(self.nats_config.get('pull_batch_max', 2000)),
+            "fetch_timeout": float(self.nats_config.get('pull_fetch_timeout', 1.0)),
+        }
+        self.pull_tasks: Dict[str, asyncio.Task] = {}
+        self.pull_batch_sizes: Dict[str, int] = {}
+        self.pull_backlog: Dict[str, int] = {}
+
+        # 写入成功后发布 (表, 交易所, 交易对) 水位，供查询缓存精确失效
+        self.publish_watermarks = bool((self.hot_storage_config or {}).get('publish_watermarks', True))
+
+        # ClickHouse 客户端（懒初始化）：原生TCP连接池 + 共享HTTP会话
+        self._ch_client: Optional[ClickHouseClient] = None
+        self._ch_lock = asyncio.Lock()
 
         # 重试配置
         self.retry_config = {
@@ -649,6 +675,8 @@ class SimpleHotStorageService:
             js_ready = False
             for attempt in range(10):  # 最长重试 ~20s
                 try:
+                    # 按数据类型拆分的多流布局下按主题解析所属流
+                    stream_name = await self._resolve_stream_name(subject_pattern, stream_name)
                     await self.jetstream._jsm.stream_info(stream_name)
                     js_ready = True
                     self.logger.info("流可用", stream=stream_name)
@@ -660,6 +688,14 @@ class SimpleHotStorageService:
             if not js_ready:
                 raise Exception(f"流 {stream_name} 在20秒内未就绪")
 
+            if self.consumer_mode == "pull":
+                try:
+                    await self._setup_pull_consumer(data_type, subject_pattern, stream_name)
+                    return
+                except Exception as pull_err:
+                    self.logger.error("拉取消费者创建失败，回退推送订阅", data_type=data_type, exception=pull_err)
+                    self.logger.debug("traceback", tb=traceback.format_exc())
+
             # JetStream订阅（低频数据）
             try:
                 # 使用新的 durable 名称以避免复用历史消费位置，确保本次启动从“新消息”开始
@@ -744,6 +780,157 @@ class SimpleHotStorageService:
             self.logger.error("订阅失败", data_type=data_type, exception=e)
             self.logger.debug("traceback", tb=traceback.format_exc())
 
+    async def _resolve_stream_name(self, subject_pattern: str, default: str) -> str:
+        """按主题查找所属流；单流布局或查找失败时使用默认流"""
+        try:
+            name = await self.jetstream._jsm.find_stream_name_by_subject(subject_pattern)
+        except Exception:
+            return default
+        return name if isinstance(name, str) and name else default
+
+    async def _setup_pull_consumer(self, data_type: str, subject_pattern: str, stream_name: str):
+        """
+        创建 JetStream 拉取消费者并启动拉取循环
+
+        - durable 保留确认位置，重启后从上次ACK处继续消费积压（不再跳过）
+        - deliver_policy=ALL 仅在首次创建 consumer 时生效
+        - max_ack_pending 由最大批次推导，无需按数据类型手工调整
+        """
+        durable = f"simple_hot_storage_pull_{data_type}"
+        max_batch = self.pull_config["max_batch"]
+        desired_config = nats.js.api.ConsumerConfig(
+            durable_name=durable,
+            deliver_policy=nats.js.api.DeliverPolicy.ALL,
+            ack_policy=nats.js.api.AckPolicy.EXPLICIT,
+            ack_wait=self.PULL_ACK_WAIT,
+            max_ack_pending=max_batch * 2,
+            filter_subject=subject_pattern,
+        )
+
+        subscription = await self.jetstream.pull_subscribe(
+            subject_pattern,
+            durable=durable,
+            stream=stream_name,
+            config=desired_config,
+        )
+        self.subscriptions[data_type] = subscription
+        self.pull_batch_sizes[data_type] = self.pull_config["min_batch"]
+        self.pull_tasks[data_type] = asyncio.create_task(self._pull_consume_loop(data_type, subscription))
+        self.logger.info("订阅成功(JS Pull)", data_type=data_type, subject=subject_pattern, durable=durable,
+                         max_batch=max_batch)
+
+    def _next_pull_batch_size(self, backlog: int) -> int:
+        """根据积压深度确定下一次拉取的批次大小"""
+        return max(self.pull_config["min_batch"], min(self.pull_config["max_batch"], int(backlog)))
+
+    async def _pull_consume_loop(self, data_type: str, subscription):
+        """拉取消费循环：fetch → 校验 → 批量写入 → 写入成功后批量ACK"""
+        fetch_timeout = self.pull_config["fetch_timeout"]
+        batch_size = self.pull_config["min_batch"]
+
+        while not self.shutdown_event.is_set():
+            try:
+                msgs = await subscription.fetch(batch=batch_size, timeout=fetch_timeout)
+            except asyncio.TimeoutError:
+                # 无新消息：回到最小批次
+                batch_size = self.pull_config["min_batch"]
+                self.pull_backlog[data_type] = 0
+                self.pull_batch_sizes[data_type] = batch_size
+                continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.warning("拉取消息失败", data_type=data_type, exception=e)
+                await asyncio.sleep(1)
+                continue
+
+            if not msgs:
+                continue
+
+            ok = await self._process_pulled_batch(data_type, msgs)
+            if not ok:
+                # 写入失败的消息已NAK，稍后重新投递；退避避免空转
+                await asyncio.sleep(self.retry_config['retry_delay'])
+
+            try:
+                backlog = msgs[-1].metadata.num_pending or 0
+            except Exception:
+                backlog = 0
+            self.pull_backlog[data_type] = backlog
+            batch_size = self._next_pull_batch_size(backlog)
+            self.pull_batch_sizes[data_type] = batch_size
+
+    async def _process_pulled_batch(self, data_type: str, msgs: List[Any]) -> bool:
+        """
+        处理一批拉取到的消息
+
+        按 insert_chunk_size 分片写入 ClickHouse，每个分片写入成功后才一次性ACK该分片的消息；
+        写入失败的分片NAK等待重投（至少一次语义），无法解析/校验失败的消息直接 TERM。
+        """
+        batch = self._new_column_batch(data_type)
+        row_msgs: List[Any] = []
+
+        self.stats["messages_received"] += len(msgs)
+        self.stats["last_message_time"] = time.time()
+
+        for msg in msgs:
+            try:
+                data = json.loads(msg.data)
+                batch.append(self._validate_message_data(data, data_type, subject=msg.subject))
+                row_msgs.append(msg)
+            except (ValueError, DataValidationError) as e:
+                # JSONDecodeError/UnicodeDecodeError 均为 ValueError；重投不会成功
+                self.logger.error(f"拉取消息校验失败 {data_type}: {e}")
+                self.stats["validation_errors"] += 1
+                try:
+                    await msg.term()
+                except Exception:
+                    pass
+
+        chunk_size = int(self.batch_config.get("insert_chunk_size", 2000))
+        all_ok = True
+        start = 0
+        for chunk in batch.chunks(chunk_size):
+            chunk_msgs = row_msgs[start:start + len(chunk)]
+            start += len(chunk)
+
+            if await self._insert_chunk_with_retry(data_type, chunk, chunk_msgs):
+                await asyncio.gather(*(m.ack() for m in chunk_msgs), return_exceptions=True)
+                self._record_processed_batch(data_type, chunk)
+                self.stats["batch_inserts"] += 1
+                self.stats["batch_size_total"] += len(chunk)
+            else:
+                all_ok = False
+                await asyncio.gather(*(m.nak() for m in chunk_msgs), return_exceptions=True)
+                self.stats["messages_failed"] += len(chunk)
+                self.type_failed[data_type] = self.type_failed.get(data_type, 0) + len(chunk)
+                self.stats["last_error_time"] = time.time()
+                self.logger.error("拉取批次写入失败，已NAK等待重投", data_type=data_type, count=len(chunk))
+
+        return all_ok
+
+    async def _insert_chunk_with_retry(self, data_type: str, chunk: ColumnBatch, msgs: List[Any] = ()) -> bool:
+        """
+        带退避重试的批量写入
+
+        每次退避前对分片消息调用 in_progress() 续期ACK等待，单次退避不超过 ack_wait 的四分之一，
+        避免重试期间消息超时被重投、写入成功后又重复入库。
+        """
+        max_retries = self.retry_config['max_retries']
+        delay = self.retry_config['retry_delay']
+        backoff = self.retry_config['backoff_multiplier']
+        max_delay = self.PULL_ACK_WAIT / 4
+
+        for attempt in range(max_retries + 1):
+            if await self._batch_insert_to_clickhouse(data_type, chunk):
+                return True
+            if attempt < max_retries and not self.shutdown_event.is_set():
+                self.stats["retry_attempts"] += 1
+                await asyncio.gather(*(m.in_progress() for m in msgs), return_exceptions=True)
+                await asyncio.sleep(min(delay, max_delay))
+                delay *= backoff
+        return False
+
     async def _handle_message(self, msg, data_type: str):
         """处理NATS消息，包含重试机制"""
         try:
@@ -792,25 +979,7 @@ class SimpleHotStorageService:
                         await msg.ack()
                     except Exception:
                         pass
-                    self.stats["messages_processed"] += 1
-                    try:
-                        self.type_processed[data_type] = self.type_processed.get(data_type, 0) + 1
-                        ex = validated_data.get('exchange', '') or ''
-                        key = f"{data_type}|{ex}"
-                        self.type_exchange_processed[key] = self.type_exchange_processed.get(key, 0) + 1
-                        # 标准化：基础交易所 + 市场类型（优先使用消息体的 market_type）
-                        base_ex = ex  # 发布端已标准化为基础交易所名
-                        mkt = (validated_data.get('market_type') or '').lower()
-                        # 归一化 market_type 同义词到三类：spot/perpetual/options
-                        if mkt in ('swap', 'futures', 'future', 'perp', 'derivatives'):
-                            mkt = 'perpetual'
-                        if not mkt:
-                            mkt = 'unknown'
-                        key2 = f"{data_type}|{base_ex}|{mkt}"
-                        self.type_exchange_market_processed[key2] = self.type_exchange_market_processed.get(key2, 0) + 1
-
-                    except Exception:
-                        pass
+                    self._record_processed(data_type, validated_data)
                     self.logger.debug("已入队等待批量", data_type=data_type, subject=msg.subject)
                     success = True
                 else:
@@ -821,25 +990,7 @@ class SimpleHotStorageService:
                             await msg.ack()
                         except Exception:
                             pass
-                        self.stats["messages_processed"] += 1
-                        try:
-                            self.type_processed[data_type] = self.type_processed.get(data_type, 0) + 1
-                            ex = validated_data.get('exchange', '') or ''
-                            key = f"{data_type}|{ex}"
-                            self.type_exchange_processed[key] = self.type_exchange_processed.get(key, 0) + 1
-                            # 标准化：基础交易所 + 市场类型（优先使用消息体的 market_type）
-                            base_ex = ex  # 发布端已标准化为基础交易所名
-                            mkt = (validated_data.get('market_type') or '').lower()
-                            # 归一化 market_type 同义词到三类：spot/perpetual/options
-                            if mkt in ('swap', 'futures', 'future', 'perp', 'derivatives'):
-                                mkt = 'perpetual'
-                            if not mkt:
-                                mkt = 'unknown'
-                            key2 = f"{data_type}|{base_ex}|{mkt}"
-                            self.type_exchange_market_processed[key2] = self.type_exchange_market_processed.get(key2, 0) + 1
-
-                        except Exception:
-                            pass
+                        self._record_processed(data_type, validated_data)
                         self.logger.debug("消息处理成功", data_type=data_type, subject=msg.subject)
             else:
                 # 低频类型：单条入库并成功后ACK
@@ -849,25 +1000,7 @@ class SimpleHotStorageService:
                         await msg.ack()
                     except Exception:
                         pass
-                    self.stats["messages_processed"] += 1
-                    try:
-                        self.type_processed[data_type] = self.type_processed.get(data_type, 0) + 1
-                        ex = validated_data.get('exchange', '') or ''
-                        key = f"{data_type}|{ex}"
-                        self.type_exchange_processed[key] = self.type_exchange_processed.get(key, 0) + 1
-                        # 标准化：基础交易所 + 市场类型（优先使用消息体的 market_type）
-                        base_ex = ex  # 发布端已标准化为基础交易所名
-                        mkt = (validated_data.get('market_type') or '').lower()
-                        # 归一化 market_type 同义词到三类：spot/perpetual/options
-                        if mkt in ('swap', 'futures', 'future', 'perp', 'derivatives'):
-                            mkt = 'perpetual'
-                        if not mkt:
-                            mkt = 'unknown'
-                        key2 = f"{data_type}|{base_ex}|{mkt}"
-                        self.type_exchange_market_processed[key2] = self.type_exchange_market_processed.get(key2, 0) + 1
-
-                    except Exception:
-                        pass
+                    self._record_processed(data_type, validated_data)
                     self.logger.debug("消息处理成功", data_type=data_type, subject=msg.subject)
 
             if success:
@@ -903,6 +1036,39 @@ class SimpleHotStorageService:
             self.logger.error(f"消息处理异常 {data_type}: {e}")
             self.logger.debug("traceback", tb=traceback.format_exc())
 
+    def _record_processed(self, data_type: str, validated_data: Dict[str, Any]) -> None:
+        """记录一条处理成功的消息（总数 + 按类型/交易所/市场类型细分）"""
+        self._count_processed(data_type, validated_data.get('exchange', ''), validated_data.get('market_type'), 1)
+
+    def _record_processed_batch(self, data_type: str, batch: ColumnBatch) -> None:
+        """按列批次记录处理成功的消息，同一交易所/市场类型只累加一次"""
+        groups = Counter(zip(batch.column('exchange'), batch.column('market_type')))
+        for (ex, mkt), count in groups.items():
+            self._count_processed(data_type, ex, mkt, count)
+
+    def _count_processed(self, data_type: str, exchange: Optional[str], market_type: Optional[str], count: int) -> None:
+        self.stats["messages_processed"] += count
+        try:
+            self.type_processed[data_type] = self.type_processed.get(data_type, 0) + count
+            ex = exchange or ''
+            key = f"{data_type}|{ex}"
+            self.type_exchange_processed[key] = self.type_exchange_processed.get(key, 0) + count
+            # 标准化：基础交易所 + 市场类型（优先使用消息体的 market_type）
+            base_ex = ex  # 发布端已标准化为基础交易所名
+            mkt = (market_type or '').lower()
+            # 归一化 market_type 同义词到三类：spot/perpetual/options
+            if mkt in ('swap', 'futures', 'future', 'perp', 'derivatives'):
+                mkt = 'perpetual'
+            if not mkt:
+                mkt = 'unknown'
+            key2 = f"{data_type}|{base_ex}|{mkt}"
+            self.type_exchange_market_processed[key2] = self.type_exchange_market_processed.get(key2, 0) + count
+        except Exception:
+            pass
+
+    def _new_column_batch(self, data_type: str) -> ColumnBatch:
+        return ColumnBatch(self.TABLE_MAPPING.get(data_type, data_type))
+
     def _validate_message_data(self, data: Dict[str, Any], data_type: str, subject: Optional[str] = None) -> Dict[str, Any]:
         """验证消息数据格式"""
         try:
@@ -1157,36 +1323,42 @@ class SimpleHotStorageService:
 
         return False
 
-    def _get_ch_client(self):
-        """获取或初始化 ClickHouse TCP 客户端"""
-        if getattr(self, "_ch_client", None) is not None:
+    async def _get_ch_client(self) -> ClickHouseClient:
+        """获取或初始化 ClickHouse 客户端（连接失败时下次写入重试）"""
+        if self._ch_client is not None:
             return self._ch_client
-        if not CHClient or not self.hot_storage_config.get('use_clickhouse_driver', True):
-            return None
-        try:
-            host = self.hot_storage_config.get('clickhouse_host', 'localhost')
-            port = int(self.hot_storage_config.get('clickhouse_tcp_port', 9000))
-            user = self.hot_storage_config.get('clickhouse_user', 'default')
-            password = self.hot_storage_config.get('clickhouse_password', '')
-            database = self.hot_storage_config.get('clickhouse_database', 'marketprism_hot')
-            self._ch_client = CHClient(host=host, port=port, user=user, password=password, database=database)
-            return self._ch_client
-        except Exception as e:
-            self.logger.warning("初始化 ClickHouse 驱动失败，将回退HTTP", exception=e)
-            self._ch_client = None
-            return None
+        async with self._ch_lock:
+            if self._ch_client is None:
+                cfg = self.hot_storage_config
+                client = ClickHouseClient(
+                    host=cfg.get('clickhouse_host', 'localhost'),
+                    http_port=int(cfg.get('clickhouse_http_port', 8123)),
+                    tcp_port=int(cfg.get('clickhouse_tcp_port', 9000)),
+                    database=cfg.get('clickhouse_database', 'marketprism_hot'),
+                    user=cfg.get('clickhouse_user', 'default'),
+                    password=cfg.get('clickhouse_password', ''),
+                    pool_size=int(cfg.get('clickhouse_pool_size', 4)),
+                    use_native=cfg.get('use_clickhouse_driver', True)
+                )
+                try:
+                    await client.connect()
+                except Exception:
+                    await client.close()
+                    raise
+                self._ch_client = client
+        return self._ch_client
 
     async def _store_to_batch_buffer(self, data_type: str, data: Dict[str, Any]) -> bool:
         """将数据添加到批量缓冲区"""
         try:
             # 初始化数据类型的缓冲区和锁
             if data_type not in self.batch_buffers:
-                self.batch_buffers[data_type] = []
+                self.batch_buffers[data_type] = self._new_column_batch(data_type)
                 self.batch_locks[data_type] = asyncio.Lock()
                 self.batch_buffer_bytes[data_type] = 0
 
             async with self.batch_locks[data_type]:
-                # 入队
+                # 入队：按列写入，校验后字典随后即可释放
                 self.batch_buffers[data_type].append(data)
                 # 近似估算记录尺寸（尽量避免重序列化）
                 approx_size = 128
@@ -1273,8 +1445,9 @@ class SimpleHotStorageService:
         if not self.batch_buffers[data_type]:
             return
 
-        batch_data = self.batch_buffers[data_type].copy()
-        self.batch_buffers[data_type].clear()
+        # 整批换出，新消息写入新的列批次
+        batch_data = self.batch_buffers[data_type]
+        self.batch_buffers[data_type] = self._new_column_batch(data_type)
         # 重置字节计数
         try:
             self.batch_buffer_bytes[data_type] = 0
@@ -1284,17 +1457,14 @@ class SimpleHotStorageService:
         try:
             chunk_size = int(self.batch_config.get("insert_chunk_size", self.batch_config.get("max_batch_size", 500)))
             total_ok = 0
-            if chunk_size <= 0:
-                chunk_size = len(batch_data)
             # 分片插入，限制峰值内存与HTTP正文大小
-            for i in range(0, len(batch_data), chunk_size):
-                chunk = batch_data[i:i + chunk_size]
+            for chunk in batch_data.chunks(chunk_size):
                 ok = await self._batch_insert_to_clickhouse(data_type, chunk)
                 if ok:
                     total_ok += len(chunk)
                 else:
                     # 分片批量失败，回退为单条重试
-                    for row in chunk:
+                    for row in chunk.rows():
                         if await self._store_to_clickhouse_with_retry(data_type, row):
                             total_ok += 1
             if total_ok > 0:
@@ -1307,38 +1477,30 @@ class SimpleHotStorageService:
         except Exception as e:
             self.logger.error(f"批量刷新失败 {data_type}: {e}")
             # 回退到单条插入
-            for row in batch_data:
+            for row in batch_data.rows():
                 await self._store_to_clickhouse_with_retry(data_type, row)
 
     async def _store_to_clickhouse(self, data_type: str, data: Dict[str, Any]) -> bool:
-        """存储数据到ClickHouse（优先TCP驱动，失败回退HTTP）"""
+        """存储数据到ClickHouse（优先TCP驱动，连接类失败回退HTTP；超时不回退，避免重复写入）"""
         try:
-            host = self.hot_storage_config.get('clickhouse_host', 'localhost')
-            http_port = self.hot_storage_config.get('clickhouse_http_port', 8123)
-            database = self.hot_storage_config.get('clickhouse_database', 'marketprism_hot')
-
-            # 获取表名 - 更新为8种数据类型的分离表
-            table_mapping = {
-                "orderbook": "orderbooks",
-                "trade": "trades",
-                "funding_rate": "funding_rates",
-                "open_interest": "open_interests",
-                "liquidation": "liquidations",
-                "lsr_top_position": "lsr_top_positions",    # 分离的LSR顶级持仓表
-                "lsr_all_account": "lsr_all_accounts",      # 分离的LSR全账户表
-                "volatility_index": "volatility_indices"
-            }
-            table_name = table_mapping.get(data_type, data_type)
+            table_name = self.TABLE_MAPPING.get(data_type, data_type)
 
             # 构建插入SQL
             insert_sql = self._build_insert_sql(table_name, data)
 
             # 1) 尝试使用 TCP 驱动
-            ch = self._get_ch_client()
-            if ch:
+            watermarks = {(data['exchange'], data['symbol']): data['ts_ms']}
+            ch = await self._get_ch_client()
+            if await ch.recover_tcp():
                 try:
-                    ch.execute(insert_sql)
+                    await ch.execute_native(insert_sql)
+                    await self._publish_watermarks(table_name, watermarks)
                     return True
+                except ClickHouseQueryError as e:
+                    # 超时时服务端可能已写入，经HTTP重放会重复写入：交由上层重试/NAK
+                    self.logger.error("ClickHouse驱动插入超时，不回退HTTP", error=str(e))
+                    self.clickhouse_insert_errors = getattr(self, 'clickhouse_insert_errors', 0) + 1
+                    return False
                 except Exception as e:
                     self.logger.warning("ClickHouse驱动执行失败，回退HTTP", exception=e)
                     try:
@@ -1347,19 +1509,17 @@ class SimpleHotStorageService:
                         pass
 
             # 2) 回退到 HTTP
-            url = f"http://{host}:{http_port}/?database={database}"
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, data=insert_sql) as response:
-                    if response.status == 200:
-                        return True
-                    else:
-                        error_text = await response.text()
-                        self.logger.error("ClickHouse插入失败", error=error_text)
-                        try:
-                            self.clickhouse_insert_errors = getattr(self, 'clickhouse_insert_errors', 0) + 1
-                        except Exception:
-                            pass
-                        return False
+            try:
+                await ch.execute_http(insert_sql)
+                await self._publish_watermarks(table_name, watermarks)
+                return True
+            except ClickHouseQueryError as e:
+                self.logger.error("ClickHouse插入失败", error=str(e))
+                try:
+                    self.clickhouse_insert_errors = getattr(self, 'clickhouse_insert_errors', 0) + 1
+                except Exception:
+                    pass
+                return False
 
         except Exception as e:
             self.logger.error("存储到ClickHouse异常", exception=e)
@@ -1369,39 +1529,25 @@ class SimpleHotStorageService:
                 pass
             return False
 
-    async def _batch_insert_to_clickhouse(self, data_type: str, batch_data: List[Dict[str, Any]]) -> bool:
-        """批量插入数据到ClickHouse（优先TCP驱动，失败回退HTTP）"""
+    async def _batch_insert_to_clickhouse(self, data_type: str, batch_data: Union[ColumnBatch, List[Dict[str, Any]]]) -> bool:
+        """批量插入数据到ClickHouse（优先TCP驱动列式插入，连接类失败回退HTTP；超时不回退，避免重复写入）"""
         if not batch_data:
             return True
 
         try:
-            host = self.hot_storage_config.get('clickhouse_host', 'localhost')
-            http_port = self.hot_storage_config.get('clickhouse_http_port', 8123)
-            database = self.hot_storage_config.get('clickhouse_database', 'marketprism_hot')
-
-            # 获取表名
-            table_mapping = {
-                "orderbook": "orderbooks",
-                "trade": "trades",
-                "funding_rate": "funding_rates",
-                "open_interest": "open_interests",
-                "liquidation": "liquidations",
-                "lsr_top_position": "lsr_top_positions",
-                "lsr_all_account": "lsr_all_accounts",
-                "volatility_index": "volatility_indices"
-            }
-            table_name = table_mapping.get(data_type, data_type)
-
-            # 构建批量插入SQL
-            batch_sql = self._build_batch_insert_sql(table_name, batch_data)
-            if not batch_sql:
-                return False
-
-            # 1) 先尝试 TCP 驱动
-            ch = self._get_ch_client()
-            if ch:
+            table_name = self.TABLE_MAPPING.get(data_type, data_type)
+            if not isinstance(batch_data, ColumnBatch):
+                rows = batch_data
+                batch_data = ColumnBatch(table_name)
+                for row in rows:
+                    batch_data.append(row)
+
+            # 1) 先尝试 TCP 驱动：按列直接发送类型化数据，无需拼接SQL
+            ch = await self._get_ch_client()
+            if await ch.recover_tcp():
                 try:
-                    ch.execute(batch_sql)
+                    await ch.insert_columns(table_name, batch_data.columns(), http_fallback=False)
+                    await self._publish_watermarks(table_name, self._batch_watermarks(batch_data))
                     self.stats["tcp_driver_hits"] += 1
                     if self.stats["tcp_driver_hits"] % 50 == 0:  # 每50次打印一次统计
                         tcp_total = self.stats["tcp_driver_hits"]
@@ -1409,6 +1555,11 @@ class SimpleHotStorageService:
                         tcp_rate = tcp_total / (tcp_total + http_total) * 100 if (tcp_total + http_total) > 0 else 0
                         self.logger.debug("ClickHouse驱动统计", tcp=tcp_total, http=http_total, tcp_rate=tcp_rate)
                     return True
+                except ClickHouseQueryError as e:
+                    # 超时时服务端可能已写入，经HTTP重放会重复写入：交由上层重试/NAK
+                    self.logger.error("ClickHouse驱动批量插入超时，不回退HTTP", error=str(e))
+                    self.clickhouse_insert_errors = getattr(self, 'clickhouse_insert_errors', 0) + 1
+                    return False
                 except Exception as e:
                     self.logger.warning("ClickHouse驱动批量执行失败，回退HTTP", exception=e)
                     try:
@@ -1418,20 +1569,20 @@ class SimpleHotStorageService:
 
             # 2) 回退到 HTTP
             self.stats["http_fallback_hits"] += 1
-            url = f"http://{host}:{http_port}/?database={database}"
-
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, data=batch_sql) as response:
-                    if response.status == 200:
-                        return True
-                    else:
-                        error_text = await response.text()
-                        self.logger.error("ClickHouse批量插入失败", error=error_text)
-                        try:
-                            self.clickhouse_insert_errors = getattr(self, 'clickhouse_insert_errors', 0) + 1
-                        except Exception:
-                            pass
-                        return False
+            batch_sql = self._build_batch_insert_sql(table_name, batch_data.rows())
+            if not batch_sql:
+                return False
+            try:
+                await ch.execute_http(batch_sql)
+                await self._publish_watermarks(table_name, self._batch_watermarks(batch_data))
+                return True
+            except ClickHouseQueryError as e:
+                self.logger.error("ClickHouse批量插入失败", error=str(e))
+                try:
+                    self.clickhouse_insert_errors = getattr(self, 'clickhouse_insert_errors', 0) + 1
+                except Exception:
+                    pass
+                return False
 
         except Exception as e:
             self.logger.error("批量插入到ClickHouse异常", exception=e)
@@ -1441,6 +1592,26 @@ class SimpleHotStorageService:
                 pass
             return False
 
+    @staticmethod
+    def _batch_watermarks(batch: ColumnBatch) -> Dict[tuple, int]:
+        """批次内每个 (交易所, 交易对) 的最大时间戳"""
+        watermarks: Dict[tuple, int] = {}
+        for ex, sym, ts in zip(batch.column('exchange'), batch.column('symbol'), batch.column('timestamp')):
+            key = (ex, sym)
+            if ts > watermarks.get(key, -1):
+                watermarks[key] = ts
+        return watermarks
+
+    async def _publish_watermarks(self, table_name: str, watermarks: Dict[tuple, int]) -> None:
+        """发布写入水位（core NATS，尽力而为，失败不影响写入结果）"""
+        if not self.publish_watermarks or not watermarks or not self.nats_client:
+            return
+        try:
+            payload = encode_watermarks(table_name, ((ex, sym, ts) for (ex, sym), ts in watermarks.items()))
+            await self.nats_client.publish(f"{WATERMARK_SUBJECT_PREFIX}.{table_name}", payload)
+        except Exception as e:
+            self.logger.debug("水位发布失败", table=table_name, error=str(e))
+
     def _build_batch_insert_sql(self, table_name: str, batch_data: List[Dict[str, Any]]) -> str:
         """构建批量插入SQL"""
         if not batch_data:
@@ -1667,6 +1838,17 @@ class SimpleHotStorageService:
 
 
 
+            # 🔧 停止拉取循环（未ACK的消息会在重启后重新投递）
+            for data_type, task in self.pull_tasks.items():
+                try:
+                    if not task.done():
+                        task.cancel()
+                        await task
+                except asyncio.CancelledError:
+                    pass
+                except Exception as e:
+                    self.logger.error("停止拉取循环失败", data_type=data_type, exception=e)
+
             # 关闭订阅
             for data_type, subscription in self.subscriptions.items():
                 try:
@@ -1680,6 +1862,11 @@ class SimpleHotStorageService:
                 await self.nats_client.close()
                 self.logger.info("NATS连接已关闭")
 
+            # 关闭ClickHouse客户端（缓冲区已刷新）
+            if self._ch_client:
+                await self._ch_client.close()
+                self._ch_client = None
+
             # 优雅关闭 HTTP/Metrics 服务器
             try:
                 if getattr(self, 'http_server', None):
@@ -1981,6 +2168,15 @@ class SimpleHotStorageService:
         except Exception:
             pass
 
+        # JetStream 拉取消费（pull 模式）
+        try:
+            for dt, backlog in (getattr(self, 'pull_backlog', {}) or {}).items():
+                metrics.append(f'marketprism_storage_pull_backlog{{data_type="{dt}"}} {int(backlog)}')
+            for dt, size in (getattr(self, 'pull_batch_sizes', {}) or {}).items():
+                metrics.append(f'marketprism_storage_pull_batch_size{{data_type="{dt}"}} {int(size)}')
+        except Exception:
+            pass
+
         # 错误率
         total_messages = self.stats["messages_received"]
         # 进程CPU使用率（百分比）
@@ -519,7 +519,7 @@ CREATE TABLE IF NOT EXISTS funding_rates (
     data_source LowCardinality(String) DEFAULT 'marketprism' CODEC(ZSTD),
     created_at DateTime64(3, 'UTC') DEFAULT now64(3) CODEC(Delta, ZSTD)
 ) ENGINE = MergeTree()
-PARTITION BY (toYYYYMM(timestamp), exchange)
+PARTITION BY (toYYYYMMDD(timestamp), exchange)
 ORDER BY (timestamp, exchange, symbol)
 SETTINGS index_granularity = 8192;
 
@@ -534,7 +534,7 @@ CREATE TABLE IF NOT EXISTS open_interests (
     data_source LowCardinality(String) DEFAULT 'marketprism' CODEC(ZSTD),
     created_at DateTime64(3, 'UTC') DEFAULT now64(3) CODEC(Delta, ZSTD)
 ) ENGINE = MergeTree()
-PARTITION BY (toYYYYMM(timestamp), exchange)
+PARTITION BY (toYYYYMMDD(timestamp), exchange)
 ORDER BY (timestamp, exchange, symbol)
 SETTINGS index_granularity = 8192;
 
@@ -551,7 +551,7 @@ CREATE TABLE IF NOT EXISTS liquidations (
     data_source LowCardinality(String) DEFAULT 'marketprism' CODEC(ZSTD),
     created_at DateTime64(3, 'UTC') DEFAULT now64(3) CODEC(Delta, ZSTD)
 ) ENGINE = MergeTree()
-PARTITION BY (toYYYYMM(timestamp), exchange)
+PARTITION BY (toYYYYMMDD(timestamp), exchange)
 ORDER BY (timestamp, exchange, symbol)
 SETTINGS index_granularity = 8192;
 
@@ -569,7 +569,7 @@ CREATE TABLE IF NOT EXISTS lsr_top_positions (
     data_source LowCardinality(String) DEFAULT 'marketprism' CODEC(ZSTD),
     created_at DateTime64(3, 'UTC') DEFAULT now64(3) CODEC(Delta, ZSTD)
 ) ENGINE = MergeTree()
-PARTITION BY (toYYYYMM(timestamp), exchange)
+PARTITION BY (toYYYYMMDD(timestamp), exchange)
 ORDER BY (timestamp, exchange, symbol, period)
 SETTINGS index_granularity = 8192;
 
@@ -588,7 +588,7 @@ CREATE TABLE IF NOT EXISTS lsr_all_accounts (
     data_source LowCardinality(String) DEFAULT 'marketprism' CODEC(ZSTD),
     created_at DateTime64(3, 'UTC') DEFAULT now64(3) CODEC(Delta, ZSTD)
 ) ENGINE = MergeTree()
-PARTITION BY (toYYYYMM(timestamp), exchange)
+PARTITION BY (toYYYYMMDD(timestamp), exchange)
 ORDER BY (timestamp, exchange, symbol, period)
 SETTINGS index_granularity = 8192;
 
@@ -605,7 +605,7 @@ CREATE TABLE IF NOT EXISTS volatility_indices (
     data_source LowCardinality(String) DEFAULT 'marketprism' CODEC(ZSTD),
     created_at DateTime64(3, 'UTC') DEFAULT now64(3) CODEC(Delta, ZSTD)
 ) ENGINE = MergeTree()
-PARTITION BY (toYYYYMM(timestamp), exchange)
+PARTITION BY (toYYYYMMDD(timestamp), exchange)
 ORDER BY (timestamp, exchange, symbol)
 SETTINGS index_granularity = 8192;
 EOF
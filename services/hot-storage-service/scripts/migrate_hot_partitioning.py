@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+热端表分区迁移：PARTITION BY (toYYYYMM(timestamp), exchange) -> (toYYYYMMDD(timestamp), exchange)
+
+冷端复制器按热端分区整体 DROP PARTITION 清理已复制数据，要求热端按天分区；
+本脚本把已有按月分区的热端表原地迁移到权威 schema 的分区方式：
+  1. 以原表 create_table_query 为模板创建 <table>__repart（仅替换 PARTITION BY，列/排序键/TTL/索引不变）
+  2. 以 created_at 边界 B 为界，按原分区逐个 INSERT SELECT（created_at <= B），校验行数
+  3. EXCHANGE TABLES 原子换表，再补齐迁移期间写入的行（created_at > B）
+  4. 删除旧表（--keep-old 保留为 <table>__repart 供核对）
+
+环境变量（可选）：
+- CH_HOST (默认: 127.0.0.1)
+- CH_HTTP_PORT (默认: 8123)
+- CH_USER (默认: default)
+- CH_PASSWORD (默认: 空)
+- CH_DATABASE (默认: marketprism_hot)
+
+用法：
+  python migrate_hot_partitioning.py --dry-run
+  python migrate_hot_partitioning.py --tables trades,orderbooks
+
+退出码：0 成功（或无需迁移）；非 0 存在失败
+"""
+
+import argparse
+import base64
+import os
+import re
+import sys
+import urllib.request
+from typing import List, Optional
+
+CH_HOST = os.getenv("CH_HOST", "127.0.0.1")
+CH_PORT = int(os.getenv("CH_HTTP_PORT", "8123"))
+CH_USER = os.getenv("CH_USER", "default")
+CH_PASSWORD = os.getenv("CH_PASSWORD", "")
+CH_DATABASE = os.getenv("CH_DATABASE", "marketprism_hot")
+
+TARGET_PARTITION = "(toYYYYMMDD(timestamp), exchange)"
+TMP_SUFFIX = "__repart"
+
+TABLES = [
+    "orderbooks",
+    "trades",
+    "funding_rates",
+    "open_interests",
+    "liquidations",
+    "lsr_top_positions",
+    "lsr_all_accounts",
+    "volatility_indices",
+]
+
+RE_PARTITION_BY = re.compile(r"PARTITION BY\s+(.+?)\s+(?=ORDER BY|PRIMARY KEY|SAMPLE BY|TTL|SETTINGS)", re.IGNORECASE)
+
+
+def _http_query(sql: str) -> str:
+    req = urllib.request.Request(f"http://{CH_HOST}:{CH_PORT}/", data=sql.encode("utf-8"), method="POST")
+    if CH_USER:
+        token = base64.b64encode(f"{CH_USER}:{CH_PASSWORD}".encode()).decode()
+        req.add_header("Authorization", f"Basic {token}")
+    with urllib.request.urlopen(req, timeout=3600) as resp:
+        return resp.read().decode("utf-8").strip()
+
+
+def _scalar(sql: str) -> str:
+    out = _http_query(f"{sql} FORMAT TabSeparated")
+    return out.splitlines()[0] if out else ""
+
+
+def _norm(expr: str) -> str:
+    return expr.replace(" ", "").strip("()")
+
+
+def is_daily_partitioned(partition_key: str) -> bool:
+    return _norm(partition_key) == _norm(TARGET_PARTITION)
+
+
+def rewrite_create_query(create_query: str, database: str, table: str, new_table: str) -> str:
+    """把原表建表语句改写为目标表：替换表名与 PARTITION BY，其余保持不变"""
+    sql, n = re.subn(
+        rf"^CREATE TABLE\s+`?{re.escape(database)}`?\.`?{re.escape(table)}`?",
+        f"CREATE TABLE {database}.{new_table}",
+        create_query.strip(),
+    )
+    if n != 1:
+        raise ValueError(f"unexpected create_table_query for {database}.{table}")
+    sql, n = RE_PARTITION_BY.subn(f"PARTITION BY {TARGET_PARTITION} ", sql)
+    if n != 1:
+        raise ValueError(f"PARTITION BY not found for {database}.{table}")
+    return sql
+
+
+def migrate_table(db: str, table: str, dry_run: bool, keep_old: bool) -> Optional[str]:
+    """迁移单表；返回错误信息，成功或跳过返回 None"""
+    row = _http_query(
+        f"SELECT partition_key, create_table_query FROM system.tables "
+        f"WHERE database = '{db}' AND name = '{table}' FORMAT TabSeparatedRaw"
+    )
+    if not row:
+        print(f"  - {db}.{table}: 不存在，跳过")
+        return None
+    partition_key, create_query = row.split("\t", 1)
+    if is_daily_partitioned(partition_key):
+        print(f"  - {db}.{table}: 已按天分区，跳过")
+        return None
+
+    tmp = f"{table}{TMP_SUFFIX}"
+    new_create = rewrite_create_query(create_query, db, table, tmp)
+    partitions = [p for p in _http_query(
+        f"SELECT DISTINCT partition_id FROM system.parts "
+        f"WHERE database = '{db}' AND table = '{table}' AND active ORDER BY partition_id FORMAT TabSeparated"
+    ).splitlines() if p]
+    print(f"  - {db}.{table}: {partition_key} -> {TARGET_PARTITION}，{len(partitions)} 个分区")
+    if dry_run:
+        print(f"    [dry-run] {new_create}")
+        return None
+
+    _http_query(f"DROP TABLE IF EXISTS {db}.{tmp}")
+    _http_query(new_create)
+
+    # 迁移期间写入仍落在原表：先按 created_at 边界复制存量，换表后补齐增量
+    boundary = _scalar("SELECT toString(now64(3, 'UTC'))")
+    cond = f"created_at <= toDateTime64('{boundary}', 3, 'UTC')"
+    for pid in partitions:
+        _http_query(f"INSERT INTO {db}.{tmp} SELECT * FROM {db}.{table} WHERE _partition_id = '{pid}' AND {cond}")
+
+    expected = int(_scalar(f"SELECT count() FROM {db}.{table} WHERE {cond}") or 0)
+    copied = int(_scalar(f"SELECT count() FROM {db}.{tmp}") or 0)
+    if copied != expected:
+        return f"{db}.{table}: 行数不一致 expected={expected} copied={copied}，已保留原表"
+
+    _http_query(f"EXCHANGE TABLES {db}.{table} AND {db}.{tmp}")
+    _http_query(
+        f"INSERT INTO {db}.{table} SELECT * FROM {db}.{tmp} "
+        f"WHERE created_at > toDateTime64('{boundary}', 3, 'UTC')"
+    )
+    if not keep_old:
+        _http_query(f"DROP TABLE {db}.{tmp}")
+    print(f"    ✅ 完成，迁移 {copied} 行{'（旧表保留为 ' + tmp + '）' if keep_old else ''}")
+    return None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="迁移热端表为按天分区")
+    parser.add_argument("--tables", default=",".join(TABLES), help="逗号分隔的表名")
+    parser.add_argument("--database", default=CH_DATABASE)
+    parser.add_argument("--dry-run", action="store_true", help="只打印计划，不做修改")
+    parser.add_argument("--keep-old", action="store_true", help="保留旧表为 <table>__repart")
+    args = parser.parse_args(argv)
+
+    print(f"🔧 热端分区迁移 ({CH_HOST}:{CH_PORT}/{args.database})")
+    errors: List[str] = []
+    for table in [t.strip() for t in args.tables.split(",") if t.strip()]:
+        try:
+            err = migrate_table(args.database, table, args.dry_run, args.keep_old)
+        except Exception as e:
+            err = f"{args.database}.{table}: {e}"
+        if err:
+            errors.append(err)
+
+    if errors:
+        print("\n❌ 迁移失败: ")
+        for e in errors:
+            print(" - " + e)
+        return 1
+    print("\n✅ 迁移完成")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,10 +2,19 @@
 MarketPrism 数据存储模块
 """
 
-from .clickhouse_client import ClickHouseClient, get_clickhouse_client, close_clickhouse_client
+from .clickhouse_client import (
+    ClickHouseClient, ClickHouseConnectionError, ClickHouseQueryError,
+    NativeConnectionPool, get_clickhouse_client, close_clickhouse_client
+)
+from .column_batch import ColumnBatch, TABLE_COLUMNS
 
 __all__ = [
     "ClickHouseClient",
+    "ClickHouseConnectionError",
+    "ClickHouseQueryError",
+    "NativeConnectionPool",
     "get_clickhouse_client", 
-    "close_clickhouse_client"
+    "close_clickhouse_client",
+    "ColumnBatch",
+    "TABLE_COLUMNS"
 ]
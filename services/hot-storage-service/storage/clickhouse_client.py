@@ -1,12 +1,16 @@
 #!/usr/bin/env python3
 """
 ClickHouse客户端优化模块
-修复HTTP查询方式，增强错误处理和重试机制
+修复HTTP查询方式，增强错误处理和重试机制；原生TCP连接池化，每个连接固定在一个工作线程上
 """
 
 import aiohttp
 import asyncio
-from typing import Optional, Dict, Any, List, Union
+import math
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Optional, Dict, Any, List, Union, Sequence, AsyncIterator, Callable
 import structlog
 from datetime import datetime
 import time
@@ -16,6 +20,11 @@ from decimal import Decimal
 
 logger = structlog.get_logger(__name__)
 
+try:
+    from clickhouse_driver.errors import ServerException as _DriverServerError
+except ImportError:  # 未安装驱动时只走HTTP
+    _DriverServerError = ()
+
 
 class ClickHouseConnectionError(Exception):
     """ClickHouse连接错误"""
@@ -27,6 +36,78 @@ class ClickHouseQueryError(Exception):
     pass
 
 
+def _execution_limit(timeout: float) -> int:
+    """服务端 max_execution_time（秒，0 表示不限，故至少为 1）"""
+    return max(1, math.ceil(timeout))
+
+
+class NativeConnection:
+    """固定在单个工作线程上的 clickhouse_driver 连接（驱动连接非线程安全）"""
+    
+    def __init__(self, index: int, client):
+        self.index = index
+        self.client = client
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"clickhouse-native-{index}")
+        self.queries = 0
+    
+    def run(self, fn: Callable, *args, **kwargs) -> "asyncio.Future":
+        """在连接所属线程执行，返回可 await 的 Future"""
+        return asyncio.wrap_future(self.executor.submit(fn, *args, **kwargs))
+    
+    def close(self):
+        self.executor.submit(self.client.disconnect)
+        self.executor.shutdown(wait=False)
+
+
+class NativeConnectionPool:
+    """有界原生连接池：同时执行的查询数不超过连接数，超出的在 acquire 处排队"""
+    
+    def __init__(self, factory: Callable[[], Any], size: int = 4):
+        self.factory = factory
+        self.size = size
+        self.connections: List[NativeConnection] = []
+        self._idle: Optional[asyncio.Queue] = None
+        self.waits = 0
+    
+    def open(self):
+        self._idle = asyncio.Queue()
+        for i in range(self.size):
+            conn = NativeConnection(i, self.factory())
+            self.connections.append(conn)
+            self._idle.put_nowait(conn)
+    
+    async def acquire(self, timeout: Optional[float] = None) -> NativeConnection:
+        if self._idle.empty():
+            self.waits += 1
+        try:
+            return await asyncio.wait_for(self._idle.get(), timeout)
+        except asyncio.TimeoutError:
+            raise ClickHouseQueryError(f"等待ClickHouse连接超时({timeout}s)")
+    
+    def release(self, conn: NativeConnection):
+        self._idle.put_nowait(conn)
+    
+    def release_when_done(self, conn: NativeConnection, future: "asyncio.Future"):
+        """线程中的查询结束后再归还连接（超时/取消时查询可能仍在执行）"""
+        if future.done():
+            self.release(conn)
+        else:
+            future.add_done_callback(lambda _: self.release(conn))
+    
+    def close(self):
+        for conn in self.connections:
+            conn.close()
+        self.connections.clear()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "size": self.size,
+            "idle": self._idle.qsize() if self._idle else 0,
+            "waits": self.waits,
+            "queries": [conn.queries for conn in self.connections],
+        }
+
+
 class ClickHouseClient:
     """优化的ClickHouse客户端，支持HTTP和TCP连接"""
     
@@ -39,7 +120,10 @@ class ClickHouseClient:
                  password: str = "",
                  timeout: int = 30,
                  max_retries: int = 3,
-                 retry_delay: float = 1.0):
+                 retry_delay: float = 1.0,
+                 pool_size: int = 4,
+                 use_native: bool = True,
+                 stream_block_rows: int = 10000):
         self.host = host
         self.http_port = http_port
         self.tcp_port = tcp_port
@@ -52,7 +136,10 @@ class ClickHouseClient:
         
         self.http_url = f"http://{host}:{http_port}/"
         self.session: Optional[aiohttp.ClientSession] = None
-        self.tcp_client = None
+        self.pool_size = pool_size
+        self.use_native = use_native
+        self.stream_block_rows = stream_block_rows
+        self.pool: Optional[NativeConnectionPool] = None
         
         # 连接状态跟踪
         self.http_available = True
@@ -95,33 +182,36 @@ class ClickHouseClient:
             headers={"User-Agent": "MarketPrism-Storage/1.0"}
         )
         
-        # 尝试初始化TCP客户端
-        try:
-            from clickhouse_driver import Client as CHClient
-            self.tcp_client = CHClient(
-                host=self.host,
-                port=self.tcp_port,
-                database=self.database,
-                user=self.user,
-                password=self.password,
-                connect_timeout=self.timeout,
-                send_receive_timeout=self.timeout
-            )
-            # 测试TCP连接
-            await asyncio.get_event_loop().run_in_executor(
-                None, self.tcp_client.execute, "SELECT 1"
-            )
-            self.tcp_available = True
-            logger.info("ClickHouse TCP连接建立成功", 
-                       host=self.host, port=self.tcp_port)
-        except Exception as e:
-            logger.warning("ClickHouse TCP连接失败，将使用HTTP", 
-                          error=str(e))
-            self.tcp_client = None
-            self.tcp_available = False
+        # 尝试初始化TCP连接池
+        if self.use_native:
+            try:
+                from clickhouse_driver import Client as CHClient
+                self.pool = NativeConnectionPool(lambda: CHClient(
+                    host=self.host,
+                    port=self.tcp_port,
+                    database=self.database,
+                    user=self.user,
+                    password=self.password,
+                    connect_timeout=self.timeout,
+                    send_receive_timeout=self.timeout
+                ), size=self.pool_size)
+                self.pool.open()
+                # 测试TCP连接
+                await self.execute_native("SELECT 1")
+                self.tcp_available = True
+                logger.info("ClickHouse TCP连接池建立成功", 
+                           host=self.host, port=self.tcp_port, pool_size=self.pool_size)
+            except Exception as e:
+                logger.warning("ClickHouse TCP连接失败，将使用HTTP", 
+                              error=str(e))
+                self.tcp_available = False
         
-        # 测试HTTP连接
-        await self._test_http_connection()
+        # 测试HTTP连接（TCP可用时HTTP仅作回退，不阻止启动）
+        try:
+            await self._test_http_connection()
+        except ClickHouseConnectionError:
+            if not self.tcp_available:
+                raise
     
     async def _test_http_connection(self):
         """测试HTTP连接"""
@@ -171,6 +261,168 @@ class ClickHouseClient:
             result = await response.text()
             return result.strip()
     
+    async def execute_http(self, query: str, params: Optional[Dict] = None) -> str:
+        """通过共享HTTP会话执行查询"""
+        return await self._execute_http_query(query, params)
+    
+    async def execute_native(self, query: str, params: Any = None,
+                             timeout: Optional[float] = None, **kwargs) -> Any:
+        """
+        在池中的原生连接上执行查询
+        
+        超时或被取消时通过 KILL QUERY 终止服务端查询，查询线程结束后连接才回到池中。
+        kwargs 透传给 clickhouse_driver.Client.execute（如 columnar、settings）。
+        """
+        if not self.pool:
+            raise ClickHouseConnectionError("TCP连接池未初始化")
+        
+        timeout = timeout or self.timeout
+        settings = {"max_execution_time": _execution_limit(timeout), **(kwargs.pop("settings", None) or {})}
+        query_id = uuid.uuid4().hex
+        conn = await self.pool.acquire(timeout)
+        future = conn.run(conn.client.execute, query, params,
+                          query_id=query_id, settings=settings, **kwargs)
+        conn.queries += 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            self._kill_query(query_id)
+            raise ClickHouseQueryError(f"查询超时({timeout}s): {query[:100]}")
+        except asyncio.CancelledError:
+            self._kill_query(query_id)
+            raise
+        finally:
+            self.pool.release_when_done(conn, future)
+    
+    def _kill_query(self, query_id: str):
+        """异步终止服务端查询"""
+        async def kill():
+            try:
+                await self._execute_http_query(f"KILL QUERY WHERE query_id = '{query_id}' ASYNC")
+            except Exception as e:
+                logger.warning("终止ClickHouse查询失败", query_id=query_id, error=str(e))
+        
+        if self.session:
+            asyncio.ensure_future(kill())
+    
+    async def stream(self, query: str, params: Any = None,
+                     block_rows: Optional[int] = None,
+                     timeout: Optional[float] = None) -> AsyncIterator[List[tuple]]:
+        """
+        按块流式返回查询结果，不在内存中物化完整结果集
+        
+        TCP 可用时逐块从原生连接读取，否则用 HTTP JSONCompactEachRow 逐行解析。
+        """
+        block_rows = block_rows or self.stream_block_rows
+        timeout = timeout or self.timeout
+        if self.tcp_available and self.pool:
+            async for block in self._stream_native(query, params, block_rows, timeout):
+                yield block
+        else:
+            async for block in self._stream_http(query, block_rows, timeout):
+                yield block
+    
+    async def _stream_native(self, query: str, params: Any, block_rows: int,
+                             timeout: float) -> AsyncIterator[List[tuple]]:
+        query_id = uuid.uuid4().hex
+        conn = await self.pool.acquire(timeout)
+        conn.queries += 1
+        rows_iter = None
+        exhausted = False
+        future = None
+        try:
+            future = conn.run(conn.client.execute_iter, query, params, query_id=query_id,
+                              settings={"max_block_size": block_rows, "max_execution_time": _execution_limit(timeout)})
+            rows_iter = await asyncio.wait_for(asyncio.shield(future), timeout)
+            while True:
+                future = conn.run(lambda: list(islice(rows_iter, block_rows)))
+                block = await asyncio.wait_for(asyncio.shield(future), timeout)
+                if not block:
+                    exhausted = True
+                    return
+                yield block
+        except asyncio.TimeoutError:
+            raise ClickHouseQueryError(f"流式查询超时({timeout}s): {query[:100]}")
+        finally:
+            if not exhausted:
+                # 提前退出/超时/取消：终止服务端查询并重置连接，未读完的结果不能留在连接上
+                self._kill_query(query_id)
+                future = conn.run(conn.client.disconnect)
+            self.pool.release_when_done(conn, future)
+    
+    async def _stream_http(self, query: str, block_rows: int, timeout: float) -> AsyncIterator[List[tuple]]:
+        if not self.session:
+            raise ClickHouseConnectionError("HTTP会话未初始化")
+        
+        params = {"database": self.database, "max_execution_time": str(_execution_limit(timeout))}
+        if self.user:
+            params["user"] = self.user
+        if self.password:
+            params["password"] = self.password
+        async with self.session.post(
+            self.http_url,
+            params=params,
+            data=f"{query} FORMAT JSONCompactEachRow".encode('utf-8'),
+            headers={"Content-Type": "text/plain; charset=utf-8"}
+        ) as response:
+            if response.status != 200:
+                raise ClickHouseQueryError(
+                    f"HTTP查询失败 (状态码: {response.status}): {await response.text()}"
+                )
+            block = []
+            async for line in response.content:
+                if line.strip():
+                    block.append(tuple(json.loads(line)))
+                    if len(block) >= block_rows:
+                        yield block
+                        block = []
+            if block:
+                yield block
+    
+    async def insert_columns(self, table: str, columns: Dict[str, Sequence],
+                             timeout: Optional[float] = None, http_fallback: bool = True) -> int:
+        """
+        按列批量插入
+        
+        Args:
+            table: 表名
+            columns: 列名 -> 列值序列，各列长度需一致
+            http_fallback: TCP失败时是否以 JSONEachRow 经HTTP重试；
+                列值需由调用方换算为HTTP可解析格式时传 False，直接抛出异常
+            
+        Returns:
+            int: 插入行数
+        """
+        lengths = {len(values) for values in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"列长度不一致: { {name: len(v) for name, v in columns.items()} }")
+        rows = lengths.pop() if lengths else 0
+        if rows == 0:
+            return 0
+        
+        names = ", ".join(columns)
+        if self.tcp_available and self.pool:
+            try:
+                await self.execute_native(f"INSERT INTO {table} ({names}) VALUES",
+                                          [list(values) for values in columns.values()],
+                                          timeout=timeout, columnar=True)
+                return rows
+            except (ClickHouseQueryError, _DriverServerError):
+                # 超时或服务端拒绝（类型/语法等）：连接本身正常，不切换到HTTP
+                raise
+            except Exception as e:
+                logger.warning("TCP列式插入失败，切换到HTTP", error=str(e), table=table)
+                self.tcp_available = False
+                if not http_fallback:
+                    raise
+        
+        body = "\n".join(
+            json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=str)
+            for row in zip(*columns.values())
+        )
+        await self._execute_http_query(f"INSERT INTO {table} ({names}) FORMAT JSONEachRow\n{body}")
+        return rows
+    
     async def execute(self, query: str, params: Optional[Dict] = None) -> Union[str, List[Dict]]:
         """执行查询，自动选择最佳连接方式"""
         start_time = time.time()
@@ -186,17 +438,16 @@ class ClickHouseClient:
         for attempt in range(self.max_retries):
             try:
                 # 优先使用TCP连接
-                if self.tcp_available and self.tcp_client:
+                if self.tcp_available and self.pool:
                     try:
-                        result = await asyncio.get_event_loop().run_in_executor(
-                            None, self._execute_tcp_query, query, params
-                        )
+                        result = await self.execute_native(query, params)
                         self._update_stats(start_time, True)
                         return result
                     except Exception as e:
                         logger.warning("TCP查询失败，切换到HTTP", 
                                      error=str(e), attempt=attempt + 1)
-                        self.tcp_available = False
+                        if not isinstance(e, _DriverServerError):
+                            self.tcp_available = False
                         last_error = e
                 
                 # 使用HTTP连接
@@ -233,20 +484,17 @@ class ClickHouseClient:
         self._update_stats(start_time, False, last_error)
         raise ClickHouseQueryError(f"查询失败，已重试{self.max_retries}次: {last_error}")
     
-    def _execute_tcp_query(self, query: str, params: Optional[Dict] = None):
-        """执行TCP查询（同步方法，在线程池中运行）"""
-        if not self.tcp_client:
-            raise ClickHouseConnectionError("TCP客户端未初始化")
-        
-        try:
-            if params:
-                return self.tcp_client.execute(query, params)
-            else:
-                return self.tcp_client.execute(query)
-        except Exception as e:
-            # TCP连接失败，标记为不可用
-            self.tcp_available = False
-            raise e
+    async def recover_tcp(self) -> bool:
+        """
+        TCP不可用时按 health_check_interval 重新探测，返回TCP当前是否可用
+
+        只调用 insert_columns/execute_native 而不经过 execute() 的调用方在写入前调用，
+        否则一次连接错误后会永久停留在HTTP。
+        """
+        if not self.tcp_available and self.pool \
+                and time.time() - self.last_health_check > self.health_check_interval:
+            await self._health_check()
+        return self.tcp_available
     
     async def _health_check(self):
         """健康检查"""
@@ -260,11 +508,9 @@ class ClickHouseClient:
                 pass
         
         # 检查TCP连接
-        if not self.tcp_available and self.tcp_client:
+        if not self.tcp_available and self.pool:
             try:
-                await asyncio.get_event_loop().run_in_executor(
-                    None, self.tcp_client.execute, "SELECT 1"
-                )
+                await self.execute_native("SELECT 1")
                 self.tcp_available = True
                 logger.info("TCP连接恢复")
             except:
@@ -302,6 +548,7 @@ class ClickHouseClient:
             **self.stats,
             "http_available": self.http_available,
             "tcp_available": self.tcp_available,
+            "pool": self.pool.get_stats() if self.pool else None,
             "connection_info": {
                 "host": self.host,
                 "http_port": self.http_port,
@@ -316,12 +563,9 @@ class ClickHouseClient:
             await self.session.close()
             self.session = None
         
-        if self.tcp_client:
-            try:
-                self.tcp_client.disconnect()
-            except:
-                pass
-            self.tcp_client = None
+        if self.pool:
+            self.pool.close()
+            self.pool = None
         
         logger.info("ClickHouse客户端连接已关闭")
 
@@ -344,7 +588,8 @@ async def get_clickhouse_client() -> ClickHouseClient:
             user=os.getenv("CLICKHOUSE_USER", "default"),
             password=os.getenv("CLICKHOUSE_PASSWORD", ""),
             timeout=int(os.getenv("CLICKHOUSE_TIMEOUT", "30")),
-            max_retries=int(os.getenv("CLICKHOUSE_MAX_RETRIES", "3"))
+            max_retries=int(os.getenv("CLICKHOUSE_MAX_RETRIES", "3")),
+            pool_size=int(os.getenv("CLICKHOUSE_POOL_SIZE", "4"))
         )
         await _global_client.connect()
 
@@ -0,0 +1,148 @@
+"""
+热端列式批次
+消息校验后直接按列写入类型化缓冲区，插入时整批交给驱动列式写入，不再保留逐行字典
+"""
+
+import sys
+from array import array
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# 列类型：ts=毫秒时间戳(DateTime64(3))，int=整数，dec=Decimal，bool=布尔，
+# lc=LowCardinality 字符串（驻留复用），str=普通字符串
+_ARRAY_CODES = {'ts': 'q', 'int': 'q', 'dec': 'd', 'bool': 'b'}
+
+# (列名, 类型, 校验后字段名, 缺省值/回退字段)
+# ts 列缺省时回退到 ts_ms；其余列缺省时取缺省值（与 _build_values_for_record 一致）
+_BASE_COLUMNS = (
+    ('timestamp', 'ts', 'ts_ms', None),
+    ('exchange', 'lc', 'exchange', ''),
+    ('market_type', 'lc', 'market_type', ''),
+    ('symbol', 'lc', 'symbol', ''),
+    ('data_source', 'lc', 'data_source', ''),
+)
+
+TABLE_COLUMNS = {
+    'orderbooks': _BASE_COLUMNS + (
+        ('last_update_id', 'int', 'last_update_id', 0),
+        ('bids_count', 'int', 'bids_count', 0),
+        ('asks_count', 'int', 'asks_count', 0),
+        ('best_bid_price', 'dec', 'best_bid_price', 0),
+        ('best_ask_price', 'dec', 'best_ask_price', 0),
+        ('best_bid_quantity', 'dec', 'best_bid_quantity', 0),
+        ('best_ask_quantity', 'dec', 'best_ask_quantity', 0),
+        ('bids', 'str', 'bids', '[]'),
+        ('asks', 'str', 'asks', '[]'),
+    ),
+    'trades': _BASE_COLUMNS + (
+        ('trade_id', 'str', 'trade_id', ''),
+        ('price', 'dec', 'price', 0),
+        ('quantity', 'dec', 'quantity', 0),
+        ('side', 'lc', 'side', ''),
+        ('is_maker', 'bool', 'is_maker', False),
+        ('trade_time', 'ts', 'trade_ts_ms', None),
+    ),
+    'funding_rates': _BASE_COLUMNS + (
+        ('funding_rate', 'dec', 'funding_rate', 0),
+        ('funding_time', 'ts', 'funding_ts_ms', None),
+        ('next_funding_time', 'ts', 'next_funding_ts_ms', None),
+    ),
+    'liquidations': _BASE_COLUMNS + (
+        ('side', 'lc', 'side', ''),
+        ('price', 'dec', 'price', 0),
+        ('quantity', 'dec', 'quantity', 0),
+        ('liquidation_time', 'ts', 'liquidation_ts_ms', None),
+    ),
+    'lsr_top_positions': _BASE_COLUMNS + (
+        ('long_position_ratio', 'dec', 'long_position_ratio', 0),
+        ('short_position_ratio', 'dec', 'short_position_ratio', 0),
+        ('period', 'lc', 'period', '5m'),
+    ),
+    'lsr_all_accounts': _BASE_COLUMNS + (
+        ('long_account_ratio', 'dec', 'long_account_ratio', 0),
+        ('short_account_ratio', 'dec', 'short_account_ratio', 0),
+        ('period', 'lc', 'period', '5m'),
+    ),
+}
+
+
+def _new_buffer(kind: str):
+    code = _ARRAY_CODES.get(kind)
+    return array(code) if code else []
+
+
+class ColumnBatch:
+    """
+    单表列式批次
+
+    数值/时间列使用 array 缓冲（连续内存，无逐值对象开销），字符串列为列表，
+    交易所/市场类型等低基数列做字符串驻留。未定义列的表只写基础字段，与SQL路径一致。
+    """
+
+    def __init__(self, table: str, _columns: Optional[Dict[str, Any]] = None):
+        self.table = table
+        self.spec: Tuple[Tuple[str, str, str, Any], ...] = TABLE_COLUMNS.get(table, _BASE_COLUMNS)
+        self._columns = _columns if _columns is not None else {
+            name: _new_buffer(kind) for name, kind, _, _ in self.spec
+        }
+        self._size = len(self._columns['timestamp'])
+
+    def append(self, record: Dict[str, Any]):
+        """追加一条已校验记录（调用方随后即可丢弃该字典）"""
+        ts_ms = int(record.get('ts_ms', 0) or 0)
+        values = []
+        # 先全部转换，避免中途出错时各列长度不一致
+        for name, kind, key, default in self.spec:
+            value = record.get(key, default)
+            if kind == 'ts':
+                value = ts_ms if value is None else int(value)
+            elif kind == 'int':
+                value = int(value)
+            elif kind == 'dec':
+                value = float(value)
+            elif kind == 'bool':
+                value = 1 if value else 0
+            elif kind == 'lc':
+                value = sys.intern(str(value))
+            else:
+                value = str(value)
+            values.append(value)
+
+        for (name, _, _, _), value in zip(self.spec, values):
+            self._columns[name].append(value)
+        self._size += 1
+
+    def __len__(self) -> int:
+        return self._size
+
+    def slice(self, start: int, end: Optional[int] = None) -> "ColumnBatch":
+        """按行切片"""
+        return ColumnBatch(self.table, {name: col[start:end] for name, col in self._columns.items()})
+
+    def chunks(self, chunk_size: int) -> Iterator["ColumnBatch"]:
+        """按行数分片；整批不超过分片大小时直接返回自身"""
+        if chunk_size <= 0 or self._size <= chunk_size:
+            if self._size:
+                yield self
+            return
+        for start in range(0, self._size, chunk_size):
+            yield self.slice(start, start + chunk_size)
+
+    def columns(self) -> Dict[str, Sequence]:
+        """列名 -> 列缓冲，供 ClickHouseClient.insert_columns 使用"""
+        return dict(self._columns)
+
+    def column(self, name: str) -> Sequence:
+        return self._columns[name]
+
+    def rows(self) -> List[Dict[str, Any]]:
+        """还原为校验后字典，供SQL/HTTP回退与单条重试"""
+        keys = [(name, kind, key) for name, kind, key, _ in self.spec]
+        rows = []
+        for i in range(self._size):
+            row = {}
+            for name, kind, key in keys:
+                value = self._columns[name][i]
+                row[key] = bool(value) if kind == 'bool' else value
+            rows.append(row)
+        return rows
+
@@ -9,12 +9,104 @@ import yaml
 import nats
 from nats.js import JetStreamContext
 from nats.js.api import StreamConfig, RetentionPolicy, DiscardPolicy, StorageType
+import dataclasses
 import logging
 import sys
 from pathlib import Path
 import time
 import os
 
+try:  # nats-py >= 2.5（服务端 >= 2.10）
+    from nats.js.api import StoreCompression, SubjectTransform
+except ImportError:  # pragma: no cover - 旧客户端不支持压缩与主题变换
+    StoreCompression = None
+    SubjectTransform = None
+
+
+# 当前客户端 StreamConfig 支持的字段；不支持的可选项会被跳过并告警
+_STREAM_CONFIG_FIELDS = {f.name for f in dataclasses.fields(StreamConfig)}
+
+# 按数据类型拆分时各子流继承的键（subjects/name/split_by/per_type 除外）
+_SPLIT_CONTROL_KEYS = ('name', 'subjects', 'split_by', 'per_type')
+
+# 历史遗留流：不在目标配置中时删除
+LEGACY_STREAMS = ('ORDERBOOK_SNAP',)
+
+
+def expand_streams(streams_config: dict) -> dict:
+    """
+    展开流配置
+
+    声明了 ``split_by: data_type`` 的流按主题首段拆分为每个数据类型一个流
+    （名称 ``<NAME>_<TYPE>``），各自拥有独立的存储、限额与去重表；
+    ``per_type`` 可按数据类型覆盖任意流参数（如 memory 存储、更短的 max_age）。
+    """
+    expanded = {}
+    for stream_name, stream_cfg in (streams_config or {}).items():
+        cfg = dict(stream_cfg or {})
+        cfg.setdefault('name', stream_name)
+
+        if cfg.get('split_by') != 'data_type':
+            expanded[cfg['name']] = cfg
+            continue
+
+        groups = {}
+        for subject in cfg.get('subjects', []):
+            groups.setdefault(subject.split('.', 1)[0], []).append(subject)
+
+        base = {k: v for k, v in cfg.items() if k not in _SPLIT_CONTROL_KEYS}
+        per_type = cfg.get('per_type') or {}
+        for data_type, subjects in groups.items():
+            sub_cfg = dict(base)
+            sub_cfg.update(per_type.get(data_type) or {})
+            sub_cfg['name'] = f"{cfg['name']}_{data_type.upper()}"
+            sub_cfg['subjects'] = subjects
+            expanded[sub_cfg['name']] = sub_cfg
+    return expanded
+
+
+def build_stream_config(config: dict, logger: logging.Logger = None) -> StreamConfig:
+    """由 YAML 流配置构建 StreamConfig"""
+    logger = logger or logging.getLogger('JetStreamInitializer')
+    storage = str(config.get('storage', 'file')).lower()
+    discard = str(config.get('discard', 'old')).lower()
+
+    kwargs = dict(
+        name=config['name'],
+        subjects=config['subjects'],
+        retention=RetentionPolicy.LIMITS,
+        max_consumers=config.get('max_consumers', 50),
+        max_msgs=config.get('max_msgs', 10000000),
+        max_bytes=config.get('max_bytes', 10737418240),
+        max_age=config.get('max_age', 259200),
+        discard=DiscardPolicy.NEW if discard == 'new' else DiscardPolicy.OLD,
+        storage=StorageType.MEMORY if storage == 'memory' else StorageType.FILE,
+        num_replicas=config.get('num_replicas', 1),
+        duplicate_window=config.get('duplicate_window', 300),
+        max_msgs_per_subject=config.get('max_msgs_per_subject', 0),
+    )
+    if 'max_msg_size' in config:
+        kwargs['max_msg_size'] = config['max_msg_size']
+    if 'allow_direct' in config:
+        kwargs['allow_direct'] = bool(config['allow_direct'])
+
+    # S2 压缩只作用于文件存储
+    compression = str(config.get('compression', 'none')).lower()
+    if compression == 's2' and storage != 'memory':
+        if StoreCompression is not None and 'compression' in _STREAM_CONFIG_FIELDS:
+            kwargs['compression'] = StoreCompression.S2
+        else:
+            logger.warning(f"⚠️ 当前 nats-py 不支持流压缩，忽略 compression: {config['name']}")
+
+    transform = config.get('subject_transform')
+    if transform:
+        if SubjectTransform is not None and 'subject_transform' in _STREAM_CONFIG_FIELDS:
+            kwargs['subject_transform'] = SubjectTransform(src=transform['src'], dest=transform['dest'])
+        else:
+            logger.warning(f"⚠️ 当前 nats-py 不支持主题变换，忽略 subject_transform: {config['name']}")
+
+    return StreamConfig(**kwargs)
+
 
 class JetStreamInitializer:
     """JetStream 初始化器"""
@@ -75,16 +167,13 @@ class JetStreamInitializer:
             js = nc.jetstream()
 
             # 获取streams配置（统一使用 dict 结构：streams: {STREAM_NAME: {...}}）
-            streams_config = self.config.get('streams', {}) or {}
+            streams_config = expand_streams(self.config.get('streams', {}))
 
-            for stream_name, stream_cfg in streams_config.items():
-                cfg = dict(stream_cfg or {})
-                cfg.setdefault('name', stream_name)
-                await self._create_or_update_stream(js, cfg)
+            # 先清理遗留/退役流，避免与新布局的 subjects 重叠导致创建失败
+            await self.cleanup_streams(js, set(streams_config.keys()))
 
-            # 清理遗留的历史流（安全版：仅 ORDERBOOK_SNAP 且不在目标配置时）
-            desired_names = set(streams_config.keys())
-            await self.cleanup_streams(js, desired_names)
+            for cfg in streams_config.values():
+                await self._create_or_update_stream(js, cfg)
 
             await nc.close()
             self.logger.info("✅ JetStream初始化完成")
@@ -102,20 +191,7 @@ class JetStreamInitializer:
         self.logger.info(f"   Subjects: {len(subjects)} 个")
 
         # 创建stream配置
-        stream_config = StreamConfig(
-            name=stream_name,
-            subjects=subjects,
-            retention=RetentionPolicy.LIMITS,
-            max_consumers=config.get('max_consumers', 50),
-            max_msgs=config.get('max_msgs', 10000000),
-            max_bytes=config.get('max_bytes', 10737418240),
-            max_age=config.get('max_age', 259200),
-            discard=DiscardPolicy.OLD,
-            storage=StorageType.FILE,
-            num_replicas=config.get('num_replicas', 1),
-            duplicate_window=config.get('duplicate_window', 300),
-            max_msgs_per_subject=config.get('max_msgs_per_subject', 0),
-        )
+        stream_config = build_stream_config(config, self.logger)
 
         try:
             # 检查stream是否存在
@@ -128,8 +204,8 @@ class JetStreamInitializer:
                 self.logger.info(f"🔄 Stream更新成功: {stream_name}")
             except Exception as ue:
                 msg = str(ue).lower()
-                if "can not change maxconsumers" in msg or "maxconsumers" in msg:
-                    self.logger.warning(f"⚠️ 更新失败因 MaxConsumers 变更，删除后重建: {stream_name}")
+                if "maxconsumers" in msg or "storage type" in msg:
+                    self.logger.warning(f"⚠️ 更新失败因不可变字段（MaxConsumers/存储类型）变更，删除后重建: {stream_name}")
                     await js.delete_stream(stream_name)
                     await js.add_stream(stream_config)
                     self.logger.info(f"✅ 重新创建成功: {stream_name}")
@@ -155,26 +231,25 @@ class JetStreamInitializer:
 
     async def cleanup_streams(self, js: JetStreamContext, desired_names: set):
         """清理配置中未声明但仍存在的特定旧流（安全版）
-        当前仅针对历史遗留的 ORDERBOOK_SNAP 进行清理，以避免误删其他自建流。
+        仅针对历史遗留的 ORDERBOOK_SNAP 以及配置 retire_streams 中显式列出的流
+        （如切换为按类型拆分后的 MARKET_DATA），以避免误删其他自建流。
         """
-        try:
+        candidates = list(LEGACY_STREAMS) + list(self.config.get('retire_streams') or [])
+        for stream_name in candidates:
             # 仅当该流不在目标配置里时才考虑删除
-            if "ORDERBOOK_SNAP" not in desired_names:
-                try:
-                    await js.stream_info("ORDERBOOK_SNAP")
-                    self.logger.warning("🧹 检测到遗留流 ORDERBOOK_SNAP，开始删除（与当前配置不一致）...")
-                    await js.delete_stream("ORDERBOOK_SNAP")
-                    self.logger.info("✅ 已删除遗留流: ORDERBOOK_SNAP")
-                except Exception as e:
-                    # 如果本就不存在，将抑制异常
-                    if "stream not found" in str(e).lower():
-                        self.logger.info("ℹ️ 未发现遗留流 ORDERBOOK_SNAP，无需清理")
-                    else:
-                        self.logger.error(f"❌ 清理 ORDERBOOK_SNAP 失败: {e}")
-                        raise
-        except Exception as outer:
-            # 清理失败不阻塞主流程，记录日志
-            self.logger.error(f"❌ 遗留流清理流程异常: {outer}")
+            if stream_name in desired_names:
+                continue
+            try:
+                await js.stream_info(stream_name)
+                self.logger.warning(f"🧹 检测到遗留流 {stream_name}，开始删除（与当前配置不一致）...")
+                await js.delete_stream(stream_name)
+                self.logger.info(f"✅ 已删除遗留流: {stream_name}")
+            except Exception as e:
+                # 如果本就不存在，将抑制异常；清理失败不阻塞主流程，记录日志
+                if "stream not found" in str(e).lower() or "not found" in str(e).lower():
+                    self.logger.info(f"ℹ️ 未发现遗留流 {stream_name}，无需清理")
+                else:
+                    self.logger.error(f"❌ 清理 {stream_name} 失败: {e}")
 
     async def health_check(self):
         """健康检查"""
@@ -182,10 +257,8 @@ class JetStreamInitializer:
             nc = await nats.connect(self.nats_url, connect_timeout=5)
             js = nc.jetstream()
 
-            # 检查所有配置的streams（dict 结构）
-            streams_config = self.config.get('streams', {}) or {}
-            for stream_name, stream_cfg in streams_config.items():
-                name = stream_cfg.get('name', stream_name)
+            # 检查所有配置的streams（dict 结构，按类型拆分的流逐个检查）
+            for name in expand_streams(self.config.get('streams', {})):
                 stream_info = await js.stream_info(name)
                 self.logger.info(f"✅ Stream健康: {name} - 消息数: {stream_info.state.messages:,}")
 
@@ -0,0 +1,112 @@
+"""
+MarketPrism 认证中间件吞吐基准
+
+对比开启/关闭已验证令牌缓存时，携带同一批JWT的认证请求吞吐，
+以及API密钥摘要表查找的每请求开销。
+
+运行：pytest tests/performance/test_auth_cache_performance.py -s
+预算可通过 MARKETPRISM_AUTH_BUDGET_SCALE 整体放大（慢速CI机器）。
+"""
+
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from core.middleware.authentication_middleware import (
+    APIKeyConfig, AuthenticationConfig, AuthenticationMiddleware, AuthenticationType,
+    JWTClaims, JWTConfig, JWTValidator
+)
+from core.middleware.middleware_framework import (
+    MiddlewareConfig, MiddlewareContext, MiddlewareRequest, MiddlewareType, RequestHeaders
+)
+
+REQUESTS = 20000
+TOKENS = 200
+BUDGET_SCALE = float(os.environ.get("MARKETPRISM_AUTH_BUDGET_SCALE", "1.0"))
+# 开启缓存后吞吐相对关闭缓存的最低倍数
+SPEEDUP_BUDGET = 2.0
+# API密钥认证每请求耗时预算（微秒）
+API_KEY_BUDGET_US = 30.0
+SECRET = "marketprism-bench-secret-0123456789abcdef"
+
+
+def make_middleware(cache_size: int) -> AuthenticationMiddleware:
+    return AuthenticationMiddleware(
+        MiddlewareConfig(middleware_id="auth", middleware_type=MiddlewareType.AUTHENTICATION),
+        AuthenticationConfig(
+            enabled_providers=[AuthenticationType.JWT, AuthenticationType.API_KEY],
+            jwt_config=JWTConfig(secret_key=SECRET, cache_size=cache_size),
+            api_key_config=APIKeyConfig(),
+        ),
+    )
+
+
+def make_requests(headers_list):
+    return [MiddlewareRequest(path="/api/v1/orderbook", headers=RequestHeaders(headers))
+            for headers in headers_list]
+
+
+async def throughput(middleware: AuthenticationMiddleware, requests) -> float:
+    """每秒通过认证的请求数"""
+    start = time.perf_counter()
+    for request in requests:
+        context = MiddlewareContext(request=request)
+        result = await middleware.process_request(context)
+        assert result.continue_chain and middleware.is_authenticated(context)
+    return len(requests) / (time.perf_counter() - start)
+
+
+@pytest.mark.performance
+def test_jwt_throughput_with_verified_cache():
+    """测试已验证令牌缓存提升JWT认证吞吐"""
+    signer = JWTValidator(JWTConfig(secret_key=SECRET))
+    tokens = [signer.generate_token(JWTClaims(user_id=f"user{i}", roles=["trader"])) for i in range(TOKENS)]
+    requests = make_requests({'authorization': f"Bearer {tokens[i % TOKENS]}"} for i in range(REQUESTS))
+
+    loop = asyncio.new_event_loop()
+    try:
+        uncached = make_middleware(cache_size=0)
+        cached = make_middleware(cache_size=TOKENS * 2)
+        loop.run_until_complete(throughput(cached, requests[:TOKENS]))
+
+        base_rps = max(loop.run_until_complete(throughput(uncached, requests)) for _ in range(3))
+        cached_rps = max(loop.run_until_complete(throughput(cached, requests)) for _ in range(3))
+    finally:
+        loop.close()
+
+    stats = cached.get_cache_stats()
+    print(f"\njwt: without cache {base_rps:,.0f} req/s, with cache {cached_rps:,.0f} req/s "
+          f"({cached_rps / base_rps:.1f}x), hits={stats['hits']} misses={stats['misses']}")
+
+    assert stats['size'] == TOKENS
+    assert cached_rps >= base_rps * SPEEDUP_BUDGET / BUDGET_SCALE
+
+
+@pytest.mark.performance
+def test_api_key_lookup_per_request():
+    """测试API密钥摘要表查找的每请求开销"""
+    middleware = make_middleware(cache_size=0)
+    middleware.auth_config.enabled_providers = [AuthenticationType.API_KEY]
+    store = middleware.providers[AuthenticationType.API_KEY].store
+    keys = [f"mp_{i:08d}_{'x' * 32}" for i in range(1000)]
+    for i, key in enumerate(keys):
+        store.add_key(key, {'user_id': f"user{i}"})
+    requests = make_requests({'x-api-key': keys[i % len(keys)]} for i in range(REQUESTS))
+
+    loop = asyncio.new_event_loop()
+    try:
+        rps = max(loop.run_until_complete(throughput(middleware, requests)) for _ in range(3))
+    finally:
+        loop.close()
+
+    per_request_us = 1e6 / rps
+    print(f"\napi_key: {rps:,.0f} req/s, {per_request_us:.2f}us/request")
+    assert per_request_us <= API_KEY_BUDGET_US * BUDGET_SCALE
@@ -0,0 +1,78 @@
+"""
+MarketPrism 熔断器性能测试
+
+测量 execute_with_breaker 相对直接 await 的每次调用开销，
+目标：单个熔断器支撑 50k 次调用/秒（含一定比例失败与降级）。
+"""
+
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到系统路径
+project_root = Path(__file__).parent.parent.parent.absolute()
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from core.reliability.circuit_breaker import MarketPrismCircuitBreaker, CircuitBreakerConfig, CircuitState
+
+CALLS = 50000
+TARGET_CALLS_PER_SECOND = 50000
+BUDGET_SCALE = float(os.environ.get("MARKETPRISM_PERF_BUDGET_SCALE", "1.0"))
+
+
+async def _ok():
+    return 1
+
+
+async def _direct(calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        await _ok()
+    return time.perf_counter() - start
+
+
+async def _through_breaker(breaker: MarketPrismCircuitBreaker, calls: int, fail_every: int = 0) -> float:
+    async def failing():
+        raise ValueError("boom")
+
+    async def fallback():
+        return 0
+
+    start = time.perf_counter()
+    for i in range(calls):
+        if fail_every and i % fail_every == 0:
+            await breaker.execute_with_breaker(failing, fallback=fallback)
+        else:
+            await breaker.execute_with_breaker(_ok)
+    return time.perf_counter() - start
+
+
+@pytest.mark.performance
+@pytest.mark.parametrize("fail_every", [0, 20])
+def test_execute_with_breaker_overhead(fail_every):
+    """测试熔断器每次调用开销满足 50k 次/秒"""
+    # 失败率 5% 低于阈值，失败次数阈值足够大，整个过程保持 CLOSED
+    config = CircuitBreakerConfig(failure_threshold=CALLS, failure_rate_threshold=0.5, minimum_requests=100)
+    breaker = MarketPrismCircuitBreaker("perf_test", config)
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(_through_breaker(breaker, 1000, fail_every))  # 预热
+        direct = min(loop.run_until_complete(_direct(CALLS)) for _ in range(3))
+        guarded = min(loop.run_until_complete(_through_breaker(breaker, CALLS, fail_every)) for _ in range(3))
+    finally:
+        loop.close()
+
+    overhead_us = (guarded - direct) / CALLS * 1e6
+    calls_per_second = CALLS / guarded
+    print(f"\nfail_every={fail_every}: direct {direct / CALLS * 1e6:.2f}us, "
+          f"breaker {guarded / CALLS * 1e6:.2f}us, overhead {overhead_us:.2f}us/call, "
+          f"{calls_per_second:,.0f} calls/s")
+
+    assert breaker.get_state() == CircuitState.CLOSED
+    assert calls_per_second * BUDGET_SCALE >= TARGET_CALLS_PER_SECOND
@@ -0,0 +1,178 @@
+"""
+MarketPrism JetStream 流布局基准
+
+在本地临时启动的 nats-server（-js）上，按不同流布局分别初始化，
+测量带 Msg-Id 去重的 JetStream 发布确认延迟（逐条与流水线两种方式）：
+
+- single：单一 MARKET_DATA 文件流（原布局）
+- single_s2：单流 + S2 压缩 + max_msgs_per_subject
+- per_type：按数据类型拆分为独立流
+- per_type_memory：按类型拆分，短生命周期类型使用内存存储
+
+运行：NATS_SERVER_BIN=/path/to/nats-server pytest tests/performance/test_jetstream_layout_performance.py -s
+未找到 nats-server 时跳过。消息数可通过 MARKETPRISM_JS_BENCH_MESSAGES 调整。
+"""
+
+import asyncio
+import copy
+import importlib.util
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+import yaml
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+nats = pytest.importorskip("nats")
+
+MESSAGES = int(os.environ.get("MARKETPRISM_JS_BENCH_MESSAGES", "5000"))
+PIPELINE_WINDOW = 64
+NATS_SERVER_BIN = os.environ.get("NATS_SERVER_BIN") or shutil.which("nats-server")
+BASE_CONFIG = PROJECT_ROOT / "scripts" / "js_init_market_data.yaml"
+
+SHORT_LIVED = {"storage": "memory", "max_age": 3600, "duplicate_window": 60}
+
+
+def load_init_jetstream():
+    spec = importlib.util.spec_from_file_location(
+        "init_jetstream", PROJECT_ROOT / "services" / "message-broker" / "init_jetstream.py"
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def layouts():
+    base = yaml.safe_load(BASE_CONFIG.read_text(encoding="utf-8"))["streams"]["MARKET_DATA"]
+    plain = {k: v for k, v in base.items() if k not in ("compression", "max_msgs_per_subject")}
+
+    single_s2 = dict(base)
+    per_type = dict(plain, split_by="data_type")
+    per_type_memory = dict(per_type, per_type={"liquidation": SHORT_LIVED, "volatility_index": SHORT_LIVED})
+    return {
+        "single": {"MARKET_DATA": plain},
+        "single_s2": {"MARKET_DATA": single_s2},
+        "per_type": {"MARKET_DATA": per_type},
+        "per_type_memory": {"MARKET_DATA": per_type_memory},
+    }
+
+
+def bench_subjects(stream_subjects):
+    """由流 subjects（如 funding_rate.binance.>）生成具体发布主题"""
+    subjects = []
+    for pattern in stream_subjects:
+        prefix = pattern[:-2]
+        for market in ("perpetual", "spot"):
+            for symbol in ("BTC-USDT", "ETH-USDT", "SOL-USDT"):
+                subjects.append(f"{prefix}.{market}.{symbol}")
+    return subjects
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture(scope="module")
+def nats_server(tmp_path_factory):
+    if not NATS_SERVER_BIN:
+        pytest.skip("未找到 nats-server 可执行文件（可设置 NATS_SERVER_BIN）")
+    port = free_port()
+    store_dir = tmp_path_factory.mktemp("jetstream")
+    proc = subprocess.Popen(
+        [NATS_SERVER_BIN, "-js", "-a", "127.0.0.1", "-p", str(port), "-sd", str(store_dir)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"nats://127.0.0.1:{port}"
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                break
+        except OSError:
+            time.sleep(0.05)
+    else:
+        proc.kill()
+        pytest.skip("nats-server 启动超时")
+    yield url
+    proc.terminate()
+    proc.wait(timeout=10)
+
+
+async def run_layout(url, init_jetstream, streams_config):
+    nc = await nats.connect(url)
+    js = nc.jetstream()
+    try:
+        # 清空上一布局的流
+        for info in await js.streams_info():
+            await js.delete_stream(info.config.name)
+
+        expanded = init_jetstream.expand_streams(streams_config)
+        subjects = []
+        for cfg in expanded.values():
+            await js.add_stream(init_jetstream.build_stream_config(cfg))
+            subjects.extend(bench_subjects(cfg["subjects"]))
+        payload = b'{"exchange":"binance","symbol":"BTC-USDT","funding_rate":"0.0001","ts":1700000000000}'
+
+        # 逐条发布，测量每条确认延迟
+        latencies = []
+        for i in range(MESSAGES):
+            start = time.perf_counter()
+            await js.publish(subjects[i % len(subjects)], payload, headers={"Nats-Msg-Id": f"s-{i}"})
+            latencies.append(time.perf_counter() - start)
+
+        # 流水线：窗口内并发等待确认
+        start = time.perf_counter()
+        for offset in range(0, MESSAGES, PIPELINE_WINDOW):
+            await asyncio.gather(*(
+                js.publish(subjects[i % len(subjects)], payload, headers={"Nats-Msg-Id": f"p-{i}"})
+                for i in range(offset, min(offset + PIPELINE_WINDOW, MESSAGES))
+            ))
+        pipelined = time.perf_counter() - start
+
+        stored = sum([(await js.stream_info(name)).state.messages for name in expanded])
+    finally:
+        await nc.close()
+
+    latencies.sort()
+    return {
+        "streams": len(expanded),
+        "p50_us": statistics.median(latencies) * 1e6,
+        "p99_us": latencies[int(len(latencies) * 0.99) - 1] * 1e6,
+        "pipelined_msgs_per_s": MESSAGES / pipelined,
+        "stored": stored,
+    }
+
+
+@pytest.mark.performance
+def test_publish_ack_latency_by_layout(nats_server):
+    """测试各流布局的发布确认延迟"""
+    init_jetstream = load_init_jetstream()
+    results = {}
+    loop = asyncio.new_event_loop()
+    try:
+        for name, streams_config in layouts().items():
+            results[name] = loop.run_until_complete(
+                run_layout(nats_server, init_jetstream, copy.deepcopy(streams_config))
+            )
+    finally:
+        loop.close()
+
+    print()
+    print(f"{'layout':<18}{'streams':>8}{'p50(us)':>10}{'p99(us)':>10}{'pipelined msg/s':>18}")
+    for name, r in results.items():
+        print(f"{name:<18}{r['streams']:>8}{r['p50_us']:>10.0f}{r['p99_us']:>10.0f}"
+              f"{r['pipelined_msgs_per_s']:>18.0f}")
+
+    for r in results.values():
+        assert r["stored"] == MESSAGES * 2
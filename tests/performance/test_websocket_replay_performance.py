@@ -0,0 +1,157 @@
+"""
+MarketPrism 交易所WebSocket接收路径回放基准
+
+将合成的 Binance / OKX 行情帧回放进客户端的 _listen_messages，
+对比“仅 loads + 回调”的下限，测量每帧的额外开销（DEBUG 关闭时）。
+
+运行：pytest tests/performance/test_websocket_replay_performance.py -s
+预算可通过 MARKETPRISM_WS_REPLAY_BUDGET_SCALE 整体放大（慢速CI机器）。
+"""
+
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+from typing import List, Union
+
+import orjson
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+COLLECTOR_ROOT = PROJECT_ROOT / "services" / "data-collector"
+for path in (PROJECT_ROOT, COLLECTOR_ROOT, COLLECTOR_ROOT / "exchanges"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+FRAMES = 20000
+BUDGET_SCALE = float(os.environ.get("MARKETPRISM_WS_REPLAY_BUDGET_SCALE", "1.0"))
+# DEBUG 关闭时，客户端相对下限的每帧额外开销预算（微秒）
+OVERHEAD_BUDGET_US = 25.0
+
+
+class ReplaySocket:
+    """按顺序产出预录帧的假连接"""
+
+    closed = False
+
+    def __init__(self, frames: List[Union[str, bytes]]):
+        self._frames = frames
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for frame in self._frames:
+            yield frame
+
+    async def send(self, _):
+        pass
+
+
+def binance_frames(count: int) -> List[str]:
+    frames = []
+    for i in range(count):
+        if i % 4 == 3:
+            frames.append(orjson.dumps({
+                "e": "trade", "E": 1700000000000 + i, "s": "BTCUSDT", "t": i,
+                "p": "43000.10", "q": "0.015", "T": 1700000000000 + i, "m": bool(i & 1),
+            }).decode())
+        else:
+            frames.append(orjson.dumps({
+                "e": "depthUpdate", "E": 1700000000000 + i, "s": "BTCUSDT",
+                "U": 1000 + i * 3, "u": 1002 + i * 3,
+                "b": [["43000.%02d" % (j % 100), "1.25"] for j in range(10)],
+                "a": [["43001.%02d" % (j % 100), "0.75"] for j in range(10)],
+            }).decode())
+    return frames
+
+
+def okx_frames(count: int) -> List[bytes]:
+    frames = []
+    for i in range(count):
+        if i % 4 == 3:
+            frames.append(orjson.dumps({
+                "arg": {"channel": "trades", "instId": "BTC-USDT"},
+                "data": [{"instId": "BTC-USDT", "tradeId": str(i), "px": "43000.1",
+                          "sz": "0.01", "side": "buy", "ts": "1700000000000"}],
+            }))
+        else:
+            frames.append(orjson.dumps({
+                "arg": {"channel": "books", "instId": "BTC-USDT"}, "action": "update",
+                "data": [{
+                    "instId": "BTC-USDT", "seqId": 1000 + i, "prevSeqId": 999 + i,
+                    "checksum": 123456, "ts": "1700000000000",
+                    "bids": [["43000.%02d" % (j % 100), "1.25", "0", "3"] for j in range(10)],
+                    "asks": [["43001.%02d" % (j % 100), "0.75", "0", "2"] for j in range(10)],
+                }],
+            }))
+    return frames
+
+
+async def baseline_per_frame(frames) -> float:
+    """下限：仅 loads + 异步回调"""
+    received = []
+
+    async def callback(symbol, data):
+        received.append(symbol)
+
+    start = time.perf_counter()
+    async for frame in ReplaySocket(frames):
+        data = orjson.loads(frame)
+        await callback(data.get("s"), data)
+    return (time.perf_counter() - start) / len(frames)
+
+
+async def replay_per_frame(client, frames) -> float:
+    client.websocket = ReplaySocket(frames)
+    client.is_connected = True
+    start = time.perf_counter()
+    await client._listen_messages()
+    return (time.perf_counter() - start) / len(frames)
+
+
+def make_client(exchange: str):
+    received = []
+
+    async def on_update(symbol, data):
+        received.append(symbol)
+
+    if exchange == "binance":
+        from binance_websocket import BinanceWebSocketClient
+        client = BinanceWebSocketClient(["BTCUSDT"], on_orderbook_update=on_update, market_type="spot")
+    else:
+        from okx_websocket import OKXWebSocketManager
+        client = OKXWebSocketManager(["BTC-USDT"], on_orderbook_update=on_update, market_type="spot")
+    return client, received
+
+
+@pytest.mark.performance
+@pytest.mark.parametrize("exchange,frames", [
+    ("binance", binance_frames(FRAMES)),
+    ("okx", okx_frames(FRAMES)),
+])
+def test_receive_path_per_frame_overhead(exchange, frames):
+    """测试DEBUG关闭时接收路径每帧开销在预算之内"""
+    try:
+        client, received = make_client(exchange)
+    except Exception as e:  # 依赖缺失时跳过
+        pytest.skip(f"{exchange} 客户端无法创建: {e}")
+
+    loop = asyncio.new_event_loop()
+    try:
+        # 预热
+        loop.run_until_complete(replay_per_frame(client, frames[:1000]))
+        received.clear()
+
+        base = min(loop.run_until_complete(baseline_per_frame(frames)) for _ in range(3))
+        per_frame = min(loop.run_until_complete(replay_per_frame(client, frames)) for _ in range(3))
+    finally:
+        loop.close()
+
+    overhead_us = (per_frame - base) * 1e6
+    print(f"\n{exchange}: baseline {base * 1e6:.2f}us/frame, client {per_frame * 1e6:.2f}us/frame, "
+          f"overhead {overhead_us:.2f}us/frame")
+
+    assert len(received) == len(frames) * 3
+    assert overhead_us <= OVERHEAD_BUDGET_US * BUDGET_SCALE
@@ -0,0 +1,101 @@
+"""
+MarketPrism 启动导入耗时基准
+
+基于 `python -X importtime` 在独立子进程中测量：
+1. core 子包（storage/reliability/networking/performance）按需导入，
+   裸导入不会加载 ClickHouse 驱动、Redis、aiohttp 等重依赖
+2. 数据采集、热存储、监控告警三个服务入口的导入耗时预算
+
+预算可通过 MARKETPRISM_IMPORT_BUDGET_SCALE 整体放大（慢速CI机器）。
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, Set, Tuple
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+
+BUDGET_SCALE = float(os.environ.get("MARKETPRISM_IMPORT_BUDGET_SCALE", "1.0"))
+
+# 包裸导入的累计耗时预算（毫秒），以及不允许被顺带加载的模块
+PACKAGE_BUDGETS = {
+    "core.storage": (150, {"clickhouse_driver", "aiochclient", "redis", "aiohttp"}),
+    "core.reliability": (150, {"aiohttp", "redis", "numpy"}),
+    "core.networking": (150, {"aiohttp", "websockets"}),
+    "core.performance": (150, {"core.reliability.performance_analyzer"}),
+}
+
+# 服务入口（服务目录, 累计耗时预算毫秒）
+ENTRY_POINT_BUDGETS = {
+    "data-collector": ("services/data-collector", 2500),
+    "hot-storage": ("services/hot-storage-service", 2000),
+    "monitoring-alerting": ("services/monitoring-alerting", 1500),
+}
+
+
+def measure_import(module: str, cwd: Path) -> Tuple[float, Set[str]]:
+    """在子进程中导入模块，返回 (累计耗时毫秒, 已加载模块集合)"""
+    env = dict(os.environ, PYTHONPATH=str(PROJECT_ROOT))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=str(cwd), env=env, capture_output=True, text=True, timeout=120,
+    )
+    if proc.returncode != 0:
+        pytest.skip(f"{module} 无法在当前环境导入: {proc.stderr.strip().splitlines()[-1:]}")
+
+    cumulative_us: Dict[str, int] = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue  # 表头
+        cumulative_us[name.strip()] = int(cumulative)
+
+    return cumulative_us.get(module, 0) / 1000, set(cumulative_us)
+
+
+@pytest.mark.performance
+@pytest.mark.parametrize("package", sorted(PACKAGE_BUDGETS))
+def test_core_package_import_is_lazy(package):
+    """测试core子包裸导入不加载子模块和重依赖"""
+    budget_ms, forbidden = PACKAGE_BUDGETS[package]
+    elapsed_ms, loaded = measure_import(package, PROJECT_ROOT)
+
+    assert not forbidden & loaded, f"{package} 导入时加载了 {sorted(forbidden & loaded)}"
+    assert elapsed_ms <= budget_ms * BUDGET_SCALE, f"{package} 导入耗时 {elapsed_ms:.1f}ms"
+
+
+@pytest.mark.performance
+@pytest.mark.parametrize("service", sorted(ENTRY_POINT_BUDGETS))
+def test_service_entry_point_import_budget(service):
+    """测试服务入口导入耗时在预算之内"""
+    service_dir, budget_ms = ENTRY_POINT_BUDGETS[service]
+    elapsed_ms, _ = measure_import("main", PROJECT_ROOT / service_dir)
+
+    assert elapsed_ms <= budget_ms * BUDGET_SCALE, f"{service} 入口导入耗时 {elapsed_ms:.1f}ms"
+
+
+def test_lazy_exports_keep_public_names():
+    """测试延迟导出与原急切导入的公开名称和对象一致"""
+    import core.networking
+    import core.reliability
+    import core.storage
+    from core.networking.websocket_manager import WebSocketConnectionManager
+    from core.reliability.circuit_breaker import MarketPrismCircuitBreaker
+    from core.storage.unified_storage_manager import UnifiedStorageManager
+
+    assert core.storage.StorageConfig is core.storage.UnifiedStorageConfig
+    assert core.storage.ClickHouseManager is UnifiedStorageManager
+    assert core.reliability.CircuitBreaker is MarketPrismCircuitBreaker
+    # 与子模块同名的导出对象不会被子模块覆盖
+    assert callable(core.reliability.circuit_breaker)
+    assert isinstance(core.networking.websocket_manager, WebSocketConnectionManager)
+    assert "UnifiedStorageManager" in dir(core.storage)
+
+    with pytest.raises(AttributeError):
+        core.storage.NotAnExport
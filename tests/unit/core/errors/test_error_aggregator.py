@@ -0,0 +1,117 @@
+"""
+错误聚合器测试
+测试分钟桶时间序列、增量趋势/方差与模式签名
+"""
+
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+from core.errors.error_aggregator import ErrorAggregator, TimeSeriesData, TimeWindow
+from core.errors.error_categories import ErrorCategory, ErrorSeverity, ErrorType
+from core.errors.exceptions import MarketPrismError
+
+
+T0 = datetime(2025, 1, 6, 12, 0, tzinfo=timezone.utc)
+
+
+def regression_slope(values):
+    n = len(values)
+    mean_x = (n - 1) / 2
+    mean_y = sum(values) / n
+    num = sum((i - mean_x) * (v - mean_y) for i, v in enumerate(values))
+    den = sum((i - mean_x) ** 2 for i in range(n))
+    return num / den
+
+
+class TestTimeSeriesData:
+    """时间序列环形缓冲测试"""
+
+    def test_increment_accumulates_in_bucket_and_fills_gaps(self):
+        """测试同桶累加、跨桶补零"""
+        series = TimeSeriesData()
+        for _ in range(5):
+            series.increment(T0)
+        series.increment(T0 + timedelta(minutes=3), 2)
+
+        assert series.get_data() == [
+            (T0, 5),
+            (T0 + timedelta(minutes=1), 0),
+            (T0 + timedelta(minutes=2), 0),
+            (T0 + timedelta(minutes=3), 2),
+        ]
+        assert series.get_data(since=T0 + timedelta(minutes=2)) == series.get_data()[2:]
+        assert series.count_since(T0 + timedelta(minutes=1)) == 3
+
+    def test_incremental_trend_and_stats_match_direct_computation(self):
+        """测试增量趋势与方差在环形淘汰后仍与直接计算一致"""
+        series = TimeSeriesData(max_points=16)
+        values = [(i * 7) % 11 + i for i in range(40)]
+        for i, value in enumerate(values):
+            series.add_point(T0 + timedelta(minutes=i), value)
+        series.add_point(T0 + timedelta(minutes=39), 3)  # 同一时间戳覆盖最新点
+        values[-1] = 3
+
+        assert len(series.values) == 16
+        assert series.calculate_trend(10) == pytest.approx(regression_slope(values[-10:]))
+        assert series.calculate_trend(100) == pytest.approx(regression_slope(values[-16:]))
+
+        window = values[-12:]
+        mean = sum(window) / len(window)
+        std = (sum((v - mean) ** 2 for v in window) / len(window)) ** 0.5
+        assert series.calculate_stats(12) == pytest.approx((mean, std))
+
+
+class TestErrorAggregator:
+    """错误聚合器测试"""
+
+    def test_burst_lands_in_single_minute_bucket(self):
+        """测试错误突发只更新当前分钟桶"""
+        aggregator = ErrorAggregator(max_history=100)
+        for i in range(250):
+            severity = ErrorSeverity.CRITICAL if i % 50 == 0 else ErrorSeverity.MEDIUM
+            aggregator.add_error(MarketPrismError("boom", category=ErrorCategory.NETWORK, severity=severity))
+
+        assert len(aggregator.error_history) == 100
+        assert len(aggregator.error_rate_series.values) == 1
+        assert aggregator.error_rate_series.get_latest_value() == 250
+        assert aggregator.critical_error_series.get_latest_value() == 5
+        assert aggregator.category_series['network'].get_latest_value() == 250
+        assert aggregator.get_statistics(TimeWindow.HOUR).total_errors == 250
+
+    def test_patterns_keyed_by_signature(self):
+        """测试模式按 (错误类型, 分类) 签名聚合"""
+        aggregator = ErrorAggregator()
+        for component in ("binance", "okx", "binance"):
+            aggregator.add_error(MarketPrismError(
+                "timeout", error_type=ErrorType.CONNECTION_TIMEOUT,
+                category=ErrorCategory.NETWORK, context={'component': component}))
+        aggregator.add_error(MarketPrismError("other"))
+
+        patterns = aggregator.get_error_patterns(min_frequency=1)
+        assert [p.frequency for p in patterns] == [3, 1]
+        assert patterns[0].pattern_id == "CONNECTION_TIMEOUT_network"
+        assert patterns[0].components == ["binance", "okx"]
+
+    def test_window_resets_at_boundary(self):
+        """测试统计窗口在边界处重置"""
+        aggregator = ErrorAggregator()
+        aggregator._reset_statistics_window(TimeWindow.MINUTE, T0)
+        aggregator._update_statistics(MarketPrismError("a"), T0 + timedelta(seconds=30))
+        aggregator._update_statistics(MarketPrismError("b"), T0 + timedelta(minutes=1))
+
+        stats = aggregator.get_statistics(TimeWindow.MINUTE)
+        assert stats.start_time == T0 + timedelta(minutes=1)
+        assert stats.total_errors == 1
+
+    def test_detect_anomalies_on_minute_buckets(self):
+        """测试基于分钟桶的错误率异常检测"""
+        aggregator = ErrorAggregator()
+        start = datetime.now(timezone.utc).replace(second=0, microsecond=0) - timedelta(minutes=20)
+        for minute in range(20):
+            aggregator.error_rate_series.increment(start + timedelta(minutes=minute), 2)
+        aggregator.error_rate_series.increment(start + timedelta(minutes=20), 40)
+
+        anomalies = aggregator.detect_anomalies()
+        assert [a['type'] for a in anomalies] == ["high_error_rate"]
+        assert anomalies[0]['current_value'] == 40
@@ -0,0 +1,108 @@
+"""
+认证中间件已验证凭证缓存测试
+测试JWT验证缓存、过期上限、吊销与API密钥摘要表
+"""
+
+import time
+from unittest.mock import patch
+
+import jwt
+import pytest
+
+from core.middleware.authentication_middleware import (
+    APIKeyConfig, APIKeyValidator, JWTClaims, JWTConfig, JWTValidator,
+    MemoryAPIKeyStore, VerifiedTokenCache
+)
+
+SECRET = "marketprism-cache-test-secret-0123456789"
+
+
+@pytest.fixture
+def validator():
+    return JWTValidator(JWTConfig(secret_key=SECRET, token_ttl=3600))
+
+
+class TestVerifiedTokenCache:
+    """测试JWT已验证令牌缓存"""
+
+    @pytest.mark.asyncio
+    async def test_repeated_token_decoded_once(self, validator):
+        """测试同一令牌只执行一次签名校验，且上下文互不影响"""
+        token = validator.generate_token(JWTClaims(user_id="u1", roles=["viewer"]))
+
+        with patch("core.middleware.authentication_middleware.jwt.decode", wraps=jwt.decode) as decode:
+            first = await validator.validate_token(token)
+            first.context.add_role("admin")
+            second = await validator.validate_token(token)
+
+        assert decode.call_count == 1
+        assert first.success and second.success
+        assert second.context.roles == ["viewer"]
+        assert validator.cache.get_stats()['hits'] == 1
+
+    @pytest.mark.asyncio
+    async def test_entry_expiry_capped_by_token_exp(self, validator):
+        """测试缓存条目不超过令牌 exp"""
+        token = jwt.encode({'sub': 'u1', 'exp': int(time.time()) + 2}, SECRET, algorithm="HS256")
+        assert (await validator.validate_token(token)).success
+
+        (deadline, _), = validator.cache._entries.values()
+        assert deadline <= time.time() + 2
+
+        with patch("core.middleware.authentication_middleware.time.time", return_value=time.time() + 5):
+            assert validator.cache.get(validator._digest(token)) is None
+
+    @pytest.mark.asyncio
+    async def test_revoked_token_rejected(self, validator):
+        """测试吊销后缓存失效且令牌被拒绝"""
+        token = validator.generate_token(JWTClaims(user_id="u1"))
+        assert (await validator.validate_token(token)).success
+
+        validator.revoke_token(token)
+
+        result = await validator.validate_token(token)
+        assert not result.success
+        assert result.error_code == "TOKEN_REVOKED"
+        assert len(validator.cache) == 0
+
+    @pytest.mark.asyncio
+    async def test_secret_rotation_bypasses_cache(self, validator):
+        """测试密钥轮换后旧令牌不会从缓存命中"""
+        token = validator.generate_token(JWTClaims(user_id="u1"))
+        assert (await validator.validate_token(token)).success
+
+        validator.config.secret_key = SECRET[::-1]
+
+        result = await validator.validate_token(token)
+        assert not result.success
+        assert result.error_code == "INVALID_TOKEN"
+
+    def test_lru_eviction(self):
+        """测试超出容量时淘汰最久未使用的条目"""
+        cache = VerifiedTokenCache(max_size=2, ttl=60)
+        cache.put(b"a", 1)
+        cache.put(b"b", 2)
+        assert cache.get(b"a") == 1
+        cache.put(b"c", 3)
+
+        assert cache.get(b"b") is None
+        assert cache.get(b"a") == 1 and cache.get(b"c") == 3
+        assert cache.stats['evictions'] == 1
+
+
+class TestAPIKeyDigestTable:
+    """测试API密钥摘要表"""
+
+    @pytest.mark.asyncio
+    async def test_lookup_and_revocation(self):
+        """测试按摘要查找，删除后立即失效"""
+        store = MemoryAPIKeyStore()
+        api_validator = APIKeyValidator(APIKeyConfig(), store)
+        store.add_key("mp_key_1", {'user_id': 'u1'})
+
+        assert (await api_validator.validate_key("mp_key_1")).success
+        assert not (await api_validator.validate_key("mp_key_2")).success
+
+        store.remove_key("mp_key_1")
+        assert not (await api_validator.validate_key("mp_key_1")).success
+        assert await store.validate_key("mp_key_1") is False
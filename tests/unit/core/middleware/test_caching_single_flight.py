@@ -0,0 +1,179 @@
+"""
+缓存中间件防击穿测试
+测试同键单飞合并、后台重新验证、负缓存与提前刷新
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from core.middleware.caching_middleware import (
+    CacheRule, CachePolicy, CacheStrategy, CachingConfig, CachingMiddleware, MemoryCacheStore
+)
+from core.middleware.middleware_framework import (
+    BaseMiddleware, MiddlewareChain, MiddlewareConfig, MiddlewareContext, MiddlewarePriority,
+    MiddlewareProcessor, MiddlewareRequest, MiddlewareResponse, MiddlewareStatus, MiddlewareType
+)
+
+
+def make_middleware(strategy=CacheStrategy.CACHE_FIRST, **config):
+    rule = CacheRule(rule_id="query", name="query", path_pattern="/api/*", cache_strategy=strategy, ttl=60)
+    return CachingMiddleware(
+        MiddlewareConfig(middleware_id="cache", middleware_type=MiddlewareType.CACHING),
+        CachingConfig(policies=[CachePolicy(policy_id="p", name="p", rules=[rule])], **config),
+        MemoryCacheStore(),
+    )
+
+
+class Backend:
+    """模拟慢查询后端，按中间件链顺序执行 请求->回源->响应"""
+
+    def __init__(self, middleware, status=200, delay=0.05):
+        self.middleware = middleware
+        self.status = status
+        self.delay = delay
+        self.calls = 0
+
+    async def fetch(self, request=None):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return MiddlewareResponse(status_code=self.status, body=b'{"rows": %d}' % self.calls)
+
+    async def request(self, path="/api/klines"):
+        context = MiddlewareContext(request=MiddlewareRequest(method="GET", path=path))
+        result = await self.middleware.process_request(context)
+        if not result.continue_chain:
+            return result.status_code, result.body, result.headers.get('X-Cache')
+        context.response = await self.fetch()
+        await self.middleware.process_response(context)
+        return context.response.status_code, context.response.body, context.response.get_header('X-Cache')
+
+
+class TestSingleFlight:
+    """单飞合并测试"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_hit_backend_once(self):
+        """测试并发未命中只回源一次，其余请求共享结果"""
+        backend = Backend(make_middleware())
+
+        results = await asyncio.gather(*(backend.request() for _ in range(20)))
+
+        assert backend.calls == 1
+        assert {body for _, body, _ in results} == {b'{"rows": 1}'}
+        assert sum(1 for *_, cache in results if cache == 'COALESCED') == 19
+        assert (await backend.request())[2] == 'HIT'
+
+    @pytest.mark.asyncio
+    async def test_waiters_fall_back_when_leader_uncacheable(self):
+        """测试回源结果不可缓存时，等待者各自回源"""
+        backend = Backend(make_middleware(negative_ttl=0), status=500)
+
+        await asyncio.gather(*(backend.request() for _ in range(3)))
+
+        assert backend.calls == 3
+        assert not backend.middleware._flights
+
+    @pytest.mark.asyncio
+    async def test_waiters_released_when_handler_raises(self):
+        """测试回源处理抛错时单飞立即结束，等待者不等到合并超时"""
+        class FailingHandler(BaseMiddleware):
+            calls = 0
+
+            async def process_request(self, context):
+                FailingHandler.calls += 1
+                await asyncio.sleep(0.05)
+                raise RuntimeError("upstream down")
+
+        caching = make_middleware(coalesce_timeout=5.0)
+        caching.status = MiddlewareStatus.ACTIVE
+        handler = FailingHandler(MiddlewareConfig(
+            middleware_id="handler", middleware_type=MiddlewareType.CUSTOM, priority=MiddlewarePriority.LOW))
+        handler.status = MiddlewareStatus.ACTIVE
+        chain = MiddlewareChain()
+        chain.add_middleware(caching)
+        chain.add_middleware(handler)
+        processor = MiddlewareProcessor(chain)
+
+        started = time.monotonic()
+        results = await asyncio.gather(*(
+            processor.process_request(MiddlewareContext(request=MiddlewareRequest(method="GET", path="/api/klines")))
+            for _ in range(3)))
+
+        assert time.monotonic() - started < 1.0
+        assert all(not result.success for result in results)
+        assert FailingHandler.calls == 3
+        assert caching.flight_stats['coalesce_timeouts'] == 0
+        assert not caching._flights
+
+
+class TestNegativeCaching:
+    """负缓存测试"""
+
+    @pytest.mark.asyncio
+    async def test_not_found_cached_briefly(self):
+        """测试 404 按 negative_ttl 缓存并原样返回状态码"""
+        middleware = make_middleware(negative_ttl=5)
+        backend = Backend(middleware, status=404)
+
+        await backend.request()
+        status, _, cache = await backend.request()
+
+        assert (status, cache) == (404, 'HIT')
+        assert backend.calls == 1
+        entry = await middleware.store.get(next(iter(middleware.store.cache)))
+        assert entry.expires_at - entry.created_at == pytest.approx(5)
+
+
+class TestRevalidation:
+    """重新验证测试"""
+
+    @pytest.mark.asyncio
+    async def test_stale_served_while_background_refresh(self):
+        """测试过期条目返回旧值，后台任务刷新且同键只刷新一次"""
+        middleware = make_middleware(CacheStrategy.STALE_WHILE_REVALIDATE, early_refresh_beta=0)
+        backend = Backend(middleware)
+        middleware.set_revalidator(backend.fetch)
+        await backend.request()
+        entry = middleware.store.cache[next(iter(middleware.store.cache))]
+        entry.metadata['fresh_until'] = time.time() - 1
+
+        results = await asyncio.gather(*(backend.request() for _ in range(5)))
+        assert {cache for *_, cache in results} == {'STALE'}
+        await asyncio.gather(*middleware._revalidations.values())
+
+        assert backend.calls == 2
+        assert await backend.request() == (200, b'{"rows": 2}', 'HIT')
+
+    @pytest.mark.asyncio
+    async def test_background_pool_is_bounded(self):
+        """测试后台刷新任务数受限"""
+        middleware = make_middleware(CacheStrategy.STALE_WHILE_REVALIDATE, max_background_revalidations=2)
+        backend = Backend(middleware)
+        middleware.set_revalidator(backend.fetch)
+        for i in range(4):
+            await backend.request(f"/api/q{i}")
+        for entry in middleware.store.cache.values():
+            entry.metadata['fresh_until'] = time.time() - 1
+
+        await asyncio.gather(*(backend.request(f"/api/q{i}") for i in range(4)))
+
+        assert len(middleware._revalidations) == 2
+        assert middleware.flight_stats['revalidations_dropped'] == 2
+        await middleware.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_early_refresh_near_expiry(self, monkeypatch):
+        """测试临近过期时单个请求提前回源，其余请求仍命中"""
+        middleware = make_middleware(early_refresh_beta=1.0)
+        backend = Backend(middleware)
+        await backend.request()
+        entry = middleware.store.cache[next(iter(middleware.store.cache))]
+        entry.metadata['fresh_until'] = time.time() + 0.01
+        monkeypatch.setattr("random.random", lambda: 0.5)
+
+        results = await asyncio.gather(*(backend.request() for _ in range(5)))
+
+        assert backend.calls == 2
+        assert sorted(cache for *_, cache in results) == ['HIT'] * 4 + ['MISS']
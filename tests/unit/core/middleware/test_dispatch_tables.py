@@ -0,0 +1,154 @@
+"""
+预编译分发表测试
+测试缓存规则前缀树与线性匹配一致、变更后失效重建，以及中间件链元组与采样计时
+"""
+
+import random
+
+import pytest
+
+from core.middleware.caching_middleware import CachePolicy, CacheRule
+from core.middleware.middleware_framework import (
+    BaseMiddleware, MiddlewareChain, MiddlewareConfig, MiddlewareContext, MiddlewareProcessor,
+    MiddlewarePriority, MiddlewareRequest, MiddlewareResult, MiddlewareStatus, MiddlewareType
+)
+
+
+def linear_match(rules, method, path):
+    """原实现：排序后逐条 matches_request"""
+    for rule in sorted([r for r in rules if r.enabled], key=lambda r: r.priority, reverse=True):
+        if rule.matches_request(method, path):
+            return rule
+    return None
+
+
+class TestRouteIndex:
+    """缓存规则索引测试"""
+
+    def test_matches_linear_semantics(self):
+        """测试随机规则集下前缀树结果与线性匹配一致"""
+        rng = random.Random(7)
+        segments = ["api", "v1", "klines", "trades", ""]
+        patterns = ["*", "/*", "/api", "/api/*", "/api/v1/*", "/api/v1/klines", "/api/", "api/*", "/ap/*"]
+        patterns += ["/" + "/".join(rng.choice(segments) for _ in range(rng.randint(1, 3))) + rng.choice(["", "/*"])
+                     for _ in range(30)]
+        rules = [
+            CacheRule(rule_id=f"r{i}", name=f"r{i}", path_pattern=rng.choice(patterns),
+                      method_pattern=rng.choice(["*", "GET", "get", "POST"]),
+                      priority=rng.randint(0, 3), enabled=rng.random() > 0.1)
+            for i in range(60)
+        ]
+        policy = CachePolicy(policy_id="p", name="p", rules=rules)
+
+        for _ in range(2000):
+            path = rng.choice(["", "/"]) + "/".join(rng.choice(segments) for _ in range(rng.randint(0, 4)))
+            method = rng.choice(["GET", "get", "POST", "DELETE"])
+            assert policy.find_matching_rule(method, path) is linear_match(rules, method, path), (method, path)
+
+    def test_rebuilt_after_rule_changes(self):
+        """测试规则增删与属性修改后索引重建"""
+        low = CacheRule(rule_id="low", name="low", path_pattern="/api/*", priority=1)
+        high = CacheRule(rule_id="high", name="high", path_pattern="/api/*", priority=5)
+        default = CacheRule(rule_id="default", name="default")
+        policy = CachePolicy(policy_id="p", name="p", default_rule=default)
+        policy.add_rule(low)
+        policy.add_rule(high)
+        assert policy.find_matching_rule("GET", "/api/x") is high
+
+        high.enabled = False
+        assert policy.find_matching_rule("GET", "/api/x") is low
+        low.path_pattern = "/other/*"
+        assert policy.find_matching_rule("GET", "/api/x") is default
+        policy.rules.append(CacheRule(rule_id="new", name="new", path_pattern="/api/x"))
+        assert policy.find_matching_rule("GET", "/api/x").rule_id == "new"
+
+    def test_replace_rule_keeps_count_but_rebuilds(self):
+        """测试先删后增（规则数不变）后不再返回已移除的规则"""
+        a = CacheRule(rule_id="a", name="a", path_pattern="/api/*")
+        b = CacheRule(rule_id="b", name="b", path_pattern="/other/*")
+        policy = CachePolicy(policy_id="p", name="p")
+        policy.add_rule(a)
+        assert policy.find_matching_rule("GET", "/api/x") is a
+
+        assert policy.remove_rule("a")
+        policy.add_rule(b)
+        assert policy.find_matching_rule("GET", "/api/x") is None
+        assert policy.find_matching_rule("GET", "/other/y") is b
+
+
+class RecordingMiddleware(BaseMiddleware):
+    def __init__(self, name, priority, calls):
+        super().__init__(MiddlewareConfig(middleware_id=name, middleware_type=MiddlewareType.CUSTOM, priority=priority))
+        self.status = MiddlewareStatus.ACTIVE
+        self.calls = calls
+
+    async def process_request(self, context):
+        self.calls.append(self.config.middleware_id)
+        return MiddlewareResult.success_result()
+
+
+class TestChainDispatch:
+    """中间件链分发表测试"""
+
+    @pytest.mark.asyncio
+    async def test_tuple_rebuilt_on_status_and_priority_change(self):
+        """测试启用状态与优先级变化后分发表重建"""
+        calls = []
+        chain = MiddlewareChain()
+        first = RecordingMiddleware("first", MiddlewarePriority.HIGH, calls)
+        second = RecordingMiddleware("second", MiddlewarePriority.LOW, calls)
+        chain.add_middleware(second)
+        chain.add_middleware(first)
+        processor = MiddlewareProcessor(chain)
+
+        forward, backward = chain.get_dispatch_table()
+        assert forward == (first, second) and backward == (second, first)
+        assert chain.get_dispatch_table()[0] is forward
+
+        second.config.priority = MiddlewarePriority.HIGHEST
+        await processor.process_request(MiddlewareContext(request=MiddlewareRequest()))
+        first.config.enabled = False
+        await processor.process_request(MiddlewareContext(request=MiddlewareRequest()))
+
+        assert calls == ["second", "first", "second"]
+
+    @pytest.mark.asyncio
+    async def test_timing_sampled(self):
+        """测试中间件耗时按采样记录，中间件与处理器计数覆盖全部请求"""
+        chain = MiddlewareChain()
+        middleware = RecordingMiddleware("m", MiddlewarePriority.NORMAL, [])
+        chain.add_middleware(middleware)
+        processor = MiddlewareProcessor(chain, timing_sample_every=4)
+
+        for _ in range(10):
+            await processor.process_request(MiddlewareContext(request=MiddlewareRequest()))
+
+        stats = middleware.get_stats()
+        assert stats['requests_processed'] == 10
+        assert stats['requests_success'] == 10
+        assert stats['timed_requests'] == 3
+        assert processor.get_stats()['total_requests'] == 10
+
+    @pytest.mark.asyncio
+    async def test_errors_counted_on_unsampled_requests(self):
+        """测试未采样请求的异常与失败结果同样计入中间件错误数"""
+        class FailingMiddleware(RecordingMiddleware):
+            async def process_request(self, context):
+                self.calls.append(self.config.middleware_id)
+                if len(self.calls) % 2:
+                    raise RuntimeError("boom")
+                return MiddlewareResult.error_result(ValueError("bad"))
+
+        chain = MiddlewareChain()
+        middleware = FailingMiddleware("m", MiddlewarePriority.NORMAL, [])
+        chain.add_middleware(middleware)
+        processor = MiddlewareProcessor(chain, timing_sample_every=4)
+
+        for _ in range(10):
+            await processor.process_request(MiddlewareContext(request=MiddlewareRequest()))
+
+        stats = middleware.get_stats()
+        assert stats['requests_processed'] == 10
+        assert stats['requests_error'] == 10
+        assert stats['timed_requests'] == 3
+        assert processor.get_stats()['failed_requests'] == 10
@@ -0,0 +1,140 @@
+"""
+交易所API代理权重调度测试
+测试响应头权重校准、按剩余权重选IP与权重耗尽时排队
+"""
+
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from core.networking.exchange_api_proxy import (
+    ExchangeAPIProxy, IPResource, WeightDispatcher, parse_used_weight
+)
+
+
+def make_dispatcher(*resources):
+    return WeightDispatcher({r.ip: r for r in resources})
+
+
+class TestUsedWeightSync:
+    """测试按响应头校准权重"""
+
+    def test_parse_used_weight_headers(self):
+        """测试解析 Binance 已用权重头"""
+        assert parse_used_weight({'X-MBX-USED-WEIGHT-1M': '1234'}) == 1234
+        assert parse_used_weight({'X-SAPI-USED-IP-WEIGHT-1M': '7'}) == 7
+        assert parse_used_weight({'Content-Type': 'application/json'}) is None
+        assert parse_used_weight({'X-MBX-USED-WEIGHT-1M': 'n/a'}) is None
+
+    def test_sync_aligns_window_and_ignores_stale_values(self):
+        """测试校准后窗口对齐整分钟，同窗口内旧值不回退"""
+        resource = IPResource(ip="10.0.0.1", current_weight=999)
+
+        resource.sync_used_weight(120)
+        assert resource.current_weight == 120
+        assert resource.last_reset.second == 0 and resource.last_reset.microsecond == 0
+
+        resource.sync_used_weight(100)  # 乱序到达的旧响应
+        assert resource.current_weight == 120
+
+
+class TestWeightDispatcher:
+    """测试权重调度器"""
+
+    def test_picks_ip_with_most_headroom(self):
+        """测试选择剩余权重最多的IP，并计入在途权重"""
+        a = IPResource(ip="a", current_weight=3000)
+        b = IPResource(ip="b", current_weight=1000)
+        dispatcher = make_dispatcher(a, b)
+
+        assert dispatcher.try_acquire(1500) is b
+        assert b.pending_weight == 1500
+        # b 剩余 3500，仍多于 a 的 3000
+        assert dispatcher.try_acquire(1000) is b
+        # b 剩余 2500，改选 a
+        assert dispatcher.try_acquire(10) is a
+
+    @pytest.mark.asyncio
+    async def test_release_settles_predicted_or_header_weight(self):
+        """测试结算：有响应头时以头为准，否则计入预测权重"""
+        resource = IPResource(ip="a")
+        dispatcher = make_dispatcher(resource)
+
+        ticket = await dispatcher.acquire(5, timeout=1)
+        dispatcher.observe_used_weight(ticket, 42)
+        dispatcher.release(ticket)
+        assert (resource.current_weight, resource.pending_weight) == (42, 0)
+
+        ticket = await dispatcher.acquire(5, timeout=1)
+        dispatcher.release(ticket)
+        assert (resource.current_weight, resource.pending_weight) == (47, 0)
+
+    @pytest.mark.asyncio
+    async def test_queues_until_window_reset(self):
+        """测试所有IP接近上限时排队等待窗口切换而不是失败"""
+        resource = IPResource(ip="a", max_weight_per_minute=100, current_weight=90)
+        resource.last_reset = datetime.now() - timedelta(seconds=59.8)
+        dispatcher = make_dispatcher(resource)
+
+        start = time.monotonic()
+        ticket = await dispatcher.acquire(10, timeout=5)
+
+        assert ticket.resource is resource
+        assert 0.1 < time.monotonic() - start < 2
+        assert resource.current_weight == 0 and resource.pending_weight == 10
+        assert dispatcher.stats['queued'] == 1
+
+    @pytest.mark.asyncio
+    async def test_release_wakes_queued_request(self):
+        """测试权重校准并释放后立即唤醒排队请求，无需等到窗口切换"""
+        resource = IPResource(ip="a", max_weight_per_minute=100)
+        resource.last_reset = datetime.now()
+        dispatcher = make_dispatcher(resource)
+        first = await dispatcher.acquire(85, timeout=1)
+
+        async def finish_first():
+            await asyncio.sleep(0.05)
+            dispatcher.observe_used_weight(first, 5)
+            dispatcher.release(first)
+
+        start = time.monotonic()
+        finisher = asyncio.create_task(finish_first())
+        ticket = await dispatcher.acquire(10, timeout=5)
+        await finisher
+
+        assert ticket.resource is resource
+        assert time.monotonic() - start < 1
+        assert dispatcher.stats['queued'] == 1 and dispatcher.get_stats()['waiting'] == 0
+
+    @pytest.mark.asyncio
+    async def test_queue_timeout(self):
+        """测试排队超时后抛出异常"""
+        resource = IPResource(ip="a", max_weight_per_minute=100, current_weight=95)
+        dispatcher = make_dispatcher(resource)
+
+        with pytest.raises(Exception, match="权重已耗尽"):
+            await dispatcher.acquire(10, timeout=0.05)
+        assert dispatcher.stats['queue_timeouts'] == 1
+
+
+class TestProxyDispatch:
+    """测试代理请求经调度器结算权重"""
+
+    @pytest.mark.asyncio
+    async def test_request_syncs_weight_from_response(self):
+        """测试请求按响应头校准IP权重"""
+        proxy = ExchangeAPIProxy.distributed_mode(["10.0.0.1", "10.0.0.2"])
+
+        async def fake_send(exchange, method, endpoint, params, ip_resource, ticket=None, **kwargs):
+            assert ip_resource.pending_weight == 40  # ticker/24hr 无参数权重
+            proxy.dispatcher.observe_used_weight(ticket, 321)
+            return {"ok": True}
+
+        proxy._send_request = fake_send
+        assert await proxy.request("binance", "GET", "/api/v3/ticker/24hr") == {"ok": True}
+
+        used = [r for r in proxy.ip_resources.values() if r.weight_synced_at]
+        assert len(used) == 1
+        assert used[0].current_weight == 321 and used[0].pending_weight == 0
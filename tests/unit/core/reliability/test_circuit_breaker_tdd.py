@@ -12,7 +12,7 @@ from datetime import datetime, timezone
 try:
     from core.reliability.circuit_breaker import (
         MarketPrismCircuitBreaker, CircuitBreakerConfig, CircuitState,
-        CircuitBreakerOpenException, OperationResult, circuit_breaker
+        CircuitBreakerOpenException, OperationResult, SlidingWindowCounter, circuit_breaker
     )
     HAS_CIRCUIT_BREAKER = True
 except ImportError:
@@ -553,6 +553,21 @@ class TestCircuitBreakerAdvancedFeatures:
         failure_rate = circuit_breaker._calculate_failure_rate(recent_ops)
         assert 0.0 <= failure_rate <= 1.0
 
+    @pytest.mark.asyncio
+    async def test_operation_history_records_all_operations(self, circuit_breaker):
+        """测试：操作历史记录全部操作，失败记录只保留失败"""
+        error = ValueError("boom")
+        await circuit_breaker._on_success("ok", 0.1, None)
+        await circuit_breaker._on_failure(error, 0.2)
+        await circuit_breaker._on_success("ok", 0.3, None)
+
+        assert [op.success for op in circuit_breaker.operation_history] == [True, False, True]
+        assert [op.error for op in circuit_breaker.failure_history] == [error]
+        assert circuit_breaker._calculate_failure_rate(circuit_breaker._get_recent_operations()) == pytest.approx(1 / 3)
+
+        circuit_breaker.reset()
+        assert len(circuit_breaker.failure_history) == 0
+
     def test_cache_management(self, circuit_breaker):
         """测试：缓存管理"""
         cache_key = "test_key"
@@ -704,3 +719,105 @@ class TestCircuitBreakerEdgeCases:
         exception = CircuitBreakerOpenException("Circuit breaker is open")
         assert str(exception) == "Circuit breaker is open"
         assert isinstance(exception, Exception)
+
+
+@pytest.mark.skipif(not HAS_CIRCUIT_BREAKER, reason="熔断器模块不可用")
+class TestSlidingWindowAndHalfOpenPermits:
+    """测试滑动窗口计数与半开许可"""
+
+    def test_window_expires_old_buckets(self):
+        """测试：超出窗口的桶被清理"""
+        window = SlidingWindowCounter(window_size=10)
+        window.record(100.2, True, 0.01, False)
+        window.record(100.7, False, 0.02, False)
+        window.record(105.0, False, 2.0, True)
+
+        assert (window.calls, window.failures, window.slow_calls) == (3, 2, 1)
+        assert window.failure_rate() == pytest.approx(2 / 3)
+
+        window.advance(110.0)  # 第100秒的桶滑出窗口
+        assert (window.calls, window.failures, window.slow_calls) == (1, 1, 1)
+
+        window.advance(200.0)
+        assert window.calls == 0 and window.total_duration == 0.0
+
+    @pytest.mark.asyncio
+    async def test_failure_rate_trips_from_window(self):
+        """测试：失败率由窗口计数判断"""
+        breaker = MarketPrismCircuitBreaker("rate_test", CircuitBreakerConfig(
+            failure_threshold=100, failure_rate_threshold=0.5, minimum_requests=4))
+
+        async def ok():
+            return "ok"
+
+        async def fail():
+            raise ValueError("boom")
+
+        async def fallback():
+            return "fallback"
+
+        await breaker.execute_with_breaker(ok)
+        await breaker.execute_with_breaker(fail, fallback=fallback)
+        await breaker.execute_with_breaker(ok)
+        assert breaker.get_state() == CircuitState.CLOSED
+
+        await breaker.execute_with_breaker(fail, fallback=fallback)
+        assert breaker.get_state() == CircuitState.OPEN
+        assert breaker.get_status()["recent_operations"] == 4
+
+    @pytest.mark.asyncio
+    async def test_slow_calls_trip_breaker(self):
+        """测试：慢调用率越过阈值时熔断"""
+        breaker = MarketPrismCircuitBreaker("slow_test", CircuitBreakerConfig(
+            minimum_requests=2, slow_call_duration_threshold=0.0, slow_call_rate_threshold=1.0))
+
+        async def ok():
+            return "ok"
+
+        await breaker.execute_with_breaker(ok)
+        assert breaker.get_state() == CircuitState.CLOSED
+        await breaker.execute_with_breaker(ok)
+        assert breaker.get_state() == CircuitState.OPEN
+
+    @pytest.mark.asyncio
+    async def test_half_open_allows_concurrent_trials_up_to_permits(self):
+        """测试：半开状态并发放行至许可数，其余请求走降级"""
+        breaker = MarketPrismCircuitBreaker("permit_test", CircuitBreakerConfig(
+            half_open_limit=3, success_threshold=3))
+        breaker.state = CircuitState.HALF_OPEN
+        release = asyncio.Event()
+        started = 0
+
+        async def trial():
+            nonlocal started
+            started += 1
+            await release.wait()
+            return "ok"
+
+        async def fallback():
+            return "rejected"
+
+        tasks = [asyncio.create_task(breaker.execute_with_breaker(trial, fallback=fallback)) for _ in range(5)]
+        await asyncio.sleep(0)
+        assert started == 3
+
+        release.set()
+        results = await asyncio.gather(*tasks)
+        assert sorted(results) == ["ok", "ok", "ok", "rejected", "rejected"]
+        assert breaker.get_state() == CircuitState.CLOSED
+
+    @pytest.mark.asyncio
+    async def test_half_open_trial_failure_reopens(self):
+        """测试：半开试探失败立即重新熔断，在途许可作废"""
+        breaker = MarketPrismCircuitBreaker("reopen_test", CircuitBreakerConfig(half_open_limit=2))
+        breaker.state = CircuitState.HALF_OPEN
+
+        async def fail():
+            raise ValueError("still failing")
+
+        async def fallback():
+            return "fallback"
+
+        assert await breaker.execute_with_breaker(fail, fallback=fallback) == "fallback"
+        assert breaker.get_state() == CircuitState.OPEN
+        assert breaker.get_status()["half_open_inflight"] == 0
@@ -0,0 +1,112 @@
+"""
+查询结果缓存测试
+测试按水位标签精确失效（含迟到数据）、加载期间推进时不写入旧结果、LRU内存上限、命中率统计与过期时间
+"""
+
+from unittest.mock import AsyncMock
+
+import pytest
+
+from core.storage.query_cache import QueryResultCache, encode_watermarks
+from core.storage.unified_storage_manager import UnifiedStorageConfig, UnifiedStorageManager
+
+BTC = ('trades', 'binance', 'BTC-USDT')
+ETH = ('trades', 'binance', 'ETH-USDT')
+
+
+class TestQueryResultCache:
+    """测试查询结果缓存"""
+
+    def test_normalized_key_and_precise_invalidation(self):
+        """测试空白不同的查询共用条目，水位推进只失效对应标签"""
+        cache = QueryResultCache()
+        cache.put("SELECT *  FROM trades\n WHERE symbol = 'BTC-USDT'", None, [BTC], ["btc"])
+        cache.put("SELECT * FROM trades WHERE symbol = 'ETH-USDT'", None, [ETH], ["eth"])
+
+        assert cache.get("SELECT * FROM trades WHERE symbol = 'BTC-USDT'") == (True, ["btc"])
+
+        payload = encode_watermarks('trades', [('binance', 'BTC-USDT', 1700000000000)])
+        assert cache.apply_watermarks(payload) == 1
+        assert cache.get("SELECT * FROM trades WHERE symbol = 'BTC-USDT'") == (False, None)
+        assert cache.get("SELECT * FROM trades WHERE symbol = 'ETH-USDT'") == (True, ["eth"])
+        assert cache.watermark(*BTC) == 1700000000000
+
+        # 迟到数据（时间戳不大于当前水位）同样失效，水位不回退
+        cache.put("q", None, [BTC], 1)
+        late = encode_watermarks('trades', [('binance', 'BTC-USDT', 1699999999000)])
+        assert cache.apply_watermarks(late) == 1
+        assert cache.get("q") == (False, None)
+        assert cache.watermark(*BTC) == 1700000000000
+
+    @pytest.mark.asyncio
+    async def test_result_loaded_across_advance_is_not_cached(self):
+        """测试查询期间水位推进时，读到的旧结果不写入缓存"""
+        cache = QueryResultCache()
+
+        async def loader():
+            cache.advance(*BTC, ts_ms=1)
+            return ["old"]
+
+        assert await cache.get_or_load("q", {"limit": 1}, [BTC], loader) == ["old"]
+        assert cache.get("q", {"limit": 1}) == (False, None)
+        assert cache.stats['stale_fills'] == 1
+
+    def test_lru_bounded_by_entries_and_bytes(self):
+        """测试按条目数与字节数淘汰最久未用的条目"""
+        cache = QueryResultCache(max_entries=2)
+        cache.put("a", None, [BTC], 1)
+        cache.put("b", None, [BTC], 2)
+        cache.get("a")
+        cache.put("c", None, [ETH], 3)
+        assert cache.get("b") == (False, None)
+        assert cache.get("a")[0] and cache.get("c")[0]
+
+        small = QueryResultCache(max_bytes=2000)
+        for i in range(10):
+            small.put(f"q{i}", None, [BTC], "x" * 500)
+        assert small.get_stats()['bytes'] <= 2000
+        assert small.stats['evictions'] >= 6
+
+        stats = cache.get_stats()
+        assert stats['evictions'] == 1
+        assert stats['hit_ratio'] == stats['hits'] / (stats['hits'] + stats['misses'])
+
+
+class TestStorageManagerQueryCache:
+    """测试统一存储管理器使用查询缓存"""
+
+    @pytest.mark.asyncio
+    async def test_recent_trades_cached_until_watermark_advances(self):
+        """测试最近成交在水位推进前不重复查询ClickHouse"""
+        manager = UnifiedStorageManager(UnifiedStorageConfig(storage_type="hot"))
+        manager.clickhouse_client = AsyncMock()
+        manager.clickhouse_client.fetchall.return_value = [{'price': 1.0}]
+
+        for _ in range(3):
+            assert await manager.get_recent_trades('binance', 'BTC-USDT', limit=10) == [{'price': 1.0}]
+        assert manager.clickhouse_client.fetchall.await_count == 1
+
+        manager.query_cache.apply_watermarks(encode_watermarks('trades', [('binance', 'ETH-USDT', 5)]))
+        await manager.get_recent_trades('binance', 'BTC-USDT', limit=10)
+        assert manager.clickhouse_client.fetchall.await_count == 1
+
+        manager.query_cache.apply_watermarks(encode_watermarks('trades', [('binance', 'BTC-USDT', 5)]))
+        await manager.get_recent_trades('binance', 'BTC-USDT', limit=10)
+        assert manager.clickhouse_client.fetchall.await_count == 2
+        assert manager.get_statistics()['query_cache']['invalidations'] == 1
+
+    @pytest.mark.asyncio
+    async def test_long_ttl_only_while_subscribed(self):
+        """测试未订阅水位时使用短过期时间，订阅期间才放宽"""
+        manager = UnifiedStorageManager(UnifiedStorageConfig(storage_type="hot"))
+        assert manager.query_cache.ttl == 300
+
+        nc = AsyncMock()
+        await manager.subscribe_watermarks(nc)
+        assert manager.query_cache.ttl == 3600
+        assert nc.subscribe.await_args.args[0] == "marketprism.watermark.>"
+
+        manager.is_running = True
+        await manager.stop()
+        assert manager.query_cache.ttl == 300
+        nc.subscribe.return_value.unsubscribe.assert_awaited_once()
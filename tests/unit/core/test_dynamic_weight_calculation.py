@@ -25,7 +25,9 @@ try:
         DynamicWeightCalculator,
         calculate_request_weight,
         validate_request_parameters,
-        get_weight_calculator
+        get_weight_calculator,
+        compile_formula,
+        compile_parameter_rule
     )
 except ImportError as e:
     pytest.skip(f"无法导入DynamicWeightCalculator: {e}")
@@ -328,6 +330,49 @@ class TestWeightCalculatorIntegration:
             pytest.fail(f"权重计算不应该因为错误输入而崩溃: {e}")
 
 
+
+class TestCompiledWeightRules:
+    """预编译权重规则测试"""
+    
+    def test_formula_compiled_without_eval(self):
+        """测试公式只支持count与四则运算，其余输入权重为1"""
+        assert compile_formula("count * 2")(3) == 6
+        assert compile_formula("(count + 1) * 3 // 2")(5) == 9
+        assert compile_formula("__import__('os').getpid()")(3) == 1
+        assert compile_formula("count / 0")(3) == 1
+        assert compile_formula("10")(3) == 1
+    
+    def test_parameter_tiers_lookup_table(self):
+        """测试区间规则查找表与规则定义顺序一致"""
+        evaluate = compile_parameter_rule({
+            "rules": [{"range": [1, 100], "weight": 1}, {"range": [50, 500], "weight": 5}]
+        })
+        assert evaluate(50) == 1
+        assert evaluate(101) == 5
+        assert evaluate("300") == 5
+        assert evaluate(100.5) == 5
+        assert evaluate(501) == 0
+    
+    def test_memo_ignores_unrelated_parameters(self):
+        """测试备忘表只以决定权重的参数为键"""
+        calculator = DynamicWeightCalculator()
+        for ts in range(100):
+            params = {"symbol": "BTCUSDT", "limit": 500, "timestamp": ts}
+            assert calculator.calculate_weight("binance", "/api/v3/depth", params) == 5
+        assert len(calculator._memo) == 1
+    
+    def test_batch_weights(self):
+        """测试批量计算多个交易对的请求权重"""
+        calculator = DynamicWeightCalculator()
+        symbols = ["BTCUSDT", "ETHUSDT", "BNBUSDT"]
+        
+        weights = calculator.calculate_weights(
+            "binance", "/api/v3/depth", [{"symbol": s, "limit": 1000} for s in symbols]
+        )
+        assert weights == [10, 10, 10]
+        assert calculator.calculate_weights("binance", "/api/v3/unknown", [{}, None]) == [1, 1]
+
+
 if __name__ == "__main__":
     # 运行测试
     pytest.main([__file__, "-v"])
\ No newline at end of file
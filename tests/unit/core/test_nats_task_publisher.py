@@ -0,0 +1,205 @@
+"""
+NATS任务发布器测试
+测试批量流水线发布、消息去重头、时间轮定时任务与确认延迟统计
+"""
+
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from core.task_system.nats_task_publisher import NATSTaskPublisher, TimerWheel
+from core.task_system.task_types import AsyncTask, TaskType
+
+
+class FakeJetStream:
+    """记录发布并模拟确认往返延迟"""
+
+    def __init__(self, rtt: float = 0.01):
+        self.rtt = rtt
+        self.published = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def publish(self, subject, payload, headers=None):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.rtt)
+        finally:
+            self.in_flight -= 1
+        self.published.append((subject, headers))
+        return SimpleNamespace(seq=len(self.published))
+
+
+def make_publisher(rtt: float = 0.01, **kwargs) -> NATSTaskPublisher:
+    publisher = NATSTaskPublisher(**kwargs)
+    publisher.js = FakeJetStream(rtt)
+    publisher.is_connected = True
+    return publisher
+
+
+def make_task(i: int) -> AsyncTask:
+    return AsyncTask(name=f"task-{i}", task_type=TaskType.DATA_COLLECTION,
+                     target_service="data-collector", target_endpoint="/collect")
+
+
+class TestBatchPublish:
+    """测试批量发布"""
+
+    @pytest.mark.asyncio
+    async def test_batch_pipelines_publishes_within_window(self):
+        """测试批量发布并发等待确认且不超过在途上限"""
+        publisher = make_publisher(rtt=0.02, max_in_flight=8)
+        tasks = [make_task(i) for i in range(40)]
+
+        start = time.perf_counter()
+        results = await publisher.publish_task_batch(tasks)
+        elapsed = time.perf_counter() - start
+
+        assert all(results.values()) and len(results) == 40
+        # 串行需要 80 次往返（约 1.6s）
+        assert elapsed < 0.6
+        assert 1 < publisher.js.max_in_flight <= 8
+        assert len(publisher.js.published) == 80
+        assert publisher.get_stats()['ack_latency_ms']['count'] == 40
+
+    @pytest.mark.asyncio
+    async def test_messages_carry_dedup_ids(self):
+        """测试任务与 QUEUED 事件都带有由任务ID派生的 Nats-Msg-Id"""
+        publisher = make_publisher(rtt=0)
+        task = make_task(0)
+
+        await publisher.publish_task_batch([task])
+
+        msg_ids = sorted(headers['Nats-Msg-Id'] for _, headers in publisher.js.published)
+        assert msg_ids == [task.task_id, f"{task.task_id}.queued"]
+
+    @pytest.mark.asyncio
+    async def test_failed_publish_reported_per_task(self):
+        """测试单个任务失败不影响同批其他任务，且不发布其事件"""
+        publisher = make_publisher(rtt=0)
+        tasks = [make_task(i) for i in range(3)]
+        publish = publisher.js.publish
+
+        async def flaky_publish(subject, payload, headers=None):
+            if headers.get('Nats-Msg-Id') == tasks[1].task_id:
+                raise TimeoutError("no ack")
+            return await publish(subject, payload, headers)
+
+        publisher.js.publish = flaky_publish
+        results = await publisher.publish_task_batch(tasks)
+
+        assert results == {tasks[0].task_id: True, tasks[1].task_id: False, tasks[2].task_id: True}
+        assert publisher.error_count == 1
+        assert len(publisher.js.published) == 4
+
+
+class TestScheduledTasks:
+    """测试时间轮定时任务"""
+
+    def test_timer_wheel_pops_due_items_across_rounds(self):
+        """测试时间轮按到期时间取出条目，超过一圈的条目等到对应轮次"""
+        wheel = TimerWheel(tick=1.0, slots=4)
+        wheel.add("a", 101.5, "a")
+        wheel.add("b", 105.2, "b")  # 与 a 同槽，下一圈
+        wheel.add("c", 103.0, "c")
+        assert wheel.cancel("c")
+
+        assert wheel.pop_due(100.0) == []
+        assert wheel.pop_due(102.0) == ["a"]
+        assert wheel.pop_due(104.9) == []
+        assert wheel.pop_due(105.0) == ["b"]
+        assert len(wheel) == 0
+
+    @pytest.mark.asyncio
+    async def test_scheduled_task_published_when_due(self):
+        """测试定时任务留在本地，到期后才发布"""
+        publisher = make_publisher(rtt=0, scheduler_tick=0.05)
+        publisher._timer_task = asyncio.create_task(publisher._timer_loop())
+        task = make_task(0)
+        try:
+            assert await publisher.publish_scheduled_task(
+                task, datetime.now(timezone.utc) + timedelta(seconds=0.2))
+            assert publisher.js.published == []
+            assert publisher.get_stats()['scheduled_pending'] == 1
+
+            await asyncio.sleep(0.4)
+            assert publisher.js.published[0][1]['Nats-Msg-Id'] == task.task_id
+            assert publisher.get_stats()['scheduled_pending'] == 0
+        finally:
+            publisher._timer_task.cancel()
+
+    @pytest.mark.asyncio
+    async def test_failed_scheduled_publish_requeued_with_backoff(self):
+        """测试到期任务发布失败后退避重新放回时间轮，恢复后发布"""
+        publisher = make_publisher(rtt=0, scheduler_tick=0.02)
+        task = make_task(0)
+        publish = publisher.js.publish
+        failures = [TimeoutError("no ack"), TimeoutError("no ack")]
+
+        async def flaky_publish(subject, payload, headers=None):
+            if headers.get('Nats-Msg-Id') == task.task_id and failures:
+                raise failures.pop()
+            return await publish(subject, payload, headers)
+
+        publisher.js.publish = flaky_publish
+        publisher._timer_task = asyncio.create_task(publisher._timer_loop())
+        try:
+            await publisher.publish_scheduled_task(task, datetime.now(timezone.utc) + timedelta(seconds=0.05))
+            await asyncio.sleep(0.5)
+        finally:
+            publisher._timer_task.cancel()
+
+        assert publisher.js.published[0][1]['Nats-Msg-Id'] == task.task_id
+        stats = publisher.get_stats()
+        assert stats['scheduled_retries'] == 2 and stats['scheduled_failed'] == 0
+        assert stats['scheduled_pending'] == 0
+
+    def test_scheduled_publish_given_up_after_max_retries(self):
+        """测试超过重试次数后放弃并计数"""
+        publisher = make_publisher(scheduler_tick=1.0, scheduled_max_retries=1)
+        task = make_task(0)
+
+        publisher._requeue_failed_scheduled([task], {task.task_id: False})
+        assert publisher.get_stats()['scheduled_pending'] == 1
+        assert publisher._timer_wheel.pop_due(time.time() + 0.5) == []  # 退避 2 个 tick
+
+        publisher._timer_wheel.cancel(task.task_id)
+        publisher._requeue_failed_scheduled([task], {task.task_id: False})
+        stats = publisher.get_stats()
+        assert stats['scheduled_pending'] == 0
+        assert stats['scheduled_retries'] == 1 and stats['scheduled_failed'] == 1
+
+    @pytest.mark.asyncio
+    async def test_stop_publishes_pending_with_delay(self):
+        """测试停止时未到期任务按延迟任务发布"""
+        publisher = make_publisher(rtt=0)
+        publisher.nc = SimpleNamespace(close=lambda: asyncio.sleep(0))
+        task = make_task(0)
+        await publisher.publish_scheduled_task(task, datetime.now(timezone.utc) + timedelta(minutes=5))
+
+        await publisher.stop()
+
+        assert 290 <= task.delay_seconds <= 300
+        assert publisher.js.published[0][1]['Nats-Msg-Id'] == task.task_id
+
+    @pytest.mark.asyncio
+    async def test_stop_republishes_in_flight_batch(self):
+        """测试停止时正在发布的到期批次被取消后放回时间轮并由 stop() 补发"""
+        publisher = make_publisher(rtt=0.3, scheduler_tick=0.01)
+        publisher.nc = SimpleNamespace(close=lambda: asyncio.sleep(0))
+        task = make_task(0)
+        publisher._timer_task = asyncio.create_task(publisher._timer_loop())
+        await publisher.publish_scheduled_task(task, datetime.now(timezone.utc) + timedelta(seconds=0.05))
+        await asyncio.sleep(0.15)
+        assert publisher.js.in_flight == 1 and not publisher.js.published
+
+        await publisher.stop()
+
+        msg_ids = [headers['Nats-Msg-Id'] for _, headers in publisher.js.published]
+        assert msg_ids.count(task.task_id) == 1
+        assert task.delay_seconds == 0
+        assert publisher.get_stats()['scheduled_pending'] == 0
@@ -0,0 +1,121 @@
+"""
+服务发现本地缓存测试
+测试 watch 推送更新、事件驱动等待、负载感知选择与过期回退
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+import pytest_asyncio
+
+from core.service_discovery import (
+    InMemoryBackend, ServiceDiscoveryCache, ServiceDiscoveryClient, ServiceInstance, ServiceStatus
+)
+
+
+def make_instance(instance_id, port, status=ServiceStatus.HEALTHY, weight=100):
+    return ServiceInstance(service_name="storage", instance_id=instance_id, host="10.0.0.1",
+                           port=port, status=status, weight=weight)
+
+
+@pytest_asyncio.fixture
+async def client():
+    client = ServiceDiscoveryClient({'backend': 'memory', 'health_check_interval': 3600})
+    await client.initialize()
+    yield client
+    await client.shutdown()
+
+
+class TestWatchPush:
+    """测试后端推送保持缓存新鲜"""
+
+    @pytest.mark.asyncio
+    async def test_register_and_deregister_pushed_without_backend_query(self, client):
+        """测试注册/注销经推送反映到缓存，查询不再访问后端"""
+        await client.backend.register(make_instance("s1", 8001))
+        assert [i.instance_id for i in await client.discover("storage")] == ["s1"]
+
+        with patch.object(client.backend, "discover", side_effect=AssertionError("不应访问后端")):
+            await client.backend.register(make_instance("s2", 8002))
+            assert {i.instance_id for i in await client.discover("storage")} == {"s1", "s2"}
+
+            await client.backend.deregister("storage", "s1")
+            assert [i.instance_id for i in await client.discover("storage")] == ["s2"]
+            assert (await client.get_service("storage")).instance_id == "s2"
+
+        assert client.get_cache_stats()['services']['storage']['version'] == 3
+
+    @pytest.mark.asyncio
+    async def test_wait_for_service_woken_by_registration(self, client):
+        """测试等待服务时由注册推送唤醒，而不是等满轮询间隔"""
+        waiter = asyncio.create_task(client.wait_for_service("storage", timeout=5, check_interval=60))
+        await asyncio.sleep(0.05)
+        assert not waiter.done()
+
+        await client.backend.register(make_instance("s1", 8001))
+        instance = await asyncio.wait_for(waiter, 1)
+        assert instance.instance_id == "s1"
+
+    @pytest.mark.asyncio
+    async def test_status_change_updates_candidates(self, client):
+        """测试状态变更后候选集回退为状态未知的实例"""
+        await client.backend.register(make_instance("s1", 8001))
+        await client.backend.register(make_instance("s2", 8002, status=ServiceStatus.UNKNOWN))
+        assert (await client.get_service("storage")).instance_id == "s1"
+
+        await client.backend.update_status("storage", "s1", ServiceStatus.UNHEALTHY)
+        assert (await client.get_service("storage")).instance_id == "s2"
+
+
+class TestSelection:
+    """测试负载感知选择与过期"""
+
+    @pytest.mark.asyncio
+    async def test_prefers_instance_with_fewer_in_flight_requests(self, client):
+        """测试在途请求多的实例被避开"""
+        await client.backend.register(make_instance("busy", 8001))
+        await client.backend.register(make_instance("idle", 8002))
+
+        async with client.use_service("storage") as first:
+            busy = first
+            for _ in range(3):
+                client.cache.begin(busy)
+            picks = {(await client.get_service("storage")).instance_id for _ in range(20)}
+            assert picks == {"idle" if busy.instance_id == "busy" else "busy"}
+
+        assert client.get_cache_stats()['services']['storage']['in_flight'] == 3
+
+    @pytest.mark.asyncio
+    async def test_expired_instances_dropped_lazily(self):
+        """测试心跳过期的实例在查询时被剔除"""
+        backend = InMemoryBackend()
+        stale = make_instance("stale", 8001)
+        stale.last_heartbeat = datetime.now() - timedelta(seconds=30)
+        await backend.register(stale)
+        await backend.register(make_instance("fresh", 8002))
+
+        cache = ServiceDiscoveryCache(backend, instance_ttl=10)
+        try:
+            assert [i.instance_id for i in await cache.instances("storage")] == ["fresh"]
+            assert (await cache.select("storage")).instance_id == "fresh"
+        finally:
+            await cache.close()
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_discover_when_watch_stalls(self):
+        """测试 watch 首个快照超时时回退为直接查询"""
+        backend = InMemoryBackend()
+        await backend.register(make_instance("s1", 8001))
+
+        async def stalled_watch(service_name, emit):
+            await asyncio.sleep(3600)
+
+        backend.watch = stalled_watch
+        cache = ServiceDiscoveryCache(backend, ready_timeout=0.05)
+        try:
+            assert (await cache.select("storage")).instance_id == "s1"
+            assert cache.stats['fallbacks'] == 1
+        finally:
+            await cache.close()
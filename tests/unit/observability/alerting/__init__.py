@@ -0,0 +1,3 @@
+"""
+告警模块单元测试
+"""
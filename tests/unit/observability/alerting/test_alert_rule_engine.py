@@ -0,0 +1,159 @@
+"""
+AlertRuleEngine 增量评估与 AlertDeduplicator 索引去重测试
+"""
+
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+from core.observability.alerting.alert_aggregator import AlertDeduplicator
+from core.observability.alerting.alert_rules import (
+    AggregationFunction, AlertCondition, AlertRule, AlertRuleEngine,
+    ConditionOperator, RollingWindow
+)
+from core.observability.alerting.alert_types import Alert, AlertCategory, AlertSeverity
+
+
+T0 = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def make_rule(rule_id, metric, threshold, aggregation=None, duration=0, time_window=300):
+    return AlertRule(
+        id=rule_id,
+        name=rule_id,
+        description=rule_id,
+        severity=AlertSeverity.HIGH,
+        category=AlertCategory.BUSINESS,
+        conditions=[AlertCondition(metric_name=metric, operator=ConditionOperator.GT,
+                                   threshold=threshold, aggregation=aggregation,
+                                   time_window=time_window)],
+        duration=duration,
+        evaluation_interval=0,
+    )
+
+
+@pytest.fixture
+def engine():
+    engine = AlertRuleEngine()
+    for rule_id in list(engine.rules):
+        engine.remove_rule(rule_id)
+    return engine
+
+
+class TestIncrementalEvaluation:
+    """测试按指标索引的增量评估"""
+
+    def test_only_rules_with_changed_inputs_are_evaluated(self, engine, monkeypatch):
+        """测试只评估输入变化的规则"""
+        for i in range(50):
+            engine.add_rule(make_rule(f"spread_{i}", f"spread.SYM{i}", 10.0))
+        engine.evaluate_rules({f"spread.SYM{i}": {'value': 1.0} for i in range(50)}, T0)
+
+        evaluated = []
+        original = engine._evaluate_rule
+        monkeypatch.setattr(engine, '_evaluate_rule',
+                            lambda rule, now: evaluated.append(rule.id) or original(rule, now))
+
+        engine.evaluate_rules({f"spread.SYM{i}": {'value': 1.0} for i in range(50)}, T0 + timedelta(seconds=1))
+        assert evaluated == []
+
+        engine.evaluate_rules({"spread.SYM7": {'value': 2.0}, "unrelated": {'value': 1}}, T0 + timedelta(seconds=2))
+        assert evaluated == ["spread_7"]
+        assert "unrelated" not in engine.metrics_cache
+
+    def test_pending_rule_fires_after_duration_without_new_input(self, engine):
+        """测试条件成立的规则在输入不变时仍推进持续时间"""
+        engine.add_rule(make_rule("lag", "lag_seconds", 5.0, duration=60))
+
+        assert engine.evaluate_rules({"lag_seconds": {'value': 9.0}}, T0) == []
+        assert engine.evaluate_rules({}, T0 + timedelta(seconds=30)) == []
+        alerts = engine.evaluate_rules({}, T0 + timedelta(seconds=61))
+
+        assert [a.metadata['rule_id'] for a in alerts] == ["lag"]
+        assert alerts[0].metadata['metrics'] == {"lag_seconds": {'value': 9.0}}
+
+    def test_stale_metric_treated_as_missing(self, engine):
+        """测试超过时间窗口未上报的指标视为缺失"""
+        engine.add_rule(make_rule("lag", "lag_seconds", 5.0, duration=60, time_window=30))
+        engine.evaluate_rules({"lag_seconds": {'value': 9.0}}, T0)
+
+        assert engine.evaluate_rules({}, T0 + timedelta(seconds=61)) == []
+        assert engine.get_rule_statistics()['pending_rules'] == 0
+
+    def test_aggregated_condition_uses_rolling_window(self, engine):
+        """测试聚合条件基于规则级滚动窗口"""
+        engine.add_rule(make_rule("avg_latency", "latency_ms", 100.0,
+                                  aggregation=AggregationFunction.AVG, time_window=10))
+        engine.rule_states["avg_latency"]['last_triggered'] = T0 - timedelta(days=1)
+
+        assert engine.evaluate_rules({"latency_ms": {'value': 300.0}}, T0) != []
+        # 窗口内均值 (300 + 0 + 0 + 0) / 4 = 75
+        for second in (1, 2, 3):
+            engine.evaluate_rules({"latency_ms": {'value': 0.0}}, T0 + timedelta(seconds=second))
+        assert engine._rule_windows["avg_latency"][0].value(AggregationFunction.AVG) == 75.0
+        assert engine.get_rule_statistics()['pending_rules'] == 0
+
+    def test_remove_rule_drops_index(self, engine):
+        """测试移除规则同时清理指标索引"""
+        engine.add_rule(make_rule("r1", "m1", 1.0))
+        engine.evaluate_rules({"m1": {'value': 0.0}}, T0)
+        engine.remove_rule("r1")
+
+        assert engine.evaluate_rules({"m1": {'value': 5.0}}, T0) == []
+        assert engine.get_rule_statistics()['indexed_metrics'] == 0
+
+
+class TestRollingWindow:
+    """测试滚动窗口聚合"""
+
+    def test_aggregations_and_expiry(self):
+        window = RollingWindow(10)
+        for ts, value in ((0, 5.0), (2, 1.0), (4, 3.0), (6, 9.0)):
+            window.add(ts, value)
+
+        assert window.value(AggregationFunction.MAX) == 9.0
+        assert window.value(AggregationFunction.MIN) == 1.0
+        assert window.value(AggregationFunction.SUM) == 18.0
+        assert window.value(AggregationFunction.INCREASE) == 4.0
+        assert window.value(AggregationFunction.RATE) == pytest.approx(4.0 / 6)
+
+        window.expire(13)  # 淘汰 ts < 3 的样本
+        assert window.value(AggregationFunction.MIN) == 3.0
+        assert window.value(AggregationFunction.COUNT) == 2.0
+
+        window.expire(100)
+        assert window.value(AggregationFunction.AVG) is None
+
+
+class TestIndexedDeduplicator:
+    """测试基于相似键的去重"""
+
+    @staticmethod
+    def make_alert(name="spread_wide", **labels):
+        return Alert(name=name, description="d", severity=AlertSeverity.HIGH,
+                     category=AlertCategory.BUSINESS, labels=labels)
+
+    def test_similar_active_alert_blocks_until_released(self):
+        dedup = AlertDeduplicator(time_window=0)
+        first = self.make_alert(service="collector", instance="a")
+
+        assert dedup.should_create_alert(first)
+        assert not dedup.should_create_alert(self.make_alert(service="collector", instance="b"))
+        assert dedup.should_create_alert(self.make_alert(service="storage"))
+
+        dedup.release_alert(first)
+        assert dedup.should_create_alert(self.make_alert(service="collector", instance="b"))
+
+    def test_non_active_alert_does_not_block(self):
+        dedup = AlertDeduplicator(time_window=0)
+        first = self.make_alert(component="orderbook")
+        assert dedup.should_create_alert(first)
+
+        first.resolve("done")
+        assert dedup.should_create_alert(self.make_alert(component="orderbook"))
+
+    def test_legacy_existing_alerts_argument(self):
+        dedup = AlertDeduplicator(time_window=0)
+        existing = self.make_alert(service="collector")
+
+        assert not dedup.should_create_alert(self.make_alert(service="collector"), [existing])
@@ -0,0 +1,133 @@
+"""
+指标注册表快速记录路径测试
+"""
+
+import threading
+import sys
+from pathlib import Path
+
+import pytest
+
+project_root = Path(__file__).resolve().parent.parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from core.observability.metrics.metric_categories import MetricDefinition, MetricType, MetricCategory
+from core.observability.metrics.metric_registry import (
+    MetricInstance, HistogramValue, HistogramBucket, CounterChild
+)
+
+
+def make_instance(metric_type: MetricType) -> MetricInstance:
+    return MetricInstance(MetricDefinition(
+        name=f"test_{metric_type.name.lower()}",
+        metric_type=metric_type,
+        category=MetricCategory.BUSINESS,
+        labels=["exchange", "symbol"]
+    ))
+
+
+class TestMetricChildren:
+    """预绑定标签子项测试"""
+
+    def test_labels_returns_cached_child(self):
+        """测试相同标签返回同一个子项（与顺序无关）"""
+        metric = make_instance(MetricType.COUNTER)
+
+        child = metric.labels(exchange="binance", symbol="BTCUSDT")
+
+        assert isinstance(child, CounterChild)
+        assert metric.labels({"symbol": "BTCUSDT", "exchange": "binance"}) is child
+        assert metric.labels(exchange="okx", symbol="BTCUSDT") is not child
+
+    def test_child_and_legacy_api_share_value(self):
+        """测试子项与 increment API 累加到同一个值"""
+        metric = make_instance(MetricType.COUNTER)
+        labels = {"exchange": "binance", "symbol": "BTCUSDT"}
+
+        metric.labels(**labels).inc(3)
+        metric.increment(2, labels)
+
+        assert metric.get_value(labels).value == 5
+        assert list(metric.get_values()) == ["exchange=binance|symbol=BTCUSDT"]
+
+    def test_counter_per_thread_accumulation(self):
+        """测试多线程无锁累加在读取时合并"""
+        metric = make_instance(MetricType.COUNTER)
+        child = metric.labels(exchange="binance")
+
+        def worker():
+            for _ in range(10000):
+                child.inc()
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert metric.get_value({"exchange": "binance"}).value == 80000
+
+    def test_histogram_buckets_match_cumulative_semantics(self):
+        """测试 bisect 桶定位与逐桶比较的累积结果一致"""
+        metric = make_instance(MetricType.HISTOGRAM)
+        bounds = [0.1, 0.5, 1.0, 2.5, 5.0, 10.0]
+        observations = [0.05, 0.1, 0.3, 0.5, 0.7, 1.0, 3.0, 7.5, 10.0, 42.0]
+
+        reference = HistogramValue(value=0, buckets=[HistogramBucket(upper_bound=b) for b in bounds])
+        for value in observations:
+            metric.observe_histogram(value, buckets=bounds)
+            reference.add_observation(value)
+
+        hist_value = metric.get_value()
+        assert [b.count for b in hist_value.buckets] == [b.count for b in reference.buckets]
+        assert hist_value.count == reference.count == len(observations)
+        assert hist_value.sum == pytest.approx(reference.sum)
+
+    def test_summary_and_gauge(self):
+        """测试摘要与仪表子项"""
+        summary = make_instance(MetricType.SUMMARY)
+        summary.labels(exchange="okx").observe(1.5)
+        summary.observe_summary(2.5, {"exchange": "okx"})
+        assert summary.get_value({"exchange": "okx"}).count == 2
+        assert summary.get_value({"exchange": "okx"}).sum == 4.0
+
+        gauge = make_instance(MetricType.GAUGE)
+        gauge.labels(symbol="ETHUSDT").set(10)
+        gauge.set_value(12.5, {"symbol": "ETHUSDT"})
+        assert gauge.get_value({"symbol": "ETHUSDT"}).value == 12.5
+
+    def test_type_mismatch_still_raises(self):
+        """测试类型不匹配时仍然报错"""
+        metric = make_instance(MetricType.GAUGE)
+        with pytest.raises(ValueError):
+            metric.increment(1)
+
+    def test_reset_clears_values(self):
+        """测试重置后旧值清零"""
+        metric = make_instance(MetricType.COUNTER)
+        metric.increment(5, {"exchange": "binance"})
+
+        metric.reset()
+
+        assert metric.get_value({"exchange": "binance"}).value == 0
+        metric.increment(1, {"exchange": "binance"})
+        assert metric.get_value({"exchange": "binance"}).value == 1
+
+    def test_cached_child_still_exported_after_reset(self):
+        """测试重置前缓存的子项在重置后继续导出"""
+        metric = make_instance(MetricType.COUNTER)
+        child = metric.labels(exchange="binance")
+        child.inc(5)
+
+        metric.reset()
+        child.inc(2)
+
+        assert metric.labels(exchange="binance") is child
+        assert metric.get_values()["exchange=binance"].value == 2
+
+        histogram = make_instance(MetricType.HISTOGRAM)
+        observer = histogram.labels(exchange="okx")
+        observer.observe(0.3)
+        histogram.reset()
+        observer.observe(0.3)
+        assert histogram.get_value({"exchange": "okx"}).count == 1
@@ -0,0 +1,223 @@
+"""
+冷端复制器测试
+测试自适应窗口规划、分片并行复制与段级校验
+"""
+
+import asyncio
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[3]
+MINUTE = 60_000
+START = 1_000 * MINUTE
+
+
+@pytest.fixture(scope="module")
+def replication():
+    spec = importlib.util.spec_from_file_location(
+        "cold_replication", PROJECT_ROOT / "services" / "cold-storage-service" / "replication.py"
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def replicator(replication, tmp_path, monkeypatch):
+    monkeypatch.setenv("MARKETPRISM_COLD_RUN_DIR", str(tmp_path))
+    rep = replication.HotToColdReplicator({"replication": {
+        "window_minutes_all": 1,
+        "target_rows_per_window": 1000,
+        "max_window_minutes": 30,
+        "shard_count": 4,
+        "shard_threshold_rows": 500,
+        "verify_segment_minutes": 60,
+        "max_catchup_windows_low": 100,
+    }})
+    rep.inserts = []
+    rep.cold_queries = 0
+    rep.checksums = {"hot": {("202501", "binance"): (1800, 42)}, "cold": {("202501", "binance"): (1800, 42)}}
+
+    def rows_hot(sql):
+        if "toStartOfMinute" in sql:
+            # 水位之后 10 分钟每分钟 300 行，之后空闲
+            return [[str(START + m * MINUTE), "300"] for m in range(10)]
+        return [[p, e, str(c), str(h)] for (p, e), (c, h) in rep.checksums["hot"].items()]
+
+    def rows_cold(sql):
+        rep.cold_queries += 1
+        return [[p, e, str(c), str(h)] for (p, e), (c, h) in rep.checksums["cold"].items()]
+
+    monkeypatch.setattr(rep, "_rows_hot", rows_hot)
+    monkeypatch.setattr(rep, "_rows_cold", rows_cold)
+    monkeypatch.setattr(rep, "_exec_cold", rep.inserts.append)
+    rep._set_state_ms("funding_rates", START)
+    return rep
+
+
+class TestWindowPlanning:
+    """窗口规划测试"""
+
+    def test_pack_by_rows_and_span(self, replication):
+        pack = replication.HotToColdReplicator._pack_windows
+        buckets = [(0, 400), (MINUTE, 400), (2 * MINUTE, 400), (3 * MINUTE, 5000), (40 * MINUTE, 1)]
+
+        windows = pack(buckets, 0, 120 * MINUTE, target_rows=1000, max_window_ms=30 * MINUTE)
+
+        assert windows == [
+            (0, 2 * MINUTE, 800),
+            (2 * MINUTE, 3 * MINUTE, 400),
+            (3 * MINUTE, 40 * MINUTE, 5000),   # 单桶超出目标行数时独占窗口，空闲区间并入
+            (40 * MINUTE, 120 * MINUTE, 1),
+        ]
+
+
+class TestReplication:
+    """复制流程测试"""
+
+    def test_catch_up_shards_large_windows_and_verifies_once(self, replicator):
+        """测试追赶时大窗口分片并行，段结束时校验一次"""
+        asyncio.run(replicator._replicate_table_window("funding_rates", START + 120 * MINUTE))
+
+        # 10 分钟 x 300 行按 1000 行切为 900/900/900/300 四个窗口，>=500 行的窗口分为 4 片
+        sharded = [sql for sql in replicator.inserts if "cityHash64(exchange, symbol) % 4" in sql]
+        assert len(sharded) == 3 * 4
+        assert len(replicator.inserts) == 3 * 4 + 1
+        assert replicator._get_state_ms("funding_rates") == START + 120 * MINUTE
+        assert replicator.success_windows == 4
+        assert replicator.cold_queries == 1
+
+    def test_missing_rows_keep_watermark(self, replicator, monkeypatch):
+        """测试冷端缺行时不推进水位"""
+        monkeypatch.setattr("time.sleep", lambda _: None)
+        replicator.checksums["cold"] = {("202501", "binance"): (1700, 41)}
+
+        with pytest.raises(RuntimeError, match="cold insufficient"):
+            asyncio.run(replicator._replicate_table_window("funding_rates", START + 120 * MINUTE))
+        assert replicator._get_state_ms("funding_rates") == START
+
+    def test_stop_commits_only_copied_windows(self, replicator, monkeypatch):
+        """测试中途停止时只校验并提交已复制的窗口"""
+        copy_window = replicator._copy_window
+        commits = []
+
+        async def copy_then_stop(*args):
+            await copy_window(*args)
+            replicator._stop = True
+
+        monkeypatch.setattr(replicator, "_copy_window", copy_then_stop)
+        monkeypatch.setattr(replicator, "_commit_segment", lambda *args: commits.append(args))
+        asyncio.run(replicator._replicate_table_window("funding_rates", START + 120 * MINUTE))
+
+        # 首个窗口为 900 行（3 分钟），停止后第二个窗口未复制
+        assert commits == [("funding_rates", START, START + 3 * MINUTE, 1)]
+
+    def test_checksum_mismatch_detected(self, replicator):
+        """测试行数一致但校验和不同时报错"""
+        replicator.checksums["cold"] = {("202501", "binance"): (1800, 7)}
+
+        with pytest.raises(RuntimeError, match="checksum mismatch"):
+            asyncio.run(replicator._replicate_table_window("funding_rates", START + 120 * MINUTE))
+
+
+class TestPartitionCleanup:
+    """分区级清理测试"""
+
+    DAY = 24 * 60 * MINUTE
+    DAY0 = 1_735_689_600_000  # 2025-01-01 00:00 UTC
+
+    def test_partition_range(self, replication):
+        parse = replication.HotToColdReplicator._partition_range
+
+        assert parse("(20250101,'binance')") == (self.DAY0, self.DAY0 + self.DAY, "binance")
+        assert parse("(202501,'okx')") == (self.DAY0, self.DAY0 + 31 * self.DAY, "okx")
+        assert parse("('2025-01-01 10:00:00.000','okx')") == (
+            self.DAY0 + 600 * MINUTE, self.DAY0 + 660 * MINUTE, "okx")
+        assert parse("tuple()") is None
+
+    def test_drops_only_replicated_whole_partitions(self, replicator, monkeypatch):
+        """测试只删除整体早于 cutoff 且冷端行数已确认的分区，尾部分区默认不发起变更"""
+        parts = [
+            ["20250101_a", "(20250101,'binance')", "100"],
+            ["20250101_b", "(20250101,'okx')", "50"],
+            ["20250102_a", "(20250102,'binance')", "70"],
+        ]
+        cold_counts = {"'binance'": 100, "'okx'": 49}
+        hot_sql = []
+        monkeypatch.setattr(replicator, "_rows_hot", lambda sql: parts)
+        monkeypatch.setattr(replicator, "_scalar_cold",
+                            lambda sql: next(v for k, v in cold_counts.items() if k in sql))
+        monkeypatch.setattr(replicator, "_exec_hot", hot_sql.append)
+
+        replicator._cleanup_table("trades", self.DAY0 + self.DAY + 60 * MINUTE)
+
+        assert hot_sql == ["ALTER TABLE marketprism_hot.trades DROP PARTITION ID '20250101_a'"]
+        assert replicator.cleanup_stats["dropped_rows"] == 100
+        assert replicator.cleanup_stats["skipped_partitions"] == 1
+
+    def test_tail_delete_limited_to_tail_partitions(self, replicator, monkeypatch):
+        """测试尾部删除只覆盖尾部分区的交易所与时间范围，有分区被保留时不删除，按实际时间限频"""
+        parts = [
+            ["20250101_b", "(20250101,'okx')", "50"],
+            ["20250102_a", "(20250102,'binance')", "70"],
+        ]
+        hot_sql = []
+        monkeypatch.setattr(replicator, "_rows_hot", lambda sql: parts)
+        monkeypatch.setattr(replicator, "_scalar_cold", lambda sql: 49)
+        monkeypatch.setattr(replicator, "_exec_hot", hot_sql.append)
+        replicator.cleanup_partial_tail = True
+        cutoff = self.DAY0 + self.DAY + 60 * MINUTE
+
+        replicator._cleanup_table("trades", cutoff)
+        assert hot_sql == []  # okx 分区未复制完整被保留
+
+        parts.pop(0)
+        replicator._cleanup_table("trades", cutoff)
+        replicator._cleanup_table("trades", cutoff + 600 * MINUTE)  # 数据时间已超过间隔，但实际时间未到
+
+        assert hot_sql == [
+            f"ALTER TABLE marketprism_hot.trades DELETE WHERE timestamp < toDateTime64({cutoff}/1000.0, 3, 'UTC') "
+            f"AND ((exchange = 'binance' AND timestamp >= toDateTime64({self.DAY0 + self.DAY}/1000.0, 3, 'UTC')))"
+        ]
+
+        replicator._last_tail_cleanup["trades"] -= 3600
+        replicator._cleanup_table("trades", cutoff + 30 * MINUTE)
+        assert len(hot_sql) == 2
+        assert replicator.cleanup_stats["tail_mutations"] == 2
+
+
+class TestStateAndLag:
+    """水位缓存与延迟计算测试"""
+
+    def test_state_cached_and_persisted_atomically(self, replicator, replication, monkeypatch):
+        """测试水位读内存，写入后原子落盘且可被新实例读回"""
+        replicator._set_state_ms("trades", START + MINUTE)
+        with monkeypatch.context() as m:
+            m.setattr("builtins.open", lambda *a, **k: pytest.fail("state read from disk"))
+            assert replicator._get_state_ms("trades") == START + MINUTE
+
+        fresh = replication.HotToColdReplicator({})
+        assert fresh.state_path == replicator.state_path
+        assert fresh._get_state_ms("trades") == START + MINUTE
+        assert not Path(replicator.state_path + ".tmp").exists()
+
+    def test_lag_from_watermark_and_parts(self, replicator, monkeypatch):
+        """测试延迟由水位与 system.parts 元数据得出，不扫描冷端"""
+        queries = []
+
+        def rows_hot(sql):
+            queries.append(sql)
+            return [["funding_rates", str(START + 30 * MINUTE)], ["trades", "0"]]
+
+        monkeypatch.setattr(replicator, "_rows_hot", rows_hot)
+        monkeypatch.setattr(replicator, "_scalar_hot", lambda sql: queries.append(sql) or 0)
+        monkeypatch.setattr(replicator, "_scalar_cold", lambda sql: pytest.fail("cold scanned"))
+
+        asyncio.run(replicator._update_lags())
+
+        assert replicator.table_lag_minutes["funding_rates"] == 30
+        assert replicator.table_lag_minutes["trades"] == 0
+        assert "system.parts" in queries[0]
+        assert all("ORDER BY timestamp DESC LIMIT 1" in q for q in queries[1:])
@@ -0,0 +1,169 @@
+"""
+热端ClickHouse客户端测试
+测试原生连接池并发上限与线程固定、超时终止、分块流式读取与列式插入
+"""
+
+import asyncio
+import importlib.util
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[3]
+
+
+@pytest.fixture(scope="module")
+def ch_module():
+    spec = importlib.util.spec_from_file_location(
+        "hot_clickhouse_client",
+        PROJECT_ROOT / "services" / "hot-storage-service" / "storage" / "clickhouse_client.py"
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+class FakeDriverClient:
+    """模拟 clickhouse_driver.Client：记录执行线程，可阻塞查询"""
+
+    active = 0
+    max_active = 0
+    lock = threading.Lock()
+
+    server_error = Exception
+
+    def __init__(self):
+        self.threads = set()
+        self.calls = []
+        self.release = threading.Event()
+        self.disconnected = 0
+
+    def execute(self, query, params=None, query_id=None, settings=None, columnar=False):
+        self.threads.add(threading.get_ident())
+        self.calls.append((query, params, settings, columnar))
+        with FakeDriverClient.lock:
+            FakeDriverClient.active += 1
+            FakeDriverClient.max_active = max(FakeDriverClient.max_active, FakeDriverClient.active)
+        try:
+            if query.startswith("BLOCK"):
+                self.release.wait(5)
+            elif "rejected" in query:
+                raise self.server_error("Type mismatch", code=53)
+            elif "broken" in query:
+                raise EOFError("Unexpected EOF while reading bytes")
+            elif query.startswith("SLEEP"):
+                time.sleep(0.05)
+            return [(1,)]
+        finally:
+            with FakeDriverClient.lock:
+                FakeDriverClient.active -= 1
+
+    def execute_iter(self, query, params=None, query_id=None, settings=None):
+        self.calls.append((query, params, settings, False))
+        return iter([(i,) for i in range(25)])
+
+    def disconnect(self):
+        self.disconnected += 1
+
+
+@pytest.fixture
+def client(ch_module):
+    FakeDriverClient.active = FakeDriverClient.max_active = 0
+    FakeDriverClient.server_error = ch_module._DriverServerError or Exception
+    client = ch_module.ClickHouseClient(timeout=5, stream_block_rows=10)
+    client.pool = ch_module.NativeConnectionPool(FakeDriverClient, size=2)
+    client.pool.open()
+    client.tcp_available = True
+    client.killed = []
+    client._kill_query = client.killed.append
+    yield client
+    client.pool.close()
+
+
+class TestNativePool:
+    """测试原生连接池"""
+
+    @pytest.mark.asyncio
+    async def test_concurrency_bounded_and_connections_pinned(self, client):
+        """测试并发查询不超过连接数，且每个连接始终在同一线程执行"""
+        await asyncio.gather(*(client.execute_native("SLEEP") for _ in range(8)))
+
+        assert FakeDriverClient.max_active == 2
+        assert client.pool.get_stats()['queries'] == [4, 4]
+        assert all(len(conn.client.threads) == 1 for conn in client.pool.connections)
+
+    @pytest.mark.asyncio
+    async def test_timeout_kills_query_and_holds_connection(self, client, ch_module):
+        """测试超时后终止服务端查询，查询线程结束前连接不归还"""
+        with pytest.raises(ch_module.ClickHouseQueryError, match="查询超时"):
+            await client.execute_native("BLOCK", timeout=0.05)
+
+        assert len(client.killed) == 1
+        assert client.pool.get_stats()['idle'] == 1
+        blocked = next(c for c in client.pool.connections if c.client.calls)
+        assert blocked.client.calls[0][2]['max_execution_time'] == 1
+
+        blocked.client.release.set()
+        await asyncio.sleep(0.05)
+        assert client.pool.get_stats()['idle'] == 2
+
+
+class TestStreamingAndInsert:
+    """测试流式读取与列式插入"""
+
+    @pytest.mark.asyncio
+    async def test_stream_yields_blocks(self, client):
+        """测试按块返回结果"""
+        blocks = [block async for block in client.stream("SELECT n FROM t")]
+
+        assert [len(b) for b in blocks] == [10, 10, 5]
+        assert blocks[2][-1] == (24,)
+        assert client.pool.get_stats()['idle'] == 2
+
+    @pytest.mark.asyncio
+    async def test_stream_early_exit_resets_connection(self, client):
+        """测试提前退出时终止查询并重置连接"""
+        stream = client.stream("SELECT n FROM t")
+        async for _ in stream:
+            break
+        await stream.aclose()
+        await asyncio.sleep(0.01)
+
+        assert len(client.killed) == 1
+        assert sum(c.client.disconnected for c in client.pool.connections) == 1
+        assert client.pool.get_stats()['idle'] == 2
+
+    @pytest.mark.asyncio
+    async def test_insert_columns_sends_columnar_data(self, client):
+        """测试列式插入"""
+        rows = await client.insert_columns("trades", {"price": [1.0, 2.0], "quantity": [3.0, 4.0]})
+
+        assert rows == 2
+        query, params, _, columnar = next(c for conn in client.pool.connections for c in conn.client.calls)
+        assert query == "INSERT INTO trades (price, quantity) VALUES"
+        assert params == [[1.0, 2.0], [3.0, 4.0]] and columnar
+
+        with pytest.raises(ValueError):
+            await client.insert_columns("trades", {"price": [1.0], "quantity": []})
+
+    @pytest.mark.asyncio
+    async def test_tcp_recovers_after_connection_error(self, client):
+        """测试服务端错误不关闭TCP；连接错误后按健康检查间隔恢复"""
+        with pytest.raises(Exception, match="Type mismatch"):
+            await client.insert_columns("rejected", {"price": [1.0]}, http_fallback=False)
+        assert client.tcp_available
+
+        with pytest.raises(EOFError):
+            await client.insert_columns("broken", {"price": [1.0]}, http_fallback=False)
+        assert not client.tcp_available
+
+        client.last_health_check = time.time()
+        assert await client.recover_tcp() is False  # 未到检查间隔，不探测
+
+        client.last_health_check = 0
+        assert await client.recover_tcp() is True
+        assert await client.insert_columns("trades", {"price": [1.0]}, http_fallback=False) == 1
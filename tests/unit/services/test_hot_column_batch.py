@@ -0,0 +1,92 @@
+"""
+热端列式批次测试
+测试类型化列缓冲、分片、回退还原与列式插入数据
+"""
+
+import importlib.util
+import sys
+from array import array
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[3]
+
+
+@pytest.fixture(scope="module")
+def column_batch():
+    spec = importlib.util.spec_from_file_location(
+        "hot_column_batch",
+        PROJECT_ROOT / "services" / "hot-storage-service" / "storage" / "column_batch.py"
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_trade(i, **overrides):
+    record = {
+        'ts_ms': 1700000000000 + i, 'exchange': 'binance_derivatives', 'market_type': 'perpetual',
+        'symbol': 'BTC-USDT', 'data_source': 'marketprism', 'trade_id': str(i),
+        'price': 50000.5 + i, 'quantity': 0.001, 'side': 'buy', 'is_maker': i % 2 == 0,
+    }
+    record.update(overrides)
+    return record
+
+
+class TestColumnBatch:
+    """测试列式批次"""
+
+    def test_typed_columns_follow_table_schema(self, column_batch):
+        """测试列顺序与类型，时间列缺省回退到 ts_ms，低基数字符串驻留"""
+        batch = column_batch.ColumnBatch("trades")
+        batch.append(make_trade(0, trade_ts_ms=1699999999999))
+        batch.append(make_trade(1))
+
+        columns = batch.columns()
+        assert list(columns) == ['timestamp', 'exchange', 'market_type', 'symbol', 'data_source',
+                                 'trade_id', 'price', 'quantity', 'side', 'is_maker', 'trade_time']
+        assert isinstance(columns['timestamp'], array) and columns['timestamp'].typecode == 'q'
+        assert isinstance(columns['price'], array) and columns['price'].typecode == 'd'
+        assert list(columns['trade_time']) == [1699999999999, 1700000000001]
+        assert list(columns['is_maker']) == [1, 0]
+        assert columns['exchange'][0] is columns['exchange'][1]
+
+    def test_chunks_and_rows_round_trip(self, column_batch):
+        """测试分片，以及还原为SQL回退使用的校验后字典"""
+        batch = column_batch.ColumnBatch("trades")
+        for i in range(5):
+            batch.append(make_trade(i))
+
+        chunks = list(batch.chunks(2))
+        assert [len(c) for c in chunks] == [2, 2, 1]
+        assert list(batch.chunks(10)) == [batch]
+
+        row = chunks[2].rows()[0]
+        assert row['ts_ms'] == 1700000000004 and row['trade_ts_ms'] == 1700000000004
+        assert row['price'] == 50004.5 and row['is_maker'] is True
+        assert row['symbol'] == 'BTC-USDT'
+
+    def test_defaults_and_base_only_tables(self, column_batch):
+        """测试缺省值与未定义列的表只写基础字段"""
+        orderbooks = column_batch.ColumnBatch("orderbooks")
+        orderbooks.append({'ts_ms': 1, 'exchange': 'okx_spot', 'market_type': 'spot',
+                           'symbol': 'BTC-USDT', 'data_source': 'x', 'last_update_id': 7})
+        assert orderbooks.column('bids')[0] == '[]'
+        assert orderbooks.column('best_bid_price')[0] == 0.0
+
+        interests = column_batch.ColumnBatch("open_interests")
+        interests.append({'ts_ms': 1, 'exchange': 'okx', 'market_type': 'perpetual',
+                          'symbol': 'BTC-USDT', 'data_source': 'x', 'open_interest': 1.0})
+        assert list(interests.columns()) == ['timestamp', 'exchange', 'market_type', 'symbol', 'data_source']
+
+    def test_failed_append_leaves_columns_aligned(self, column_batch):
+        """测试转换失败的记录不写入任何列"""
+        batch = column_batch.ColumnBatch("trades")
+        batch.append(make_trade(0))
+        with pytest.raises(ValueError):
+            batch.append(make_trade(1, quantity='n/a'))
+
+        assert len(batch) == 1
+        assert {len(col) for col in batch.columns().values()} == {1}
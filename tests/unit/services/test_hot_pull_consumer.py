@@ -0,0 +1,152 @@
+"""
+热端拉取消费测试
+测试分片写入成功后ACK、失败NAK、无效消息TERM、重试期间续期ACK等待与自适应批次大小
+"""
+
+import importlib.util
+import json
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[3]
+
+
+@pytest.fixture(scope="module")
+def hot_main():
+    spec = importlib.util.spec_from_file_location(
+        "hot_storage_main",
+        PROJECT_ROOT / "services" / "hot-storage-service" / "main.py"
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def service(hot_main, monkeypatch):
+    svc = hot_main.SimpleHotStorageService({
+        'nats': {'pull_batch_min': 10, 'pull_batch_max': 100},
+        'hot_storage': {'strict_monitor': False, 'publish_watermarks': False},
+        'retry': {'max_retries': 2, 'delay_seconds': 1, 'backoff_multiplier': 2},
+    })
+    svc.batch_config['insert_chunk_size'] = 2
+    svc.sleeps = []
+
+    async def fake_sleep(delay):
+        svc.sleeps.append(delay)
+
+    monkeypatch.setattr(hot_main.asyncio, "sleep", fake_sleep)
+    return svc
+
+
+def make_msg(i, data=None):
+    if data is None:
+        data = json.dumps({
+            'ts_ms': 1700000000000 + i, 'exchange': 'binance', 'market_type': 'spot',
+            'symbol': 'BTC-USDT', 'trade_id': str(i), 'price': 50000 + i, 'quantity': 0.1, 'side': 'buy',
+        }).encode()
+    return SimpleNamespace(data=data, subject="trade.binance.spot.BTC-USDT",
+                           ack=AsyncMock(), nak=AsyncMock(), term=AsyncMock(), in_progress=AsyncMock())
+
+
+class TestPullConsumer:
+    """测试JetStream拉取消费路径"""
+
+    @pytest.mark.asyncio
+    async def test_chunk_acked_only_after_insert_succeeds(self, service):
+        """测试每个分片写入成功后ACK，失败分片NAK"""
+        results = iter([True, False, False, False])
+        inserted = []
+
+        async def fake_insert(data_type, chunk):
+            inserted.append([row['trade_id'] for row in chunk.rows()])
+            return next(results)
+
+        service._batch_insert_to_clickhouse = fake_insert
+        msgs = [make_msg(i) for i in range(4)]
+
+        assert await service._process_pulled_batch("trade", msgs) is False
+
+        assert inserted == [['0', '1'], ['2', '3'], ['2', '3'], ['2', '3']]
+        for msg in msgs[:2]:
+            msg.ack.assert_awaited_once()
+            msg.nak.assert_not_awaited()
+        for msg in msgs[2:]:
+            msg.nak.assert_awaited_once()
+            msg.ack.assert_not_awaited()
+        assert service.stats['messages_processed'] == 2
+        assert service.stats['messages_failed'] == 2
+
+    @pytest.mark.asyncio
+    async def test_invalid_messages_terminated(self, service, hot_main):
+        """测试无效JSON与校验失败的消息TERM，不参与写入"""
+        validate = service._validate_message_data
+
+        def strict_validate(data, data_type, subject=None):
+            if data.get('trade_id') == '1':
+                raise hot_main.DataValidationError("bad trade")
+            return validate(data, data_type, subject)
+
+        service._validate_message_data = strict_validate
+        service._batch_insert_to_clickhouse = AsyncMock(return_value=True)
+        bad_json = make_msg(0, data=b"{not json")
+        bad_data = make_msg(1)
+        good = make_msg(2)
+
+        assert await service._process_pulled_batch("trade", [bad_json, bad_data, good]) is True
+
+        bad_json.term.assert_awaited_once()
+        bad_data.term.assert_awaited_once()
+        good.ack.assert_awaited_once()
+        good.term.assert_not_awaited()
+        assert service.stats['validation_errors'] == 2
+        assert len(service._batch_insert_to_clickhouse.await_args.args[1]) == 1
+
+    @pytest.mark.asyncio
+    async def test_retry_keeps_messages_in_progress(self, service):
+        """测试重试退避前续期ACK等待，单次退避不超过 ack_wait 的四分之一"""
+        service.retry_config.update(max_retries=3, retry_delay=10)
+        service._batch_insert_to_clickhouse = AsyncMock(side_effect=[False, False, False, True])
+        msgs = [make_msg(0), make_msg(1)]
+        chunk = service._new_column_batch("trade")
+
+        assert await service._insert_chunk_with_retry("trade", chunk, msgs) is True
+
+        assert service.sleeps == [10, 15, 15]
+        assert sum(service.sleeps) < service.PULL_ACK_WAIT
+        for msg in msgs:
+            assert msg.in_progress.await_count == 3
+
+    def test_adaptive_batch_size(self, service):
+        """测试批次大小随积压深度在上下限之间变化"""
+        assert service._next_pull_batch_size(0) == 10
+        assert service._next_pull_batch_size(55) == 55
+        assert service._next_pull_batch_size(10_000) == 100
+
+
+class TestInsertFallback:
+    """测试TCP插入失败时的HTTP回退"""
+
+    @pytest.mark.asyncio
+    async def test_timed_out_insert_not_replayed_over_http(self, service, hot_main):
+        """测试TCP插入超时（服务端可能已写入）时不经HTTP重放，返回失败交由NAK重投"""
+        ch = SimpleNamespace(
+            recover_tcp=AsyncMock(return_value=True),
+            insert_columns=AsyncMock(side_effect=hot_main.ClickHouseQueryError("查询超时(30s)")),
+            execute_native=AsyncMock(side_effect=hot_main.ClickHouseQueryError("查询超时(30s)")),
+            execute_http=AsyncMock(),
+        )
+        service._ch_client = ch
+        chunk = service._new_column_batch("trade")
+        chunk.append(service._validate_message_data(json.loads(make_msg(0).data), "trade"))
+
+        assert await service._batch_insert_to_clickhouse("trade", chunk) is False
+        assert await service._store_to_clickhouse("trade", json.loads(make_msg(1).data)) is False
+
+        ch.execute_http.assert_not_awaited()
+        assert service.stats['http_fallback_hits'] == 0
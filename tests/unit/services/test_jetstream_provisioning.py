@@ -0,0 +1,62 @@
+"""
+JetStream 流初始化配置测试
+测试按数据类型拆分流与 StreamConfig 构建
+"""
+
+import importlib.util
+from pathlib import Path
+
+import pytest
+import yaml
+
+pytest.importorskip("nats")
+from nats.js.api import DiscardPolicy, StorageType
+
+PROJECT_ROOT = Path(__file__).resolve().parents[3]
+
+
+@pytest.fixture(scope="module")
+def init_jetstream():
+    spec = importlib.util.spec_from_file_location(
+        "init_jetstream", PROJECT_ROOT / "services" / "message-broker" / "init_jetstream.py"
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def market_data():
+    config = yaml.safe_load((PROJECT_ROOT / "scripts" / "js_init_market_data.yaml").read_text(encoding="utf-8"))
+    return config["streams"]["MARKET_DATA"]
+
+
+class TestStreamProvisioning:
+    """流配置展开与构建测试"""
+
+    def test_single_stream_layout_unchanged(self, init_jetstream, market_data):
+        """测试默认单流布局保持 MARKET_DATA 与每 subject 限额"""
+        streams = init_jetstream.expand_streams({"MARKET_DATA": market_data})
+        config = init_jetstream.build_stream_config(streams["MARKET_DATA"])
+
+        assert list(streams) == ["MARKET_DATA"]
+        assert config.subjects == market_data["subjects"]
+        assert config.max_msgs_per_subject == market_data["max_msgs_per_subject"]
+        assert config.storage == StorageType.FILE
+        assert config.discard == DiscardPolicy.OLD
+
+    def test_split_by_data_type_with_overrides(self, init_jetstream, market_data):
+        """测试按数据类型拆分并应用单类型覆盖"""
+        market_data = dict(market_data, split_by="data_type",
+                           per_type={"liquidation": {"storage": "memory", "max_age": 3600}})
+        streams = init_jetstream.expand_streams({"MARKET_DATA": market_data})
+
+        assert "MARKET_DATA" not in streams
+        liquidation = streams["MARKET_DATA_LIQUIDATION"]
+        assert liquidation["subjects"] == ["liquidation.binance.>", "liquidation.okx.>", "liquidation.deribit.>"]
+        assert sorted(s for cfg in streams.values() for s in cfg["subjects"]) == sorted(market_data["subjects"])
+
+        config = init_jetstream.build_stream_config(liquidation)
+        assert config.storage == StorageType.MEMORY
+        assert config.max_age == 3600
+        assert init_jetstream.build_stream_config(streams["MARKET_DATA_FUNDING_RATE"]).storage == StorageType.FILE
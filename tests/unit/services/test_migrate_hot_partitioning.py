@@ -0,0 +1,107 @@
+"""
+热端分区迁移脚本测试
+测试分区键判断、建表语句改写，以及换表前的行数校验与跳过逻辑
+"""
+
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[3]
+
+MONTHLY_CREATE = (
+    "CREATE TABLE marketprism_hot.trades (`timestamp` DateTime64(3, 'UTC'), `exchange` LowCardinality(String), "
+    "`created_at` DateTime64(3, 'UTC')) ENGINE = MergeTree PARTITION BY (toYYYYMM(timestamp), exchange) "
+    "ORDER BY (exchange, timestamp) TTL toDateTime(timestamp) + toIntervalDay(3) SETTINGS index_granularity = 8192"
+)
+
+
+@pytest.fixture(scope="module")
+def migrate():
+    spec = importlib.util.spec_from_file_location(
+        "migrate_hot_partitioning",
+        PROJECT_ROOT / "services" / "hot-storage-service" / "scripts" / "migrate_hot_partitioning.py"
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def clickhouse(migrate, monkeypatch):
+    """按 SQL 片段应答的假 ClickHouse，记录执行过的语句"""
+    ch = {
+        "sql": [],
+        "table": f"(toYYYYMM(timestamp), exchange)\t{MONTHLY_CREATE}",
+        "partitions": "202501-binance\n202501-okx",
+        "expected": "10",
+        "copied": "10",
+    }
+
+    def http_query(sql):
+        ch["sql"].append(sql)
+        if "FROM system.tables" in sql:
+            return ch["table"]
+        if "FROM system.parts" in sql:
+            return ch["partitions"]
+        if "now64" in sql:
+            return "2025-01-02 00:00:00.000"
+        if "count()" in sql:
+            return ch["copied"] if "__repart" in sql else ch["expected"]
+        return ""
+
+    monkeypatch.setattr(migrate, "_http_query", http_query)
+    return ch
+
+
+class TestMigrateHotPartitioning:
+    """热端分区迁移测试"""
+
+    def test_partition_key_and_create_rewrite(self, migrate):
+        assert migrate.is_daily_partitioned("toYYYYMMDD(timestamp), exchange")
+        assert not migrate.is_daily_partitioned("(toYYYYMM(timestamp), exchange)")
+
+        sql = migrate.rewrite_create_query(MONTHLY_CREATE, "marketprism_hot", "trades", "trades__repart")
+        assert sql.startswith("CREATE TABLE marketprism_hot.trades__repart (")
+        assert "PARTITION BY (toYYYYMMDD(timestamp), exchange) ORDER BY (exchange, timestamp) TTL" in sql
+        assert "toYYYYMM(timestamp)" not in sql
+
+        with pytest.raises(ValueError):
+            migrate.rewrite_create_query(MONTHLY_CREATE, "marketprism_hot", "orderbooks", "x")
+
+    def test_skip_daily_table_and_dry_run(self, migrate, clickhouse):
+        """测试已按天分区或不存在时跳过，dry-run 不做修改"""
+        clickhouse["table"] = f"(toYYYYMMDD(timestamp), exchange)\t{MONTHLY_CREATE}"
+        assert migrate.migrate_table("marketprism_hot", "trades", dry_run=False, keep_old=False) is None
+        clickhouse["table"] = ""
+        assert migrate.migrate_table("marketprism_hot", "trades", dry_run=False, keep_old=False) is None
+        assert len(clickhouse["sql"]) == 2
+
+        clickhouse["table"] = f"(toYYYYMM(timestamp), exchange)\t{MONTHLY_CREATE}"
+        clickhouse["sql"].clear()
+        assert migrate.migrate_table("marketprism_hot", "trades", dry_run=True, keep_old=False) is None
+        assert all(sql.lstrip().startswith("SELECT") for sql in clickhouse["sql"])
+
+    def test_migrates_per_partition_and_exchanges(self, migrate, clickhouse):
+        """测试按分区复制存量，校验通过后换表并补齐增量"""
+        assert migrate.migrate_table("marketprism_hot", "trades", dry_run=False, keep_old=False) is None
+
+        writes = [sql for sql in clickhouse["sql"] if not sql.startswith("SELECT")]
+        assert writes[0] == "DROP TABLE IF EXISTS marketprism_hot.trades__repart"
+        assert writes[1].startswith("CREATE TABLE marketprism_hot.trades__repart")
+        assert "_partition_id = '202501-binance'" in writes[2]
+        assert "_partition_id = '202501-okx'" in writes[3]
+        assert writes[4] == "EXCHANGE TABLES marketprism_hot.trades AND marketprism_hot.trades__repart"
+        assert "created_at > toDateTime64('2025-01-02 00:00:00.000', 3, 'UTC')" in writes[5]
+        assert writes[6] == "DROP TABLE marketprism_hot.trades__repart"
+
+    def test_count_mismatch_keeps_original_table(self, migrate, clickhouse):
+        """测试行数不一致时不换表并返回错误"""
+        clickhouse["copied"] = "9"
+
+        err = migrate.migrate_table("marketprism_hot", "trades", dry_run=False, keep_old=False)
+
+        assert "expected=10 copied=9" in err
+        assert not any(sql.startswith(("EXCHANGE", "DROP TABLE marketprism")) for sql in clickhouse["sql"])
+        assert migrate.main(["--tables", "trades"]) == 1
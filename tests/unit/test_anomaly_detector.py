@@ -13,7 +13,8 @@ sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
 from core.observability.alerting.anomaly_detector import (
     AnomalyDetector, BaseAnomalyDetector, MLAnomalyDetector,
-    SeasonalAnomalyDetector, MetricPoint, AnomalyResult
+    SeasonalAnomalyDetector, MetricPoint, AnomalyResult,
+    RunningStats, EWMAStats, RollingMedianStats, SKLEARN_AVAILABLE
 )
 
 
@@ -89,6 +90,54 @@ class TestAnomalyResult:
         assert result_dict['value'] == 60.0
 
 
+class TestRunningStatistics:
+    """增量统计量测试"""
+    
+    def test_running_stats_matches_full_window(self):
+        """测试滑动窗口Welford结果与全量计算一致"""
+        rng = np.random.default_rng(7)
+        values = rng.normal(100, 15, 500)
+        stats = RunningStats(capacity=50)
+        
+        for i, value in enumerate(values):
+            stats.push(float(value))
+            window = values[max(0, i - 49):i + 1]
+            assert len(stats) == len(window)
+            assert stats.center() == pytest.approx(np.mean(window))
+            assert stats.spread() == pytest.approx(np.std(window))
+    
+    def test_rolling_median_matches_numpy(self):
+        """测试滚动中位数/MAD与numpy计算一致"""
+        rng = np.random.default_rng(11)
+        values = rng.standard_t(3, 300)
+        stats = RollingMedianStats(capacity=31)
+        
+        for i, value in enumerate(values):
+            stats.push(float(value))
+            window = values[max(0, i - 30):i + 1]
+            median = np.median(window)
+            mad = np.median(np.abs(window - median))
+            assert stats.center() == pytest.approx(median)
+            assert stats.spread() == pytest.approx(mad * RollingMedianStats.MAD_SCALE)
+    
+    def test_ewma_stats_tracks_level_shift(self):
+        """测试EWMA对水平变化的跟踪"""
+        stats = EWMAStats(alpha=0.5)
+        for _ in range(50):
+            stats.push(10.0)
+        assert stats.center() == pytest.approx(10.0)
+        assert stats.spread() == 0.0
+        
+        for _ in range(50):
+            stats.push(20.0)
+        assert stats.center() == pytest.approx(20.0)
+    
+    def test_invalid_estimator(self):
+        """测试不支持的估计器"""
+        with pytest.raises(ValueError):
+            BaseAnomalyDetector(estimator='unknown')
+
+
 class TestBaseAnomalyDetector:
     """基础异常检测器测试"""
     
@@ -165,6 +214,20 @@ class TestBaseAnomalyDetector:
         assert "metric2" in detector.data_windows
         assert len(detector.data_windows["metric1"]) == 15
         assert len(detector.data_windows["metric2"]) == 15
+    
+    def test_median_estimator_ignores_spikes(self):
+        """测试中位数估计器在历史尖峰下仍能识别异常"""
+        detector = BaseAnomalyDetector(window_size=50, threshold=3.0, estimator='median')
+        timestamp = datetime.now(timezone.utc)
+        
+        for i in range(40):
+            value = 500.0 if i % 10 == 0 else 50.0 + (i % 3)
+            detector.add_metric_point("spiky", MetricPoint(timestamp + timedelta(seconds=i), value))
+        
+        result = detector.add_metric_point("spiky", MetricPoint(timestamp + timedelta(seconds=40), 80.0))
+        
+        assert result is not None
+        assert result.is_anomaly is True
 
 
 class TestSeasonalAnomalyDetector:
@@ -315,6 +378,39 @@ class TestMLAnomalyDetector:
         if hasattr(detector, 'models') and 'ml_metric' in detector.models:
             assert detector.models['ml_metric'] is not None
             assert detector.scalers['ml_metric'] is not None
+    
+    @pytest.mark.skipif(not SKLEARN_AVAILABLE, reason="ML detector requires scikit-learn")
+    def test_ml_training_runs_in_background(self, detector):
+        """测试模型在后台训练，训练完成前回退到统计检测"""
+        timestamp = datetime.now(timezone.utc)
+        
+        for i in range(20):
+            point = MetricPoint(timestamp + timedelta(seconds=i), 50.0 + np.random.normal(0, 5))
+            result = detector.add_metric_point("ml_metric", point)
+        
+        detector.wait_for_training(timeout=30)
+        assert 'ml_metric' in detector.models
+        assert 'ml_metric' in detector.scalers
+        
+        point = MetricPoint(timestamp + timedelta(seconds=20), 50.0)
+        result = detector.add_metric_point("ml_metric", point)
+        assert result is not None
+        assert result.threshold == 0.0
+        
+        detector.shutdown()
+
+    @pytest.mark.skipif(not SKLEARN_AVAILABLE, reason="ML detector requires scikit-learn")
+    def test_retrain_replaces_model_and_scaler_together(self, detector):
+        """测试重训后模型与标准化器作为一对整体替换"""
+        detector._train_model("ml_metric", np.full((50, 1), 10.0) + np.random.normal(0, 1, (50, 1)))
+        old_model, old_scaler = detector._fitted["ml_metric"]
+
+        detector._train_model("ml_metric", np.full((50, 1), 500.0) + np.random.normal(0, 1, (50, 1)))
+        model, scaler = detector._fitted["ml_metric"]
+
+        assert model is not old_model and scaler is not old_scaler
+        assert abs(scaler.mean_[0] - 500.0) < 5
+        assert detector.models["ml_metric"] is model and detector.scalers["ml_metric"] is scaler
 
 
 if __name__ == '__main__':